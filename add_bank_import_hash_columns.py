@@ -0,0 +1,102 @@
+"""
+Add content-hash duplicate detection columns for bank statement imports.
+
+Adds:
+    bank_imports.duplicate_rows
+    bank_import_rows.content_hash (+ index)
+    bank_statement_entries.content_hash (+ index on bank_account_id, content_hash)
+
+and backfills content_hash for rows imported before this change, so
+re-importing an old statement still skips the lines already stored.
+
+Usage:
+    python add_bank_import_hash_columns.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text, inspect, select, update
+from sqlalchemy.orm import Session
+from app.database.connection import engine
+from app.database.models import BankImportRow
+from app.database.bank_statement_models import BankStatementEntry
+from app.services.bank_import_service import statement_line_hash
+
+BATCH_SIZE = 5000
+
+COLUMNS = [
+    ("bank_imports", "duplicate_rows", "INTEGER DEFAULT 0"),
+    ("bank_import_rows", "content_hash", "VARCHAR(64)"),
+    ("bank_statement_entries", "content_hash", "VARCHAR(64)"),
+]
+
+INDEXES = [
+    ("idx_import_row_hash", "bank_import_rows", "content_hash"),
+    ("idx_bank_statement_entry_hash", "bank_statement_entries", "bank_account_id, content_hash"),
+]
+
+
+def add_columns():
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table, column, column_type in COLUMNS:
+            existing = [col['name'] for col in inspector.get_columns(table)]
+            if column in existing:
+                print(f"  ⏭️ {table}.{column} already exists")
+                continue
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"))
+            print(f"  ✅ Added column: {table}.{column}")
+
+        for name, table, columns in INDEXES:
+            existing = [index['name'] for index in inspector.get_indexes(table)]
+            if name in existing:
+                print(f"  ⏭️ Index {name} already exists")
+                continue
+            conn.execute(text(f"CREATE INDEX {name} ON {table} ({columns})"))
+            print(f"  ✅ Created index: {name}")
+
+
+def backfill(db: Session, model, hash_of) -> int:
+    """Fill content_hash in batches for rows that don't have one."""
+    filled = 0
+    while True:
+        rows = db.execute(
+            select(model).where(model.content_hash.is_(None)).limit(BATCH_SIZE)
+        ).scalars().all()
+        if not rows:
+            return filled
+
+        db.execute(update(model), [{"id": row.id, "content_hash": hash_of(row)} for row in rows])
+        db.commit()
+        filled += len(rows)
+        print(f"    {model.__tablename__}: {filled} rows")
+
+
+def main():
+    print("Adding bank import duplicate detection columns...")
+    print("=" * 60)
+    add_columns()
+
+    print("\nBackfilling content hashes...")
+    with Session(engine) as db:
+        rows = backfill(db, BankImportRow, lambda row: statement_line_hash(
+            row.value_date or row.transaction_date,
+            (row.credit_amount or 0) - (row.debit_amount or 0),
+            row.description,
+            row.reference_number,
+            row.balance,
+        ))
+        entries = backfill(db, BankStatementEntry, lambda entry: statement_line_hash(
+            entry.value_date,
+            entry.amount,
+            entry.description,
+            entry.bank_reference,
+            entry.balance,
+        ))
+
+    print(f"\n✅ Done: {rows} import rows and {entries} statement entries hashed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Add columns for parallel payroll processing.
+
+Adds:
+    payroll_settings.payroll_workers
+    payroll_runs.processing_errors
+
+Usage:
+    python add_payroll_parallel_columns.py
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text, inspect
+from app.database.connection import engine
+
+COLUMNS = [
+    ("payroll_settings", "payroll_workers", "INTEGER DEFAULT 1"),
+    ("payroll_runs", "processing_errors", "JSON"),
+]
+
+
+def main():
+    print("Adding parallel payroll columns...")
+    print("=" * 60)
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table, column, column_type in COLUMNS:
+            existing = [col['name'] for col in inspector.get_columns(table)]
+            if column in existing:
+                print(f"  ⏭️ {table}.{column} already exists")
+                continue
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"))
+            print(f"  ✅ Added column: {table}.{column}")
+
+    print("\n✅ Done")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,14 @@
 """Accounting API endpoints."""
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from typing import List, Optional
 from datetime import datetime, date
-from app.database.connection import get_db
+from app.database.connection import get_db, get_async_db
 from app.database.models import User, Company, Account, Transaction, BankImport, AccountMapping, PayrollAccountConfig, AccountMappingType
-from app.auth.dependencies import get_current_user, get_current_active_user
+from app.auth.dependencies import get_current_user, get_current_active_user, get_current_active_user_async, get_company_or_404_async
 from app.services.accounting_service import AccountingService
 from app.services.bank_import_service import BankImportService
 from app.services.report_service import ReportService
@@ -278,14 +281,18 @@ async def get_account_ledger(
     account_id: str,
     from_date: Optional[date] = None,
     to_date: Optional[date] = None,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get account ledger with transaction history."""
-    company = get_company_or_404(company_id, current_user, db)
-    service = AccountingService(db)
+    company = await get_company_or_404_async(company_id, current_user, db)
     
-    account = service.get_account(account_id, company)
+    account = await db.scalar(
+        select(Account).where(
+            Account.id == account_id,
+            Account.company_id == company.id
+        )
+    )
     if not account:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -295,7 +302,10 @@ async def get_account_ledger(
     from_dt = datetime.combine(from_date, datetime.min.time()) if from_date else None
     to_dt = datetime.combine(to_date, datetime.max.time()) if to_date else None
     
-    ledger = service.get_account_ledger(account, from_dt, to_dt)
+    # Reuse the sync service on the async connection
+    ledger = await db.run_sync(
+        lambda session: AccountingService(session).get_account_ledger(account, from_dt, to_dt)
+    )
     
     return {
         "account": AccountResponse.model_validate(ledger["account"]),
@@ -649,24 +659,9 @@ async def preview_bank_statement(
         )
     
     try:
-        content = await file.read()
-        # Try different encodings
-        content_str = None
-        for encoding in ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252']:
-            try:
-                content_str = content.decode(encoding)
-                break
-            except UnicodeDecodeError:
-                continue
-        
-        if content_str is None:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Unable to decode CSV file"
-            )
-        
+        # Read from the spooled upload; the encoding is sniffed by the service
         service = BankImportService(db)
-        preview = service.preview_csv(content_str)
+        preview = await run_in_threadpool(service.preview_csv, file.file)
         
         return {
             "filename": file.filename,
@@ -708,22 +703,6 @@ async def upload_bank_statement(
         )
     
     try:
-        content = await file.read()
-        # Try different encodings
-        content_str = None
-        for encoding in ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252']:
-            try:
-                content_str = content.decode(encoding)
-                break
-            except UnicodeDecodeError:
-                continue
-        
-        if content_str is None:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Unable to decode CSV file"
-            )
-        
         # Build column mapping if provided
         column_mapping = None
         if description_column:  # At minimum, description is required
@@ -741,11 +720,13 @@ async def upload_bank_statement(
             if balance_column:
                 column_mapping['balance'] = balance_column
         
+        # Stream the spooled upload in chunks, off the event loop
         service = BankImportService(db)
-        bank_import = service.create_import(
+        bank_import = await run_in_threadpool(
+            service.create_import,
             company,
             file.filename,
-            content_str,
+            file.file,
             bank_account_id,
             bank_name,
             column_mapping
@@ -926,6 +907,26 @@ async def get_profit_loss(
     return report
 
 
+@router.get("/reports/profit-loss/periodic")
+async def get_periodic_profit_loss(
+    company_id: str,
+    from_date: date,
+    to_date: date,
+    months_per_period: int = Query(1, ge=1, le=12),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Profit & Loss with one column per month (3 for quarters, ...)."""
+    company = get_company_or_404(company_id, current_user, db)
+    
+    service = ReportService(db)
+    
+    from_dt = datetime.combine(from_date, datetime.min.time())
+    to_dt = datetime.combine(to_date, datetime.max.time())
+    
+    return service.get_periodic_profit_loss(company, from_dt, to_dt, months_per_period)
+
+
 @router.get("/reports/balance-sheet")
 async def get_balance_sheet(
     company_id: str,
@@ -948,6 +949,49 @@ async def get_balance_sheet(
     return report
 
 
+@router.get("/reports/balance-sheet/comparative")
+async def get_comparative_balance_sheet(
+    company_id: str,
+    as_of_dates: List[date] = Query(...),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Balance Sheets as of several dates, side by side."""
+    company = get_company_or_404(company_id, current_user, db)
+    
+    service = ReportService(db)
+    
+    as_of_dts = [datetime.combine(d, datetime.max.time()) for d in as_of_dates]
+    return service.get_comparative_balance_sheet(company, as_of_dts)
+
+
+@router.get("/reports/comparative")
+async def get_comparative_report(
+    company_id: str,
+    from_dates: List[date] = Query(...),
+    to_dates: List[date] = Query(...),
+    statement: str = Query("profit_loss", pattern="^(profit_loss|balance_sheet)$"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Profit & Loss or Balance Sheet with one column per period (from_dates[i] - to_dates[i])."""
+    company = get_company_or_404(company_id, current_user, db)
+    
+    if len(from_dates) != len(to_dates):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="from_dates and to_dates must have the same number of values"
+        )
+    
+    service = ReportService(db)
+    
+    periods = [
+        (datetime.combine(f, datetime.min.time()), datetime.combine(t, datetime.max.time()))
+        for f, t in zip(from_dates, to_dates)
+    ]
+    return service.get_comparative_report(company, periods, statement)
+
+
 @router.get("/reports/cash-flow")
 async def get_cash_flow(
     company_id: str,
@@ -1064,15 +1108,19 @@ async def get_party_statement(
 async def get_day_book(
     company_id: str,
     date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    page: int = Query(1, ge=1),
+    page_size: Optional[int] = Query(None, ge=1, le=1000),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Get day book - all transactions for a specific day."""
+    """Get day book - all transactions for a specific day (or up to to_date)."""
     company = get_company_or_404(company_id, current_user, db)
     service = ReportService(db)
     
     target_date = datetime.combine(date, datetime.min.time()) if date else None
-    return service.get_day_book(company, target_date)
+    end_date = datetime.combine(to_date, datetime.min.time()) if to_date else None
+    return service.get_day_book(company, target_date, end_date, page, page_size)
 
 
 # ============== Account Mapping Endpoints ==============
@@ -6,7 +6,8 @@ from app.database.payroll_models import  Employee, Designation
 from app.database.models import User
 from app.schemas.auth import UserCreate, UserLogin, UserResponse, TokenResponse, UserUpdate, PasswordChange
 from app.auth.supabase_client import auth_helper
-from app.auth.dependencies import get_current_user
+from app.auth.dependencies import get_current_user, get_token_from_header
+from app.auth.token_verifier import token_verifier
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
@@ -193,9 +194,13 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
 
 
 @router.post("/logout")
-async def logout(current_user: User = Depends(get_current_user)):
+async def logout(
+    current_user: User = Depends(get_current_user),
+    token: str = Depends(get_token_from_header)
+):
     """Logout the current user."""
-    # With Supabase, logout is handled client-side
+    # With Supabase, logout is handled client-side; stop accepting this token here too
+    token_verifier.revoke_token(token)
     return {"message": "Logged out successfully"}
 
 
@@ -243,6 +248,9 @@ async def change_password(
         # Update password in Supabase
         await auth_helper.update_password(data.new_password)
         
+        # Tokens issued before the change are no longer accepted here
+        token_verifier.revoke_user(current_user.supabase_id)
+        
         return {"message": "Password updated successfully"}
     except Exception as e:
         raise HTTPException(
@@ -1,7 +1,8 @@
 """
 Banking API - Cheques, PDC, Bank Reconciliation, Recurring Transactions
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import Optional, List
 from datetime import datetime
@@ -683,6 +684,40 @@ async def import_bank_statement(
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post("/companies/{company_id}/bank-accounts/{bank_account_id}/import-statement/upload")
+async def upload_bank_statement_file(
+    company_id: str,
+    bank_account_id: str,
+    file: UploadFile = File(...),
+    bank_name: Optional[str] = Form(None),
+    auto_match: bool = Form(True),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Import a bank statement CSV file upload (Tally-style).
+    
+    Same as import-statement, but the file is streamed from the upload in
+    chunks instead of being posted as one JSON string, so large statements
+    are never held in memory whole.
+    """
+    get_company_or_404(company_id, current_user, db)
+    service = BankStatementImportService(db)
+    
+    try:
+        return await run_in_threadpool(
+            service.import_statement,
+            company_id=company_id,
+            bank_account_id=bank_account_id,
+            content=file.file,
+            file_name=file.filename or "import.csv",
+            bank_name=bank_name,
+            auto_match=auto_match,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get("/companies/{company_id}/bank-accounts/{bank_account_id}/statement-entries")
 async def get_statement_entries(
     company_id: str,
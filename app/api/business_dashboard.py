@@ -1,20 +1,22 @@
 """Business Dashboard API - Comprehensive overview of sales, purchases, GST, and TDS."""
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, and_, or_, select, case
 from typing import Optional, List
 from datetime import datetime, date, timedelta
 from dateutil.relativedelta import relativedelta
 from decimal import Decimal
 from pydantic import BaseModel
 
-from app.database.connection import get_db
+from app.database.connection import get_db, get_async_db
 from app.database.models import (
     User, Company, Invoice, InvoiceStatus, PurchaseInvoice, PurchaseInvoiceStatus,
     PurchaseOrder, SalesOrder, OrderStatus, Payment, PurchasePayment,
     TDSEntry, Transaction, TransactionEntry, Account, AccountType
 )
-from app.auth.dependencies import get_current_active_user
+from app.auth.dependencies import get_current_active_user, get_current_active_user_async, get_company_or_404_async
+from app.services.dashboard_cache import dashboard_cache
 
 router = APIRouter(prefix="/companies/{company_id}/business", tags=["Business Dashboard"])
 
@@ -115,35 +117,46 @@ class RecentActivityResponse(BaseModel):
 async def get_business_summary(
     company_id: str,
     period: str = Query("month", pattern="^(month|quarter|year)$"),
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get overall business summary - sales, purchases, and net position."""
-    company = get_company_or_404(company_id, current_user, db)
+    company = await get_company_or_404_async(company_id, current_user, db)
     start_date, end_date = get_period_dates(period)
     
+    key = dashboard_cache.key(company.id, "business_summary", period, start_date)
+    summary = dashboard_cache.get(key)
+    if summary is not None:
+        return summary
+    
     # Total Sales (from invoices)
-    sales_result = db.query(func.sum(Invoice.total_amount)).filter(
+    sales = select(func.coalesce(func.sum(Invoice.total_amount), 0)).where(
         Invoice.company_id == company.id,
         Invoice.invoice_date >= start_date,
         Invoice.invoice_date <= end_date,
         Invoice.status.notin_([InvoiceStatus.DRAFT, InvoiceStatus.CANCELLED, InvoiceStatus.VOID])
-    ).scalar() or Decimal("0")
+    ).scalar_subquery()
     
     # Total Purchases (from purchase invoices)
-    purchases_result = db.query(func.sum(PurchaseInvoice.total_amount)).filter(
+    purchases = select(func.coalesce(func.sum(PurchaseInvoice.total_amount), 0)).where(
         PurchaseInvoice.company_id == company.id,
         PurchaseInvoice.invoice_date >= start_date,
         PurchaseInvoice.invoice_date <= end_date,
         PurchaseInvoice.status.notin_([PurchaseInvoiceStatus.DRAFT, PurchaseInvoiceStatus.CANCELLED])
-    ).scalar() or Decimal("0")
+    ).scalar_subquery()
     
-    return BusinessSummary(
+    # Both totals in one round trip
+    sales_result, purchases_result = (await db.execute(select(sales, purchases))).one()
+    sales_result, purchases_result = Decimal(sales_result or 0), Decimal(purchases_result or 0)
+    
+    summary = BusinessSummary(
         total_sales=float(sales_result),
         total_purchases=float(purchases_result),
         net_position=float(sales_result - purchases_result),
         period={"from": start_date.isoformat(), "to": end_date.isoformat(), "type": period}
     )
+    dashboard_cache.set(key, summary)
+    return summary
 
 
 @router.get("/gst-summary", response_model=GSTSummaryResponse)
@@ -404,59 +417,48 @@ async def get_outstanding_summary(
 ):
     """Get outstanding receivables and payables summary."""
     company = get_company_or_404(company_id, current_user, db)
+    today = date.today()
     
-    # Outstanding Receivables (unpaid invoices)
-    receivables = db.query(func.sum(Invoice.balance_due)).filter(
-        Invoice.company_id == company.id,
-        Invoice.balance_due > 0,
-        Invoice.status.notin_([InvoiceStatus.CANCELLED, InvoiceStatus.VOID, InvoiceStatus.DRAFT])
-    ).scalar() or Decimal("0")
-    
-    receivables_count = db.query(Invoice).filter(
-        Invoice.company_id == company.id,
-        Invoice.balance_due > 0,
-        Invoice.status.notin_([InvoiceStatus.CANCELLED, InvoiceStatus.VOID, InvoiceStatus.DRAFT])
-    ).count()
-    
-    # Outstanding Payables (unpaid purchase invoices)
-    payables = db.query(func.sum(PurchaseInvoice.balance_due)).filter(
-        PurchaseInvoice.company_id == company.id,
-        PurchaseInvoice.balance_due > 0,
-        PurchaseInvoice.status.notin_([PurchaseInvoiceStatus.CANCELLED, PurchaseInvoiceStatus.DRAFT])
-    ).scalar() or Decimal("0")
-    
-    payables_count = db.query(PurchaseInvoice).filter(
-        PurchaseInvoice.company_id == company.id,
-        PurchaseInvoice.balance_due > 0,
-        PurchaseInvoice.status.notin_([PurchaseInvoiceStatus.CANCELLED, PurchaseInvoiceStatus.DRAFT])
-    ).count()
+    key = dashboard_cache.key(company.id, "outstanding", today)
+    summary = dashboard_cache.get(key)
+    if summary is not None:
+        return summary
     
-    # Overdue amounts
-    today = date.today()
-    overdue_receivables = db.query(func.sum(Invoice.balance_due)).filter(
+    # Outstanding Receivables (unpaid invoices), with the overdue part
+    receivables, receivables_count, overdue_receivables = db.query(
+        func.sum(Invoice.balance_due),
+        func.count(Invoice.id),
+        func.sum(case((Invoice.due_date < today, Invoice.balance_due), else_=0)),
+    ).filter(
         Invoice.company_id == company.id,
         Invoice.balance_due > 0,
-        Invoice.due_date < today,
         Invoice.status.notin_([InvoiceStatus.CANCELLED, InvoiceStatus.VOID, InvoiceStatus.DRAFT])
-    ).scalar() or Decimal("0")
+    ).one()
     
-    overdue_payables = db.query(func.sum(PurchaseInvoice.balance_due)).filter(
+    # Outstanding Payables (unpaid purchase invoices), with the overdue part
+    payables, payables_count, overdue_payables = db.query(
+        func.sum(PurchaseInvoice.balance_due),
+        func.count(PurchaseInvoice.id),
+        func.sum(case((PurchaseInvoice.due_date < today, PurchaseInvoice.balance_due), else_=0)),
+    ).filter(
         PurchaseInvoice.company_id == company.id,
         PurchaseInvoice.balance_due > 0,
-        PurchaseInvoice.due_date < today,
         PurchaseInvoice.status.notin_([PurchaseInvoiceStatus.CANCELLED, PurchaseInvoiceStatus.DRAFT])
-    ).scalar() or Decimal("0")
+    ).one()
     
-    return {
+    receivables, payables = Decimal(receivables or 0), Decimal(payables or 0)
+    summary = {
         "receivables": {
             "total": float(receivables),
             "count": receivables_count,
-            "overdue": float(overdue_receivables)
+            "overdue": float(overdue_receivables or 0)
         },
         "payables": {
             "total": float(payables),
             "count": payables_count,
-            "overdue": float(overdue_payables)
+            "overdue": float(overdue_payables or 0)
         },
         "net_position": float(receivables - payables)
     }
+    dashboard_cache.set(key, summary)
+    return summary
@@ -239,8 +239,9 @@ async def dev_reset_company_data(
     """
     from app.database.models import (
         Invoice, Customer, Product, Payment, InvoiceItem,
-        Transaction, TransactionEntry, Account, BankImport, BankImportRow
+        Transaction, TransactionEntry, Account, BankImport, BankImportRow, GSTReturnLedger
     )
+    from app.services.gst_return_ledger import GSTReturnLedgerService
     
     service = CompanyService(db)
     company = service.get_company(company_id, current_user)
@@ -314,8 +315,19 @@ async def dev_reset_company_data(
         accounts_deleted = db.query(Account).filter(Account.company_id == company_id).delete(synchronize_session=False)
         deleted_counts["accounts"] = accounts_deleted
         
+        # 11. Delete GST return ledger rows (only cascade when the company is deleted)
+        ledger_rows_deleted = db.query(GSTReturnLedger).filter(
+            GSTReturnLedger.company_id == company_id
+        ).delete(synchronize_session=False)
+        deleted_counts["gst_return_ledger"] = ledger_rows_deleted
+        
         db.commit()
         
+        # Purchase invoices are kept; put their ITC back into the ledger
+        ledger = GSTReturnLedgerService(db)
+        if ledger.is_enabled():
+            ledger.rebuild(company_id)
+        
         return {
             "message": "All business data has been reset",
             "deleted": deleted_counts,
@@ -1,11 +1,13 @@
 """Dashboard API routes."""
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from app.database.connection import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.connection import get_db, get_async_db
 from app.database.models import User, Company
 from app.services.invoice_service import InvoiceService
+from app.services.async_invoice_service import AsyncInvoiceService
 from app.services.company_service import CompanyService
-from app.auth.dependencies import get_current_active_user
+from app.auth.dependencies import get_current_active_user, get_current_active_user_async, get_company_or_404_async
 
 router = APIRouter(prefix="/companies/{company_id}/dashboard", tags=["Dashboard"])
 
@@ -25,14 +27,16 @@ def get_company_or_404(company_id: str, user: User, db: Session) -> Company:
 @router.get("/summary")
 async def get_dashboard_summary(
     company_id: str,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get dashboard summary with key metrics."""
-    company = get_company_or_404(company_id, current_user, db)
+    company = await get_company_or_404_async(company_id, current_user, db)
     
-    invoice_service = InvoiceService(db)
-    summary = invoice_service.get_dashboard_summary(company)
+    # Reuse the sync service on the async connection
+    summary = await db.run_sync(
+        lambda session: InvoiceService(session).get_dashboard_summary(company)
+    )
     
     return {
         "company": {
@@ -67,14 +71,16 @@ async def get_dashboard_summary(
 async def get_recent_invoices(
     company_id: str,
     limit: int = 5,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get recent invoices for dashboard."""
-    company = get_company_or_404(company_id, current_user, db)
+    company = await get_company_or_404_async(company_id, current_user, db)
     
-    invoice_service = InvoiceService(db)
-    invoices, _, _ = invoice_service.get_invoices(company, page=1, page_size=limit)
+    invoice_service = AsyncInvoiceService(db)
+    invoices, _, _ = await invoice_service.get_invoices(
+        company, page=1, page_size=limit, with_relations=False
+    )
     
     return [
         {
@@ -94,26 +100,28 @@ async def get_recent_invoices(
 async def get_outstanding_invoices(
     company_id: str,
     limit: int = 10,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get outstanding (unpaid/partially paid) invoices."""
-    company = get_company_or_404(company_id, current_user, db)
+    company = await get_company_or_404_async(company_id, current_user, db)
     
-    invoice_service = InvoiceService(db)
-    invoices, _, _ = invoice_service.get_invoices(
+    invoice_service = AsyncInvoiceService(db)
+    invoices, _, _ = await invoice_service.get_invoices(
         company,
         page=1,
         page_size=limit,
-        status="pending"
+        status="pending",
+        with_relations=False
     )
     
     # Also get partially paid
-    partial_invoices, _, _ = invoice_service.get_invoices(
+    partial_invoices, _, _ = await invoice_service.get_invoices(
         company,
         page=1,
         page_size=limit,
-        status="partially_paid"
+        status="partially_paid",
+        with_relations=False
     )
     
     all_invoices = invoices + partial_invoices
@@ -1,12 +1,16 @@
 """GST Report API routes."""
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.background import BackgroundTask
 from datetime import datetime
 import json
+import os
 from app.database.connection import get_db
 from app.database.models import User, Company
 from app.schemas.gst import GSTR1Response, GSTR3BResponse, GSTSummary
 from app.services.gst_service import GSTService
+from app.services.gstr_json_service import GSTRJsonService
 from app.services.company_service import CompanyService
 from app.auth.dependencies import get_current_active_user
 
@@ -109,6 +113,49 @@ async def download_gstr1_json(
     )
 
 
+@router.get("/gstr1/portal-json")
+async def download_gstr1_portal_json(
+    company_id: str,
+    month: int = Query(..., ge=1, le=12),
+    year: int = Query(..., ge=2020, le=2100),
+    to_file: bool = Query(False, description="Write to a temporary file first and send it with a Content-Length"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Download the GSTR-1 JSON in the GST portal format.
+    
+    The JSON is streamed in chunks as it is produced, so large B2C periods
+    do not build the whole document in memory.
+    """
+    company = get_company_or_404(company_id, current_user, db)
+    
+    if not company.gstin:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Company GSTIN is required for GST reports"
+        )
+    
+    service = GSTRJsonService(db)
+    return_period = f"{month:02d}{year}"
+    filename = f"GSTR1_{company.gstin}_{return_period}.json"
+    
+    if to_file:
+        path = service.write_gstr1_json(company.id, return_period, company.gstin)
+        return FileResponse(
+            path,
+            media_type="application/json",
+            filename=filename,
+            background=BackgroundTask(os.remove, path),
+        )
+    
+    return StreamingResponse(
+        service.iter_gstr1_json(company.id, return_period, company.gstin),
+        media_type="application/json",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
 @router.get("/gstr3b", response_model=GSTR3BResponse)
 async def get_gstr3b_report(
     company_id: str,
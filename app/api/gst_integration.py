@@ -1,12 +1,13 @@
 """GST Integration API - E-Invoice, E-Way Bill, ITC endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from typing import Optional, List
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from pydantic import BaseModel
 
 from app.database.connection import get_db
 from app.database.models import User, Company, Invoice
+from app.services.einvoice_batch import EInvoiceBatchService, run_job_in_background
 from app.services.gst_integration_service import GSTIntegrationService
 from app.auth.dependencies import get_current_active_user
 
@@ -30,6 +31,11 @@ class EInvoiceRequest(BaseModel):
     invoice_id: str
 
 
+class EInvoiceBatchRequest(BaseModel):
+    from_date: date
+    to_date: date
+
+
 class EWayBillRequest(BaseModel):
     invoice_id: str
     transporter_id: Optional[str] = None
@@ -106,6 +112,79 @@ async def cancel_einvoice(
     return result
 
 
+@router.post("/e-invoice/batch-jobs")
+async def create_einvoice_batch_job(
+    company_id: str,
+    data: EInvoiceBatchRequest,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Generate IRNs for every eligible invoice in a date range without one.
+    
+    The job runs in the background; poll it for progress and failures.
+    """
+    company = get_company_or_404(company_id, current_user, db)
+    
+    if not company.gstin:
+        raise HTTPException(status_code=400, detail="Company GSTIN is required for e-invoicing")
+    if data.to_date < data.from_date:
+        raise HTTPException(status_code=400, detail="to_date must not be before from_date")
+    
+    service = EInvoiceBatchService(db)
+    job = service.create_job(
+        company,
+        datetime.combine(data.from_date, datetime.min.time()),
+        datetime.combine(data.to_date + timedelta(days=1), datetime.min.time()),
+    )
+    background_tasks.add_task(run_job_in_background, job.id)
+    
+    return service.job_summary(job)
+
+
+@router.get("/e-invoice/batch-jobs/{job_id}")
+async def get_einvoice_batch_job(
+    company_id: str,
+    job_id: str,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Get progress and failures of a bulk e-invoice job."""
+    company = get_company_or_404(company_id, current_user, db)
+    
+    service = EInvoiceBatchService(db)
+    job = service.get_job(company.id, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="E-invoice job not found")
+    
+    return service.job_summary(job)
+
+
+@router.post("/e-invoice/batch-jobs/{job_id}/resume")
+async def resume_einvoice_batch_job(
+    company_id: str,
+    job_id: str,
+    background_tasks: BackgroundTasks,
+    force: bool = Query(False, description="Resume a job still marked running (e.g. after a crash)"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Resume a bulk e-invoice job: submit invoices still without an IRN and retry failures."""
+    company = get_company_or_404(company_id, current_user, db)
+    
+    service = EInvoiceBatchService(db)
+    job = service.get_job(company.id, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="E-invoice job not found")
+    if not service.claim_job(job, force):
+        raise HTTPException(status_code=409, detail="E-invoice job is already running")
+    
+    background_tasks.add_task(run_job_in_background, job.id)
+    
+    return service.job_summary(job)
+
+
 @router.get("/e-invoice/{invoice_id}")
 async def get_einvoice_details(
     company_id: str,
@@ -103,7 +103,7 @@ async def reconcile_gstr2b(
         records = service.parse_gstr2b_json(data.json_data)
         
         # Reconcile
-        result = service.reconcile_period(company.id, records)
+        result = service.reconcile_period(company.id, records, data.return_period)
         return result
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
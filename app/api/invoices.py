@@ -1,10 +1,11 @@
 """Invoice API routes."""
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from datetime import date
 from decimal import Decimal
-from app.database.connection import get_db
+from app.database.connection import get_db, get_async_db
 from app.database.models import User, Company, InvoiceStatus
 from app.schemas.invoice import (
     InvoiceCreate, InvoiceUpdate, InvoiceResponse,
@@ -13,11 +14,12 @@ from app.schemas.invoice import (
     UPIQRResponse, StatusChangeRequest
 )
 from app.services.invoice_service import InvoiceService
+from app.services.async_invoice_service import AsyncInvoiceService
 from app.services.payment_service import PaymentService
 from app.services.customer_service import CustomerService
 from app.services.company_service import CompanyService
 from app.services.pdf_service import PDFService
-from app.auth.dependencies import get_current_active_user
+from app.auth.dependencies import get_current_active_user, get_current_active_user_async, get_company_or_404_async
 
 router = APIRouter(prefix="/companies/{company_id}/invoices", tags=["Invoices"])
 
@@ -79,14 +81,14 @@ async def list_invoices(
     from_date: Optional[date] = None,
     to_date: Optional[date] = None,
     search: Optional[str] = None,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """List invoices for a company."""
-    company = get_company_or_404(company_id, current_user, db)
+    company = await get_company_or_404_async(company_id, current_user, db)
     
-    invoice_service = InvoiceService(db)
-    invoices, total, summary = invoice_service.get_invoices(
+    invoice_service = AsyncInvoiceService(db)
+    invoices, total, summary = await invoice_service.get_invoices(
         company, page, page_size, status, customer_id, from_date, to_date, search
     )
     
@@ -115,14 +117,14 @@ async def list_invoices(
 async def get_invoice(
     company_id: str,
     invoice_id: str,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get an invoice by ID."""
-    company = get_company_or_404(company_id, current_user, db)
+    company = await get_company_or_404_async(company_id, current_user, db)
     
-    invoice_service = InvoiceService(db)
-    invoice = invoice_service.get_invoice(invoice_id, company)
+    invoice_service = AsyncInvoiceService(db)
+    invoice = await invoice_service.get_invoice(invoice_id, company)
     
     if not invoice:
         raise HTTPException(
@@ -139,7 +141,11 @@ async def get_invoice(
         response.customer_phone = invoice.customer.phone
     
     # Add godown names to warehouse allocations
-    from app.database.models import Godown
+    godown_names = await invoice_service.get_godown_names(
+        alloc.get("godown_id")
+        for item in response.items
+        for alloc in (item.warehouse_allocation or [])
+    )
     for item in response.items:
         if item.warehouse_allocation:
             enriched_allocation = []
@@ -148,8 +154,7 @@ async def get_invoice(
                 enriched_alloc = dict(alloc)
                 
                 if godown_id:
-                    godown = db.query(Godown).filter(Godown.id == godown_id).first()
-                    enriched_alloc["godown_name"] = godown.name if godown else "Unknown"
+                    enriched_alloc["godown_name"] = godown_names.get(godown_id, "Unknown")
                 else:
                     enriched_alloc["godown_name"] = "Main Location"
                 
@@ -704,6 +704,7 @@ async def process_payroll(
     company_id: str,
     payroll_run_id: str,
     working_days: int = Query(30, ge=1, le=31),
+    use_attendance: bool = Query(True, description="Deduct LOP from attendance and unpaid leave"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -721,11 +722,12 @@ async def process_payroll(
     service = PayrollService(db)
     
     try:
-        payroll_run = service.process_payroll(payroll_run_id, working_days)
+        payroll_run = service.process_payroll(payroll_run_id, working_days, use_attendance=use_attendance)
         return {
             "message": "Payroll processed successfully",
             "processed_employees": payroll_run.processed_employees,
             "total_net_pay": float(payroll_run.total_net_pay),
+            "errors": payroll_run.processing_errors or [],
         }
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -1048,6 +1050,7 @@ async def get_payroll_settings(
         "default_tax_regime": settings.default_tax_regime.value if settings.default_tax_regime else "new",
         "pay_day": settings.pay_day,
         "working_days_per_month": settings.working_days_per_month,
+        "payroll_workers": settings.payroll_workers or 1,
     }
 
 
@@ -1074,6 +1077,8 @@ async def update_payroll_settings(
         data["esi_employer_rate"] = Decimal(str(data["esi_employer_rate"]))
     if "esi_wage_ceiling" in data:
         data["esi_wage_ceiling"] = Decimal(str(data["esi_wage_ceiling"]))
+    if "payroll_workers" in data:
+        data["payroll_workers"] = max(1, int(data["payroll_workers"]))
     
     settings = service.update_payroll_settings(company.id, **data)
     
@@ -1,17 +1,21 @@
 """
 Advanced Reports API - Ledger, Aging, Ratios, Day Book
 """
-from fastapi import APIRouter, Depends, HTTPException
+import csv
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Optional, Dict, Iterator
 from datetime import datetime, date
-from io import BytesIO
+from io import BytesIO, StringIO
 
 from app.database.connection import get_db
 from app.database.models import User, Company
 from app.auth.dependencies import get_current_active_user
 from app.services.ledger_report_service import LedgerReportService
+from app.services.report_service import ReportService
 from app.services.aging_report_service import AgingReportService
 from app.services.ratio_analysis_service import RatioAnalysisService
 from app.services.excel_service import ExcelService
@@ -86,11 +90,128 @@ async def get_ledger(
     return result
 
 
+LEDGER_CSV_COLUMNS = [
+    'date', 'voucher_number', 'voucher_type', 'description',
+    'debit', 'credit', 'balance', 'transaction_id', 'cursor',
+]
+
+
+def _ledger_ndjson(header: Dict, rows: Iterator[Dict], limit: Optional[int]) -> Iterator[str]:
+    """Header line, one line per entry, then a footer with totals and the next-page cursor."""
+    yield json.dumps({'type': 'header', **header}) + '\n'
+    
+    closing_balance = header['opening_balance']
+    total_debit = total_credit = 0.0
+    count = 0
+    last_cursor = None
+    for row in rows:
+        row.pop('running_balance')
+        closing_balance = row['balance']
+        total_debit += row['debit']
+        total_credit += row['credit']
+        count += 1
+        last_cursor = row['cursor']
+        yield json.dumps({'type': 'entry', **row}) + '\n'
+    
+    yield json.dumps({
+        'type': 'footer',
+        'closing_balance': closing_balance,
+        'total_debit': round(total_debit, 2),
+        'total_credit': round(total_credit, 2),
+        'entry_count': count,
+        'next_cursor': last_cursor if limit and count == limit else None,
+    }) + '\n'
+
+
+def _ledger_csv(header: Dict, rows: Iterator[Dict]) -> Iterator[str]:
+    """CSV with an opening balance line; every row carries the cursor to resume after it."""
+    buffer = StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=LEDGER_CSV_COLUMNS, extrasaction='ignore')
+    writer.writeheader()
+    writer.writerow({'description': 'Opening Balance', 'balance': header['opening_balance']})
+    
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() > 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+@router.get("/companies/{company_id}/reports/ledger/{account_id}/stream")
+async def stream_ledger(
+    company_id: str,
+    account_id: str,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="Cursor of the last row received"),
+    limit: Optional[int] = Query(None, ge=1, description="Rows in this page (all when omitted)"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Stream an account ledger as NDJSON or CSV.
+    
+    Rows are read in keyset order (date, entry) and sent as they are
+    produced. To page, pass limit and then the cursor of the last row
+    received; the running balance continues from the cursor.
+    """
+    get_company_or_404(company_id, current_user, db)
+    service = LedgerReportService(db)
+    
+    try:
+        fd = datetime.fromisoformat(from_date) if from_date else None
+        td = datetime.fromisoformat(to_date) if to_date else None
+        header, rows = service.stream_account_ledger(company_id, account_id, fd, td, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if format == "csv":
+        return StreamingResponse(
+            _ledger_csv(header, rows),
+            media_type="text/csv",
+            headers={"Content-Disposition": f"attachment; filename=ledger_{account_id}.csv"}
+        )
+    return StreamingResponse(_ledger_ndjson(header, rows, limit), media_type="application/x-ndjson")
+
+
+@router.get("/companies/{company_id}/reports/party-statements/stream")
+async def stream_party_statements(
+    company_id: str,
+    party_type: str = Query("customer", pattern="^(customer|vendor)$"),
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Stream the statement of every customer (or vendor) with an opening
+    balance or documents in the period, one NDJSON line per party, for
+    month-end statement runs.
+    """
+    company = get_company_or_404(company_id, current_user, db)
+    service = ReportService(db)
+    
+    fd = datetime.fromisoformat(from_date) if from_date else None
+    td = datetime.combine(datetime.fromisoformat(to_date).date(), datetime.max.time()) if to_date else None
+    statements = service.iter_party_statements(company, party_type, fd, td)
+    
+    return StreamingResponse(
+        (json.dumps(jsonable_encoder(statement)) + '\n' for statement in statements),
+        media_type="application/x-ndjson"
+    )
+
+
 @router.get("/companies/{company_id}/reports/day-book")
 async def get_day_book(
     company_id: str,
     date: str,
     voucher_type: Optional[str] = None,
+    to_date: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    page_size: Optional[int] = Query(None, ge=1, le=1000),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -98,8 +219,9 @@ async def get_day_book(
     service = LedgerReportService(db)
     
     report_date = datetime.fromisoformat(date)
+    end_date = datetime.fromisoformat(to_date) if to_date else None
     
-    return service.get_day_book(company_id, report_date, voucher_type)
+    return service.get_day_book(company_id, report_date, voucher_type, end_date, page, page_size)
 
 
 @router.get("/companies/{company_id}/reports/voucher-register")
@@ -108,6 +230,8 @@ async def get_voucher_register(
     from_date: str,
     to_date: str,
     voucher_type: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    page_size: Optional[int] = Query(None, ge=1, le=1000),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -117,7 +241,7 @@ async def get_voucher_register(
     fd = datetime.fromisoformat(from_date)
     td = datetime.fromisoformat(to_date)
     
-    return service.get_voucher_register(company_id, fd, td, voucher_type)
+    return service.get_voucher_register(company_id, fd, td, voucher_type, page, page_size)
 
 
 @router.get("/companies/{company_id}/reports/cash-bank-book")
@@ -145,15 +269,25 @@ async def get_receivables_aging(
     company_id: str,
     as_of_date: Optional[str] = None,
     customer_id: Optional[str] = None,
+    include_details: bool = True,
+    page: int = Query(1, ge=1),
+    page_size: Optional[int] = Query(None, ge=1, le=1000),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
+    """
+    Bucket summary and per-party rollup; invoice details can be skipped
+    or paged with page/page_size.
+    """
     get_company_or_404(company_id, current_user, db)
     service = AgingReportService(db)
     
     aod = datetime.fromisoformat(as_of_date) if as_of_date else None
     
-    return service.get_receivables_aging(company_id, aod, customer_id)
+    return service.get_receivables_aging(
+        company_id, aod, customer_id,
+        include_details=include_details, page=page, page_size=page_size
+    )
 
 
 @router.get("/companies/{company_id}/reports/aging/payables")
@@ -161,15 +295,25 @@ async def get_payables_aging(
     company_id: str,
     as_of_date: Optional[str] = None,
     vendor_id: Optional[str] = None,
+    include_details: bool = True,
+    page: int = Query(1, ge=1),
+    page_size: Optional[int] = Query(None, ge=1, le=1000),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
+    """
+    Bucket summary and per-party rollup; invoice details can be skipped
+    or paged with page/page_size.
+    """
     get_company_or_404(company_id, current_user, db)
     service = AgingReportService(db)
     
     aod = datetime.fromisoformat(as_of_date) if as_of_date else None
     
-    return service.get_payables_aging(company_id, aod, vendor_id)
+    return service.get_payables_aging(
+        company_id, aod, vendor_id,
+        include_details=include_details, page=page, page_size=page_size
+    )
 
 
 # ==================== RATIOS ====================
@@ -177,13 +321,34 @@ async def get_payables_aging(
 @router.get("/companies/{company_id}/reports/ratios")
 async def get_ratio_analysis(
     company_id: str,
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     get_company_or_404(company_id, current_user, db)
     service = RatioAnalysisService(db)
     
-    return service.get_all_ratios(company_id)
+    fd = datetime.fromisoformat(from_date) if from_date else None
+    td = datetime.combine(datetime.fromisoformat(to_date).date(), datetime.max.time()) if to_date else None
+    
+    return service.get_all_ratios(company_id, fd, td)
+
+
+@router.get("/companies/{company_id}/reports/ratios/trend")
+async def get_ratio_trend(
+    company_id: str,
+    months: int = Query(12, ge=1, le=60),
+    as_of_date: Optional[str] = None,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    get_company_or_404(company_id, current_user, db)
+    service = RatioAnalysisService(db)
+    
+    aod = datetime.fromisoformat(as_of_date) if as_of_date else None
+    
+    return service.get_ratio_trend(company_id, months, aod)
 
 
 # ==================== EXCEL EXPORT ====================
@@ -1,13 +1,17 @@
 """Authentication dependencies for FastAPI."""
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from jose import jwt, JWTError
 from typing import Optional
-from app.database.connection import get_db
-from app.database.models import User
+from app.database.connection import get_db, get_async_db
+from app.database.models import User, Company
 from app.config import settings
 from app.auth.supabase_client import auth_helper
+from app.auth.token_verifier import token_verifier
 
 # HTTP Bearer token scheme
 security = HTTPBearer(auto_error=False)
@@ -23,13 +27,87 @@ async def get_token_from_header(
 
 
 async def verify_supabase_token(token: str) -> Optional[dict]:
-    """Verify Supabase JWT token."""
+    """Verify Supabase JWT token.
+    
+    Verifies the signature locally when a JWT secret or JWKS is available,
+    otherwise falls back to the Supabase API. Results are cached per token.
+    """
+    try:
+        return await token_verifier.verify_async(token)
+    except LookupError:
+        pass
+    
     try:
-        # For Supabase, we can verify the token using their API
+        # Fall back to verifying the token using the Supabase API
         user = await auth_helper.get_user(token)
-        return user
     except Exception:
         return None
+    
+    if user:
+        try:
+            exp = jwt.get_unverified_claims(token).get("exp")
+        except JWTError:
+            exp = None
+        token_verifier.remember(token, user, exp)
+    return user
+
+
+def _get_user_by_supabase_id(db: Session, supabase_id: str) -> Optional[User]:
+    """Load the local user, using the cached supabase_id -> User.id mapping."""
+    user_pk = token_verifier.get_user_pk(supabase_id)
+    if user_pk:
+        user = db.get(User, user_pk)
+        if user and user.supabase_id == supabase_id:
+            return user
+    
+    user = db.query(User).filter(User.supabase_id == supabase_id).first()
+    if user:
+        token_verifier.remember_user_pk(supabase_id, user.id)
+    return user
+
+
+def _get_or_create_mock_user(db: Session) -> User:
+    """Find or create the development user."""
+    user = db.query(User).filter(User.email == "test@example.com").first()
+    if not user:
+        user = User(
+            email="test@example.com",
+            full_name="Test User",
+            supabase_id="mock-user-id",
+            is_verified=True
+        )
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+    return user
+
+
+def _get_or_create_user(db: Session, supabase_user: dict) -> User:
+    """Get the local user for a Supabase user, creating it on first login."""
+    user = _get_user_by_supabase_id(db, supabase_user.get("id"))
+    
+    if not user:
+        # Create user from Supabase data
+        user = User(
+            supabase_id=supabase_user.get("id"),
+            email=supabase_user.get("email"),
+            full_name=supabase_user.get("user_metadata", {}).get("full_name", ""),
+            is_verified=True
+        )
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        token_verifier.remember_user_pk(user.supabase_id, user.id)
+    
+    return user
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
 
 
 async def get_current_user(
@@ -37,30 +115,15 @@ async def get_current_user(
     db: Session = Depends(get_db)
 ) -> User:
     """Get current authenticated user."""
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+    credentials_exception = _credentials_exception()
     
     if not token:
         raise credentials_exception
     
     # For development without Supabase
+    # (DB lookups run in a worker thread so they don't block the event loop)
     if token == "mock-access-token" or not settings.SUPABASE_URL:
-        # Try to find mock user or create one
-        user = db.query(User).filter(User.email == "test@example.com").first()
-        if not user:
-            user = User(
-                email="test@example.com",
-                full_name="Test User",
-                supabase_id="mock-user-id",
-                is_verified=True
-            )
-            db.add(user)
-            db.commit()
-            db.refresh(user)
-        return user
+        return await run_in_threadpool(_get_or_create_mock_user, db)
     
     # Verify token with Supabase
     supabase_user = await verify_supabase_token(token)
@@ -68,21 +131,7 @@ async def get_current_user(
         raise credentials_exception
     
     # Get or create local user
-    user = db.query(User).filter(User.supabase_id == supabase_user.get("id")).first()
-    
-    if not user:
-        # Create user from Supabase data
-        user = User(
-            supabase_id=supabase_user.get("id"),
-            email=supabase_user.get("email"),
-            full_name=supabase_user.get("user_metadata", {}).get("full_name", ""),
-            is_verified=True
-        )
-        db.add(user)
-        db.commit()
-        db.refresh(user)
-    
-    return user
+    return await run_in_threadpool(_get_or_create_user, db, supabase_user)
 
 
 async def get_current_active_user(
@@ -97,6 +146,51 @@ async def get_current_active_user(
     return current_user
 
 
+async def get_current_user_async(
+    token: Optional[str] = Depends(get_token_from_header),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """get_current_user for endpoints on get_async_db.
+    
+    Loads the user through the request's AsyncSession, so the request
+    holds one pool connection instead of a sync and an async one.
+    """
+    if not token:
+        raise _credentials_exception()
+    
+    if token == "mock-access-token" or not settings.SUPABASE_URL:
+        return await db.run_sync(_get_or_create_mock_user)
+    
+    supabase_user = await verify_supabase_token(token)
+    if not supabase_user:
+        raise _credentials_exception()
+    
+    return await db.run_sync(_get_or_create_user, supabase_user)
+
+
+async def get_current_active_user_async(
+    current_user: User = Depends(get_current_user_async)
+) -> User:
+    """get_current_active_user for endpoints on get_async_db."""
+    return await get_current_active_user(current_user)
+
+
+async def get_company_or_404_async(company_id: str, user: User, db: AsyncSession) -> Company:
+    """Get a company owned by the user or raise 404, for endpoints on get_async_db."""
+    company = await db.scalar(
+        select(Company).where(
+            Company.id == company_id,
+            Company.user_id == user.id
+        )
+    )
+    if not company:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Company not found"
+        )
+    return company
+
+
 async def get_optional_user(
     token: Optional[str] = Depends(get_token_from_header),
     db: Session = Depends(get_db)
@@ -0,0 +1,218 @@
+"""Local Supabase JWT verification with caching.
+
+Verifies Supabase access tokens in-process with python-jose instead of
+calling the Supabase auth API on every request.
+
+Signing keys:
+- HS256 projects: SUPABASE_JWT_SECRET (Project Settings -> API -> JWT Secret)
+- Asymmetric (RS256/ES256) projects: the project JWKS, fetched from
+  SUPABASE_JWKS_URL (defaults to <SUPABASE_URL>/auth/v1/.well-known/jwks.json)
+  and cached for JWKS_CACHE_TTL_SECONDS. An unknown `kid` triggers one refetch.
+If neither is available, or the JWKS cannot be fetched or parsed,
+verification falls back to the Supabase API. verify_async() runs anything
+beyond a cache hit (JWKS fetch, signature check) in the threadpool.
+
+Expiry and revocation:
+- A token is accepted only while `exp` is in the future (JWT_LEEWAY_SECONDS
+  allows for clock skew). Cached verifications never outlive the token's
+  `exp`, and are otherwise kept for at most TOKEN_CACHE_TTL_SECONDS.
+- Supabase access tokens are stateless: signing out or changing a password
+  does not invalidate tokens already issued. Tokens revoked through
+  revoke_token()/revoke_user() (logout, password change) are rejected by this
+  process until they expire. Other workers keep accepting them until `exp`,
+  so keep the Supabase JWT expiry short.
+- Deactivating the local User takes effect immediately, because the User row
+  is still loaded on every request (by primary key) and `is_active` is checked.
+"""
+import hashlib
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+from jose import jwt, JWTError
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.utils.cache import BoundedCache
+
+
+def _token_key(token: str) -> str:
+    """Cache key for a token (raw tokens are never kept in memory caches)."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class TokenVerifier:
+    """Verifies Supabase JWTs locally and caches the results."""
+
+    def __init__(self):
+        self.token_cache = BoundedCache(settings.TOKEN_CACHE_MAX_SIZE)
+        self.user_id_cache = BoundedCache(settings.USER_ID_CACHE_MAX_SIZE)
+        self._revoked_tokens = BoundedCache(settings.TOKEN_CACHE_MAX_SIZE)
+        self._revoked_before = BoundedCache(settings.USER_ID_CACHE_MAX_SIZE)
+        self._jwks: Optional[Dict[str, Any]] = None
+        self._jwks_fetched_at = 0.0
+        self._jwks_lock = threading.Lock()
+
+    @property
+    def jwks_url(self) -> Optional[str]:
+        if settings.SUPABASE_JWKS_URL:
+            return settings.SUPABASE_JWKS_URL
+        if settings.SUPABASE_URL:
+            return f"{settings.SUPABASE_URL.rstrip('/')}/auth/v1/.well-known/jwks.json"
+        return None
+
+    @property
+    def can_verify_locally(self) -> bool:
+        return bool(settings.AUTH_LOCAL_JWT_VERIFY and (settings.SUPABASE_JWT_SECRET or self.jwks_url))
+
+    # ============== Signing Keys ==============
+
+    def _fetch_jwks(self, force: bool = False) -> Dict[str, Any]:
+        """Get the JWKS keyed by `kid`, refreshing it when the TTL has passed."""
+        with self._jwks_lock:
+            age = time.time() - self._jwks_fetched_at
+            if self._jwks is not None and not force and age < settings.JWKS_CACHE_TTL_SECONDS:
+                return self._jwks
+            # Don't hammer the endpoint when tokens carry an unknown kid
+            if self._jwks is not None and force and age < 30:
+                return self._jwks
+
+            response = httpx.get(self.jwks_url, timeout=5.0)
+            response.raise_for_status()
+            try:
+                self._jwks = {key.get("kid"): key for key in response.json().get("keys", [])}
+            except (ValueError, AttributeError) as exc:
+                raise LookupError(f"JWKS unreadable: {exc}")
+            self._jwks_fetched_at = time.time()
+            return self._jwks
+
+    def _get_signing_key(self, token: str) -> Any:
+        """
+        Pick the secret or JWK that should have signed this token.
+
+        Raises LookupError when no key for the token's algorithm is
+        configured (e.g. an HS256 token without SUPABASE_JWT_SECRET), which
+        says nothing about whether the token is valid.
+        """
+        header = jwt.get_unverified_header(token)
+
+        if header.get("alg") == "HS256":
+            if not settings.SUPABASE_JWT_SECRET:
+                raise LookupError("No JWT secret configured for HS256 tokens")
+            return settings.SUPABASE_JWT_SECRET
+
+        if not self.jwks_url:
+            raise LookupError("No JWKS configured for asymmetric tokens")
+
+        kid = header.get("kid")
+        keys = self._fetch_jwks()
+        if kid not in keys:
+            keys = self._fetch_jwks(force=True)
+        if kid not in keys:
+            raise JWTError("Unknown signing key")
+        return keys[kid]
+
+    # ============== Verification ==============
+
+    async def verify_async(self, token: str) -> Optional[Dict[str, Any]]:
+        """verify() for async callers: cache hits inline, everything else in the threadpool."""
+        key = _token_key(token)
+        if self._revoked_tokens.get(key):
+            return None
+        cached = self.token_cache.get(key)
+        if cached is not None:
+            return cached
+        return await run_in_threadpool(self.verify, token)
+
+    def verify(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Verify a token locally and return the user dict
+        ({"id", "email", "user_metadata"}) or None if it is invalid.
+
+        Raises LookupError if local verification is not possible (not
+        configured, no key for the token's algorithm, JWKS unreachable or
+        malformed), so the caller can fall back to the Supabase API. Blocks
+        on the JWKS fetch; async callers use verify_async().
+        """
+        key = _token_key(token)
+
+        if self._revoked_tokens.get(key):
+            return None
+
+        cached = self.token_cache.get(key)
+        if cached is not None:
+            return cached
+
+        if not self.can_verify_locally:
+            raise LookupError("Local JWT verification is not configured")
+
+        try:
+            claims = jwt.decode(
+                token,
+                self._get_signing_key(token),
+                algorithms=["HS256", "RS256", "ES256"],
+                audience=settings.JWT_AUDIENCE,
+                options={"leeway": settings.JWT_LEEWAY_SECONDS},
+            )
+        except httpx.HTTPError as exc:
+            raise LookupError(f"JWKS unavailable: {exc}")
+        except JWTError:
+            return None
+
+        user_id = claims.get("sub")
+        if not user_id:
+            return None
+
+        revoked_before = self._revoked_before.get(user_id)
+        if revoked_before and claims.get("iat", 0) < revoked_before:
+            return None
+
+        user = {
+            "id": user_id,
+            "email": claims.get("email"),
+            "user_metadata": claims.get("user_metadata") or {},
+        }
+        self.remember(token, user, claims.get("exp"))
+        return user
+
+    def remember(self, token: str, user: Dict[str, Any], exp: Optional[float] = None) -> None:
+        """Cache a verified token until its expiry or the cache TTL, whichever is first."""
+        expires_at = time.time() + settings.TOKEN_CACHE_TTL_SECONDS
+        if exp:
+            expires_at = min(expires_at, float(exp))
+        self.token_cache.set(_token_key(token), user, expires_at)
+
+    # ============== Revocation ==============
+
+    def revoke_token(self, token: str) -> None:
+        """Reject this token in this process from now on (e.g. on logout)."""
+        key = _token_key(token)
+        self.token_cache.delete(key)
+
+        expires_at = None
+        try:
+            exp = jwt.get_unverified_claims(token).get("exp")
+            expires_at = float(exp) if exp else None
+        except JWTError:
+            pass
+        # Revoked entries only need to live as long as the token itself
+        self._revoked_tokens.set(key, True, expires_at or time.time() + settings.TOKEN_CACHE_TTL_SECONDS)
+
+    def revoke_user(self, supabase_id: str) -> None:
+        """Reject all of a user's tokens issued before now (e.g. on password change)."""
+        self._revoked_before.set(supabase_id, int(time.time()))
+        self.user_id_cache.delete(supabase_id)
+        self.token_cache.clear()
+
+    # ============== supabase_id -> User.id ==============
+
+    def get_user_pk(self, supabase_id: str) -> Optional[str]:
+        return self.user_id_cache.get(supabase_id)
+
+    def remember_user_pk(self, supabase_id: str, user_pk: str) -> None:
+        self.user_id_cache.set(supabase_id, user_pk)
+
+
+# Global verifier instance
+token_verifier = TokenVerifier()
@@ -18,9 +18,62 @@ class Settings(BaseSettings):
     SUPABASE_KEY: str = ""
     SUPABASE_SERVICE_KEY: Optional[str] = None
     
+    # Local JWT verification (see app/auth/token_verifier.py)
+    AUTH_LOCAL_JWT_VERIFY: bool = True
+    SUPABASE_JWT_SECRET: Optional[str] = None  # HS256 projects
+    SUPABASE_JWKS_URL: Optional[str] = None  # Defaults to <SUPABASE_URL>/auth/v1/.well-known/jwks.json
+    JWT_AUDIENCE: str = "authenticated"
+    JWT_LEEWAY_SECONDS: int = 30
+    JWKS_CACHE_TTL_SECONDS: int = 600
+    TOKEN_CACHE_TTL_SECONDS: int = 300
+    TOKEN_CACHE_MAX_SIZE: int = 10000
+    USER_ID_CACHE_MAX_SIZE: int = 10000
+    
     # Database settings
     DATABASE_URL: str = ""
     
+    # Connection pool (PostgreSQL)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # Seconds before a connection is replaced
+    DB_POOL_PRE_PING: bool = True  # Detect connections dropped by failovers
+    DB_STATEMENT_TIMEOUT_MS: int = 0  # 0 = no limit; see .env.example for poolers
+    
+    # SQLite
+    SQLITE_WAL: bool = True
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    
+    # Pool and query metrics
+    DB_METRICS_ENABLED: bool = True
+    # Add X-DB-Queries / X-DB-Query-Time-Ms headers to every response (debugging only)
+    DB_METRICS_HEADERS: bool = False
+    # Serve them on /metrics; scrapers send "Authorization: Bearer <METRICS_TOKEN>" when set
+    METRICS_ENDPOINT_ENABLED: bool = False
+    METRICS_TOKEN: Optional[str] = None
+    
+    # Read account balances from daily snapshots (run rebuild_balance_snapshots.py first)
+    BALANCE_SNAPSHOTS_ENABLED: bool = False
+    
+    # Serve GST summaries and GSTR-3B from the GST return ledger (run rebuild_gst_return_ledger.py first)
+    GST_RETURN_LEDGER_ENABLED: bool = False
+    
+    # Bank statement imports are parsed and inserted this many rows at a time
+    BANK_IMPORT_CHUNK_SIZE: int = 1000
+    
+    # Bulk e-invoice (IRN) jobs: transport name, requests in flight, requests
+    # per second, retries per invoice and per-request timeout
+    EINVOICE_TRANSPORT: str = "simulator"
+    EINVOICE_CONCURRENCY: int = 8
+    EINVOICE_RATE_LIMIT: float = 10.0
+    EINVOICE_MAX_RETRIES: int = 3
+    EINVOICE_TIMEOUT_SECONDS: float = 30.0
+    
+    # Dashboard metrics are cached per company for this many seconds (0 = off);
+    # invoice, payment, purchase and sales pipeline writes invalidate them
+    DASHBOARD_CACHE_TTL_SECONDS: int = 30
+    DASHBOARD_CACHE_MAX_SIZE: int = 10000
+    
     # JWT settings
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24  # 24 hours
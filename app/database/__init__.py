@@ -1,5 +1,5 @@
 """Database module."""
-from app.database.connection import get_db, engine, Base, SessionLocal
+from app.database.connection import get_db, get_async_db, engine, Base, SessionLocal
 from app.database.models import (
     User,
     Company,
@@ -12,6 +12,13 @@ from app.database.models import (
     Account,
     Transaction,
     TransactionEntry,
+    AccountBalanceSnapshot,
+    AccountPeriodTotal,
+    AccountPeriodTotalVersion,
+    GSTReturnLedger,
+    EInvoiceJob,
+    EInvoiceJobStatus,
+    VoucherSequence,
     # Multi-currency
     Currency,
     ExchangeRate,
@@ -106,6 +113,7 @@ from app.database.bank_statement_models import (
 
 __all__ = [
     "get_db",
+    "get_async_db",
     "engine",
     "Base",
     "SessionLocal",
@@ -120,6 +128,13 @@ __all__ = [
     "Account",
     "Transaction",
     "TransactionEntry",
+    "AccountBalanceSnapshot",
+    "AccountPeriodTotal",
+    "AccountPeriodTotalVersion",
+    "GSTReturnLedger",
+    "EInvoiceJob",
+    "EInvoiceJobStatus",
+    "VoucherSequence",
     # Multi-currency
     "Currency",
     "ExchangeRate",
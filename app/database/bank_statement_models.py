@@ -5,7 +5,7 @@ These are NOT transactions - they are records imported from bank statements
 used for reconciliation purposes only.
 """
 from datetime import datetime
-from sqlalchemy import Column, String, Numeric, DateTime, Boolean, ForeignKey, Text, Enum as SQLEnum
+from sqlalchemy import Column, String, Numeric, DateTime, Boolean, ForeignKey, Text, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from enum import Enum as PyEnum
 
@@ -61,6 +61,9 @@ class BankStatementEntry(Base):
     needs_booking = Column(Boolean, default=False)  # True if this should become a transaction
     booked_transaction_id = Column(String(36), ForeignKey("transactions.id", ondelete="SET NULL"))
     
+    # SHA-256 of date, amount, narration, reference and balance (duplicate detection)
+    content_hash = Column(String(64))
+    
     # Metadata
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -70,6 +73,10 @@ class BankStatementEntry(Base):
     bank_account = relationship("BankAccount")
     matched_entry = relationship("TransactionEntry", foreign_keys=[matched_entry_id])
     booked_transaction = relationship("Transaction", foreign_keys=[booked_transaction_id])
+    
+    __table_args__ = (
+        Index("idx_bank_statement_entry_hash", "bank_account_id", "content_hash"),
+    )
 
 
 class MonthlyBankReconciliation(Base):
@@ -1,26 +1,131 @@
 """Database connection setup."""
-from sqlalchemy import create_engine
+from typing import Any, AsyncIterator, Callable, TypeVar
+from uuid import uuid4
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url, URL
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
 from app.config import settings
+from app.database.metrics import db_metrics, InstrumentedQueuePool, InstrumentedAsyncQueuePool
+
+T = TypeVar("T")
 
 # Create database engine
 # For Supabase, use the connection string from your project
 DATABASE_URL = settings.DATABASE_URL or "sqlite:///./gst_invoice.db"
 
-# Handle SQLite vs PostgreSQL
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-else:
-    engine = create_engine(DATABASE_URL)
+
+def _pool_kwargs(poolclass) -> dict:
+    """Pool settings for PostgreSQL engines."""
+    return {
+        "poolclass": poolclass,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def _apply_sqlite_pragmas(sync_engine, url: str) -> None:
+    """Set WAL mode and a busy timeout on every new SQLite connection."""
+    in_memory = url.rstrip("/").endswith(("sqlite:", ":memory:")) or "mode=memory" in url
+
+    @event.listens_for(sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout = {settings.SQLITE_BUSY_TIMEOUT_MS}")
+        if settings.SQLITE_WAL and not in_memory:
+            # WAL lets readers run alongside a writer
+            cursor.execute("PRAGMA journal_mode = WAL")
+            cursor.execute("PRAGMA synchronous = NORMAL")
+        cursor.close()
+
+
+def _create_engine():
+    """Create the sync engine from settings."""
+    # Handle SQLite vs PostgreSQL
+    if DATABASE_URL.startswith("sqlite"):
+        sync_engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+        _apply_sqlite_pragmas(sync_engine, DATABASE_URL)
+    else:
+        connect_args = {}
+        if settings.DB_STATEMENT_TIMEOUT_MS:
+            connect_args["options"] = f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+        sync_engine = create_engine(
+            DATABASE_URL,
+            connect_args=connect_args,
+            **_pool_kwargs(InstrumentedQueuePool)
+        )
+
+    if settings.DB_METRICS_ENABLED:
+        db_metrics.instrument(sync_engine, "sync")
+    return sync_engine
+
+
+engine = _create_engine()
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async session factory, bound on first use by get_async_engine()
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
+_async_engine = None
+
 # Create declarative base
 Base = declarative_base()
 
 
+def get_async_database_url(url: str = DATABASE_URL) -> URL:
+    """Map the configured URL to its async driver (asyncpg / aiosqlite)."""
+    async_url = make_url(url)
+
+    if async_url.get_backend_name() == "sqlite":
+        return async_url.set(drivername="sqlite+aiosqlite")
+
+    async_url = async_url.set(drivername="postgresql+asyncpg")
+    # asyncpg takes `ssl` rather than libpq's `sslmode`
+    if "sslmode" in async_url.query:
+        sslmode = async_url.query["sslmode"]
+        async_url = async_url.difference_update_query(["sslmode"]).update_query_dict({"ssl": sslmode})
+    return async_url
+
+
+def get_async_engine() -> AsyncEngine:
+    """Get the async engine, creating it on first use.
+
+    Created lazily so deployments that never use async endpoints don't need
+    the async driver installed.
+    """
+    global _async_engine
+    if _async_engine is None:
+        async_url = get_async_database_url()
+
+        if async_url.get_backend_name() == "sqlite":
+            _async_engine = create_async_engine(async_url, connect_args={"check_same_thread": False})
+            _apply_sqlite_pragmas(_async_engine.sync_engine, DATABASE_URL)
+        else:
+            connect_args = {}
+            if settings.DB_STATEMENT_TIMEOUT_MS:
+                connect_args["server_settings"] = {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}
+            if async_url.port == 6543:
+                # Supabase transaction pooler (PgBouncer) can't keep prepared statements
+                connect_args["statement_cache_size"] = 0
+                connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+            _async_engine = create_async_engine(
+                async_url,
+                connect_args=connect_args,
+                **_pool_kwargs(InstrumentedAsyncQueuePool)
+            )
+
+        if settings.DB_METRICS_ENABLED:
+            db_metrics.instrument(_async_engine.sync_engine, "async")
+        AsyncSessionLocal.configure(bind=_async_engine)
+    return _async_engine
+
+
 def get_db():
     """Dependency to get database session."""
     db = SessionLocal()
@@ -30,7 +135,31 @@ def get_db():
         db.close()
 
 
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Dependency to get an async database session.
+
+    Queries run on the async driver, so awaiting them doesn't block the
+    event loop. Sync service code can be reused with `await db.run_sync(fn)`.
+    """
+    get_async_engine()
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def run_in_session(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run `func(db, *args, **kwargs)` with its own sync session in a worker thread.
+
+    Thread-offload path for async endpoints that call services which stay
+    synchronous, so their queries don't block the event loop. The session is
+    closed afterwards; commit inside `func` if it writes.
+    """
+    def call() -> T:
+        with SessionLocal() as db:
+            return func(db, *args, **kwargs)
+
+    return await run_in_threadpool(call)
+
+
 def init_db():
     """Initialize database tables."""
     Base.metadata.create_all(bind=engine)
-
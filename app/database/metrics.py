@@ -0,0 +1,228 @@
+"""Database pool and query metrics.
+
+Collects connection pool activity (checkouts, checkout wait time, overflow)
+and per-request query counts/time from SQLAlchemy events, for sizing worker
+counts against the database. Served by the /metrics endpoint in main.py.
+
+Per-request numbers are tracked through a context variable set by the HTTP
+middleware, so queries issued from threadpool workers and AsyncSession
+greenlets are attributed to the request that caused them.
+"""
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class RequestStats:
+    """Query count and time for one request."""
+
+    __slots__ = ("queries", "query_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+
+
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("db_request_stats", default=None)
+
+
+class DatabaseMetrics:
+    """Process-wide counters, updated from SQLAlchemy pool and cursor events."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pools: Dict[str, Any] = {}
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.connects = 0
+            self.checkouts = 0
+            self.checkins = 0
+            self.invalidations = 0
+            self.checkout_wait_total = 0.0
+            self.checkout_wait_max = 0.0
+            self.overflow_max = 0
+            self.queries = 0
+            self.query_time = 0.0
+            self.requests = 0
+            self.request_queries_max = 0
+            self.routes: Dict[str, Dict[str, float]] = {}
+
+    # ============== Event Hooks ==============
+
+    def instrument(self, engine: Engine, name: str) -> None:
+        """Attach pool and cursor listeners to a (sync) engine."""
+        self._pools[name] = engine.pool
+
+        @event.listens_for(engine.pool, "connect")
+        def _on_connect(dbapi_connection, connection_record):
+            with self._lock:
+                self.connects += 1
+
+        @event.listens_for(engine.pool, "checkout")
+        def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+            with self._lock:
+                self.checkouts += 1
+
+        @event.listens_for(engine.pool, "checkin")
+        def _on_checkin(dbapi_connection, connection_record):
+            with self._lock:
+                self.checkins += 1
+
+        @event.listens_for(engine.pool, "invalidate")
+        def _on_invalidate(dbapi_connection, connection_record, exception):
+            with self._lock:
+                self.invalidations += 1
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _before_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "handle_error")
+        def _on_error(context):
+            # after_cursor_execute doesn't run for a failed statement
+            connection = context.connection
+            if connection is not None and connection.info.get("query_start"):
+                connection.info["query_start"].pop()
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _after_execute(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - conn.info["query_start"].pop()
+            with self._lock:
+                self.queries += 1
+                self.query_time += elapsed
+
+            stats = _current_request.get()
+            if stats is not None:
+                stats.queries += 1
+                stats.query_time += elapsed
+
+    def record_checkout_wait(self, pool, elapsed: float) -> None:
+        """Called by the instrumented pools with the time spent getting a connection."""
+        with self._lock:
+            self.checkout_wait_total += elapsed
+            self.checkout_wait_max = max(self.checkout_wait_max, elapsed)
+            self.overflow_max = max(self.overflow_max, pool.overflow())
+
+    # ============== Requests ==============
+
+    def start_request(self) -> RequestStats:
+        """Start attributing queries in the current context to a new request."""
+        stats = RequestStats()
+        _current_request.set(stats)
+        return stats
+
+    def finish_request(self, route: str, stats: RequestStats) -> None:
+        """Fold a finished request into the per-route totals."""
+        with self._lock:
+            self.requests += 1
+            self.request_queries_max = max(self.request_queries_max, stats.queries)
+
+            totals = self.routes.setdefault(route, {
+                "requests": 0, "queries": 0, "query_time_ms": 0.0, "max_queries": 0,
+            })
+            totals["requests"] += 1
+            totals["queries"] += stats.queries
+            totals["query_time_ms"] += stats.query_time * 1000
+            totals["max_queries"] = max(totals["max_queries"], stats.queries)
+
+    # ============== Reporting ==============
+
+    def snapshot(self) -> dict:
+        """Current metrics as a JSON-serializable dict."""
+        with self._lock:
+            pools = {}
+            for name, pool in self._pools.items():
+                if isinstance(pool, QueuePool):
+                    pools[name] = {
+                        "size": pool.size(),
+                        "checked_out": pool.checkedout(),
+                        "checked_in": pool.checkedin(),
+                        "overflow": pool.overflow(),
+                    }
+                else:
+                    pools[name] = {"status": pool.status()}
+
+            return {
+                "pools": pools,
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "checkout_wait_ms_total": round(self.checkout_wait_total * 1000, 3),
+                "checkout_wait_ms_max": round(self.checkout_wait_max * 1000, 3),
+                "checkout_wait_ms_avg": round(self.checkout_wait_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                "overflow_max": self.overflow_max,
+                "queries": self.queries,
+                "query_time_ms": round(self.query_time * 1000, 3),
+                "requests": self.requests,
+                "queries_per_request_avg": round(self.queries / self.requests, 2) if self.requests else 0.0,
+                "queries_per_request_max": self.request_queries_max,
+                "routes": {
+                    route: {
+                        "requests": int(totals["requests"]),
+                        "queries_avg": round(totals["queries"] / totals["requests"], 2),
+                        "queries_max": int(totals["max_queries"]),
+                        "query_time_ms_avg": round(totals["query_time_ms"] / totals["requests"], 3),
+                    }
+                    for route, totals in sorted(self.routes.items())
+                },
+            }
+
+    def prometheus(self) -> str:
+        """Current metrics in the Prometheus text exposition format."""
+        data = self.snapshot()
+        lines = []
+
+        def metric(name: str, kind: str, value: Any) -> None:
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {value}")
+
+        metric("db_pool_connects_total", "counter", data["connects"])
+        metric("db_pool_checkouts_total", "counter", data["checkouts"])
+        metric("db_pool_invalidations_total", "counter", data["invalidations"])
+        metric("db_pool_checkout_wait_seconds_total", "counter", data["checkout_wait_ms_total"] / 1000)
+        metric("db_pool_checkout_wait_seconds_max", "gauge", data["checkout_wait_ms_max"] / 1000)
+        metric("db_pool_overflow_max", "gauge", data["overflow_max"])
+        for key in ("checked_out", "overflow"):
+            lines.append(f"# TYPE db_pool_{key} gauge")
+            for name, pool in data["pools"].items():
+                if key in pool:
+                    lines.append(f'db_pool_{key}{{pool="{name}"}} {pool[key]}')
+        metric("db_queries_total", "counter", data["queries"])
+        metric("db_query_seconds_total", "counter", data["query_time_ms"] / 1000)
+        metric("db_requests_total", "counter", data["requests"])
+        metric("db_queries_per_request_max", "gauge", data["queries_per_request_max"])
+        return "\n".join(lines) + "\n"
+
+
+# Global metrics instance
+db_metrics = DatabaseMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that reports how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_metrics.record_checkout_wait(self, time.perf_counter() - start)
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that reports how long each checkout waited."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_metrics.record_checkout_wait(self, time.perf_counter() - start)
@@ -98,6 +98,14 @@ class BankImportStatus(str, PyEnum):
     FAILED = "failed"
 
 
+class EInvoiceJobStatus(str, PyEnum):
+    """Bulk e-invoice (IRN) job status."""
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
 class BankImportRowStatus(str, PyEnum):
     """Bank import row status."""
     PENDING = "pending"
@@ -1241,6 +1249,214 @@ class TransactionEntry(Base):
         return f"<TransactionEntry {self.debit_amount or self.credit_amount}>"
 
 
+class AccountBalanceSnapshot(Base):
+    """Daily cumulative balance snapshot per account.
+
+    Holds cumulative debit/credit totals of POSTED entries up to and including
+    snapshot_date. A balance as of any moment is the latest snapshot before
+    that day plus the same-day delta. Maintained by BalanceSnapshotService.
+    """
+    __tablename__ = "account_balance_snapshots"
+
+    id = Column(String(36), primary_key=True, default=generate_uuid)
+    company_id = Column(String(36), ForeignKey("companies.id", ondelete="CASCADE"), nullable=False)
+    account_id = Column(String(36), ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False)
+    snapshot_date = Column(Date, nullable=False)
+    
+    # Cumulative totals from the start of the books to end of snapshot_date
+    debit_total = Column(Numeric(18, 2), default=0, nullable=False)
+    credit_total = Column(Numeric(18, 2), default=0, nullable=False)
+    
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("account_id", "snapshot_date", name="uq_balance_snapshot_account_date"),
+        Index("idx_balance_snapshot_company_date", "company_id", "snapshot_date"),
+    )
+
+    def __repr__(self):
+        return f"<AccountBalanceSnapshot {self.account_id} {self.snapshot_date}>"
+
+
+class AccountPeriodTotal(Base):
+    """Cached debit/credit totals of an account for a report period.
+
+    Rows for a period are written for every account of the company at once,
+    so a period is cached when any row for it exists. period_start is NULL
+    for "from the start of the books" (balance sheet columns). Rows are
+    deleted when a transaction dated inside the period is posted or
+    reversed, except for periods inside a full period lock, which stay
+    frozen. Maintained by PeriodTotalsCache.
+    """
+    __tablename__ = "account_period_totals"
+
+    id = Column(String(36), primary_key=True, default=generate_uuid)
+    company_id = Column(String(36), ForeignKey("companies.id", ondelete="CASCADE"), nullable=False)
+    account_id = Column(String(36), ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False)
+    period_start = Column(DateTime)
+    period_end = Column(DateTime, nullable=False)
+    
+    debit_total = Column(Numeric(18, 2), default=0, nullable=False)
+    credit_total = Column(Numeric(18, 2), default=0, nullable=False)
+    
+    # Period lies inside an active lock covering all voucher types
+    is_locked = Column(Boolean, default=False, nullable=False)
+    computed_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("account_id", "period_start", "period_end", name="uq_period_total_account_period"),
+        Index("idx_period_total_company_period", "company_id", "period_end", "period_start"),
+    )
+
+    def __repr__(self):
+        return f"<AccountPeriodTotal {self.account_id} {self.period_start} - {self.period_end}>"
+
+
+class AccountPeriodTotalVersion(Base):
+    """Invalidation counter of a company's cached period totals.
+
+    Bumped by every posting that invalidates cached periods. PeriodTotalsCache
+    only stores totals computed while the counter stayed at the value it
+    read beforehand.
+    """
+    __tablename__ = "account_period_total_versions"
+
+    company_id = Column(String(36), ForeignKey("companies.id", ondelete="CASCADE"), primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<AccountPeriodTotalVersion {self.company_id} {self.version}>"
+
+
+class GSTReturnLedger(Base):
+    """Running GST return totals per (company, return period, section, POS, rate, HSN).
+
+    Two kinds of rows share the table: "document" rows (rate 0, no HSN)
+    carry document counts and header totals per section and place of
+    supply; "item" rows carry line totals per rate and HSN. Sections are
+    the GSTR-1 tables (b2b, b2cl, b2cs, exp), sales_return for debit notes,
+    itc / itc_ineligible for approved purchases and purchase_return for
+    credit notes. Updated in the same database transaction as the invoice,
+    purchase or note write; maintained by GSTReturnLedgerService.
+    """
+    __tablename__ = "gst_return_ledger"
+
+    id = Column(String(36), primary_key=True, default=generate_uuid)
+    company_id = Column(String(36), ForeignKey("companies.id", ondelete="CASCADE"), nullable=False)
+    return_period = Column(String(6), nullable=False)  # MMYYYY
+    line_type = Column(String(10), nullable=False)  # document / item
+    section = Column(String(20), nullable=False)
+    place_of_supply = Column(String(2), nullable=False, default="")
+    gst_rate = Column(Numeric(5, 2), nullable=False, default=0)
+    hsn_code = Column(String(8), nullable=False, default="")
+    is_reverse_charge = Column(Boolean, nullable=False, default=False)
+    
+    document_count = Column(Integer, nullable=False, default=0)
+    quantity = Column(Numeric(16, 3), nullable=False, default=0)
+    total_value = Column(Numeric(18, 2), nullable=False, default=0)
+    taxable_value = Column(Numeric(18, 2), nullable=False, default=0)
+    igst_amount = Column(Numeric(18, 2), nullable=False, default=0)
+    cgst_amount = Column(Numeric(18, 2), nullable=False, default=0)
+    sgst_amount = Column(Numeric(18, 2), nullable=False, default=0)
+    cess_amount = Column(Numeric(18, 2), nullable=False, default=0)
+    
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "company_id", "return_period", "line_type", "section", "place_of_supply",
+            "gst_rate", "hsn_code", "is_reverse_charge", name="uq_gst_return_ledger_key"
+        ),
+    )
+
+    def __repr__(self):
+        return f"<GSTReturnLedger {self.return_period} {self.section} {self.line_type}>"
+
+
+class EInvoiceJob(Base):
+    """Bulk IRN generation run over a company's invoices in a date range.
+
+    Progress counters and failures are committed after every chunk, so a
+    job that stops half way can be resumed: invoices that already have an
+    IRN are skipped, failed ones are retried. Run by EInvoiceBatchService.
+    """
+    __tablename__ = "einvoice_jobs"
+
+    id = Column(String(36), primary_key=True, default=generate_uuid)
+    company_id = Column(String(36), ForeignKey("companies.id", ondelete="CASCADE"), nullable=False)
+    from_date = Column(DateTime, nullable=False)
+    to_date = Column(DateTime, nullable=False)  # Exclusive
+    
+    status = Column(Enum(EInvoiceJobStatus), default=EInvoiceJobStatus.PENDING)
+    
+    # Statistics
+    total_invoices = Column(Integer, default=0)  # Eligible without an IRN at creation
+    succeeded_invoices = Column(Integer, default=0)
+    failed_invoices = Column(Integer, default=0)  # In the latest run
+    attempts = Column(Integer, default=0)  # Submissions, including retries
+    runs = Column(Integer, default=0)
+    
+    # Error tracking: [{"invoice_id", "invoice_number", "error", "attempts"}] of the latest run
+    failures = Column(JSON)
+    error_message = Column(Text)
+    
+    started_at = Column(DateTime)
+    completed_at = Column(DateTime)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index("idx_einvoice_job_company", "company_id"),
+    )
+
+    def __repr__(self):
+        return f"<EInvoiceJob {self.id} {self.status}>"
+
+
+class VoucherSequence(Base):
+    """Counter row for a voucher number series.
+
+    One row per (company, voucher type, series, financial year). Numbers are
+    handed out by SequenceService with an atomic UPDATE ... RETURNING (or a
+    row lock), so concurrent postings never share a number. Series that do
+    not reset yearly use an empty financial_year.
+    """
+    __tablename__ = "voucher_sequences"
+
+    id = Column(String(36), primary_key=True, default=generate_uuid)
+    company_id = Column(String(36), ForeignKey("companies.id", ondelete="CASCADE"), nullable=False)
+    
+    voucher_type = Column(String(50), nullable=False)  # invoice, journal, sales, ...
+    series_name = Column(String(100), nullable=False, default="Default")
+    financial_year = Column(String(9), nullable=False, default="")  # e.g. "2024-2025"
+    
+    # Next number to hand out
+    next_number = Column(Integer, nullable=False, default=1)
+    
+    # Formatting (used by VoucherNumberingService series)
+    prefix = Column(String(20), default="")
+    suffix = Column(String(20), default="")
+    separator = Column(String(5), default="/")
+    number_padding = Column(Integer, default=4)
+    starting_number = Column(Integer, default=1)
+    reset_frequency = Column(String(20), default="yearly")
+    include_fy_in_number = Column(Boolean, default=True)
+    is_active = Column(Boolean, default=True)
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "company_id", "voucher_type", "series_name", "financial_year",
+            name="uq_voucher_sequence_key"
+        ),
+    )
+
+    def __repr__(self):
+        return f"<VoucherSequence {self.voucher_type}/{self.series_name} {self.financial_year}: {self.next_number}>"
+
+
 class BankImport(Base):
     """Bank import model - Tracks CSV import batches."""
     __tablename__ = "bank_imports"
@@ -1262,6 +1478,7 @@ class BankImport(Base):
     matched_rows = Column(Integer, default=0)
     created_rows = Column(Integer, default=0)
     ignored_rows = Column(Integer, default=0)
+    duplicate_rows = Column(Integer, default=0)  # Already imported for this bank account
     
     # Error tracking
     error_message = Column(Text)
@@ -1318,6 +1535,9 @@ class BankImportRow(Base):
     # Raw data for debugging
     raw_data = Column(JSON)
     
+    # SHA-256 of date, amount, narration, reference and balance (duplicate detection)
+    content_hash = Column(String(64))
+    
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
@@ -1328,6 +1548,7 @@ class BankImportRow(Base):
     __table_args__ = (
         Index("idx_import_row_import", "import_id"),
         Index("idx_import_row_status", "status"),
+        Index("idx_import_row_hash", "content_hash"),
     )
 
     def __repr__(self):
@@ -408,6 +408,7 @@ class PayrollRun(Base):
     transaction_id = Column(String(36), ForeignKey("transactions.id", ondelete="SET NULL"))
     
     notes = Column(Text)
+    processing_errors = Column(JSON)  # [{"employee_id", "employee_code", "error"}] from the last run
     
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -734,6 +735,7 @@ class PayrollSettings(Base):
     # Pay schedule
     pay_day = Column(Integer, default=1)  # Day of month for salary
     working_days_per_month = Column(Integer, default=30)
+    payroll_workers = Column(Integer, default=1)  # Processes for salary calculation (1 = in-process)
     
     # Payslip settings
     payslip_template = Column(String(100), default="default")
@@ -255,6 +255,7 @@ class BankImportResponse(BaseModel):
     matched_rows: int
     created_rows: int
     ignored_rows: int
+    duplicate_rows: int = 0
     error_message: Optional[str] = None
     import_date: datetime
     completed_at: Optional[datetime] = None
@@ -32,6 +32,19 @@ class B2CLInvoice(BaseModel):
     cess_amount: Decimal
 
 
+class ExportInvoice(BaseModel):
+    """Export / SEZ Invoice for GSTR-1."""
+    export_type: str  # WPAY (with IGST) or WOPAY
+    customer_name: str
+    invoice_number: str
+    invoice_date: date
+    invoice_value: Decimal
+    place_of_supply: str
+    taxable_value: Decimal
+    igst_amount: Decimal
+    cess_amount: Decimal
+
+
 class B2CSInvoice(BaseModel):
     """B2C Small summary for GSTR-1."""
     place_of_supply: str
@@ -84,6 +97,10 @@ class GSTR1Response(BaseModel):
     b2cs_summary: List[B2CSInvoice] = []
     b2cs_total: Decimal = Decimal("0")
     
+    # Exports and SEZ supplies
+    exp_invoices: List[ExportInvoice] = []
+    exp_total: Decimal = Decimal("0")
+    
     # HSN Summary
     hsn_summary: List[HSNSummary] = []
     
@@ -1,5 +1,5 @@
 """Accounting service for double-entry bookkeeping."""
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, contains_eager
 from sqlalchemy import func, and_
 from typing import List, Optional, Tuple
 from datetime import datetime, date, timedelta
@@ -10,6 +10,9 @@ from app.database.models import (
     AccountMapping, AccountMappingType, PayrollAccountConfig
 )
 from app.database.payroll_models import SalaryComponent
+from app.services.balance_snapshot_service import BalanceSnapshotService, ZERO_TOTALS
+from app.services.period_totals_cache import PeriodTotalsCache
+from app.services.sequence_service import SequenceService, SYSTEM_SERIES
 from app.schemas.accounting import (
     AccountCreate, AccountUpdate, TransactionCreate, TransactionEntryCreate,
     DEFAULT_CHART_OF_ACCOUNTS, AccountType as SchemaAccountType
@@ -45,20 +48,24 @@ class AccountingService:
         if not account:
             return Decimal("0")
         
-        query = self.db.query(
-            func.coalesce(func.sum(TransactionEntry.debit_amount), 0).label('total_debit'),
-            func.coalesce(func.sum(TransactionEntry.credit_amount), 0).label('total_credit')
-        ).join(Transaction).filter(
-            TransactionEntry.account_id == account_id,
-            Transaction.status == TransactionStatus.POSTED
-        )
-        
-        if as_of_date:
-            query = query.filter(Transaction.transaction_date <= as_of_date)
-        
-        result = query.first()
-        total_debit = Decimal(str(result.total_debit or 0))
-        total_credit = Decimal(str(result.total_credit or 0))
+        if BalanceSnapshotService.is_enabled():
+            totals = BalanceSnapshotService(self.db).get_totals([account_id], as_of_date)
+            total_debit, total_credit = totals.get(account_id, ZERO_TOTALS)
+        else:
+            query = self.db.query(
+                func.coalesce(func.sum(TransactionEntry.debit_amount), 0).label('total_debit'),
+                func.coalesce(func.sum(TransactionEntry.credit_amount), 0).label('total_credit')
+            ).join(Transaction).filter(
+                TransactionEntry.account_id == account_id,
+                Transaction.status == TransactionStatus.POSTED
+            )
+            
+            if as_of_date:
+                query = query.filter(Transaction.transaction_date <= as_of_date)
+            
+            result = query.first()
+            total_debit = Decimal(str(result.total_debit or 0))
+            total_credit = Decimal(str(result.total_credit or 0))
         
         # Assets and Expenses have debit-normal balances
         # Liabilities, Equity, Revenue have credit-normal balances
@@ -78,18 +85,28 @@ class AccountingService:
         if not account:
             return Decimal("0")
         
-        result = self.db.query(
-            func.coalesce(func.sum(TransactionEntry.debit_amount), 0).label('total_debit'),
-            func.coalesce(func.sum(TransactionEntry.credit_amount), 0).label('total_credit')
-        ).join(Transaction).filter(
-            TransactionEntry.account_id == account_id,
-            Transaction.status == TransactionStatus.POSTED,
-            Transaction.transaction_date >= from_date,
-            Transaction.transaction_date <= to_date
-        ).first()
-        
-        total_debit = Decimal(str(result.total_debit or 0))
-        total_credit = Decimal(str(result.total_credit or 0))
+        if BalanceSnapshotService.is_enabled():
+            # Movement = closing totals minus totals just before the period
+            snapshots = BalanceSnapshotService(self.db)
+            end_debit, end_credit = snapshots.get_totals([account_id], to_date).get(account_id, ZERO_TOTALS)
+            start_debit, start_credit = snapshots.get_totals(
+                [account_id], from_date, inclusive=False
+            ).get(account_id, ZERO_TOTALS)
+            total_debit = end_debit - start_debit
+            total_credit = end_credit - start_credit
+        else:
+            result = self.db.query(
+                func.coalesce(func.sum(TransactionEntry.debit_amount), 0).label('total_debit'),
+                func.coalesce(func.sum(TransactionEntry.credit_amount), 0).label('total_credit')
+            ).join(Transaction).filter(
+                TransactionEntry.account_id == account_id,
+                Transaction.status == TransactionStatus.POSTED,
+                Transaction.transaction_date >= from_date,
+                Transaction.transaction_date <= to_date
+            ).first()
+            
+            total_debit = Decimal(str(result.total_debit or 0))
+            total_credit = Decimal(str(result.total_credit or 0))
         
         if account.account_type in [AccountType.ASSET, AccountType.EXPENSE]:
             return total_debit - total_credit
@@ -237,6 +254,8 @@ class AccountingService:
         )
         self.db.add(credit_entry)
         
+        BalanceSnapshotService(self.db).record_transaction(transaction)
+        PeriodTotalsCache(self.db).invalidate(transaction)
         self.db.commit()
         return transaction
     
@@ -627,20 +646,24 @@ class AccountingService:
     
     def _get_next_transaction_number(self, company: Company) -> str:
         """Get next transaction number for a company."""
-        # Get the max transaction number
-        result = self.db.query(func.max(Transaction.transaction_number)).filter(
-            Transaction.company_id == company.id
-        ).scalar()
-        
-        if result:
-            # Extract number and increment
-            try:
-                num = int(result.replace("JE-", ""))
-                return f"JE-{num + 1:06d}"
-            except ValueError:
-                pass
-        
-        return "JE-000001"
+        def seed() -> int:
+            # First use of the counter continues after the highest existing JE number
+            result = self.db.query(func.max(Transaction.transaction_number)).filter(
+                Transaction.company_id == company.id,
+                Transaction.transaction_number.like("JE-%")
+            ).scalar()
+            
+            if result:
+                try:
+                    return int(result.replace("JE-", "")) + 1
+                except ValueError:
+                    pass
+            return 1
+        
+        number = SequenceService(self.db).allocate(
+            company.id, "journal_entry", series_name=SYSTEM_SERIES, seed=seed
+        )
+        return f"JE-{number:06d}"
     
     def create_journal_entry(
         self,
@@ -705,8 +728,10 @@ class AccountingService:
         if transaction.status != TransactionStatus.DRAFT:
             raise ValueError("Only draft transactions can be posted")
         
-        # No need to update account balances - they are calculated from transaction entries
+        # Balances are calculated from transaction entries; snapshots only cache them
         transaction.status = TransactionStatus.POSTED
+        BalanceSnapshotService(self.db).record_transaction(transaction)
+        PeriodTotalsCache(self.db).invalidate(transaction)
         self.db.commit()
         self.db.refresh(transaction)
         return transaction
@@ -743,7 +768,9 @@ class AccountingService:
             auto_post=True
         )
         
-        # Link transactions
+        # Link transactions (the original no longer counts towards balances)
+        BalanceSnapshotService(self.db).record_transaction(transaction, sign=-1)
+        PeriodTotalsCache(self.db).invalidate(transaction)
         transaction.status = TransactionStatus.REVERSED
         transaction.reversed_by_id = reversal.id
         reversal.reverses_id = transaction.id
@@ -820,7 +847,10 @@ class AccountingService:
         to_date: Optional[date] = None
     ) -> dict:
         """Get account ledger with running balance."""
-        query = self.db.query(TransactionEntry).join(Transaction).filter(
+        # Transactions come from the join itself instead of a lazy load per entry
+        query = self.db.query(TransactionEntry).join(Transaction).options(
+            contains_eager(TransactionEntry.transaction)
+        ).filter(
             TransactionEntry.account_id == account.id,
             Transaction.status == TransactionStatus.POSTED
         )
@@ -831,7 +861,7 @@ class AccountingService:
         if to_date:
             query = query.filter(Transaction.transaction_date <= to_date)
         
-        entries = query.order_by(Transaction.transaction_date).all()
+        entries = query.order_by(Transaction.transaction_date, TransactionEntry.id).all()
         
         # Calculate opening balance (before from_date)
         if from_date:
@@ -0,0 +1,201 @@
+"""Aging engine - bucketed outstanding amounts for receivables and payables.
+
+Every aging and outstanding report ages the same thing: open sales or
+purchase invoices with a balance due, bucketed by days past the due date
+(invoice date when there is no due date). Buckets are assigned by a SQL
+CASE on the due date against precomputed cutoffs and amounts are grouped
+by party in the database, so the summary and the per-party rollup cost
+one query whatever the size of the debtor book. Invoice details are a
+separate, optionally paginated query.
+
+Buckets are given as inclusive upper limits in days overdue with None
+for the open last bucket, e.g. [30, 60, 90, 180, None] for 0-30, 31-60,
+61-90, 91-180 and 180+. Not yet due invoices fall in the first bucket.
+"""
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import case, desc, func, literal, select
+from sqlalchemy.orm import Session
+
+from app.database.models import Customer, Invoice, InvoiceStatus, PurchaseInvoice, PurchaseInvoiceStatus
+
+# Invoices that are not receivable/payable even with a balance due
+EXCLUDED_INVOICE_STATUSES = [
+    InvoiceStatus.DRAFT, InvoiceStatus.CANCELLED, InvoiceStatus.VOID,
+    InvoiceStatus.REFUNDED, InvoiceStatus.WRITE_OFF,
+]
+EXCLUDED_PURCHASE_STATUSES = [PurchaseInvoiceStatus.DRAFT, PurchaseInvoiceStatus.CANCELLED]
+
+
+def _day(value) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+class AgingEngine:
+    """Set-based aging of sales ('sales') or purchase ('purchase') invoices."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ==================== QUERY PARTS ====================
+
+    def _columns(self, invoice_type: str) -> Dict[str, Any]:
+        if invoice_type == "purchase":
+            model, party, excluded = PurchaseInvoice, PurchaseInvoice.vendor_id, EXCLUDED_PURCHASE_STATUSES
+        else:
+            model, party, excluded = Invoice, Invoice.customer_id, EXCLUDED_INVOICE_STATUSES
+        return {
+            "model": model,
+            "party_id": party,
+            "excluded": excluded,
+            "due": func.coalesce(model.due_date, model.invoice_date),
+        }
+
+    def _filters(self, cols: Dict[str, Any], company_id: str, as_of_date: datetime, party_id: Optional[str]):
+        model = cols["model"]
+        filters = [
+            model.company_id == company_id,
+            model.balance_due > 0,
+            model.invoice_date <= as_of_date,
+            model.status.notin_(cols["excluded"]),
+        ]
+        if party_id:
+            filters.append(cols["party_id"] == party_id)
+        return filters
+
+    @staticmethod
+    def _bucket(due, as_of_date: datetime, limits: List[Optional[int]]):
+        """
+        Bucket index as a CASE expression. Days overdue are calendar days
+        (as_of_date.date() - due.date()), so `days <= limit` is
+        `due >= midnight of (as_of_date.date() - limit days)`.
+        """
+        as_of_day = datetime.combine(as_of_date.date(), time.min)
+        whens = [
+            (due >= as_of_day - timedelta(days=limit), i)
+            for i, limit in enumerate(limits)
+            if limit is not None
+        ]
+        if not whens:
+            return literal(0)
+        return case(*whens, else_=len(limits) - 1)
+
+    # ==================== ROLLUP ====================
+
+    def get_party_rollup(
+        self,
+        company_id: str,
+        invoice_type: str,
+        as_of_date: datetime,
+        limits: List[Optional[int]],
+        party_id: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Outstanding per party and bucket, largest total first, in one
+        grouped query. Invoices without a party are rolled up under None.
+        """
+        cols = self._columns(invoice_type)
+        model = cols["model"]
+        bucket = self._bucket(cols["due"], as_of_date, limits)
+        total = func.sum(model.balance_due)
+
+        query = select(
+            cols["party_id"],
+            func.max(Customer.name),
+            func.count(model.id),
+            total,
+            *[func.sum(case((bucket == i, model.balance_due), else_=0)) for i in range(len(limits))],
+        ).outerjoin(
+            Customer, Customer.id == cols["party_id"]
+        ).where(
+            *self._filters(cols, company_id, as_of_date, party_id)
+        ).group_by(cols["party_id"]).order_by(desc(total), cols["party_id"])
+
+        return [
+            {
+                "party_id": row[0],
+                "party_name": row[1],
+                "invoice_count": row[2],
+                "total": Decimal(str(row[3] or 0)),
+                "buckets": [Decimal(str(amount or 0)) for amount in row[4:]],
+            }
+            for row in self.db.execute(query)
+        ]
+
+    @staticmethod
+    def summarize(rollup: List[Dict[str, Any]], limits: List[Optional[int]]) -> Dict[str, Any]:
+        """Company-wide bucket totals from a party rollup."""
+        buckets = [Decimal("0")] * len(limits)
+        for party in rollup:
+            buckets = [a + b for a, b in zip(buckets, party["buckets"])]
+        return {
+            "buckets": buckets,
+            "total": sum(buckets, Decimal("0")),
+            "invoice_count": sum(party["invoice_count"] for party in rollup),
+            "party_count": len(rollup),
+        }
+
+    # ==================== DETAILS ====================
+
+    def get_details(
+        self,
+        company_id: str,
+        invoice_type: str,
+        as_of_date: datetime,
+        limits: List[Optional[int]],
+        party_id: Optional[str] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        by_party: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Outstanding invoices with their bucket index, oldest due first
+        (grouped by party first when by_party). Reads plain columns, not
+        ORM objects; pass offset/limit to page through large books.
+        """
+        cols = self._columns(invoice_type)
+        model = cols["model"]
+        due = cols["due"]
+
+        order = [due, model.invoice_number, model.id]
+        if by_party:
+            order.insert(0, cols["party_id"])
+
+        query = select(
+            model.id,
+            model.invoice_number,
+            model.invoice_date,
+            model.due_date,
+            due.label("aging_date"),
+            cols["party_id"].label("party_id"),
+            Customer.name.label("party_name"),
+            model.total_amount,
+            model.amount_paid,
+            model.balance_due,
+            self._bucket(due, as_of_date, limits).label("bucket"),
+        ).outerjoin(
+            Customer, Customer.id == cols["party_id"]
+        ).where(
+            *self._filters(cols, company_id, as_of_date, party_id)
+        ).order_by(*order).offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+
+        return [
+            {
+                "invoice_id": row.id,
+                "invoice_number": row.invoice_number,
+                "invoice_date": row.invoice_date,
+                "due_date": row.due_date,
+                "days_overdue": (as_of_date.date() - _day(row.aging_date)).days,
+                "bucket": row.bucket,
+                "party_id": row.party_id,
+                "party_name": row.party_name,
+                "total_amount": Decimal(str(row.total_amount or 0)),
+                "amount_paid": Decimal(str(row.amount_paid or 0)),
+                "outstanding": Decimal(str(row.balance_due or 0)),
+            }
+            for row in self.db.execute(query)
+        ]
@@ -5,14 +5,14 @@ Features:
 - Receivables aging
 - Payables aging
 - Customizable aging buckets
+- Optionally paginated invoice details
 """
 from decimal import Decimal, ROUND_HALF_UP
 from typing import List, Dict, Optional
-from datetime import datetime, timedelta
+from datetime import datetime
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 
-from app.database.models import Invoice, PurchaseInvoice, Customer
+from app.services.aging_engine import AgingEngine
 
 
 class AgingReportService:
@@ -30,91 +30,15 @@ class AgingReportService:
         as_of_date: datetime = None,
         customer_id: str = None,
         buckets: List[int] = None,
+        include_details: bool = True,
+        page: int = 1,
+        page_size: Optional[int] = None,
     ) -> Dict:
         """Get receivables aging report."""
-        if not as_of_date:
-            as_of_date = datetime.utcnow()
-        
-        if not buckets:
-            buckets = [0, 30, 60, 90, 180]  # Standard buckets
-        
-        # Get outstanding invoices
-        query = self.db.query(Invoice).filter(
-            Invoice.company_id == company_id,
-            Invoice.outstanding_amount > 0,
-            Invoice.invoice_date <= as_of_date,
+        return self._get_aging(
+            'sales', 'customer', company_id, as_of_date, customer_id, buckets,
+            include_details, page, page_size,
         )
-        
-        if customer_id:
-            query = query.filter(Invoice.customer_id == customer_id)
-        
-        invoices = query.all()
-        
-        # Initialize bucket totals
-        bucket_labels = self._create_bucket_labels(buckets)
-        totals = {label: Decimal('0') for label in bucket_labels}
-        
-        # Customer-wise breakdown
-        customer_aging = {}
-        details = []
-        
-        for inv in invoices:
-            due_date = inv.due_date or inv.invoice_date
-            days_overdue = (as_of_date - due_date).days
-            bucket = self._get_bucket(days_overdue, buckets)
-            bucket_label = bucket_labels[bucket]
-            
-            outstanding = inv.outstanding_amount or Decimal('0')
-            totals[bucket_label] += outstanding
-            
-            # Add to customer totals
-            cust_id = inv.customer_id or 'unknown'
-            cust_name = inv.customer.name if inv.customer else 'Unknown'
-            
-            if cust_id not in customer_aging:
-                customer_aging[cust_id] = {
-                    'customer_id': cust_id,
-                    'customer_name': cust_name,
-                    'buckets': {label: Decimal('0') for label in bucket_labels},
-                    'total': Decimal('0'),
-                }
-            
-            customer_aging[cust_id]['buckets'][bucket_label] += outstanding
-            customer_aging[cust_id]['total'] += outstanding
-            
-            details.append({
-                'invoice_id': inv.id,
-                'invoice_number': inv.invoice_number,
-                'invoice_date': inv.invoice_date.strftime('%Y-%m-%d'),
-                'due_date': due_date.strftime('%Y-%m-%d') if due_date else None,
-                'days_overdue': days_overdue,
-                'bucket': bucket_label,
-                'customer_id': cust_id,
-                'customer_name': cust_name,
-                'total_amount': self._round(inv.total_amount or 0),
-                'outstanding': self._round(outstanding),
-            })
-        
-        # Convert customer aging to list
-        customer_list = []
-        for cust in customer_aging.values():
-            cust['buckets'] = {k: self._round(v) for k, v in cust['buckets'].items()}
-            cust['total'] = self._round(cust['total'])
-            customer_list.append(cust)
-        
-        customer_list.sort(key=lambda x: x['total'], reverse=True)
-        
-        return {
-            'report_type': 'receivables_aging',
-            'as_of_date': as_of_date.strftime('%Y-%m-%d'),
-            'buckets': bucket_labels,
-            'summary': {k: self._round(v) for k, v in totals.items()},
-            'total_outstanding': self._round(sum(totals.values())),
-            'invoice_count': len(invoices),
-            'customer_count': len(customer_aging),
-            'by_customer': customer_list,
-            'details': details,
-        }
     
     def get_payables_aging(
         self,
@@ -122,84 +46,84 @@ class AgingReportService:
         as_of_date: datetime = None,
         vendor_id: str = None,
         buckets: List[int] = None,
+        include_details: bool = True,
+        page: int = 1,
+        page_size: Optional[int] = None,
     ) -> Dict:
         """Get payables aging report."""
+        return self._get_aging(
+            'purchase', 'vendor', company_id, as_of_date, vendor_id, buckets,
+            include_details, page, page_size,
+        )
+    
+    def _get_aging(
+        self,
+        invoice_type: str,
+        party: str,
+        company_id: str,
+        as_of_date: Optional[datetime],
+        party_id: Optional[str],
+        buckets: Optional[List[int]],
+        include_details: bool,
+        page: int,
+        page_size: Optional[int],
+    ) -> Dict:
+        """
+        Summary and per-party rollup come from one grouped query; details
+        (all of them, or one page when page_size is given) from a second one.
+        """
         if not as_of_date:
             as_of_date = datetime.utcnow()
         
         if not buckets:
-            buckets = [0, 30, 60, 90, 180]
-        
-        query = self.db.query(PurchaseInvoice).filter(
-            PurchaseInvoice.company_id == company_id,
-            PurchaseInvoice.outstanding_amount > 0,
-            PurchaseInvoice.invoice_date <= as_of_date,
-        )
-        
-        if vendor_id:
-            query = query.filter(PurchaseInvoice.vendor_id == vendor_id)
-        
-        invoices = query.all()
+            buckets = [0, 30, 60, 90, 180]  # Standard buckets
         
         bucket_labels = self._create_bucket_labels(buckets)
-        totals = {label: Decimal('0') for label in bucket_labels}
+        limits = buckets[1:] + [None]
+        
+        engine = AgingEngine(self.db)
+        rollup = engine.get_party_rollup(company_id, invoice_type, as_of_date, limits, party_id)
+        summary = engine.summarize(rollup, limits)
+        
+        party_list = [
+            {
+                f'{party}_id': row['party_id'] or 'unknown',
+                f'{party}_name': row['party_name'] or 'Unknown',
+                'buckets': {label: self._round(amount) for label, amount in zip(bucket_labels, row['buckets'])},
+                'total': self._round(row['total']),
+            }
+            for row in rollup
+        ]
         
-        vendor_aging = {}
         details = []
-        
-        for inv in invoices:
-            due_date = inv.due_date or inv.invoice_date
-            days_overdue = (as_of_date - due_date).days
-            bucket = self._get_bucket(days_overdue, buckets)
-            bucket_label = bucket_labels[bucket]
-            
-            outstanding = inv.outstanding_amount or Decimal('0')
-            totals[bucket_label] += outstanding
-            
-            vendor_id_val = inv.vendor_id or 'unknown'
-            vendor_name = inv.vendor.name if inv.vendor else 'Unknown'
-            
-            if vendor_id_val not in vendor_aging:
-                vendor_aging[vendor_id_val] = {
-                    'vendor_id': vendor_id_val,
-                    'vendor_name': vendor_name,
-                    'buckets': {label: Decimal('0') for label in bucket_labels},
-                    'total': Decimal('0'),
-                }
-            
-            vendor_aging[vendor_id_val]['buckets'][bucket_label] += outstanding
-            vendor_aging[vendor_id_val]['total'] += outstanding
-            
-            details.append({
-                'invoice_id': inv.id,
-                'invoice_number': inv.invoice_number,
-                'invoice_date': inv.invoice_date.strftime('%Y-%m-%d'),
-                'due_date': due_date.strftime('%Y-%m-%d') if due_date else None,
-                'days_overdue': days_overdue,
-                'bucket': bucket_label,
-                'vendor_id': vendor_id_val,
-                'vendor_name': vendor_name,
-                'total_amount': self._round(inv.total_amount or 0),
-                'outstanding': self._round(outstanding),
-            })
-        
-        vendor_list = []
-        for vendor in vendor_aging.values():
-            vendor['buckets'] = {k: self._round(v) for k, v in vendor['buckets'].items()}
-            vendor['total'] = self._round(vendor['total'])
-            vendor_list.append(vendor)
-        
-        vendor_list.sort(key=lambda x: x['total'], reverse=True)
+        if include_details:
+            offset = (max(page, 1) - 1) * page_size if page_size else 0
+            for row in engine.get_details(
+                company_id, invoice_type, as_of_date, limits, party_id, offset, page_size
+            ):
+                due_date = row['due_date'] or row['invoice_date']
+                details.append({
+                    'invoice_id': row['invoice_id'],
+                    'invoice_number': row['invoice_number'],
+                    'invoice_date': row['invoice_date'].strftime('%Y-%m-%d'),
+                    'due_date': due_date.strftime('%Y-%m-%d'),
+                    'days_overdue': row['days_overdue'],
+                    'bucket': bucket_labels[row['bucket']],
+                    f'{party}_id': row['party_id'] or 'unknown',
+                    f'{party}_name': row['party_name'] or 'Unknown',
+                    'total_amount': self._round(row['total_amount']),
+                    'outstanding': self._round(row['outstanding']),
+                })
         
         return {
-            'report_type': 'payables_aging',
+            'report_type': 'receivables_aging' if party == 'customer' else 'payables_aging',
             'as_of_date': as_of_date.strftime('%Y-%m-%d'),
             'buckets': bucket_labels,
-            'summary': {k: self._round(v) for k, v in totals.items()},
-            'total_outstanding': self._round(sum(totals.values())),
-            'invoice_count': len(invoices),
-            'vendor_count': len(vendor_aging),
-            'by_vendor': vendor_list,
+            'summary': {label: self._round(amount) for label, amount in zip(bucket_labels, summary['buckets'])},
+            'total_outstanding': self._round(summary['total']),
+            'invoice_count': summary['invoice_count'],
+            f'{party}_count': summary['party_count'],
+            f'by_{party}': party_list,
             'details': details,
         }
     
@@ -214,16 +138,3 @@ class AgingReportService:
             else:
                 labels.append(f'{b+1}-{buckets[i+1]}')
         return labels
-    
-    def _get_bucket(self, days: int, buckets: List[int]) -> int:
-        """Determine which bucket a number of days falls into."""
-        if days < 0:
-            days = 0
-        
-        for i, b in enumerate(buckets):
-            if i == len(buckets) - 1:
-                return i
-            if days <= buckets[i + 1]:
-                return i
-        
-        return len(buckets) - 1
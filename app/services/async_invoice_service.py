@@ -0,0 +1,121 @@
+"""Async read paths for invoices.
+
+Mirrors the read methods of CompanyService/InvoiceService on an AsyncSession
+so the hot list and detail endpoints don't block the event loop. Relationships
+used by the response schemas are eager-loaded, since lazy loading is not
+available on an AsyncSession.
+"""
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy import select, func
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import date
+from decimal import Decimal
+from app.database.models import Invoice, Company, Godown, User
+
+
+class AsyncInvoiceService:
+    """Async invoice queries for read-heavy endpoints."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    def _with_relations(self, query):
+        """Eager-load everything InvoiceResponse reads."""
+        return query.options(
+            selectinload(Invoice.customer),
+            selectinload(Invoice.items),
+            selectinload(Invoice.payments),
+        )
+
+    async def get_company(self, company_id: str, user: User) -> Optional[Company]:
+        """Get a company by ID (must belong to user)."""
+        result = await self.db.execute(
+            select(Company).where(
+                Company.id == company_id,
+                Company.user_id == user.id
+            )
+        )
+        return result.scalars().first()
+
+    async def get_invoice(self, invoice_id: str, company: Company) -> Optional[Invoice]:
+        """Get an invoice by ID (must belong to company)."""
+        result = await self.db.execute(
+            self._with_relations(select(Invoice)).where(
+                Invoice.id == invoice_id,
+                Invoice.company_id == company.id
+            )
+        )
+        return result.scalars().first()
+
+    async def get_invoices(
+        self,
+        company: Company,
+        page: int = 1,
+        page_size: int = 20,
+        status: Optional[str] = None,
+        customer_id: Optional[str] = None,
+        from_date: Optional[date] = None,
+        to_date: Optional[date] = None,
+        search: Optional[str] = None,
+        with_relations: bool = True
+    ) -> Tuple[List[Invoice], int, dict]:
+        """Get invoices with pagination and filters (same semantics as InvoiceService.get_invoices)."""
+        filters = [Invoice.company_id == company.id]
+
+        if status:
+            filters.append(Invoice.status == status)
+        if customer_id:
+            filters.append(Invoice.customer_id == customer_id)
+        if from_date:
+            filters.append(Invoice.invoice_date >= from_date)
+        if to_date:
+            filters.append(Invoice.invoice_date <= to_date)
+        if search:
+            filters.append(Invoice.invoice_number.ilike(f"%{search}%"))
+
+        total = await self.db.scalar(
+            select(func.count(Invoice.id)).where(*filters)
+        )
+
+        # Summary covers all invoices of the company, not just the filtered page
+        summary = (await self.db.execute(
+            select(
+                func.sum(Invoice.total_amount).label('total_amount'),
+                func.sum(Invoice.amount_paid).label('total_paid'),
+                func.sum(Invoice.balance_due).label('total_pending')
+            ).where(Invoice.company_id == company.id)
+        )).first()
+
+        summary_dict = {
+            "total_amount": summary.total_amount or Decimal("0"),
+            "total_paid": summary.total_paid or Decimal("0"),
+            "total_pending": summary.total_pending or Decimal("0"),
+        }
+
+        query = select(Invoice)
+        if with_relations:
+            query = self._with_relations(query)
+        else:
+            query = query.options(selectinload(Invoice.customer))
+
+        offset = (page - 1) * page_size
+        result = await self.db.execute(
+            query.where(*filters)
+            .order_by(Invoice.invoice_date.desc())
+            .offset(offset)
+            .limit(page_size)
+        )
+
+        return list(result.scalars().all()), total or 0, summary_dict
+
+    async def get_godown_names(self, godown_ids: Iterable[str]) -> Dict[str, str]:
+        """Get {godown_id: name} for warehouse allocation display in one query."""
+        ids = {godown_id for godown_id in godown_ids if godown_id}
+        if not ids:
+            return {}
+
+        result = await self.db.execute(
+            select(Godown.id, Godown.name).where(Godown.id.in_(ids))
+        )
+        return {row.id: row.name for row in result}
@@ -11,12 +11,13 @@ from decimal import Decimal, ROUND_HALF_UP
 from typing import Optional, List, Dict
 from datetime import datetime, date, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, case
 
 from app.database.payroll_models import (
     Attendance, AttendanceStatus, Employee, OvertimeRule, Holiday
 )
 from app.database.models import generate_uuid
+from app.services.leave_service import LeaveService
 
 
 class AttendanceService:
@@ -164,9 +165,85 @@ class AttendanceService:
         year: int,
     ) -> Dict:
         """Get attendance summary for a month."""
-        records = self.get_monthly_attendance(company_id, employee_id, month, year)
+        summaries = self.get_monthly_summaries(company_id, month, year, [employee_id])
+        return summaries.get(employee_id) or self._empty_summary(employee_id, month, year)
+    
+    def get_monthly_summaries(
+        self,
+        company_id: str,
+        month: int,
+        year: int,
+        employee_ids: Optional[List[str]] = None,
+    ) -> Dict[str, Dict]:
+        """
+        Attendance summaries for a month, for all employees at once.
+        
+        Status counts, hours and late/early counts come from one grouped
+        query over Attendance; approved leave from LeaveService is folded in
+        as paid_leave / unpaid_leave. lop_days is absent days, half of the
+        half days and unpaid leave. Employees with neither attendance nor
+        leave in the month are not included.
+        """
+        start_date = date(year, month, 1)
+        if month == 12:
+            end_date = date(year + 1, 1, 1) - timedelta(days=1)
+        else:
+            end_date = date(year, month + 1, 1) - timedelta(days=1)
+        
+        def count_of(condition):
+            return func.sum(case((condition, 1), else_=0))
+        
+        query = self.db.query(
+            Attendance.employee_id,
+            func.count(Attendance.id),
+            count_of(Attendance.status == AttendanceStatus.PRESENT),
+            count_of(Attendance.status == AttendanceStatus.ABSENT),
+            count_of(Attendance.status == AttendanceStatus.HALF_DAY),
+            count_of(Attendance.status == AttendanceStatus.LEAVE),
+            count_of(Attendance.status == AttendanceStatus.HOLIDAY),
+            count_of(Attendance.status == AttendanceStatus.WEEK_OFF),
+            func.sum(func.coalesce(Attendance.working_hours, 0)),
+            func.sum(func.coalesce(Attendance.overtime_hours, 0)),
+            count_of(Attendance.late_minutes > 0),
+            count_of(Attendance.early_leaving_minutes > 0),
+        ).filter(
+            Attendance.company_id == company_id,
+            Attendance.attendance_date >= start_date,
+            Attendance.attendance_date <= end_date,
+        ).group_by(Attendance.employee_id)
+        if employee_ids is not None:
+            query = query.filter(Attendance.employee_id.in_(employee_ids))
+        
+        summaries = {}
+        for row in query:
+            summary = self._empty_summary(row[0], month, year)
+            (
+                summary['total_days'], summary['present'], summary['absent'],
+                summary['half_day'], summary['leave'], summary['holiday'],
+                summary['week_off'],
+            ) = (int(value or 0) for value in row[1:8])
+            summary['total_working_hours'] = float(row[8] or 0)
+            summary['total_overtime_hours'] = float(row[9] or 0)
+            summary['late_count'] = int(row[10] or 0)
+            summary['early_leaving_count'] = int(row[11] or 0)
+            summaries[row[0]] = summary
+        
+        leave_days = LeaveService(self.db).get_approved_leave_days(company_id, month, year, employee_ids)
+        for employee_id, days in leave_days.items():
+            summary = summaries.get(employee_id)
+            if summary is None:
+                summary = summaries[employee_id] = self._empty_summary(employee_id, month, year)
+            summary['paid_leave'] = float(days['paid'])
+            summary['unpaid_leave'] = float(days['unpaid'])
         
-        summary = {
+        for summary in summaries.values():
+            summary['effective_days'] = summary['present'] + summary['half_day'] * 0.5
+            summary['lop_days'] = summary['absent'] + summary['half_day'] * 0.5 + summary['unpaid_leave']
+        
+        return summaries
+    
+    def _empty_summary(self, employee_id: str, month: int, year: int) -> Dict:
+        return {
             'employee_id': employee_id,
             'month': month,
             'year': year,
@@ -177,42 +254,15 @@ class AttendanceService:
             'leave': 0,
             'holiday': 0,
             'week_off': 0,
-            'total_working_hours': Decimal('0'),
-            'total_overtime_hours': Decimal('0'),
+            'total_working_hours': 0.0,
+            'total_overtime_hours': 0.0,
             'late_count': 0,
             'early_leaving_count': 0,
+            'paid_leave': 0.0,
+            'unpaid_leave': 0.0,
+            'effective_days': 0,
+            'lop_days': 0,
         }
-        
-        for record in records:
-            summary['total_days'] += 1
-            
-            if record.status == AttendanceStatus.PRESENT:
-                summary['present'] += 1
-            elif record.status == AttendanceStatus.ABSENT:
-                summary['absent'] += 1
-            elif record.status == AttendanceStatus.HALF_DAY:
-                summary['half_day'] += 1
-            elif record.status == AttendanceStatus.LEAVE:
-                summary['leave'] += 1
-            elif record.status == AttendanceStatus.HOLIDAY:
-                summary['holiday'] += 1
-            elif record.status == AttendanceStatus.WEEK_OFF:
-                summary['week_off'] += 1
-            
-            summary['total_working_hours'] += record.working_hours or Decimal('0')
-            summary['total_overtime_hours'] += record.overtime_hours or Decimal('0')
-            
-            if record.late_minutes and record.late_minutes > 0:
-                summary['late_count'] += 1
-            
-            if record.early_leaving_minutes and record.early_leaving_minutes > 0:
-                summary['early_leaving_count'] += 1
-        
-        summary['total_working_hours'] = float(summary['total_working_hours'])
-        summary['total_overtime_hours'] = float(summary['total_overtime_hours'])
-        summary['effective_days'] = summary['present'] + summary['half_day'] * 0.5
-        
-        return summary
     
     def get_department_attendance(
         self,
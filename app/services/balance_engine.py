@@ -0,0 +1,94 @@
+"""Grouped account balance engine.
+
+Computes debit/credit totals for every account of a company in a single
+``GROUP BY account_id`` query, so report cost stays constant as the number
+of ledgers grows. Sign rules are applied in memory.
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from typing import Dict, Optional, Tuple
+from datetime import datetime
+from decimal import Decimal
+from app.database.models import (
+    Transaction, TransactionEntry, AccountType, TransactionStatus
+)
+from app.services.balance_snapshot_service import BalanceSnapshotService
+
+
+# Assets and Expenses have debit-normal balances
+DEBIT_NORMAL_TYPES = (AccountType.ASSET, AccountType.EXPENSE)
+
+
+class AccountBalanceEngine:
+    """Aggregates posted transaction entries for all accounts of a company."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @staticmethod
+    def signed_balance(
+        account_type: AccountType,
+        total_debit: Decimal,
+        total_credit: Decimal
+    ) -> Decimal:
+        """Apply the account-type sign rule to raw debit/credit totals.
+
+        For Assets and Expenses: Debits increase, Credits decrease
+        For Liabilities, Equity, Revenue: Credits increase, Debits decrease
+        """
+        if account_type in DEBIT_NORMAL_TYPES:
+            return total_debit - total_credit
+        return total_credit - total_debit
+
+    def get_totals(
+        self,
+        company_id: str,
+        as_of_date: Optional[datetime] = None,
+        from_date: Optional[datetime] = None
+    ) -> Dict[str, Tuple[Decimal, Decimal]]:
+        """Get (total_debit, total_credit) per account in one grouped query.
+
+        Only POSTED transactions are included. Accounts without activity in
+        the window are absent from the result. Cumulative totals (no from_date)
+        are served from balance snapshots when they are enabled.
+        """
+        if from_date is None and BalanceSnapshotService.is_enabled():
+            return BalanceSnapshotService(self.db).get_company_totals(company_id, as_of_date)
+
+        query = self.db.query(
+            TransactionEntry.account_id,
+            func.coalesce(func.sum(TransactionEntry.debit_amount), 0).label('total_debit'),
+            func.coalesce(func.sum(TransactionEntry.credit_amount), 0).label('total_credit')
+        ).join(Transaction).filter(
+            Transaction.company_id == company_id,
+            Transaction.status == TransactionStatus.POSTED
+        )
+
+        if from_date:
+            query = query.filter(Transaction.transaction_date >= from_date)
+        if as_of_date:
+            query = query.filter(Transaction.transaction_date <= as_of_date)
+
+        totals = {}
+        for row in query.group_by(TransactionEntry.account_id).all():
+            totals[row.account_id] = (
+                Decimal(str(row.total_debit or 0)),
+                Decimal(str(row.total_credit or 0)),
+            )
+        return totals
+
+    def get_balances(
+        self,
+        company_id: str,
+        account_types: Dict[str, AccountType],
+        as_of_date: Optional[datetime] = None,
+        from_date: Optional[datetime] = None
+    ) -> Dict[str, Decimal]:
+        """Get signed balances for the given {account_id: account_type} map."""
+        totals = self.get_totals(company_id, as_of_date=as_of_date, from_date=from_date)
+        zero = (Decimal("0"), Decimal("0"))
+
+        return {
+            account_id: self.signed_balance(account_type, *totals.get(account_id, zero))
+            for account_id, account_type in account_types.items()
+        }
@@ -0,0 +1,382 @@
+"""Balance snapshot service - materialized daily account balances.
+
+Snapshots hold cumulative debit/credit totals per (account, date), so a
+balance as of any moment is one snapshot lookup plus the same-day delta
+instead of a scan over the full history.
+
+Posting code calls record_transaction() inside its own database
+transaction to keep snapshots current. It locks the affected Account rows
+in id order first: a new day's snapshot is seeded from the latest earlier
+one, and without the lock that read could miss a concurrent backdated
+posting's uncommitted delta. The fixed order keeps two postings from
+deadlocking. rebuild() and check_consistency() recompute from
+TransactionEntry for recovery and auditing.
+
+Snapshots are only read and maintained when BALANCE_SNAPSHOTS_ENABLED is
+set. Run rebuild_balance_snapshots.py before enabling it.
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import func, and_, update, insert
+from sqlalchemy.exc import IntegrityError
+from typing import Dict, List, Optional, Tuple, Any
+from datetime import datetime, date, time
+from decimal import Decimal
+from app.config import settings
+from app.database.models import (
+    Account, AccountBalanceSnapshot, Transaction, TransactionEntry, TransactionStatus
+)
+
+
+ZERO_TOTALS = (Decimal("0"), Decimal("0"))
+
+
+def _to_date(value) -> date:
+    """Normalise a DB date value (SQLite returns strings for DATE())."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+class BalanceSnapshotService:
+    """Service for reading and maintaining account balance snapshots."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @staticmethod
+    def is_enabled() -> bool:
+        """Whether balances should be served from snapshots."""
+        return settings.BALANCE_SNAPSHOTS_ENABLED
+
+    # ============== Incremental Maintenance ==============
+
+    def record_transaction(self, transaction: Transaction, sign: int = 1) -> None:
+        """Apply a transaction's entries to the snapshots.
+
+        Call with sign=1 when a transaction becomes POSTED and sign=-1 when it
+        stops counting (e.g. status changes to REVERSED). Does not commit, so
+        the snapshot update shares the caller's database transaction.
+        """
+        if not self.is_enabled():
+            return
+
+        self.db.flush()
+
+        rows = self.db.query(
+            TransactionEntry.account_id,
+            func.coalesce(func.sum(TransactionEntry.debit_amount), 0).label('total_debit'),
+            func.coalesce(func.sum(TransactionEntry.credit_amount), 0).label('total_credit')
+        ).filter(
+            TransactionEntry.transaction_id == transaction.id
+        ).group_by(TransactionEntry.account_id).order_by(TransactionEntry.account_id).all()
+        self._lock_accounts([row.account_id for row in rows])
+
+        day = _to_date(transaction.transaction_date)
+        for row in rows:
+            self._apply_delta(
+                transaction.company_id,
+                row.account_id,
+                day,
+                Decimal(str(row.total_debit or 0)) * sign,
+                Decimal(str(row.total_credit or 0)) * sign,
+            )
+
+    def _lock_accounts(self, account_ids: List[str]) -> None:
+        """Lock accounts in id order until the caller's transaction ends (no-op on SQLite)."""
+        if account_ids:
+            self.db.query(Account.id).filter(
+                Account.id.in_(account_ids)
+            ).order_by(Account.id).with_for_update().all()
+
+    def _apply_delta(
+        self,
+        company_id: str,
+        account_id: str,
+        day: date,
+        debit: Decimal,
+        credit: Decimal
+    ) -> None:
+        """Add a debit/credit delta to the snapshot for day and every later snapshot."""
+        if debit == 0 and credit == 0:
+            return
+
+        existing = self.db.query(AccountBalanceSnapshot.id).filter(
+            AccountBalanceSnapshot.account_id == account_id,
+            AccountBalanceSnapshot.snapshot_date == day
+        ).first()
+
+        later = AccountBalanceSnapshot.snapshot_date >= day
+        if existing is None:
+            # Start a new snapshot from the previous cumulative totals
+            prev_debit, prev_credit = self._get_latest_before(account_id, day)
+            try:
+                with self.db.begin_nested():
+                    self.db.add(AccountBalanceSnapshot(
+                        company_id=company_id,
+                        account_id=account_id,
+                        snapshot_date=day,
+                        debit_total=prev_debit + debit,
+                        credit_total=prev_credit + credit,
+                    ))
+                    self.db.flush()
+                later = AccountBalanceSnapshot.snapshot_date > day
+            except IntegrityError:
+                # Another posting created the day's snapshot first; add to it
+                pass
+
+        # Backdated postings shift every later cumulative snapshot
+        self.db.execute(
+            update(AccountBalanceSnapshot)
+            .where(AccountBalanceSnapshot.account_id == account_id, later)
+            .values(
+                debit_total=AccountBalanceSnapshot.debit_total + debit,
+                credit_total=AccountBalanceSnapshot.credit_total + credit,
+                updated_at=datetime.utcnow(),
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    def _get_latest_before(self, account_id: str, day: date) -> Tuple[Decimal, Decimal]:
+        """Get cumulative totals from the latest snapshot strictly before day."""
+        row = self.db.query(
+            AccountBalanceSnapshot.debit_total,
+            AccountBalanceSnapshot.credit_total
+        ).filter(
+            AccountBalanceSnapshot.account_id == account_id,
+            AccountBalanceSnapshot.snapshot_date < day
+        ).order_by(AccountBalanceSnapshot.snapshot_date.desc()).first()
+
+        if not row:
+            return ZERO_TOTALS
+        return Decimal(str(row.debit_total or 0)), Decimal(str(row.credit_total or 0))
+
+    # ============== Balance Lookup ==============
+
+    def get_totals(
+        self,
+        account_ids: List[str],
+        as_of_date: Optional[datetime] = None,
+        inclusive: bool = True
+    ) -> Dict[str, Tuple[Decimal, Decimal]]:
+        """Get cumulative (debit, credit) per account as of a moment.
+
+        With inclusive=False, entries dated exactly at as_of_date are excluded,
+        which gives the opening position for a period starting at as_of_date.
+        """
+        if not account_ids:
+            return {}
+
+        return self._get_totals(
+            AccountBalanceSnapshot.account_id.in_(account_ids),
+            TransactionEntry.account_id.in_(account_ids),
+            as_of_date,
+            inclusive,
+        )
+
+    def get_company_totals(
+        self,
+        company_id: str,
+        as_of_date: Optional[datetime] = None,
+        inclusive: bool = True
+    ) -> Dict[str, Tuple[Decimal, Decimal]]:
+        """Get cumulative (debit, credit) for every account of a company."""
+        return self._get_totals(
+            AccountBalanceSnapshot.company_id == company_id,
+            Transaction.company_id == company_id,
+            as_of_date,
+            inclusive,
+        )
+
+    def _get_totals(
+        self,
+        snapshot_filter,
+        entry_filter,
+        as_of_date: Optional[datetime],
+        inclusive: bool
+    ) -> Dict[str, Tuple[Decimal, Decimal]]:
+        """Latest snapshot before the day of as_of_date plus the same-day delta."""
+        if as_of_date is not None and not isinstance(as_of_date, datetime):
+            as_of_date = datetime.combine(as_of_date, time.max)
+
+        latest = self.db.query(
+            AccountBalanceSnapshot.account_id,
+            func.max(AccountBalanceSnapshot.snapshot_date).label('snapshot_date')
+        ).filter(snapshot_filter)
+
+        if as_of_date is not None:
+            latest = latest.filter(AccountBalanceSnapshot.snapshot_date < as_of_date.date())
+
+        latest = latest.group_by(AccountBalanceSnapshot.account_id).subquery()
+
+        rows = self.db.query(
+            AccountBalanceSnapshot.account_id,
+            AccountBalanceSnapshot.debit_total,
+            AccountBalanceSnapshot.credit_total
+        ).join(
+            latest,
+            and_(
+                AccountBalanceSnapshot.account_id == latest.c.account_id,
+                AccountBalanceSnapshot.snapshot_date == latest.c.snapshot_date
+            )
+        ).all()
+
+        totals = {
+            row.account_id: (Decimal(str(row.debit_total or 0)), Decimal(str(row.credit_total or 0)))
+            for row in rows
+        }
+
+        if as_of_date is None:
+            return totals
+
+        # Same-day delta: entries from start of day up to as_of_date
+        day_start = datetime.combine(as_of_date.date(), time.min)
+        query = self.db.query(
+            TransactionEntry.account_id,
+            func.coalesce(func.sum(TransactionEntry.debit_amount), 0).label('total_debit'),
+            func.coalesce(func.sum(TransactionEntry.credit_amount), 0).label('total_credit')
+        ).join(Transaction).filter(
+            entry_filter,
+            Transaction.status == TransactionStatus.POSTED,
+            Transaction.transaction_date >= day_start
+        )
+
+        if inclusive:
+            query = query.filter(Transaction.transaction_date <= as_of_date)
+        else:
+            query = query.filter(Transaction.transaction_date < as_of_date)
+
+        for row in query.group_by(TransactionEntry.account_id).all():
+            debit, credit = totals.get(row.account_id, ZERO_TOTALS)
+            totals[row.account_id] = (
+                debit + Decimal(str(row.total_debit or 0)),
+                credit + Decimal(str(row.total_credit or 0)),
+            )
+
+        return totals
+
+    # ============== Rebuild & Consistency ==============
+
+    def _recompute(self, company_id: str) -> Dict[str, List[Tuple[date, Decimal, Decimal]]]:
+        """Recompute cumulative daily totals per account from transaction entries."""
+        day = func.date(Transaction.transaction_date)
+
+        rows = self.db.query(
+            TransactionEntry.account_id,
+            day.label('day'),
+            func.coalesce(func.sum(TransactionEntry.debit_amount), 0).label('total_debit'),
+            func.coalesce(func.sum(TransactionEntry.credit_amount), 0).label('total_credit')
+        ).join(Transaction).filter(
+            Transaction.company_id == company_id,
+            Transaction.status == TransactionStatus.POSTED
+        ).group_by(TransactionEntry.account_id, day).order_by(
+            TransactionEntry.account_id, day
+        ).all()
+
+        series = {}
+        for row in rows:
+            debit = Decimal(str(row.total_debit or 0))
+            credit = Decimal(str(row.total_credit or 0))
+            if debit == 0 and credit == 0:
+                continue
+
+            points = series.setdefault(row.account_id, [])
+            prev_debit, prev_credit = (points[-1][1], points[-1][2]) if points else ZERO_TOTALS
+            points.append((_to_date(row.day), prev_debit + debit, prev_credit + credit))
+
+        return series
+
+    def _load_snapshots(self, company_id: str) -> Dict[str, List[Tuple[date, Decimal, Decimal]]]:
+        """Load stored snapshots per account, ordered by date."""
+        rows = self.db.query(
+            AccountBalanceSnapshot.account_id,
+            AccountBalanceSnapshot.snapshot_date,
+            AccountBalanceSnapshot.debit_total,
+            AccountBalanceSnapshot.credit_total
+        ).filter(
+            AccountBalanceSnapshot.company_id == company_id
+        ).order_by(
+            AccountBalanceSnapshot.account_id, AccountBalanceSnapshot.snapshot_date
+        ).all()
+
+        series = {}
+        for row in rows:
+            series.setdefault(row.account_id, []).append((
+                _to_date(row.snapshot_date),
+                Decimal(str(row.debit_total or 0)),
+                Decimal(str(row.credit_total or 0)),
+            ))
+        return series
+
+    def rebuild(self, company_id: str) -> int:
+        """Drop and recompute all snapshots for a company. Returns rows written."""
+        series = self._recompute(company_id)
+
+        self.db.query(AccountBalanceSnapshot).filter(
+            AccountBalanceSnapshot.company_id == company_id
+        ).delete(synchronize_session=False)
+
+        now = datetime.utcnow()
+        rows = [
+            {
+                "company_id": company_id,
+                "account_id": account_id,
+                "snapshot_date": day,
+                "debit_total": debit,
+                "credit_total": credit,
+                "updated_at": now,
+            }
+            for account_id, points in series.items()
+            for day, debit, credit in points
+        ]
+
+        if rows:
+            self.db.execute(insert(AccountBalanceSnapshot), rows)
+
+        self.db.commit()
+        return len(rows)
+
+    def check_consistency(self, company_id: str) -> Dict[str, Any]:
+        """Compare stored snapshots against a full recompute.
+
+        Both sides are treated as step functions over dates, so redundant
+        snapshot rows (e.g. left behind by a reversal) are not reported. For
+        each drifted account the first date where totals differ is reported.
+        """
+        expected = self._recompute(company_id)
+        stored = self._load_snapshots(company_id)
+
+        mismatches = []
+        for account_id in sorted(set(expected) | set(stored)):
+            exp_points = expected.get(account_id, [])
+            got_points = stored.get(account_id, [])
+
+            exp_by_day = {p[0]: p for p in exp_points}
+            got_by_day = {p[0]: p for p in got_points}
+
+            exp_current = got_current = ZERO_TOTALS
+            for day in sorted(set(exp_by_day) | set(got_by_day)):
+                if day in exp_by_day:
+                    exp_current = exp_by_day[day][1:]
+                if day in got_by_day:
+                    got_current = got_by_day[day][1:]
+
+                if exp_current != got_current:
+                    mismatches.append({
+                        "account_id": account_id,
+                        "date": day,
+                        "expected_debit": exp_current[0],
+                        "expected_credit": exp_current[1],
+                        "snapshot_debit": got_current[0],
+                        "snapshot_credit": got_current[1],
+                    })
+                    break
+
+        return {
+            "company_id": company_id,
+            "accounts_checked": len(set(expected) | set(stored)),
+            "snapshot_rows": sum(len(points) for points in stored.values()),
+            "mismatches": mismatches,
+            "is_consistent": not mismatches,
+        }
@@ -1,11 +1,16 @@
 """Bank import service for CSV parsing and transaction creation."""
+import codecs
 import csv
+import hashlib
 import io
 import re
-from datetime import datetime
+from datetime import datetime, timedelta
 from decimal import Decimal, InvalidOperation
-from typing import List, Optional, Tuple, Dict, Any, Union
+from itertools import chain, islice
+from typing import List, Optional, Tuple, Dict, Any, Union, BinaryIO, Callable, Iterable, Iterator, TextIO
+from sqlalchemy import func, insert, select, update
 from sqlalchemy.orm import Session
+from app.config import settings
 from app.database.models import (
     BankImport, BankImportRow, Company, BankAccount, Transaction,
     BankImportStatus, BankImportRowStatus, Account
@@ -14,6 +19,111 @@ from app.schemas.accounting import (
     TransactionCreate, TransactionEntryCreate, ReferenceType
 )
 from app.services.accounting_service import AccountingService
+from app.services.reconciliation_matcher import MatchCandidate, ReconciliationMatcher, to_cents, to_day
+
+
+# CSV content as decoded text, raw bytes or a binary file (e.g. UploadFile.file)
+CSVSource = Union[str, bytes, BinaryIO]
+
+
+def _latin1_fallback(error: UnicodeDecodeError) -> Tuple[str, int]:
+    """Decode bytes that are not valid UTF-8 as Latin-1 instead of dropping them."""
+    return error.object[error.start:error.end].decode('latin-1'), error.end
+
+
+codecs.register_error('latin1_fallback', _latin1_fallback)
+
+
+def open_csv_stream(source: CSVSource, sample_size: int = 64 * 1024) -> TextIO:
+    """Open CSV content as a text stream without reading it all into memory.
+    
+    The encoding of binary input is sniffed from the first sample_size bytes:
+    UTF-8 (with or without BOM), otherwise Latin-1. Invalid UTF-8 further
+    into a file sniffed as UTF-8 (e.g. a Latin-1 narration after the sample)
+    is decoded as Latin-1 rather than replaced.
+    """
+    if isinstance(source, str):
+        return io.StringIO(source[1:] if source.startswith('\ufeff') else source)
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    
+    sample = source.read(sample_size)
+    source.seek(0)
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return io.TextIOWrapper(source, encoding='utf-8-sig', errors='latin1_fallback', newline='')
+    except UnicodeDecodeError:
+        return io.TextIOWrapper(source, encoding='latin-1', newline='')
+
+
+def read_csv_rows(source: CSVSource) -> Tuple[List[str], Iterator[Dict[str, str]]]:
+    """Return the CSV headers and a lazy iterator over its rows (None keys dropped)."""
+    reader = csv.DictReader(open_csv_stream(source))
+    headers = [h for h in (reader.fieldnames or []) if h is not None]
+    rows = ({k: v for k, v in row.items() if k is not None} for row in reader)
+    return headers, rows
+
+
+def chunked(items: Iterable, size: int) -> Iterator[List]:
+    """Yield lists of up to size items."""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def statement_line_hash(
+    value_date: Optional[datetime],
+    amount: Decimal,
+    description: Optional[str],
+    reference: Optional[str],
+    balance: Optional[Decimal],
+) -> str:
+    """Content hash of a bank statement line, used to skip re-imported lines.
+    
+    amount is signed: credit minus debit.
+    """
+    parts = [
+        value_date.strftime('%Y-%m-%d') if value_date else '',
+        f"{Decimal(amount or 0):.2f}",
+        ' '.join((description or '').split()).upper(),
+        (reference or '').strip().upper(),
+        f"{Decimal(balance):.2f}" if balance is not None else '',
+    ]
+    return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+class DuplicateFilter:
+    """Skips statement lines that an earlier import already stored.
+    
+    Occurrences are counted rather than just checked for presence: a hash
+    stored n times skips only its first n occurrences in the file, so
+    genuinely identical lines within one statement are kept.
+    
+    count_existing(hashes) returns {hash: stored count} for the hashes that
+    exist, excluding rows written by the running import. Only those hashes
+    are remembered, so memory follows the overlap, not the file size.
+    """
+    
+    def __init__(self, count_existing: Callable[[List[str]], Dict[str, int]]):
+        self.count_existing = count_existing
+        self._remaining: Dict[str, int] = {}
+    
+    def new_flags(self, hashes: List[str]) -> List[bool]:
+        """For each hash in order, True if the line should be imported."""
+        unknown = list({h for h in hashes if h not in self._remaining})
+        if unknown:
+            self._remaining.update(self.count_existing(unknown))
+        
+        flags = []
+        for h in hashes:
+            left = self._remaining.get(h, 0)
+            if left:
+                self._remaining[h] = left - 1
+            flags.append(not left)
+        return flags
 
 
 class BankCSVParser:
@@ -361,22 +471,13 @@ class BankImportService:
             GenericParser(),  # Fallback
         ]
     
-    def preview_csv(self, content: str) -> Dict[str, Any]:
+    def preview_csv(self, content: CSVSource) -> Dict[str, Any]:
         """Preview CSV content and return headers and sample rows for mapping."""
         try:
-            # Handle BOM
-            if content.startswith('\ufeff'):
-                content = content[1:]
-            
-            reader = csv.DictReader(io.StringIO(content))
-            headers = [h for h in (reader.fieldnames or []) if h is not None]
+            headers, rows = read_csv_rows(content)
             
             # Get sample rows
-            sample_rows = []
-            for i, row in enumerate(reader):
-                if i >= 5:
-                    break
-                sample_rows.append({k: v for k, v in row.items() if k is not None})
+            sample_rows = list(islice(rows, 5))
             
             # Try auto-detect
             detected_bank = None
@@ -389,40 +490,37 @@ class BankImportService:
                 'headers': headers,
                 'sample_rows': sample_rows,
                 'detected_bank': detected_bank,
-                'row_count': sum(1 for _ in csv.DictReader(io.StringIO(content))),
+                'row_count': len(sample_rows) + sum(1 for _ in rows),
             }
         except Exception as e:
             raise ValueError(f"Failed to parse CSV: {str(e)}")
     
-    def detect_bank_format(self, content: str) -> Tuple[BankCSVParser, List[str], List[Dict[str, str]]]:
+    def detect_parser(
+        self,
+        headers: List[str],
+        rows: Iterator[Dict[str, str]]
+    ) -> Tuple[BankCSVParser, Iterator[Dict[str, str]]]:
+        """Detect bank format from the headers and first rows.
+        
+        Returns the parser and an iterator that still yields every row.
+        """
+        peeked = list(islice(rows, 5))
+        sample_rows = [list(row.values()) for row in peeked]
+        rows = chain(peeked, rows)
+        
+        for parser in self.parsers:
+            if parser.can_parse(headers, sample_rows):
+                return parser, rows
+        
+        # Fallback to generic
+        return self.parsers[-1], rows
+    
+    def detect_bank_format(self, content: CSVSource) -> Tuple[BankCSVParser, List[str], List[Dict[str, str]]]:
         """Detect bank format from CSV content."""
-        # Try to parse CSV
         try:
-            # Handle BOM
-            if content.startswith('\ufeff'):
-                content = content[1:]
-            
-            reader = csv.DictReader(io.StringIO(content))
-            headers = [h for h in (reader.fieldnames or []) if h is not None]
-            
-            # Get sample rows
-            sample_rows = []
-            rows_list = []
-            for i, row in enumerate(reader):
-                # Filter out None keys
-                clean_row = {k: v for k, v in row.items() if k is not None}
-                rows_list.append(clean_row)
-                if i < 5:
-                    sample_rows.append(list(clean_row.values()))
-            
-            # Find matching parser
-            for parser in self.parsers:
-                if parser.can_parse(headers, sample_rows):
-                    return parser, headers, rows_list
-            
-            # Fallback to generic
-            return self.parsers[-1], headers, rows_list
-            
+            headers, rows = read_csv_rows(content)
+            parser, rows = self.detect_parser(headers, rows)
+            return parser, headers, list(rows)
         except Exception as e:
             raise ValueError(f"Failed to parse CSV: {str(e)}")
     
@@ -430,14 +528,24 @@ class BankImportService:
         self,
         company: Company,
         file_name: str,
-        content: str,
+        content: CSVSource,
         bank_account_id: Optional[str] = None,
         bank_name: Optional[str] = None,
-        column_mapping: Optional[Dict[str, str]] = None
+        column_mapping: Optional[Dict[str, str]] = None,
+        chunk_size: Optional[int] = None
     ) -> BankImport:
         """Create a bank import from CSV content.
         
+        The CSV is read and parsed row by row and written chunk_size rows at a
+        time (BANK_IMPORT_CHUNK_SIZE by default). Each chunk is committed, so
+        total_rows and processed_rows show progress while a large file is
+        still importing. Lines already imported for the same bank account are
+        skipped and counted in duplicate_rows. If the import fails, the import
+        is marked FAILED and the committed chunks stay; importing the file
+        again skips them as duplicates.
+        
         Args:
+            content: CSV text, bytes or a binary file object
             column_mapping: Optional custom mapping like {
                 'date': 'Date Column',
                 'description': 'Narration',
@@ -447,61 +555,91 @@ class BankImportService:
                 'balance': 'Balance'
             }
         """
-        # Handle BOM
-        if content.startswith('\ufeff'):
-            content = content[1:]
-        
-        # Use custom mapping or auto-detect
-        if column_mapping:
-            parser = CustomMappingParser(column_mapping)
-            reader = csv.DictReader(io.StringIO(content))
-            headers = [h for h in (reader.fieldnames or []) if h is not None]
-            rows = [{k: v for k, v in row.items() if k is not None} for row in reader]
-            detected_bank = bank_name or "Custom"
-        else:
-            parser, headers, rows = self.detect_bank_format(content)
-            detected_bank = bank_name or parser.bank_name
+        try:
+            headers, rows = read_csv_rows(content)
+            
+            # Use custom mapping or auto-detect
+            if column_mapping:
+                parser = CustomMappingParser(column_mapping)
+                detected_bank = bank_name or "Custom"
+            else:
+                parser, rows = self.detect_parser(headers, rows)
+                detected_bank = bank_name or parser.bank_name
+        except Exception as e:
+            raise ValueError(f"Failed to parse CSV: {str(e)}")
         
-        # Create import record
+        # Create import record up front so progress is visible
         bank_import = BankImport(
             company_id=company.id,
             bank_account_id=bank_account_id,
             file_name=file_name,
             bank_name=detected_bank,
             status=BankImportStatus.PROCESSING,
-            total_rows=len(rows),
+            total_rows=0,
+            processed_rows=0,
+            duplicate_rows=0,
         )
-        
         self.db.add(bank_import)
-        self.db.flush()
+        self.db.commit()
+        import_id = bank_import.id
         
-        # Parse and create rows
-        processed = 0
-        for i, row in enumerate(rows, 1):
-            try:
-                parsed = parser.parse_row(row, i)
+        duplicates = DuplicateFilter(
+            lambda hashes: self._count_imported_rows(company.id, bank_account_id, import_id, hashes)
+        )
+        total = processed = skipped = 0
+        
+        try:
+            for chunk in chunked(enumerate(rows, 1), chunk_size or settings.BANK_IMPORT_CHUNK_SIZE):
+                values = []
+                for i, row in chunk:
+                    try:
+                        parsed = parser.parse_row(row, i)
+                    except Exception:
+                        # Skip rows that fail to parse
+                        continue
+                    
+                    if parsed and (parsed['debit_amount'] > 0 or parsed['credit_amount'] > 0):
+                        values.append({
+                            'import_id': import_id,
+                            'row_number': parsed['row_number'],
+                            'transaction_date': parsed['transaction_date'],
+                            'value_date': parsed['value_date'],
+                            'description': parsed['description'],
+                            'reference_number': parsed['reference_number'],
+                            'debit_amount': parsed['debit_amount'],
+                            'credit_amount': parsed['credit_amount'],
+                            'balance': parsed['balance'],
+                            'status': BankImportRowStatus.PENDING,
+                            'raw_data': parsed['raw_data'],
+                            'content_hash': statement_line_hash(
+                                parsed['value_date'] or parsed['transaction_date'],
+                                parsed['credit_amount'] - parsed['debit_amount'],
+                                parsed['description'],
+                                parsed['reference_number'],
+                                parsed['balance'],
+                            ),
+                        })
                 
-                if parsed and (parsed['debit_amount'] > 0 or parsed['credit_amount'] > 0):
-                    import_row = BankImportRow(
-                        import_id=bank_import.id,
-                        row_number=parsed['row_number'],
-                        transaction_date=parsed['transaction_date'],
-                        value_date=parsed['value_date'],
-                        description=parsed['description'],
-                        reference_number=parsed['reference_number'],
-                        debit_amount=parsed['debit_amount'],
-                        credit_amount=parsed['credit_amount'],
-                        balance=parsed['balance'],
-                        status=BankImportRowStatus.PENDING,
-                        raw_data=parsed['raw_data'],
-                    )
-                    self.db.add(import_row)
-                    processed += 1
-            except Exception as e:
-                # Skip rows that fail to parse
-                continue
+                flags = duplicates.new_flags([v['content_hash'] for v in values])
+                new_rows = [v for v, is_new in zip(values, flags) if is_new]
+                if new_rows:
+                    self.db.execute(insert(BankImportRow), new_rows)
+                
+                total += len(chunk)
+                processed += len(new_rows)
+                skipped += len(values) - len(new_rows)
+                bank_import.total_rows = total
+                bank_import.processed_rows = processed
+                bank_import.duplicate_rows = skipped
+                self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            bank_import.status = BankImportStatus.FAILED
+            bank_import.error_message = str(e)
+            bank_import.completed_at = datetime.utcnow()
+            self.db.commit()
+            raise ValueError(f"Failed to import CSV after {total} rows: {str(e)}")
         
-        bank_import.processed_rows = processed
         bank_import.status = BankImportStatus.COMPLETED
         bank_import.completed_at = datetime.utcnow()
         
@@ -509,6 +647,31 @@ class BankImportService:
         self.db.refresh(bank_import)
         return bank_import
     
+    def _count_imported_rows(
+        self,
+        company_id: str,
+        bank_account_id: Optional[str],
+        import_id: str,
+        hashes: List[str]
+    ) -> Dict[str, int]:
+        """Stored row counts per content hash for the bank account, other imports only."""
+        account_filter = (
+            BankImport.bank_account_id == bank_account_id if bank_account_id
+            else BankImport.bank_account_id.is_(None)
+        )
+        result = self.db.execute(
+            select(BankImportRow.content_hash, func.count())
+            .join(BankImport, BankImport.id == BankImportRow.import_id)
+            .where(
+                BankImport.company_id == company_id,
+                account_filter,
+                BankImportRow.import_id != import_id,
+                BankImportRow.content_hash.in_(hashes),
+            )
+            .group_by(BankImportRow.content_hash)
+        )
+        return {content_hash: count for content_hash, count in result}
+    
     def get_import(self, import_id: str, company: Company) -> Optional[BankImport]:
         """Get a bank import by ID."""
         return self.db.query(BankImport).filter(
@@ -539,29 +702,97 @@ class BankImportService:
         
         return query.order_by(BankImportRow.row_number).all()
     
-    def match_transactions(self, bank_import: BankImport) -> int:
-        """Try to match import rows with existing transactions."""
-        matched = 0
-        rows = self.get_import_rows(bank_import, BankImportRowStatus.PENDING)
-        
-        for row in rows:
-            # Try to find matching transaction by date and amount
-            # This is a simple matching - could be enhanced
-            if row.transaction_date:
-                existing = self.db.query(Transaction).filter(
-                    Transaction.company_id == bank_import.company_id,
-                    Transaction.transaction_date == row.transaction_date,
-                    Transaction.total_debit == (row.credit_amount or row.debit_amount)
-                ).first()
-                
-                if existing:
-                    row.transaction_id = existing.id
-                    row.status = BankImportRowStatus.MATCHED
-                    matched += 1
-        
+    def match_transactions(self, bank_import: BankImport, tolerance_days: int = 0) -> Dict[str, int]:
+        """Match pending import rows with existing transactions by date and amount.
+        
+        A row matches a transaction whose total_debit equals the row amount
+        (credit or debit) and whose date is within tolerance_days. All
+        candidate transactions for the import's date span are loaded in one
+        query and indexed by amount and date; each transaction is assigned to
+        at most one row, including rows of earlier imports. The closest date
+        wins, then the earliest transaction. A match is counted as ambiguous
+        when another transaction was equally close.
+        
+        Dates are compared by calendar day, not by exact datetime: a row
+        stamped at midnight matches a transaction posted later that day.
+        Before this, a row only matched a transaction with an identical
+        transaction_date.
+        
+        Returns:
+            {"matched": int, "ambiguous": int, "unmatched": int}. This used
+            to be the bare number of matched rows; read result["matched"]
+            for the old value.
+        """
+        rows = self.db.execute(
+            select(
+                BankImportRow.id,
+                BankImportRow.transaction_date,
+                BankImportRow.credit_amount,
+                BankImportRow.debit_amount,
+            )
+            .where(
+                BankImportRow.import_id == bank_import.id,
+                BankImportRow.status == BankImportRowStatus.PENDING,
+            )
+            .order_by(BankImportRow.row_number)
+        ).all()
+        
+        dated = [row for row in rows if row.transaction_date]
+        if not dated:
+            return {"matched": 0, "ambiguous": 0, "unmatched": len(rows)}
+        
+        start = min(row.transaction_date for row in dated).date() - timedelta(days=tolerance_days)
+        end = max(row.transaction_date for row in dated).date() + timedelta(days=tolerance_days + 1)
+        
+        # Transactions already linked to an import row can't be claimed again
+        claimed = (
+            select(BankImportRow.transaction_id)
+            .join(BankImport, BankImport.id == BankImportRow.import_id)
+            .where(
+                BankImport.company_id == bank_import.company_id,
+                BankImportRow.transaction_id.isnot(None),
+            )
+        )
+        transactions = self.db.execute(
+            select(Transaction.id, Transaction.transaction_date, Transaction.total_debit)
+            .where(
+                Transaction.company_id == bank_import.company_id,
+                Transaction.transaction_date >= datetime.combine(start, datetime.min.time()),
+                Transaction.transaction_date < datetime.combine(end, datetime.min.time()),
+                Transaction.id.notin_(claimed),
+            )
+            .order_by(Transaction.transaction_date, Transaction.id)
+        ).all()
+        
+        matcher = ReconciliationMatcher(
+            [MatchCandidate(id=t.id, amount_cents=to_cents(t.total_debit), day=to_day(t.transaction_date))
+             for t in transactions],
+            tolerance_days=tolerance_days,
+            tolerance_amount=Decimal("0"),
+        )
+        results = matcher.match([
+            MatchCandidate(
+                id=row.id,
+                amount_cents=to_cents(row.credit_amount or row.debit_amount),
+                day=to_day(row.transaction_date),
+            )
+            for row in dated
+        ])
+        
+        if results:
+            self.db.execute(update(BankImportRow), [
+                {"id": r.book_id, "transaction_id": r.bank_id, "status": BankImportRowStatus.MATCHED}
+                for r in results
+            ])
+        
+        matched = len(results)
         bank_import.matched_rows = matched
         self.db.commit()
-        return matched
+        return {
+            "matched": matched,
+            "ambiguous": sum(1 for r in results if r.ties),
+            "unmatched": len(rows) - matched,
+        }
     
     def process_rows(
         self,
@@ -17,11 +17,14 @@ from decimal import Decimal, ROUND_HALF_UP
 from typing import Optional, List, Dict
 from datetime import datetime, date, timedelta
 from calendar import monthrange
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_, extract
+from sqlalchemy.orm import Session, contains_eager
+from sqlalchemy import func, and_, or_, extract, update
 
 from app.database.models import (
-    TransactionEntry, Transaction, BankAccount, Account, generate_uuid
+    TransactionEntry, Transaction, BankAccount, Account, TransactionStatus, generate_uuid
+)
+from app.services.reconciliation_matcher import (
+    ReconciliationMatcher, MatchCandidate, to_cents, to_day, reference_tokens, narration_tokens
 )
 
 
@@ -302,14 +305,20 @@ class BankReconciliationService:
         bank_account_id: str,
         tolerance_days: int = 3,
         tolerance_amount: Decimal = Decimal('0.01'),
+        match_references: bool = False,
+        match_narration: bool = False,
+        narration_threshold: float = 0.5,
     ) -> Dict:
         """
         Auto-match book entries with bank statement entries.
         
         Matching logic (in order of priority):
-        1. Exact amount + date within tolerance
-        2. Exact amount + partial description match
+        1. Exact amount + date within tolerance (closest date wins)
+        2. Optional: exact amount + shared reference (UTR / cheque number)
+        3. Optional: exact amount + similar narration
         
+        Bank entries are indexed by amount, so the cost grows with the number
+        of entries rather than their product (see ReconciliationMatcher).
         Returns detailed results including unmatched entries on both sides.
         """
         from app.database.bank_statement_models import BankStatementEntry, BankStatementEntryStatus
@@ -323,89 +332,89 @@ class BankReconciliationService:
                 "error": "Bank account not found"
             }
         
-        # Get unreconciled book entries
-        book_entries = self.db.query(TransactionEntry).join(Transaction).filter(
+        # Get unreconciled book entries with their transactions in one query
+        book_entries = self.db.query(TransactionEntry).join(Transaction).options(
+            contains_eager(TransactionEntry.transaction)
+        ).filter(
             TransactionEntry.account_id == account.id,
-            Transaction.status == 'POSTED',
+            Transaction.status == TransactionStatus.POSTED,
             TransactionEntry.is_reconciled == False,
-        ).all()
+        ).order_by(Transaction.transaction_date, TransactionEntry.id).all()
         
         # Get pending bank entries
         bank_entries = self.db.query(BankStatementEntry).filter(
             BankStatementEntry.company_id == company_id,
             BankStatementEntry.bank_account_id == bank_account_id,
             BankStatementEntry.status == BankStatementEntryStatus.PENDING,
-        ).all()
+        ).order_by(BankStatementEntry.value_date, BankStatementEntry.id).all()
+        
+        book_candidates = [
+            MatchCandidate(
+                id=b.id,
+                amount_cents=to_cents(b.debit_amount) - to_cents(b.credit_amount),
+                day=to_day(b.transaction.transaction_date),
+                references=reference_tokens(b.bank_reference, b.description, b.transaction.description) if match_references else set(),
+                words=narration_tokens(b.description, b.transaction.description) if match_narration else set(),
+            )
+            for b in book_entries
+        ]
+        bank_candidates = [
+            MatchCandidate(
+                id=b.id,
+                amount_cents=to_cents(b.amount),
+                day=to_day(b.value_date),
+                references=reference_tokens(b.bank_reference) if match_references else set(),
+                words=narration_tokens(b.description) if match_narration else set(),
+            )
+            for b in bank_entries
+        ]
         
-        matched = 0
-        matched_bank_ids = set()
+        matcher = ReconciliationMatcher(bank_candidates, tolerance_days, tolerance_amount)
+        results = matcher.match(
+            book_candidates,
+            match_references=match_references,
+            match_narration=match_narration,
+            narration_threshold=narration_threshold,
+        )
+        
+        books_by_id = {b.id: b for b in book_entries}
+        banks_by_id = {b.id: b for b in bank_entries}
         matched_book_ids = set()
+        matched_bank_ids = set()
         match_details = []
+        book_updates = []
+        bank_updates = []
+        now = datetime.utcnow()
         
-        # First pass: Exact amount + date within tolerance
-        for book in book_entries:
-            if book.id in matched_book_ids:
-                continue
-                
-            book_amount = Decimal(str(book.debit_amount or 0)) - Decimal(str(book.credit_amount or 0))
-            book_date = book.transaction.transaction_date
-            
-            if not book_date:
-                continue
-            
-            if isinstance(book_date, datetime):
-                book_date = book_date.date()
+        for result in results:
+            book = books_by_id[result.book_id]
+            bank = banks_by_id[result.bank_id]
             
-            best_match = None
-            best_date_diff = None
+            book_updates.append({
+                "id": book.id,
+                "bank_date": bank.value_date,
+                "is_reconciled": True,
+                "reconciliation_date": now,
+                "bank_reference": bank.bank_reference,
+            })
+            bank_updates.append({
+                "id": bank.id,
+                "status": BankStatementEntryStatus.MATCHED,
+                "matched_entry_id": book.id,
+                "matched_at": now,
+            })
             
-            for bank in bank_entries:
-                if bank.id in matched_bank_ids:
-                    continue
-                
-                # Check amount match (must be exact or within tiny tolerance)
-                amount_diff = abs(book_amount - Decimal(str(bank.amount)))
-                if amount_diff > tolerance_amount:
-                    continue
-                
-                # Check date match
-                bank_date = bank.value_date
-                if bank_date:
-                    if isinstance(bank_date, datetime):
-                        bank_date = bank_date.date()
-                    
-                    date_diff = abs((book_date - bank_date).days)
-                    if date_diff > tolerance_days:
-                        continue
-                    
-                    # Keep best match (closest date)
-                    if best_match is None or date_diff < best_date_diff:
-                        best_match = bank
-                        best_date_diff = date_diff
+            matched_book_ids.add(book.id)
+            matched_bank_ids.add(bank.id)
             
-            if best_match:
-                # Match found!
-                book.bank_date = best_match.value_date
-                book.is_reconciled = True
-                book.reconciliation_date = datetime.utcnow()
-                book.bank_reference = best_match.bank_reference
-                
-                best_match.status = BankStatementEntryStatus.MATCHED
-                best_match.matched_entry_id = book.id
-                best_match.matched_at = datetime.utcnow()
-                
-                matched_bank_ids.add(best_match.id)
-                matched_book_ids.add(book.id)
-                matched += 1
-                
-                match_details.append({
-                    "book_entry_id": book.id,
-                    "bank_entry_id": best_match.id,
-                    "amount": float(book_amount),
-                    "date_diff_days": best_date_diff,
-                })
-        
-        self.db.commit()
+            match_details.append({
+                "book_entry_id": book.id,
+                "bank_entry_id": bank.id,
+                "amount": float(Decimal(str(book.debit_amount or 0)) - Decimal(str(book.credit_amount or 0))),
+                "date_diff_days": result.date_diff_days,
+                "rule": result.rule,
+                "score": result.score,
+            })
         
         # Build unmatched lists
         bank_unmatched = [
@@ -425,13 +434,19 @@ class BankReconciliationService:
                 "transaction_id": b.transaction_id,
                 "date": b.transaction.transaction_date.isoformat() if b.transaction.transaction_date else None,
                 "amount": float(Decimal(str(b.debit_amount or 0)) - Decimal(str(b.credit_amount or 0))),
-                "description": b.description or b.transaction.narration or "",
+                "description": b.description or b.transaction.description or "",
             }
             for b in book_entries if b.id not in matched_book_ids
         ]
         
+        # Write all matches back with one executemany per table
+        if book_updates:
+            self.db.execute(update(TransactionEntry), book_updates)
+            self.db.execute(update(BankStatementEntry), bank_updates)
+        self.db.commit()
+        
         return {
-            "matched": matched,
+            "matched": len(results),
             "match_details": match_details,
             "bank_unmatched": bank_unmatched,
             "bank_unmatched_count": len(bank_unmatched),
@@ -7,23 +7,24 @@ This service handles:
 3. Creating transactions for unmatched entries when categorized
 4. Marking entries as bank charges/interest
 """
-import csv
-import io
 from decimal import Decimal
 from datetime import datetime, date, timedelta
+from itertools import islice
 from typing import List, Optional, Dict, Any, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_, or_, insert, select
 
+from app.config import settings
 from app.database.models import (
     Company, BankAccount, Account, Transaction, TransactionEntry,
-    TransactionStatus, generate_uuid
+    TransactionStatus, BankImport, BankImportStatus, generate_uuid
 )
 from app.database.bank_statement_models import (
     BankStatementEntry, BankStatementEntryStatus
 )
 from app.services.bank_import_service import (
-    HDFCParser, ICICIParser, SBIParser, AxisParser, GenericParser, CustomMappingParser
+    HDFCParser, ICICIParser, SBIParser, AxisParser, GenericParser, CustomMappingParser,
+    CSVSource, DuplicateFilter, chunked, read_csv_rows, statement_line_hash
 )
 
 
@@ -54,19 +55,11 @@ class BankStatementImportService:
             Account.bank_account_id == bank_account_id,
         ).first()
     
-    def preview_csv(self, content: str) -> Dict[str, Any]:
+    def preview_csv(self, content: CSVSource) -> Dict[str, Any]:
         """Preview CSV content and return headers and sample rows."""
-        if content.startswith('\ufeff'):
-            content = content[1:]
+        headers, rows = read_csv_rows(content)
         
-        reader = csv.DictReader(io.StringIO(content))
-        headers = [h for h in (reader.fieldnames or []) if h is not None]
-        
-        sample_rows = []
-        for i, row in enumerate(reader):
-            if i >= 5:
-                break
-            sample_rows.append({k: v for k, v in row.items() if k is not None})
+        sample_rows = list(islice(rows, 5))
         
         # Detect bank format
         detected_bank = None
@@ -76,8 +69,7 @@ class BankStatementImportService:
                 break
         
         # Count total rows
-        reader = csv.DictReader(io.StringIO(content))
-        row_count = sum(1 for _ in reader)
+        row_count = len(sample_rows) + sum(1 for _ in rows)
         
         return {
             'headers': headers,
@@ -90,27 +82,34 @@ class BankStatementImportService:
         self,
         company_id: str,
         bank_account_id: str,
-        content: str,
+        content: CSVSource,
         file_name: str = "import",
         bank_name: Optional[str] = None,
         column_mapping: Optional[Dict[str, str]] = None,
         auto_match: bool = True,
+        chunk_size: Optional[int] = None,
     ) -> Dict[str, Any]:
         """
         Import bank statement to BankStatementEntry table.
         
         This is the main entry point - imports bank data and optionally auto-matches.
         
+        content may be CSV text, bytes or a binary file object. It is parsed
+        lazily and inserted chunk_size rows at a time (BANK_IMPORT_CHUNK_SIZE
+        by default), committing each chunk. Progress is recorded on a
+        BankImport row linked to the entries. Lines already imported for the
+        bank account are found by content hash and skipped.
+        
         Returns:
             {
+                "import_id": str,
                 "imported": int,
                 "duplicates_skipped": int,
                 "auto_matched": int,
                 "pending": int,
             }
         """
-        if content.startswith('\ufeff'):
-            content = content[1:]
+        headers, rows = read_csv_rows(content)
         
         # Select parser
         if column_mapping:
@@ -124,9 +123,6 @@ class BankStatementImportService:
             })
             detected_bank = bank_name or "Custom"
         else:
-            reader = csv.DictReader(io.StringIO(content))
-            headers = [h for h in (reader.fieldnames or []) if h is not None]
-            
             # Detect bank format
             parser = self.parsers[-1]  # Default to generic
             detected_bank = "Generic"
@@ -136,66 +132,96 @@ class BankStatementImportService:
                     detected_bank = p.bank_name
                     break
         
-        # Parse CSV
-        reader = csv.DictReader(io.StringIO(content))
-        rows = [{k: v for k, v in row.items() if k is not None} for row in reader]
+        bank_import = BankImport(
+            company_id=company_id,
+            bank_account_id=bank_account_id,
+            file_name=file_name,
+            bank_name=detected_bank,
+            status=BankImportStatus.PROCESSING,
+            total_rows=0,
+            processed_rows=0,
+            duplicate_rows=0,
+        )
+        self.db.add(bank_import)
+        self.db.commit()
+        import_id = bank_import.id
         
+        duplicates = DuplicateFilter(
+            lambda hashes: self._count_statement_entries(company_id, bank_account_id, import_id, hashes)
+        )
+        total = 0
         imported = 0
-        duplicates = 0
-        
-        for i, row in enumerate(rows, 1):
-            try:
-                parsed = parser.parse_row(row, i)
-                
-                if not parsed:
-                    continue
-                
-                # Skip rows with no amount
-                debit = parsed.get('debit_amount', Decimal('0')) or Decimal('0')
-                credit = parsed.get('credit_amount', Decimal('0')) or Decimal('0')
-                
-                if debit == 0 and credit == 0:
-                    continue
-                
-                # Calculate net amount (positive = money in, negative = money out)
-                amount = credit - debit
-                
-                value_date = parsed.get('value_date') or parsed.get('transaction_date')
-                if not value_date:
-                    continue
-                
-                # Check for duplicate
-                existing = self.db.query(BankStatementEntry).filter(
-                    BankStatementEntry.company_id == company_id,
-                    BankStatementEntry.bank_account_id == bank_account_id,
-                    BankStatementEntry.value_date == value_date,
-                    BankStatementEntry.amount == amount,
-                    BankStatementEntry.description == parsed.get('description', ''),
-                ).first()
-                
-                if existing:
-                    duplicates += 1
-                    continue
+        duplicate_count = 0
+        
+        try:
+            for chunk in chunked(enumerate(rows, 1), chunk_size or settings.BANK_IMPORT_CHUNK_SIZE):
+                values = []
+                for i, row in chunk:
+                    try:
+                        parsed = parser.parse_row(row, i)
+                    except Exception:
+                        continue
+                    
+                    if not parsed:
+                        continue
+                    
+                    # Skip rows with no amount
+                    debit = parsed.get('debit_amount', Decimal('0')) or Decimal('0')
+                    credit = parsed.get('credit_amount', Decimal('0')) or Decimal('0')
+                    
+                    if debit == 0 and credit == 0:
+                        continue
+                    
+                    # Calculate net amount (positive = money in, negative = money out)
+                    amount = credit - debit
+                    
+                    value_date = parsed.get('value_date') or parsed.get('transaction_date')
+                    if not value_date:
+                        continue
+                    
+                    values.append({
+                        'id': generate_uuid(),
+                        'company_id': company_id,
+                        'bank_account_id': bank_account_id,
+                        'import_id': import_id,
+                        'value_date': value_date,
+                        'transaction_date': parsed.get('transaction_date'),
+                        'amount': amount,
+                        'bank_reference': parsed.get('reference_number'),
+                        'description': parsed.get('description', ''),
+                        'balance': parsed.get('balance'),
+                        'status': BankStatementEntryStatus.PENDING,
+                        'content_hash': statement_line_hash(
+                            value_date,
+                            amount,
+                            parsed.get('description', ''),
+                            parsed.get('reference_number'),
+                            parsed.get('balance'),
+                        ),
+                    })
                 
-                # Create BankStatementEntry
-                entry = BankStatementEntry(
-                    id=generate_uuid(),
-                    company_id=company_id,
-                    bank_account_id=bank_account_id,
-                    value_date=value_date,
-                    transaction_date=parsed.get('transaction_date'),
-                    amount=amount,
-                    bank_reference=parsed.get('reference_number'),
-                    description=parsed.get('description', ''),
-                    balance=parsed.get('balance'),
-                    status=BankStatementEntryStatus.PENDING,
-                )
-                self.db.add(entry)
-                imported += 1
+                flags = duplicates.new_flags([v['content_hash'] for v in values])
+                new_entries = [v for v, is_new in zip(values, flags) if is_new]
+                if new_entries:
+                    self.db.execute(insert(BankStatementEntry), new_entries)
                 
-            except Exception as e:
-                continue
-        
+                total += len(chunk)
+                imported += len(new_entries)
+                duplicate_count += len(values) - len(new_entries)
+                bank_import.total_rows = total
+                bank_import.processed_rows = imported
+                bank_import.duplicate_rows = duplicate_count
+                self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            bank_import.status = BankImportStatus.FAILED
+            bank_import.error_message = str(e)
+            bank_import.completed_at = datetime.utcnow()
+            self.db.commit()
+            raise ValueError(f"Failed to import statement after {total} rows: {str(e)}")
+        
+        bank_import.status = BankImportStatus.COMPLETED
+        bank_import.completed_at = datetime.utcnow()
         self.db.commit()
         
         # Auto-match if requested
@@ -212,13 +238,37 @@ class BankStatementImportService:
         ).count()
         
         return {
+            "import_id": import_id,
             "imported": imported,
-            "duplicates_skipped": duplicates,
+            "duplicates_skipped": duplicate_count,
             "auto_matched": matched,
             "pending": pending,
             "bank_detected": detected_bank,
         }
     
+    def _count_statement_entries(
+        self,
+        company_id: str,
+        bank_account_id: str,
+        import_id: str,
+        hashes: List[str],
+    ) -> Dict[str, int]:
+        """Stored entry counts per content hash for the bank account, other imports only."""
+        result = self.db.execute(
+            select(BankStatementEntry.content_hash, func.count())
+            .where(
+                BankStatementEntry.company_id == company_id,
+                BankStatementEntry.bank_account_id == bank_account_id,
+                or_(
+                    BankStatementEntry.import_id.is_(None),
+                    BankStatementEntry.import_id != import_id,
+                ),
+                BankStatementEntry.content_hash.in_(hashes),
+            )
+            .group_by(BankStatementEntry.content_hash)
+        )
+        return {content_hash: count for content_hash, count in result}
+    
     def auto_match_entries(
         self,
         company_id: str,
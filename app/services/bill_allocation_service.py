@@ -17,6 +17,7 @@ from app.database.models import (
     BillAllocation, BillAllocationType, Invoice, PurchaseInvoice,
     Transaction, Customer, generate_uuid
 )
+from app.services.aging_engine import AgingEngine
 
 
 class BillAllocationService:
@@ -272,52 +273,36 @@ class BillAllocationService:
         if not as_of_date:
             as_of_date = datetime.utcnow()
         
-        buckets = {
-            '0-30': Decimal('0'),
-            '31-60': Decimal('0'),
-            '61-90': Decimal('0'),
-            '91-180': Decimal('0'),
-            '180+': Decimal('0'),
-        }
+        labels = ['0-30', '31-60', '61-90', '91-180', '180+']
+        limits = [30, 60, 90, 180, None]  # Not yet due falls in 0-30
+        party_key = 'vendor_id' if invoice_type == 'purchase' else 'customer_id'
         
-        invoices = self.get_outstanding_invoices(
-            company_id, party_id, invoice_type, as_of_date
+        engine = AgingEngine(self.db)
+        summary = engine.summarize(
+            engine.get_party_rollup(company_id, invoice_type, as_of_date, limits, party_id), limits
         )
         
-        details = []
-        
-        for inv in invoices:
-            due_date = datetime.fromisoformat(inv['due_date']) if inv['due_date'] else datetime.fromisoformat(inv['invoice_date'])
-            days_overdue = (as_of_date - due_date).days
-            outstanding = Decimal(str(inv['outstanding_amount']))
-            
-            if days_overdue <= 0:
-                bucket = '0-30'  # Not yet due
-            elif days_overdue <= 30:
-                bucket = '0-30'
-            elif days_overdue <= 60:
-                bucket = '31-60'
-            elif days_overdue <= 90:
-                bucket = '61-90'
-            elif days_overdue <= 180:
-                bucket = '91-180'
-            else:
-                bucket = '180+'
-            
-            buckets[bucket] += outstanding
-            
-            details.append({
-                **inv,
-                'days_overdue': days_overdue,
-                'bucket': bucket,
-            })
+        details = [
+            {
+                'id': inv['invoice_id'],
+                'invoice_number': inv['invoice_number'],
+                'invoice_date': inv['invoice_date'].isoformat() if inv['invoice_date'] else None,
+                'due_date': inv['due_date'].isoformat() if inv['due_date'] else None,
+                'total_amount': float(inv['total_amount']),
+                'outstanding_amount': float(inv['outstanding']),
+                party_key: inv['party_id'],
+                'days_overdue': inv['days_overdue'],
+                'bucket': labels[inv['bucket']],
+            }
+            for inv in engine.get_details(company_id, invoice_type, as_of_date, limits, party_id)
+        ]
         
         return {
             'as_of_date': as_of_date.isoformat(),
             'invoice_type': invoice_type,
-            'summary': {k: float(v) for k, v in buckets.items()},
-            'total_outstanding': sum(float(v) for v in buckets.values()),
-            'invoice_count': len(invoices),
+            'summary': {label: float(amount) for label, amount in zip(labels, summary['buckets'])},
+            'total_outstanding': float(summary['total']),
+            'invoice_count': summary['invoice_count'],
             'details': details,
         }
     
@@ -17,6 +17,7 @@ from app.database.models import (
     Invoice, PurchaseInvoice, RecurringTransaction, PostDatedCheque,
     Account, AccountType, Transaction, TransactionEntry, TransactionStatus
 )
+from app.services.balance_snapshot_service import BalanceSnapshotService
 
 
 class CashFlowForecastService:
@@ -45,17 +46,22 @@ class CashFlowForecastService:
         
         account_ids = [a.id for a in cash_bank_accounts]
         
-        # Calculate balance from transaction entries
-        result = self.db.query(
-            func.coalesce(func.sum(TransactionEntry.debit_amount), 0).label('total_debit'),
-            func.coalesce(func.sum(TransactionEntry.credit_amount), 0).label('total_credit')
-        ).join(Transaction).filter(
-            TransactionEntry.account_id.in_(account_ids),
-            Transaction.status == TransactionStatus.POSTED,
-        ).first()
-        
-        total_debit = Decimal(str(result.total_debit or 0))
-        total_credit = Decimal(str(result.total_credit or 0))
+        if BalanceSnapshotService.is_enabled():
+            totals = BalanceSnapshotService(self.db).get_totals(account_ids).values()
+            total_debit = sum((t[0] for t in totals), Decimal('0'))
+            total_credit = sum((t[1] for t in totals), Decimal('0'))
+        else:
+            # Calculate balance from transaction entries
+            result = self.db.query(
+                func.coalesce(func.sum(TransactionEntry.debit_amount), 0).label('total_debit'),
+                func.coalesce(func.sum(TransactionEntry.credit_amount), 0).label('total_credit')
+            ).join(Transaction).filter(
+                TransactionEntry.account_id.in_(account_ids),
+                Transaction.status == TransactionStatus.POSTED,
+            ).first()
+            
+            total_debit = Decimal(str(result.total_debit or 0))
+            total_credit = Decimal(str(result.total_credit or 0))
         
         # Assets have debit-normal balance
         return total_debit - total_credit
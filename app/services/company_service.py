@@ -4,6 +4,7 @@ from typing import List, Optional
 from decimal import Decimal
 from app.database.models import Company, BankAccount, User, Account, AccountType
 from app.schemas.company import CompanyCreate, CompanyUpdate, BankAccountCreate, BankAccountUpdate
+from app.services.sequence_service import SequenceService, SYSTEM_SERIES
 
 
 class CompanyService:
@@ -249,13 +250,18 @@ class CompanyService:
         }
     
     def get_next_invoice_number(self, company: Company) -> str:
-        """Get the next invoice number for a company."""
-        counter = company.invoice_counter
+        """Get the next invoice number for a company.
+        
+        The number is only consumed when the caller commits the invoice.
+        """
+        counter = SequenceService(self.db).allocate(
+            company.id, "invoice", series_name=SYSTEM_SERIES,
+            seed=lambda: company.invoice_counter or 1
+        )
         invoice_number = f"{company.invoice_prefix}-{counter:05d}"
         
-        # Increment counter
+        # Keep the displayed counter in step (the sequence row is locked until commit)
         company.invoice_counter = counter + 1
-        self.db.commit()
         
         return invoice_number
 
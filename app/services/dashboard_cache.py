@@ -0,0 +1,193 @@
+"""Dashboard metrics cache - short-lived per-company dashboard results.
+
+The dashboard tiles (InvoiceService.get_dashboard_summary, the business
+dashboard summary and outstanding tiles, SalesDashboardService.get_dashboard_summary)
+are the most frequent reads we serve. Their results are kept in process
+memory for DASHBOARD_CACHE_TTL_SECONDS.
+
+Invoices, payments and purchases are written from many services and API
+routes, so invalidation is not left to each call site. Session listeners
+record the company of every flushed Invoice, Payment, PurchaseInvoice,
+PurchasePayment, SalesTicket, Enquiry or Quotation and drop that company's
+entries when the transaction commits. ORM bulk statements on those
+tables are scoped from the statement itself:
+
+- INSERTs drop the companies in their rows;
+- UPDATEs that only set columns the dashboards don't read (e.g. the IRN
+  write-back of the e-invoice batch) drop nothing;
+- UPDATE/DELETE filtered on `company_id == x` or `company_id IN (...)` at
+  the top level of their WHERE drop those companies;
+- anything else drops every company's entries.
+
+The cache is per process: other workers see a write once their entries
+expire.
+"""
+import copy
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter, BooleanClauseList
+
+from app.config import settings
+from app.database.models import (
+    Invoice, Payment, PurchaseInvoice, PurchasePayment, SalesTicket, Enquiry, Quotation,
+)
+from app.utils.cache import BoundedCache
+
+# Models whose writes change dashboard metrics
+WATCHED_MODELS = (Invoice, Payment, PurchaseInvoice, PurchasePayment, SalesTicket, Enquiry, Quotation)
+ALL_COMPANIES = "*"
+
+# Columns of watched models that no dashboard reads
+UNREAD_COLUMNS = {"id", "irn", "ack_number", "ack_date", "signed_qr", "updated_at"}
+
+
+class DashboardCache:
+    """Per-company TTL cache whose entries are dropped by company on writes."""
+
+    def __init__(self, maxsize: int):
+        self._entries = BoundedCache(maxsize)
+        self._generations: Dict[str, int] = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    def key(self, company_id: str, *parts: Any) -> str:
+        """
+        Cache key for a company's metric. Take the key before computing the
+        value: a write committed in between changes the key, so the stale
+        value is stored where nobody will look for it.
+        """
+        with self._lock:
+            version = f"{self._epoch}.{self._generations.get(company_id, 0)}"
+        return ":".join([company_id, version, *map(str, parts)])
+
+    def get(self, key: str) -> Optional[Any]:
+        if settings.DASHBOARD_CACHE_TTL_SECONDS <= 0:
+            return None
+        value = self._entries.get(key)
+        return copy.deepcopy(value) if value is not None else None
+
+    def set(self, key: str, value: Any) -> None:
+        if settings.DASHBOARD_CACHE_TTL_SECONDS <= 0:
+            return
+        self._entries.set(key, copy.deepcopy(value), time.time() + settings.DASHBOARD_CACHE_TTL_SECONDS)
+
+    def invalidate(self, company_id: str) -> None:
+        """Drop a company's entries (ALL_COMPANIES drops everyone's)."""
+        with self._lock:
+            if company_id == ALL_COMPANIES:
+                self._epoch += 1
+            else:
+                self._generations[company_id] = self._generations.get(company_id, 0) + 1
+        if company_id == ALL_COMPANIES:
+            self._entries.clear()
+
+
+dashboard_cache = DashboardCache(settings.DASHBOARD_CACHE_MAX_SIZE)
+
+
+# ============== Invalidation ==============
+
+def _company_of(session: Session, obj) -> str:
+    """Company of a watched object (payments go through their invoice)."""
+    if isinstance(obj, Payment):
+        invoice = session.get(Invoice, obj.invoice_id) if obj.invoice_id else None
+        return invoice.company_id if invoice is not None else ALL_COMPANIES
+    if isinstance(obj, PurchasePayment):
+        invoice = session.get(PurchaseInvoice, obj.purchase_invoice_id) if obj.purchase_invoice_id else None
+        return invoice.company_id if invoice is not None else ALL_COMPANIES
+    return obj.company_id or ALL_COMPANIES
+
+
+def _pending(session: Session) -> set:
+    return session.info.setdefault("dashboard_cache_companies", set())
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed(session, flush_context):
+    companies = _pending(session)
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, WATCHED_MODELS):
+            companies.add(_company_of(session, obj))
+
+
+def _rows(orm_execute_state) -> list:
+    params = orm_execute_state.parameters
+    if isinstance(params, dict):
+        return [params]
+    return list(params or [])
+
+
+def _written_columns(orm_execute_state) -> set:
+    """Columns set by a bulk UPDATE, from .values() and per-row parameters."""
+    values = getattr(orm_execute_state.statement, "_values", None) or {}
+    columns = {getattr(column, "key", column) for column in values}
+    for row in _rows(orm_execute_state):
+        columns.update(row)
+    return columns
+
+
+def _where_companies(statement, table) -> Optional[set]:
+    """Companies pinned by a top-level company_id = / IN condition on table, or None."""
+    where = statement.whereclause
+    if where is None:
+        return None
+    conditions = where.clauses if (
+        isinstance(where, BooleanClauseList) and where.operator is operators.and_
+    ) else [where]
+    for condition in conditions:
+        if not isinstance(condition, BinaryExpression):
+            continue
+        if getattr(condition.left, "table", None) is not table or condition.left.key != "company_id":
+            continue
+        if not isinstance(condition.right, BindParameter):
+            continue
+        value = condition.right.effective_value
+        if condition.operator is operators.eq:
+            return {value}
+        if condition.operator is operators.in_op:
+            return set(value)
+    return None
+
+
+def _bulk_companies(orm_execute_state) -> set:
+    """Companies whose dashboards a bulk statement can change."""
+    if orm_execute_state.is_insert:
+        companies = {row.get("company_id") for row in _rows(orm_execute_state)}
+        return companies if companies and None not in companies else {ALL_COMPANIES}
+    if orm_execute_state.is_update:
+        columns = _written_columns(orm_execute_state)
+        if columns and columns <= UNREAD_COLUMNS:
+            return set()
+    table = orm_execute_state.bind_mapper.local_table
+    return _where_companies(orm_execute_state.statement, table) or {ALL_COMPANIES}
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and issubclass(mapper.class_, WATCHED_MODELS):
+        _pending(orm_execute_state.session).update(_bulk_companies(orm_execute_state))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    companies = session.info.pop("dashboard_cache_companies", None)
+    if not companies:
+        return
+    if ALL_COMPANIES in companies:
+        dashboard_cache.invalidate(ALL_COMPANIES)
+        return
+    for company_id in companies:
+        dashboard_cache.invalidate(company_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop("dashboard_cache_companies", None)
@@ -0,0 +1,400 @@
+"""E-invoice batch pipeline - bulk IRN generation for a period.
+
+An EInvoiceJob covers a company's e-invoice eligible invoices in a date
+range that have no IRN yet. EInvoiceBatchService.run_job walks them in
+keyset chunks of EINVOICE_BATCH_SIZE:
+
+1. load the chunk with customers joined and all items in one more query
+   (the company is already in the session), so payloads are built by
+   GSTIntegrationService.generate_irn_data without lazy loads;
+2. submit the payloads through an EInvoiceTransport with at most
+   EINVOICE_CONCURRENCY requests in flight and EINVOICE_RATE_LIMIT per
+   second, retrying retryable errors with exponential backoff;
+3. write IRN and acknowledgement data back with one bulk UPDATE and commit
+   the chunk together with the job's progress counters and failures.
+
+The job runs on the server's event loop, so the sync database steps (1
+and 3, and the status updates) run in the threadpool; only the IRP
+requests are awaited on the loop.
+
+A job that stops half way (crash, deploy, NIC outage) is resumed by
+running it again: invoices that got their IRN are no longer selected and
+the failed ones are retried.
+
+Transports are pluggable: TRANSPORTS maps EINVOICE_TRANSPORT names to
+classes. Only the local NIC simulator ships here; a GSP / NIC client
+subclasses EInvoiceTransport and registers itself.
+"""
+import asyncio
+import base64
+import hashlib
+import itertools
+import json
+import random
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, func, or_, update
+from sqlalchemy.orm import Session, contains_eager
+from sqlalchemy.orm.attributes import set_committed_value
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.database.connection import SessionLocal
+from app.database.models import (
+    Company, Customer, EInvoiceJob, EInvoiceJobStatus, Invoice, InvoiceItem, InvoiceType,
+)
+from app.services.gst_integration_service import GSTIntegrationService
+from app.services.gstr1_builder import EXCLUDED_STATUSES
+
+# Invoices loaded, submitted and written back per round
+EINVOICE_BATCH_SIZE = 500
+
+# First retry delay in seconds; doubled on every further attempt
+RETRY_BACKOFF_SECONDS = 0.5
+
+# Invoice types that need an e-invoice whatever the customer
+EINVOICE_TYPES = [InvoiceType.B2B, InvoiceType.SEZ, InvoiceType.EXPORT, InvoiceType.DEEMED_EXPORT]
+
+
+# ============== Transports ==============
+
+class EInvoiceTransportError(Exception):
+    """IRN request failed. Retryable errors (timeouts, 5xx, throttling) are retried."""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class EInvoiceTransport:
+    """Submits one e-invoice payload to the IRP and returns its response."""
+
+    async def generate_irn(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Return {"Irn", "AckNo", "AckDt" ("%Y-%m-%d %H:%M:%S"), "SignedQRCode"}
+        or raise EInvoiceTransportError.
+        """
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """Release connections; called once when a job run ends."""
+
+
+class SimulatedNICTransport(EInvoiceTransport):
+    """
+    Local stand-in for the NIC IRP. IRNs are the SHA-256 of seller GSTIN,
+    financial year, document type and number, as on the portal, so they are
+    stable across retries. latency and failure_rate simulate a slow or flaky
+    portal.
+    """
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._ack_numbers = itertools.count(int(datetime.utcnow().strftime("%y%m%d%H%M%S")) * 1000)
+
+    async def generate_irn(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.failure_rate and self._random.random() < self.failure_rate:
+            raise EInvoiceTransportError("Simulated IRP timeout")
+
+        seller = payload["SellerDtls"]["Gstin"]
+        doc = payload["DocDtls"]
+        day, month, year = (int(part) for part in doc["Dt"].split("/"))
+        fy_start = year if month >= 4 else year - 1
+        irn = hashlib.sha256(
+            f"{seller}{fy_start}-{(fy_start + 1) % 100:02d}{doc['Typ']}{doc['No']}".encode()
+        ).hexdigest()
+
+        ack_date = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        qr = {
+            "SellerGstin": seller,
+            "BuyerGstin": payload["BuyerDtls"]["Gstin"],
+            "DocNo": doc["No"],
+            "DocTyp": doc["Typ"],
+            "DocDt": doc["Dt"],
+            "TotInvVal": payload["ValDtls"]["TotInvVal"],
+            "ItemCnt": len(payload["ItemList"]),
+            "MainHsnCode": payload["ItemList"][0]["HsnCd"] if payload["ItemList"] else "",
+            "Irn": irn,
+            "IrnDt": ack_date,
+        }
+        return {
+            "Irn": irn,
+            "AckNo": str(next(self._ack_numbers)),
+            "AckDt": ack_date,
+            "SignedQRCode": base64.b64encode(json.dumps(qr, sort_keys=True).encode()).decode(),
+        }
+
+
+TRANSPORTS = {
+    "simulator": SimulatedNICTransport,
+}
+
+
+def get_transport(name: Optional[str] = None) -> EInvoiceTransport:
+    """Transport configured by EINVOICE_TRANSPORT (or the given name)."""
+    name = name or settings.EINVOICE_TRANSPORT
+    if name not in TRANSPORTS:
+        raise ValueError(f"Unknown e-invoice transport '{name}'. Available: {', '.join(TRANSPORTS)}")
+    return TRANSPORTS[name]()
+
+
+class RateLimiter:
+    """Spaces request starts at least 1/rate seconds apart across all tasks."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+# ============== Batch Service ==============
+
+class EInvoiceBatchService:
+    """Creates, runs and resumes bulk IRN generation jobs."""
+
+    def __init__(self, db: Session, transport: Optional[EInvoiceTransport] = None):
+        self.db = db
+        self.transport = transport
+
+    def _eligible_filters(self, company_id: str, from_date: datetime, to_date: datetime):
+        has_gstin = and_(Customer.tax_number.isnot(None), Customer.tax_number != "")
+        return [
+            Invoice.company_id == company_id,
+            Invoice.invoice_date >= from_date,
+            Invoice.invoice_date < to_date,
+            Invoice.status.notin_(EXCLUDED_STATUSES),
+            Invoice.irn.is_(None),
+            or_(Invoice.invoice_type.in_(EINVOICE_TYPES), has_gstin),
+        ]
+
+    def create_job(self, company: Company, from_date: datetime, to_date: datetime) -> EInvoiceJob:
+        """Create a job for [from_date, to_date) and count the invoices it will submit."""
+        total = self.db.query(func.count(Invoice.id)).outerjoin(
+            Customer, Customer.id == Invoice.customer_id
+        ).filter(*self._eligible_filters(company.id, from_date, to_date)).scalar()
+
+        job = EInvoiceJob(
+            company_id=company.id,
+            from_date=from_date,
+            to_date=to_date,
+            status=EInvoiceJobStatus.PENDING,
+            total_invoices=total or 0,
+            failures=[],
+        )
+        self.db.add(job)
+        self.db.commit()
+        self.db.refresh(job)
+        return job
+
+    def get_job(self, company_id: str, job_id: str) -> Optional[EInvoiceJob]:
+        return self.db.query(EInvoiceJob).filter(
+            EInvoiceJob.id == job_id,
+            EInvoiceJob.company_id == company_id,
+        ).first()
+
+    def claim_job(self, job: EInvoiceJob, force: bool = False) -> bool:
+        """
+        Mark a job RUNNING for a resume. Unless forced, a job already
+        running is left alone and False returned; the check and the update
+        are one statement, so two resume requests cannot both claim it.
+        """
+        query = update(EInvoiceJob).where(EInvoiceJob.id == job.id)
+        if not force:
+            query = query.where(EInvoiceJob.status != EInvoiceJobStatus.RUNNING)
+        claimed = self.db.execute(
+            query.values(status=EInvoiceJobStatus.RUNNING).execution_options(synchronize_session=False)
+        ).rowcount
+        self.db.commit()
+        self.db.refresh(job)
+        return bool(claimed)
+
+    @staticmethod
+    def job_summary(job: EInvoiceJob) -> Dict[str, Any]:
+        remaining = max((job.total_invoices or 0) - (job.succeeded_invoices or 0), 0)
+        return {
+            "id": job.id,
+            "status": job.status.value if job.status else None,
+            "from_date": job.from_date.isoformat() if job.from_date else None,
+            "to_date": job.to_date.isoformat() if job.to_date else None,
+            "total_invoices": job.total_invoices or 0,
+            "succeeded_invoices": job.succeeded_invoices or 0,
+            "failed_invoices": job.failed_invoices or 0,
+            "remaining_invoices": remaining,
+            "attempts": job.attempts or 0,
+            "runs": job.runs or 0,
+            "failures": job.failures or [],
+            "error_message": job.error_message,
+            "started_at": job.started_at.isoformat() if job.started_at else None,
+            "completed_at": job.completed_at.isoformat() if job.completed_at else None,
+        }
+
+    def _load_chunk(self, job: EInvoiceJob, after_id: str) -> List[Invoice]:
+        """Next chunk of eligible invoices by id, with customer and items populated."""
+        invoices = self.db.query(Invoice).outerjoin(
+            Customer, Customer.id == Invoice.customer_id
+        ).options(contains_eager(Invoice.customer)).filter(
+            *self._eligible_filters(job.company_id, job.from_date, job.to_date),
+            Invoice.id > after_id,
+        ).order_by(Invoice.id).limit(EINVOICE_BATCH_SIZE).all()
+        if not invoices:
+            return invoices
+
+        items = {invoice.id: [] for invoice in invoices}
+        for item in self.db.query(InvoiceItem).filter(
+            InvoiceItem.invoice_id.in_(list(items))
+        ).order_by(InvoiceItem.invoice_id, InvoiceItem.created_at, InvoiceItem.id):
+            items[item.invoice_id].append(item)
+        for invoice in invoices:
+            set_committed_value(invoice, "items", items[invoice.id])
+        return invoices
+
+    def _prepare_chunk(
+        self, job: EInvoiceJob, after_id: str, integration: GSTIntegrationService
+    ) -> Tuple[List[Invoice], List[Dict[str, Any]]]:
+        invoices = self._load_chunk(job, after_id)
+        return invoices, [integration.generate_irn_data(invoice) for invoice in invoices]
+
+    async def _submit(
+        self,
+        payload: Dict[str, Any],
+        semaphore: asyncio.Semaphore,
+        limiter: RateLimiter,
+        max_retries: int,
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str], int]:
+        """Submit one payload with retries. Returns (response, error, attempts)."""
+        attempts = 0
+        while True:
+            attempts += 1
+            async with semaphore:
+                await limiter.wait()
+                try:
+                    response = await asyncio.wait_for(
+                        self.transport.generate_irn(payload), settings.EINVOICE_TIMEOUT_SECONDS
+                    )
+                    return response, None, attempts
+                except asyncio.TimeoutError:
+                    error = EInvoiceTransportError("IRP request timed out")
+                except EInvoiceTransportError as e:
+                    error = e
+            if not error.retryable or attempts > max_retries:
+                return None, str(error), attempts
+            await asyncio.sleep(RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1))
+
+    def _write_back(self, job: EInvoiceJob, invoices: List[Invoice], results: List[Tuple]) -> None:
+        """Bulk-update IRNs of the chunk and commit it with the job's progress."""
+        rows = []
+        failures = list(job.failures or [])
+        for invoice, (response, error, attempts) in zip(invoices, results):
+            job.attempts = (job.attempts or 0) + attempts
+            if response is None:
+                failures.append({
+                    "invoice_id": invoice.id,
+                    "invoice_number": invoice.invoice_number,
+                    "error": error,
+                    "attempts": attempts,
+                })
+                continue
+            rows.append({
+                "id": invoice.id,
+                "irn": response["Irn"],
+                "ack_number": str(response["AckNo"]),
+                "ack_date": datetime.strptime(response["AckDt"], "%Y-%m-%d %H:%M:%S"),
+                "signed_qr": response["SignedQRCode"],
+            })
+
+        if rows:
+            self.db.execute(update(Invoice), rows)
+        job.succeeded_invoices = (job.succeeded_invoices or 0) + len(rows)
+        job.failed_invoices = len(failures)
+        job.failures = failures
+        self.db.commit()
+
+    def _start(self, job: EInvoiceJob) -> None:
+        job.status = EInvoiceJobStatus.RUNNING
+        job.runs = (job.runs or 0) + 1
+        job.started_at = datetime.utcnow()
+        job.completed_at = None
+        job.failed_invoices = 0
+        job.failures = []
+        job.error_message = None
+        self.db.commit()
+        # Seller details: invoice.company then resolves from the identity map
+        self.db.get(Company, job.company_id)
+
+    def _finish(self, job: EInvoiceJob, error: Optional[Exception] = None) -> None:
+        if error is not None:
+            self.db.rollback()
+            job.status = EInvoiceJobStatus.FAILED
+            job.error_message = str(error)
+        else:
+            job.status = EInvoiceJobStatus.COMPLETED
+            job.completed_at = datetime.utcnow()
+        self.db.commit()
+
+    async def run_job(
+        self,
+        job: EInvoiceJob,
+        concurrency: Optional[int] = None,
+        rate_per_second: Optional[float] = None,
+        max_retries: Optional[int] = None,
+    ) -> EInvoiceJob:
+        """
+        Run (or resume) a job to the end. Each chunk is committed as it
+        completes; failures of this run are listed on the job.
+        """
+        concurrency = concurrency or settings.EINVOICE_CONCURRENCY
+        rate_per_second = settings.EINVOICE_RATE_LIMIT if rate_per_second is None else rate_per_second
+        max_retries = settings.EINVOICE_MAX_RETRIES if max_retries is None else max_retries
+        if self.transport is None:
+            self.transport = get_transport()
+
+        await run_in_threadpool(self._start, job)
+        integration = GSTIntegrationService(self.db)
+        semaphore = asyncio.Semaphore(concurrency)
+        limiter = RateLimiter(rate_per_second)
+
+        try:
+            after_id = ""
+            while True:
+                invoices, payloads = await run_in_threadpool(self._prepare_chunk, job, after_id, integration)
+                if not invoices:
+                    break
+                after_id = invoices[-1].id
+                results = await asyncio.gather(*[
+                    self._submit(payload, semaphore, limiter, max_retries) for payload in payloads
+                ])
+                await run_in_threadpool(self._write_back, job, invoices, results)
+        except Exception as e:
+            await run_in_threadpool(self._finish, job, e)
+            return job
+        finally:
+            await self.transport.close()
+
+        await run_in_threadpool(self._finish, job)
+        return job
+
+
+async def run_job_in_background(job_id: str) -> None:
+    """Run a job with its own session, for FastAPI background tasks."""
+    db = SessionLocal()
+    try:
+        job = await run_in_threadpool(db.get, EInvoiceJob, job_id)
+        if job is not None:
+            await EInvoiceBatchService(db).run_job(job)
+    finally:
+        await run_in_threadpool(db.close)
@@ -15,7 +15,7 @@ until next contribution period (April-September or October-March).
 """
 from decimal import Decimal, ROUND_HALF_UP
 from dataclasses import dataclass
-from typing import Optional, List, Tuple
+from typing import Optional, List, Tuple, Dict
 from datetime import date
 from sqlalchemy.orm import Session
 
@@ -52,6 +52,11 @@ class ESIService:
     
     def __init__(self, db: Session):
         self.db = db
+        self._settings: Dict[str, Optional[PayrollSettings]] = {}
+    
+    def use_settings(self, company_id: str, settings: Optional[PayrollSettings]) -> None:
+        """Use preloaded settings for a company instead of querying (payroll runs)."""
+        self._settings[company_id] = settings
     
     def _round_amount(self, amount: Decimal) -> Decimal:
         """Round to nearest rupee."""
@@ -63,6 +68,8 @@ class ESIService:
     
     def get_esi_settings(self, company_id: str) -> Optional[PayrollSettings]:
         """Get company-specific ESI settings."""
+        if company_id in self._settings:
+            return self._settings[company_id]
         return self.db.query(PayrollSettings).filter(
             PayrollSettings.company_id == company_id
         ).first()
@@ -8,8 +8,9 @@ import hashlib
 import base64
 
 from app.database.models import (
-    Company, Invoice, Customer, InvoiceItem, InvoiceStatus
+    Company, Invoice, Customer, InvoiceItem, InvoiceType
 )
+from app.services.gst_return_ledger import OUTWARD_SECTIONS, GSTReturnLedgerService
 
 
 class GSTIntegrationService:
@@ -55,7 +56,7 @@ class GSTIntegrationService:
             "Version": "1.1",
             "TranDtls": {
                 "TaxSch": "GST",
-                "SupTyp": "B2B",  # B2B, B2C, SEZWP, SEZWOP, EXPWP, EXPWOP, DEXP
+                "SupTyp": self._supply_type(invoice),  # B2B, SEZWP, SEZWOP, EXPWP, EXPWOP, DEXP
                 "IgstOnIntra": "N",
             },
             "DocDtls": {
@@ -70,17 +71,17 @@ class GSTIntegrationService:
                 "Addr1": company.address_line1 or "",
                 "Addr2": company.address_line2 or "",
                 "Loc": company.city or "",
-                "Pin": int(company.pincode or 0),
+                "Pin": self._pin(company.pincode),
                 "Stcd": company.state_code or "",
             },
             "BuyerDtls": {
-                "Gstin": customer.gstin if customer else "URP",  # Unregistered Person
+                "Gstin": (customer.tax_number or "URP") if customer else "URP",  # Unregistered Person
                 "LglNm": customer.name if customer else "",
                 "TrdNm": customer.trade_name if customer else "",
                 "Addr1": customer.billing_address_line1 if customer else "",
                 "Addr2": customer.billing_address_line2 if customer else "",
                 "Loc": customer.billing_city if customer else "",
-                "Pin": int(customer.billing_pincode or 0) if customer else 0,
+                "Pin": self._pin(customer.billing_zip) if customer else 0,
                 "Stcd": customer.billing_state_code if customer else "",
                 "Pos": invoice.place_of_supply or company.state_code or "",
             },
@@ -98,6 +99,24 @@ class GSTIntegrationService:
         
         return einvoice_data
     
+    @staticmethod
+    def _supply_type(invoice: Invoice) -> str:
+        """E-invoice supply type; SEZ and exports split on whether IGST is paid."""
+        with_payment = bool(invoice.igst_amount and invoice.igst_amount > 0)
+        if invoice.invoice_type == InvoiceType.SEZ:
+            return "SEZWP" if with_payment else "SEZWOP"
+        if invoice.invoice_type == InvoiceType.EXPORT:
+            return "EXPWP" if with_payment else "EXPWOP"
+        if invoice.invoice_type == InvoiceType.DEEMED_EXPORT:
+            return "DEXP"
+        return "B2B"
+    
+    @staticmethod
+    def _pin(value: Optional[str]) -> int:
+        """PIN code as the integer the schema expects (0 when missing)."""
+        digits = "".join(ch for ch in str(value or "") if ch.isdigit())
+        return int(digits) if digits else 0
+    
     def generate_signed_qr(self, invoice: Invoice) -> str:
         """
         Generate a signed QR code data for E-Invoice.
@@ -107,7 +126,7 @@ class GSTIntegrationService:
         # integration with GST portal and proper signing
         qr_data = {
             "SellerGstin": invoice.company.gstin or "",
-            "BuyerGstin": invoice.customer.gstin if invoice.customer else "",
+            "BuyerGstin": (invoice.customer.tax_number or "") if invoice.customer else "",
             "DocNo": invoice.invoice_number,
             "DocTyp": "INV",
             "DocDt": invoice.invoice_date.strftime("%d/%m/%Y"),
@@ -291,13 +310,25 @@ class GSTIntegrationService:
         from_date: datetime,
         to_date: datetime,
     ) -> Dict[str, Any]:
-        """Get Input Tax Credit summary for a period."""
-        # In a full implementation, this would compare:
-        # 1. Our purchase invoices
-        # 2. GSTR-2A data from GST portal
-        # 3. Identify mismatches
+        """
+        Get Input Tax Credit summary for a period. Available ITC comes from
+        approved purchase invoices (net of purchase returns) in the GST return
+        ledger; claimed figures and mismatches need GSTR-2A data.
+        """
+        ledger = GSTReturnLedgerService(self.db)
+        totals = ledger.get_totals(company, from_date, self._period_end(to_date))
+        eligible = ledger.sum_totals(totals, ["itc"])
+        reversed_ = ledger.sum_totals(totals, ["purchase_return"])
+        
+        available = {
+            name: eligible[field] - reversed_[field]
+            for name, field in (
+                ("cgst", "cgst_amount"), ("sgst", "sgst_amount"),
+                ("igst", "igst_amount"), ("cess", "cess_amount"),
+            )
+        }
+        available["total"] = sum(available.values(), Decimal("0"))
         
-        # For now, return a summary structure
         return {
             "period": {
                 "from_date": from_date.isoformat(),
@@ -310,13 +341,7 @@ class GSTIntegrationService:
                 "cess": Decimal("0"),
                 "total": Decimal("0"),
             },
-            "available": {
-                "cgst": Decimal("0"),
-                "sgst": Decimal("0"),
-                "igst": Decimal("0"),
-                "cess": Decimal("0"),
-                "total": Decimal("0"),
-            },
+            "available": available,
             "mismatches": [],
             "message": "ITC reconciliation requires GSTR-2A data integration",
         }
@@ -358,18 +383,13 @@ class GSTIntegrationService:
         from_date: datetime,
         to_date: datetime,
     ) -> Dict[str, Any]:
-        """Get GSTR-1 summary for a period."""
-        invoices = self.db.query(Invoice).filter(
-            Invoice.company_id == company.id,
-            Invoice.invoice_date.between(from_date, to_date),
-            Invoice.status.in_([InvoiceStatus.PENDING, InvoiceStatus.PAID, InvoiceStatus.PARTIALLY_PAID])
-        ).all()
-        
-        b2b_invoices = [i for i in invoices if i.customer and i.customer.gstin]
-        b2c_invoices = [i for i in invoices if not i.customer or not i.customer.gstin]
+        """Get GSTR-1 summary for a period from the GST return ledger."""
+        ledger = GSTReturnLedgerService(self.db)
+        totals = ledger.get_totals(company, from_date, self._period_end(to_date))
+        sales = ledger.sum_totals(totals, OUTWARD_SECTIONS)
+        b2b = ledger.sum_totals(totals, ["b2b"])
         
-        total_value = sum(i.total_amount or Decimal("0") for i in invoices)
-        total_tax = sum((i.cgst_amount or Decimal("0")) + (i.sgst_amount or Decimal("0")) + (i.igst_amount or Decimal("0")) for i in invoices)
+        total_tax = sales["cgst_amount"] + sales["sgst_amount"] + sales["igst_amount"]
         
         return {
             "period": {
@@ -377,16 +397,21 @@ class GSTIntegrationService:
                 "to_date": to_date.isoformat(),
             },
             "summary": {
-                "total_invoices": len(invoices),
-                "b2b_count": len(b2b_invoices),
-                "b2c_count": len(b2c_invoices),
-                "total_value": float(total_value),
+                "total_invoices": sales["document_count"],
+                "b2b_count": b2b["document_count"],
+                "b2c_count": sales["document_count"] - b2b["document_count"],
+                "total_value": float(sales["total_value"]),
                 "total_tax": float(total_tax),
             },
             "tax_breakup": {
-                "cgst": float(sum(i.cgst_amount or Decimal("0") for i in invoices)),
-                "sgst": float(sum(i.sgst_amount or Decimal("0") for i in invoices)),
-                "igst": float(sum(i.igst_amount or Decimal("0") for i in invoices)),
-                "cess": float(sum(i.cess_amount or Decimal("0") for i in invoices)),
+                "cgst": float(sales["cgst_amount"]),
+                "sgst": float(sales["sgst_amount"]),
+                "igst": float(sales["igst_amount"]),
+                "cess": float(sales["cess_amount"]),
             },
         }
+    
+    @staticmethod
+    def _period_end(to_date: datetime) -> datetime:
+        """Exclusive end of a period whose last day is to_date."""
+        return datetime.combine(to_date.date(), datetime.min.time()) + timedelta(days=1)
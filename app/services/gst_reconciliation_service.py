@@ -6,16 +6,22 @@ Features:
 - Auto-match with purchase invoices
 - Identify discrepancies
 - Generate reconciliation reports
+
+A period is reconciled in one pass: the candidate purchase invoices are
+loaded with a single query and GSTR2BMatcher resolves every 2B record
+against in-memory indexes.
 """
+import re
+from collections import defaultdict
 from decimal import Decimal, ROUND_HALF_UP
 from dataclasses import dataclass
 from typing import Optional, List, Dict, Tuple
 from datetime import datetime, date
 from enum import Enum
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, or_, select
 
-from app.database.models import PurchaseInvoice
+from app.database.models import Customer, PurchaseInvoice, PurchaseInvoiceStatus
 
 
 class GSTR2MatchStatus(str, Enum):
@@ -57,6 +63,108 @@ class ReconciliationResult:
     notes: str
 
 
+def normalize_invoice_number(number: Optional[str]) -> str:
+    """Upper-case, separators removed and leading zeros dropped ("inv/0012" -> "INV0012")."""
+    return re.sub(r"[^A-Z0-9]", "", (number or "").upper()).lstrip("0")
+
+
+def _as_date(value) -> Optional[date]:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _month_bounds(year: int, month: int) -> Tuple[date, date]:
+    """First day of the month and first day of the next month."""
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+class GSTR2BMatcher:
+    """
+    One-to-one matching of GSTR-2B records against purchase invoices in memory.
+    
+    Invoices are indexed once by (vendor GSTIN, normalized invoice number),
+    by normalized invoice number alone and by (amount, month). Records are
+    resolved in three passes in that order, so an exact match is never lost
+    to another record's fuzzy match. Within a pass earlier records win, and
+    each invoice is assigned at most once.
+    
+    The supplier's invoice number (vendor_invoice_number) and our own
+    invoice_number are both indexed; the invoice date used is
+    vendor_invoice_date when set, else invoice_date.
+    """
+    
+    def __init__(self, invoices: List[Tuple[PurchaseInvoice, Optional[str]]]):
+        """invoices: (purchase invoice, vendor GSTIN) pairs, in preference order."""
+        self.invoices = [invoice for invoice, _ in invoices]
+        self.gstins: Dict[str, str] = {}
+        self.claimed = set()
+        
+        self._by_gstin_number: Dict[Tuple[str, str], List[PurchaseInvoice]] = defaultdict(list)
+        self._by_number: Dict[str, List[PurchaseInvoice]] = defaultdict(list)
+        self._by_amount_month: Dict[Tuple[Decimal, int, int], List[PurchaseInvoice]] = defaultdict(list)
+        
+        for invoice, gstin in invoices:
+            gstin = (gstin or "").strip().upper()
+            self.gstins[invoice.id] = gstin
+            
+            numbers = {
+                normalize_invoice_number(invoice.vendor_invoice_number),
+                normalize_invoice_number(invoice.invoice_number),
+            } - {""}
+            for number in numbers:
+                self._by_number[number].append(invoice)
+                if gstin:
+                    self._by_gstin_number[(gstin, number)].append(invoice)
+            
+            invoice_date = self.invoice_date(invoice)
+            if invoice_date:
+                key = (self._amount(invoice.total_amount), invoice_date.year, invoice_date.month)
+                self._by_amount_month[key].append(invoice)
+    
+    @staticmethod
+    def invoice_date(invoice: PurchaseInvoice) -> Optional[date]:
+        return _as_date(invoice.vendor_invoice_date or invoice.invoice_date)
+    
+    @staticmethod
+    def _amount(value) -> Decimal:
+        return Decimal(str(value or 0)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+    
+    def match(self, records: List[GSTR2Record]) -> List[Optional[PurchaseInvoice]]:
+        """Return the assigned invoice (or None) for each record, in record order."""
+        keys = [
+            (
+                (record.supplier_gstin or "").strip().upper(),
+                normalize_invoice_number(record.invoice_number),
+            )
+            for record in records
+        ]
+        
+        passes = [
+            lambda i, record: self._by_gstin_number.get(keys[i]) if keys[i][1] else None,
+            lambda i, record: self._by_number.get(keys[i][1]) if keys[i][1] else None,
+            lambda i, record: self._by_amount_month.get((
+                self._amount(record.invoice_value), record.invoice_date.year, record.invoice_date.month,
+            )) if record.invoice_date else None,
+        ]
+        
+        assigned: List[Optional[PurchaseInvoice]] = [None] * len(records)
+        for lookup in passes:
+            for i, record in enumerate(records):
+                if assigned[i] is not None:
+                    continue
+                for invoice in lookup(i, record) or ():
+                    if invoice.id not in self.claimed:
+                        self.claimed.add(invoice.id)
+                        assigned[i] = invoice
+                        break
+        return assigned
+    
+    def unclaimed(self) -> List[PurchaseInvoice]:
+        """Invoices not assigned to any record."""
+        return [invoice for invoice in self.invoices if invoice.id not in self.claimed]
+
+
 class GSTReconciliationService:
     """Service for GSTR-2A/2B reconciliation."""
     
@@ -172,27 +280,57 @@ class GSTReconciliationService:
     
     # ==================== RECONCILIATION ====================
     
-    def reconcile_record(
+    def _load_purchase_invoices(
         self,
         company_id: str,
-        gstr_record: GSTR2Record,
-        tolerance: Decimal = Decimal("1"),  # Allow Rs. 1 difference
-    ) -> ReconciliationResult:
+        gstr_records: List[GSTR2Record],
+        period: Optional[Tuple[date, date]] = None,
+    ) -> List[Tuple[PurchaseInvoice, Optional[str]]]:
         """
-        Reconcile a single GSTR-2B record with purchase invoices.
+        Candidate invoices for a set of 2B records in one query.
+        
+        Loads every non-cancelled invoice dated in the months the records
+        (and the return period, if given) cover, plus any invoice from a
+        supplier GSTIN that appears in the records.
         """
-        # Search for matching purchase invoice
-        # First try exact match on GSTIN + Invoice Number
-        purchase_invoice = self.db.query(PurchaseInvoice).filter(
-            PurchaseInvoice.company_id == company_id,
-            PurchaseInvoice.vendor_gstin == gstr_record.supplier_gstin,
-            PurchaseInvoice.invoice_number == gstr_record.invoice_number,
-        ).first()
+        months = {(r.invoice_date.year, r.invoice_date.month) for r in gstr_records if r.invoice_date}
+        if period:
+            months.add((period[0].year, period[0].month))
         
-        if not purchase_invoice:
-            # Try fuzzy match (same invoice number, close date)
-            purchase_invoice = self._fuzzy_match(company_id, gstr_record)
+        conditions = []
+        if months:
+            start = _month_bounds(*min(months))[0]
+            end = _month_bounds(*max(months))[1]
+            conditions.append(and_(PurchaseInvoice.invoice_date >= start, PurchaseInvoice.invoice_date < end))
+            conditions.append(and_(PurchaseInvoice.vendor_invoice_date >= start, PurchaseInvoice.vendor_invoice_date < end))
         
+        gstins = {r.supplier_gstin.strip().upper() for r in gstr_records if r.supplier_gstin}
+        if gstins:
+            conditions.append(func.upper(Customer.tax_number).in_(gstins))
+        
+        if not conditions:
+            return []
+        
+        rows = self.db.execute(
+            select(PurchaseInvoice, Customer.tax_number)
+            .outerjoin(Customer, Customer.id == PurchaseInvoice.vendor_id)
+            .where(
+                PurchaseInvoice.company_id == company_id,
+                or_(PurchaseInvoice.status.is_(None), PurchaseInvoice.status != PurchaseInvoiceStatus.CANCELLED),
+                or_(*conditions),
+            )
+            .order_by(PurchaseInvoice.invoice_date, PurchaseInvoice.id)
+        ).all()
+        return [(invoice, gstin) for invoice, gstin in rows]
+    
+    def _compare(
+        self,
+        gstr_record: GSTR2Record,
+        purchase_invoice: Optional[PurchaseInvoice],
+        vendor_gstin: Optional[str],
+        tolerance: Decimal,
+    ) -> ReconciliationResult:
+        """Classify a 2B record against the invoice it was matched with."""
         if not purchase_invoice:
             return ReconciliationResult(
                 gstr_record=gstr_record,
@@ -215,14 +353,26 @@ class GSTReconciliationService:
         tax_diff = abs(gstr_total_tax - books_total_tax)
         
         # Check for date mismatch
+        books_date = GSTR2BMatcher.invoice_date(purchase_invoice)
         date_match = True
-        if gstr_record.invoice_date and purchase_invoice.invoice_date:
+        if gstr_record.invoice_date and books_date:
             # Allow 1-day difference for timing issues
-            date_diff = abs((gstr_record.invoice_date - purchase_invoice.invoice_date).days)
+            date_diff = abs((gstr_record.invoice_date - books_date).days)
             date_match = date_diff <= 1
         
         # Determine match status
         if amount_diff <= tolerance and tax_diff <= tolerance and date_match:
+            if vendor_gstin and gstr_record.supplier_gstin and \
+                    vendor_gstin.strip().upper() != gstr_record.supplier_gstin.strip().upper():
+                return ReconciliationResult(
+                    gstr_record=gstr_record,
+                    purchase_invoice=purchase_invoice,
+                    match_status=GSTR2MatchStatus.GSTIN_MISMATCH,
+                    amount_difference=amount_diff,
+                    tax_difference=tax_diff,
+                    notes=f"GSTIN mismatch: GSTR={gstr_record.supplier_gstin}, Books={vendor_gstin}",
+                )
+            
             return ReconciliationResult(
                 gstr_record=gstr_record,
                 purchase_invoice=purchase_invoice,
@@ -239,7 +389,7 @@ class GSTReconciliationService:
                 match_status=GSTR2MatchStatus.DATE_MISMATCH,
                 amount_difference=amount_diff,
                 tax_difference=tax_diff,
-                notes=f"Date mismatch: GSTR={gstr_record.invoice_date}, Books={purchase_invoice.invoice_date}",
+                notes=f"Date mismatch: GSTR={gstr_record.invoice_date}, Books={books_date}",
             )
         
         return ReconciliationResult(
@@ -251,71 +401,75 @@ class GSTReconciliationService:
             notes=f"Amount difference: Rs. {amount_diff}, Tax difference: Rs. {tax_diff}",
         )
     
-    def _fuzzy_match(
+    def reconcile_record(
         self,
         company_id: str,
         gstr_record: GSTR2Record,
-    ) -> Optional[PurchaseInvoice]:
-        """Attempt fuzzy matching for purchase invoice."""
-        # Try matching by invoice number alone (different GSTIN format)
-        invoice = self.db.query(PurchaseInvoice).filter(
-            PurchaseInvoice.company_id == company_id,
-            PurchaseInvoice.invoice_number == gstr_record.invoice_number,
-        ).first()
-        
-        if invoice:
-            return invoice
-        
-        # Try matching by amount and approximate date
-        if gstr_record.invoice_date:
-            from_date = gstr_record.invoice_date.replace(day=1)
-            to_date = gstr_record.invoice_date.replace(day=28)  # Safe for all months
-            
-            invoice = self.db.query(PurchaseInvoice).filter(
-                PurchaseInvoice.company_id == company_id,
-                PurchaseInvoice.total_amount == gstr_record.invoice_value,
-                PurchaseInvoice.invoice_date >= from_date,
-                PurchaseInvoice.invoice_date <= to_date,
-            ).first()
+        tolerance: Decimal = Decimal("1"),  # Allow Rs. 1 difference
+    ) -> ReconciliationResult:
+        """
+        Reconcile a single GSTR-2B record with purchase invoices.
         
-        return invoice
+        Use reconcile_period for a whole return; this loads candidates for
+        the one record.
+        """
+        matcher = GSTR2BMatcher(self._load_purchase_invoices(company_id, [gstr_record]))
+        purchase_invoice = matcher.match([gstr_record])[0]
+        vendor_gstin = matcher.gstins.get(purchase_invoice.id) if purchase_invoice else None
+        return self._compare(gstr_record, purchase_invoice, vendor_gstin, tolerance)
     
     def reconcile_period(
         self,
         company_id: str,
         gstr_records: List[GSTR2Record],
+        return_period: Optional[str] = None,  # MMYYYY format
+        tolerance: Decimal = Decimal("1"),
     ) -> Dict:
         """
         Reconcile all GSTR-2B records for a period.
+        
+        Purchase invoices are loaded once and matched one-to-one by
+        GSTR2BMatcher. Invoices from GSTIN-registered vendors, dated in the
+        return period (or, without one, the months the records cover), that
+        no record matched are listed under not_in_gstr.
         """
+        period = None
+        if return_period:
+            period = _month_bounds(int(return_period[2:]), int(return_period[:2]))
+        
+        matcher = GSTR2BMatcher(self._load_purchase_invoices(company_id, gstr_records, period))
+        matches = matcher.match(gstr_records)
+        
         results = []
         summary = {
             "total_records": len(gstr_records),
             "matched": 0,
             "amount_mismatch": 0,
             "date_mismatch": 0,
+            "gstin_mismatch": 0,
             "not_in_books": 0,
             "not_in_gstr": 0,
         }
         
-        for record in gstr_records:
-            result = self.reconcile_record(company_id, record)
+        for record, purchase_invoice in zip(gstr_records, matches):
+            vendor_gstin = matcher.gstins.get(purchase_invoice.id) if purchase_invoice else None
+            result = self._compare(record, purchase_invoice, vendor_gstin, tolerance)
             results.append(result)
-            
-            summary[result.match_status.value.lower().replace(" ", "_")] = \
-                summary.get(result.match_status.value.lower().replace(" ", "_"), 0) + 1
-        
-        # Find invoices in books but not in GSTR
-        gstr_invoice_numbers = {r.invoice_number for r in gstr_records}
-        gstr_gstins = {r.supplier_gstin for r in gstr_records}
+            summary[result.match_status.value] += 1
         
-        unmatched_in_books = self.db.query(PurchaseInvoice).filter(
-            PurchaseInvoice.company_id == company_id,
-            PurchaseInvoice.vendor_gstin.in_(gstr_gstins),
-            ~PurchaseInvoice.invoice_number.in_(gstr_invoice_numbers),
-        ).count()
+        # Invoices in books but not in GSTR
+        if period:
+            in_period = lambda d: period[0] <= d < period[1]
+        else:
+            months = {(r.invoice_date.year, r.invoice_date.month) for r in gstr_records if r.invoice_date}
+            in_period = lambda d: (d.year, d.month) in months
         
-        summary["not_in_gstr"] = unmatched_in_books
+        not_in_gstr = [
+            invoice for invoice in matcher.unclaimed()
+            if matcher.gstins.get(invoice.id) and GSTR2BMatcher.invoice_date(invoice)
+            and in_period(GSTR2BMatcher.invoice_date(invoice))
+        ]
+        summary["not_in_gstr"] = len(not_in_gstr)
         
         return {
             "summary": summary,
@@ -327,7 +481,8 @@ class GSTReconciliationService:
                     "invoice_date": r.gstr_record.invoice_date.isoformat() if r.gstr_record.invoice_date else None,
                     "gstr_value": float(r.gstr_record.invoice_value),
                     "gstr_tax": float(r.gstr_record.cgst + r.gstr_record.sgst + r.gstr_record.igst),
-                    "books_value": float(r.purchase_invoice.total_amount) if r.purchase_invoice else None,
+                    "purchase_invoice_id": r.purchase_invoice.id if r.purchase_invoice else None,
+                    "books_value": float(r.purchase_invoice.total_amount or 0) if r.purchase_invoice else None,
                     "books_tax": float(
                         (r.purchase_invoice.cgst_amount or 0) +
                         (r.purchase_invoice.sgst_amount or 0) +
@@ -340,6 +495,23 @@ class GSTReconciliationService:
                 }
                 for r in results
             ],
+            "not_in_gstr": [
+                {
+                    "purchase_invoice_id": invoice.id,
+                    "invoice_number": invoice.invoice_number,
+                    "vendor_invoice_number": invoice.vendor_invoice_number,
+                    "vendor_gstin": matcher.gstins.get(invoice.id),
+                    "invoice_date": GSTR2BMatcher.invoice_date(invoice).isoformat(),
+                    "books_value": float(invoice.total_amount or 0),
+                    "books_tax": float(
+                        (invoice.cgst_amount or 0) +
+                        (invoice.sgst_amount or 0) +
+                        (invoice.igst_amount or 0)
+                    ),
+                    "match_status": GSTR2MatchStatus.NOT_IN_GSTR.value,
+                }
+                for invoice in not_in_gstr
+            ],
         }
     
     # ==================== ITC SUMMARY ====================
@@ -393,7 +565,7 @@ class GSTReconciliationService:
         itc_as_per_books["total"] = sum(itc_as_per_books.values())
         
         # Reconcile to find eligible/ineligible
-        reconciliation = self.reconcile_period(company_id, gstr_records)
+        reconciliation = self.reconcile_period(company_id, gstr_records, return_period)
         
         matched_tax = sum(
             r["gstr_tax"]
@@ -0,0 +1,488 @@
+"""GST return ledger - running GST totals per return period.
+
+Rows are keyed by (company, return period, line type, section, place of
+supply, rate, HSN, reverse charge) and hold document counts, quantities,
+values and tax amounts; see GSTReturnLedger. Writers apply the delta of a
+single document inside their own database transaction:
+
+- InvoiceService finalize / cancel / void / status changes -> record_invoice_status
+- PurchaseService approval and cancellation -> record_purchase
+- VoucherEngine debit and credit notes -> record_note
+
+Each key is bumped with an atomic UPDATE ... SET x = x + delta and inserted
+(inside a savepoint) when missing, so concurrent writers never lose updates.
+compute() is the full recompute from invoices, purchases and note vouchers
+that rebuild() and check_consistency() (rebuild_gst_return_ledger.py, run
+nightly with --check) use, and that readers fall back to for partial
+months or while the ledger is disabled.
+
+The ledger is only maintained and read when GST_RETURN_LEDGER_ENABLED is
+set. Run rebuild_gst_return_ledger.py before enabling it.
+"""
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, extract, func, insert, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database.models import (
+    Account, Company, Customer, GSTReturnLedger, Invoice, InvoiceItem, InvoiceStatus,
+    PurchaseInvoice, PurchaseInvoiceItem, PurchaseInvoiceStatus, Transaction,
+    TransactionEntry, TransactionStatus, VoucherType,
+)
+from app.services.gstr1_builder import EXCLUDED_STATUSES, GSTR1Builder, classify_invoice
+
+KEY_FIELDS = ("line_type", "section", "place_of_supply", "gst_rate", "hsn_code", "is_reverse_charge")
+AMOUNT_FIELDS = (
+    "document_count", "quantity", "total_value", "taxable_value",
+    "igst_amount", "cgst_amount", "sgst_amount", "cess_amount",
+)
+
+OUTWARD_SECTIONS = ("b2b", "b2cl", "b2cs", "exp")
+EXCLUDED_PURCHASE_STATUSES = [PurchaseInvoiceStatus.DRAFT, PurchaseInvoiceStatus.CANCELLED]
+
+# VoucherEngine.ACCOUNTS codes used by debit/credit note vouchers
+RECEIVABLES_CODE, PAYABLES_CODE = "1100", "2000"
+SALES_CODE, PURCHASES_CODE = "4001", "5100"
+OUTPUT_TAX_CODES = {"igst_amount": "2103", "cgst_amount": "2101", "sgst_amount": "2102"}
+INPUT_TAX_CODES = {"igst_amount": "1303", "cgst_amount": "1301", "sgst_amount": "1302"}
+
+TWO_PLACES = Decimal("0.01")
+THREE_PLACES = Decimal("0.001")
+
+# (line_type, section, place_of_supply, gst_rate, hsn_code, is_reverse_charge)
+Key = Tuple[str, str, str, Decimal, str, bool]
+# (return_period, key) -> amounts in AMOUNT_FIELDS order
+Rows = Dict[Tuple[str, Key], List[Decimal]]
+
+
+def return_period(moment: datetime) -> str:
+    """GST return period (MMYYYY) of a date."""
+    return f"{moment.month:02d}{moment.year}"
+
+
+def month_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1)
+
+
+def whole_months(start: datetime, end: datetime) -> Optional[List[str]]:
+    """Return periods covering [start, end) exactly, or None if it is not whole months."""
+    if start != month_start(start) or end != month_start(end) or end <= start:
+        return None
+    periods = []
+    moment = start
+    while moment < end:
+        periods.append(return_period(moment))
+        moment = datetime(moment.year + moment.month // 12, moment.month % 12 + 1, 1)
+    return periods
+
+
+def _dec(value, places: Decimal = TWO_PLACES) -> Decimal:
+    return Decimal(str(value or 0)).quantize(places)
+
+
+def _amounts(values: Iterable, sign: int = 1) -> Dict[str, Any]:
+    """Column values of an amounts list; document_count is an integer column."""
+    amounts = {field: value * sign for field, value in zip(AMOUNT_FIELDS, values)}
+    amounts["document_count"] = int(amounts["document_count"])
+    return amounts
+
+
+def _key(line_type: str, section: str, pos: Optional[str], rate=0, hsn: Optional[str] = "", rcm=False) -> Key:
+    return (line_type, section, pos or "", _dec(rate), hsn or "", bool(rcm))
+
+
+def _add(rows: Rows, period: str, key: Key, values: Iterable) -> None:
+    current = rows.get((period, key))
+    values = [Decimal(str(v or 0)) for v in values]
+    rows[(period, key)] = values if current is None else [a + b for a, b in zip(current, values)]
+
+
+class GSTReturnLedgerService:
+    """Service for maintaining and reading the GST return ledger."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @staticmethod
+    def is_enabled() -> bool:
+        """Whether the ledger is maintained and read."""
+        return settings.GST_RETURN_LEDGER_ENABLED
+
+    # ============== Document Rows ==============
+
+    def _invoice_rows(self, invoice: Invoice) -> Rows:
+        state_code = invoice.company.state_code if invoice.company else None
+        gstin = invoice.customer.tax_number if invoice.customer else None
+        section = classify_invoice(
+            invoice.invoice_type, gstin, invoice.total_amount, invoice.place_of_supply, state_code
+        )
+        pos = invoice.place_of_supply or state_code
+        period = return_period(invoice.invoice_date)
+
+        rows: Rows = {}
+        _add(rows, period, _key("document", section, pos, rcm=invoice.is_reverse_charge), [
+            1, 0, invoice.total_amount, invoice.subtotal,
+            invoice.igst_amount, invoice.cgst_amount, invoice.sgst_amount, invoice.cess_amount,
+        ])
+        for item in invoice.items:
+            _add(rows, period, _key("item", section, pos, item.gst_rate, item.hsn_code, invoice.is_reverse_charge), [
+                0, item.quantity, item.total_amount, item.taxable_amount,
+                item.igst_amount, item.cgst_amount, item.sgst_amount, item.cess_amount,
+            ])
+        return rows
+
+    def _purchase_rows(self, invoice: PurchaseInvoice) -> Rows:
+        period = return_period(invoice.invoice_date)
+        header_section = "itc_ineligible" if invoice.itc_eligible is False else "itc"
+
+        rows: Rows = {}
+        _add(rows, period, _key("document", header_section, invoice.place_of_supply, rcm=invoice.is_reverse_charge), [
+            1, 0, invoice.total_amount, invoice.subtotal,
+            invoice.igst_amount, invoice.cgst_amount, invoice.sgst_amount, invoice.cess_amount,
+        ])
+        for item in invoice.items:
+            eligible = invoice.itc_eligible is not False and item.itc_eligible is not False
+            section = "itc" if eligible else "itc_ineligible"
+            _add(rows, period, _key(
+                "item", section, invoice.place_of_supply, item.gst_rate, item.hsn_code, invoice.is_reverse_charge
+            ), [
+                0, item.quantity, item.total_amount, item.taxable_amount,
+                item.igst_amount, item.cgst_amount, item.sgst_amount, item.cess_amount,
+            ])
+        return rows
+
+    # ============== Incremental Maintenance ==============
+
+    def _apply(self, company_id: str, rows: Rows, sign: int) -> None:
+        now = datetime.utcnow()
+        for (period, key), values in rows.items():
+            deltas = _amounts(values, sign)
+            match = [
+                GSTReturnLedger.company_id == company_id,
+                GSTReturnLedger.return_period == period,
+                *[getattr(GSTReturnLedger, field) == value for field, value in zip(KEY_FIELDS, key)],
+            ]
+            bump = update(GSTReturnLedger).where(*match).values(
+                updated_at=now,
+                **{field: getattr(GSTReturnLedger, field) + delta for field, delta in deltas.items()},
+            ).execution_options(synchronize_session=False)
+
+            if self.db.execute(bump).rowcount:
+                continue
+            try:
+                with self.db.begin_nested():
+                    self.db.execute(insert(GSTReturnLedger).values(
+                        company_id=company_id,
+                        return_period=period,
+                        updated_at=now,
+                        **dict(zip(KEY_FIELDS, key)),
+                        **deltas,
+                    ))
+            except IntegrityError:
+                # Another writer created the row first
+                self.db.execute(bump)
+
+    @staticmethod
+    def counts_for_returns(status: Optional[InvoiceStatus]) -> bool:
+        """Whether a sales invoice in this status is an outward supply."""
+        return status is not None and status not in EXCLUDED_STATUSES
+
+    def record_invoice_status(self, invoice: Invoice, old_status: Optional[InvoiceStatus]) -> None:
+        """
+        Apply a sales invoice status change: add it when it starts counting
+        (finalised), remove it when it stops (cancelled, voided). Call after
+        setting the new status; does not commit.
+        """
+        if not self.is_enabled():
+            return
+        was, now = self.counts_for_returns(old_status), self.counts_for_returns(invoice.status)
+        if was != now:
+            self._apply(invoice.company_id, self._invoice_rows(invoice), 1 if now else -1)
+
+    def record_purchase(self, invoice: PurchaseInvoice, sign: int = 1) -> None:
+        """
+        Apply a purchase invoice: sign=1 when it is approved, sign=-1 when an
+        approved invoice is cancelled. Does not commit.
+        """
+        if not self.is_enabled():
+            return
+        self._apply(invoice.company_id, self._purchase_rows(invoice), sign)
+
+    def record_note(
+        self,
+        company_id: str,
+        section: str,
+        note_date: datetime,
+        place_of_supply: Optional[str],
+        total_value: Decimal,
+        taxable_value: Decimal,
+        igst_amount: Decimal = Decimal("0"),
+        cgst_amount: Decimal = Decimal("0"),
+        sgst_amount: Decimal = Decimal("0"),
+        sign: int = 1,
+    ) -> None:
+        """
+        Apply a debit note (section 'sales_return') or credit note
+        ('purchase_return') with the amounts posted on its voucher: the party
+        line as total_value, the sales/purchases line as taxable_value. Does
+        not commit.
+        """
+        if not self.is_enabled():
+            return
+        rows: Rows = {}
+        _add(rows, return_period(note_date), _key("document", section, place_of_supply), [
+            1, 0, total_value, taxable_value, igst_amount, cgst_amount, sgst_amount, 0,
+        ])
+        self._apply(company_id, rows, sign)
+
+    # ============== Full Recompute ==============
+
+    def compute(
+        self,
+        company_id: str,
+        state_code: Optional[str],
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Rows:
+        """Ledger rows recomputed from source documents dated in [start, end)."""
+        rows: Rows = {}
+
+        def dated(column):
+            filters = []
+            if start is not None:
+                filters.append(column >= start)
+            if end is not None:
+                filters.append(column < end)
+            return filters
+
+        def periods(column):
+            return extract("year", column), extract("month", column)
+
+        # Sales invoices
+        section = GSTR1Builder(self.db)._section(state_code)
+        pos = func.coalesce(Invoice.place_of_supply, state_code or "")
+        rcm = func.coalesce(Invoice.is_reverse_charge, False)
+        year, month = periods(Invoice.invoice_date)
+        sales = [
+            Invoice.company_id == company_id,
+            Invoice.status.notin_(EXCLUDED_STATUSES),
+            *dated(Invoice.invoice_date),
+        ]
+        for row in self.db.query(
+            year, month, section, pos, rcm,
+            func.count(Invoice.id), func.sum(Invoice.total_amount), func.sum(Invoice.subtotal),
+            func.sum(Invoice.igst_amount), func.sum(Invoice.cgst_amount),
+            func.sum(Invoice.sgst_amount), func.sum(Invoice.cess_amount),
+        ).outerjoin(Customer, Customer.id == Invoice.customer_id).filter(*sales).group_by(
+            year, month, section, pos, rcm
+        ):
+            _add(rows, f"{int(row[1]):02d}{int(row[0])}", _key("document", row[2], row[3], rcm=row[4]),
+                 [row[5], 0, *row[6:]])
+
+        for row in self.db.query(
+            year, month, section, pos, InvoiceItem.gst_rate, InvoiceItem.hsn_code, rcm,
+            func.sum(InvoiceItem.quantity), func.sum(InvoiceItem.total_amount),
+            func.sum(InvoiceItem.taxable_amount), func.sum(InvoiceItem.igst_amount),
+            func.sum(InvoiceItem.cgst_amount), func.sum(InvoiceItem.sgst_amount),
+            func.sum(InvoiceItem.cess_amount),
+        ).join(Invoice, Invoice.id == InvoiceItem.invoice_id).outerjoin(
+            Customer, Customer.id == Invoice.customer_id
+        ).filter(*sales).group_by(
+            year, month, section, pos, InvoiceItem.gst_rate, InvoiceItem.hsn_code, rcm
+        ):
+            _add(rows, f"{int(row[1]):02d}{int(row[0])}", _key("item", row[2], row[3], row[4], row[5], row[6]),
+                 [0, *row[7:]])
+
+        # Approved purchase invoices
+        header_section = case((PurchaseInvoice.itc_eligible == False, "itc_ineligible"), else_="itc")
+        item_section = case(
+            (or_(PurchaseInvoice.itc_eligible == False, PurchaseInvoiceItem.itc_eligible == False), "itc_ineligible"),
+            else_="itc",
+        )
+        pos = func.coalesce(PurchaseInvoice.place_of_supply, "")
+        rcm = func.coalesce(PurchaseInvoice.is_reverse_charge, False)
+        year, month = periods(PurchaseInvoice.invoice_date)
+        purchases = [
+            PurchaseInvoice.company_id == company_id,
+            PurchaseInvoice.status.notin_(EXCLUDED_PURCHASE_STATUSES),
+            *dated(PurchaseInvoice.invoice_date),
+        ]
+        for row in self.db.query(
+            year, month, header_section, pos, rcm,
+            func.count(PurchaseInvoice.id), func.sum(PurchaseInvoice.total_amount),
+            func.sum(PurchaseInvoice.subtotal), func.sum(PurchaseInvoice.igst_amount),
+            func.sum(PurchaseInvoice.cgst_amount), func.sum(PurchaseInvoice.sgst_amount),
+            func.sum(PurchaseInvoice.cess_amount),
+        ).filter(*purchases).group_by(year, month, header_section, pos, rcm):
+            _add(rows, f"{int(row[1]):02d}{int(row[0])}", _key("document", row[2], row[3], rcm=row[4]),
+                 [row[5], 0, *row[6:]])
+
+        for row in self.db.query(
+            year, month, item_section, pos, PurchaseInvoiceItem.gst_rate, PurchaseInvoiceItem.hsn_code, rcm,
+            func.sum(PurchaseInvoiceItem.quantity), func.sum(PurchaseInvoiceItem.total_amount),
+            func.sum(PurchaseInvoiceItem.taxable_amount), func.sum(PurchaseInvoiceItem.igst_amount),
+            func.sum(PurchaseInvoiceItem.cgst_amount), func.sum(PurchaseInvoiceItem.sgst_amount),
+            func.sum(PurchaseInvoiceItem.cess_amount),
+        ).join(PurchaseInvoice, PurchaseInvoice.id == PurchaseInvoiceItem.purchase_invoice_id).filter(
+            *purchases
+        ).group_by(
+            year, month, item_section, pos, PurchaseInvoiceItem.gst_rate, PurchaseInvoiceItem.hsn_code, rcm
+        ):
+            _add(rows, f"{int(row[1]):02d}{int(row[0])}", _key("item", row[2], row[3], row[4], row[5], row[6]),
+                 [0, *row[7:]])
+
+        # Debit notes (sales returns) and credit notes (purchase returns), from their vouchers
+        year, month = periods(Transaction.transaction_date)
+        for voucher_type, note_section, model, party_code, base_code, tax_codes, side in (
+            (VoucherType.DEBIT_NOTE, "sales_return", Invoice, RECEIVABLES_CODE, SALES_CODE,
+             OUTPUT_TAX_CODES, TransactionEntry.debit_amount),
+            (VoucherType.CREDIT_NOTE, "purchase_return", PurchaseInvoice, PAYABLES_CODE, PURCHASES_CODE,
+             INPUT_TAX_CODES, TransactionEntry.credit_amount),
+        ):
+            def posted(code, column=side):
+                return func.sum(case((Account.code == code, column), else_=0))
+
+            other_side = TransactionEntry.credit_amount if side is TransactionEntry.debit_amount else TransactionEntry.debit_amount
+            note_pos = func.coalesce(model.place_of_supply, "")
+            for row in self.db.query(
+                year, month, note_pos,
+                func.count(func.distinct(Transaction.id)),
+                posted(party_code, other_side),
+                posted(base_code),
+                *[posted(tax_codes[field]) for field in ("igst_amount", "cgst_amount", "sgst_amount")],
+            ).join(TransactionEntry, TransactionEntry.transaction_id == Transaction.id).join(
+                Account, Account.id == TransactionEntry.account_id
+            ).outerjoin(model, model.id == Transaction.reference_id).filter(
+                Transaction.company_id == company_id,
+                Transaction.voucher_type == voucher_type,
+                Transaction.status == TransactionStatus.POSTED,
+                *dated(Transaction.transaction_date),
+            ).group_by(year, month, note_pos):
+                _add(rows, f"{int(row[1]):02d}{int(row[0])}", _key("document", note_section, row[2]),
+                     [row[3], 0, *row[4:], 0])
+
+        return rows
+
+    def _load(self, company_id: str, periods: Optional[List[str]] = None) -> Rows:
+        query = self.db.query(GSTReturnLedger).filter(GSTReturnLedger.company_id == company_id)
+        if periods is not None:
+            query = query.filter(GSTReturnLedger.return_period.in_(periods))
+        rows: Rows = {}
+        for row in query:
+            key = _key(row.line_type, row.section, row.place_of_supply, row.gst_rate, row.hsn_code,
+                       row.is_reverse_charge)
+            _add(rows, row.return_period, key, [getattr(row, field) for field in AMOUNT_FIELDS])
+        return rows
+
+    def rebuild(self, company_id: str) -> int:
+        """Drop and recompute the ledger of a company. Returns rows written."""
+        state_code = self.db.query(Company.state_code).filter(Company.id == company_id).scalar()
+        rows = self.compute(company_id, state_code)
+
+        self.db.query(GSTReturnLedger).filter(
+            GSTReturnLedger.company_id == company_id
+        ).delete(synchronize_session=False)
+
+        now = datetime.utcnow()
+        if rows:
+            self.db.execute(insert(GSTReturnLedger), [
+                {
+                    "company_id": company_id,
+                    "return_period": period,
+                    "updated_at": now,
+                    **dict(zip(KEY_FIELDS, key)),
+                    **_amounts(values),
+                }
+                for (period, key), values in rows.items()
+            ])
+        self.db.commit()
+        return len(rows)
+
+    def check_consistency(self, company_id: str) -> Dict[str, Any]:
+        """Compare the stored ledger against a full recompute, row by row."""
+        state_code = self.db.query(Company.state_code).filter(Company.id == company_id).scalar()
+        expected = self.compute(company_id, state_code)
+        stored = self._load(company_id)
+
+        zero = [Decimal("0")] * len(AMOUNT_FIELDS)
+        mismatches = []
+        for period, key in sorted(set(expected) | set(stored), key=lambda k: (k[0][2:], k[0][:2], str(k[1]))):
+            exp = [_dec(v, THREE_PLACES) for v in expected.get((period, key), zero)]
+            got = [_dec(v, THREE_PLACES) for v in stored.get((period, key), zero)]
+            if exp != got:
+                mismatches.append({
+                    "return_period": period,
+                    **dict(zip(KEY_FIELDS, key)),
+                    "expected": dict(zip(AMOUNT_FIELDS, exp)),
+                    "stored": dict(zip(AMOUNT_FIELDS, got)),
+                })
+
+        return {
+            "is_consistent": not mismatches,
+            "ledger_rows": len(stored),
+            "mismatches": mismatches,
+        }
+
+    # ============== Reading ==============
+
+    def get_totals(
+        self,
+        company: Company,
+        start: datetime,
+        end: datetime,
+    ) -> Dict[Key, Dict[str, Decimal]]:
+        """
+        Totals per key (all periods summed) for documents dated in [start, end).
+        Whole months are read from the ledger in one grouped query when it is
+        enabled; otherwise the range is recomputed from source documents.
+        """
+        periods = whole_months(start, end)
+        totals: Dict[Key, List[Decimal]] = defaultdict(lambda: [Decimal("0")] * len(AMOUNT_FIELDS))
+
+        if self.is_enabled() and periods:
+            columns = [getattr(GSTReturnLedger, field) for field in KEY_FIELDS]
+            for row in self.db.query(
+                *columns, *[func.sum(getattr(GSTReturnLedger, field)) for field in AMOUNT_FIELDS]
+            ).filter(
+                GSTReturnLedger.company_id == company.id,
+                GSTReturnLedger.return_period.in_(periods),
+            ).group_by(*columns):
+                key = _key(*row[:len(KEY_FIELDS)])
+                totals[key] = [a + Decimal(str(b or 0)) for a, b in zip(totals[key], row[len(KEY_FIELDS):])]
+        else:
+            for (_, key), values in self.compute(company.id, company.state_code, start, end).items():
+                totals[key] = [a + b for a, b in zip(totals[key], values)]
+
+        return {
+            key: {
+                field: (int(value) if field == "document_count" else _dec(value, THREE_PLACES if field == "quantity" else TWO_PLACES))
+                for field, value in zip(AMOUNT_FIELDS, values)
+            }
+            for key, values in totals.items()
+        }
+
+    @staticmethod
+    def sum_totals(
+        totals: Dict[Key, Dict[str, Decimal]],
+        sections: Iterable[str],
+        line_type: str = "document",
+        **match,
+    ) -> Dict[str, Decimal]:
+        """Add up get_totals() rows of a line type and sections, optionally filtered by key fields."""
+        match["line_type"] = line_type
+        sections = set(sections)
+        result = {field: (0 if field == "document_count" else Decimal("0")) for field in AMOUNT_FIELDS}
+        for key, values in totals.items():
+            fields = dict(zip(KEY_FIELDS, key))
+            if fields["section"] not in sections:
+                continue
+            if any(fields[name] != value for name, value in match.items()):
+                continue
+            for field in AMOUNT_FIELDS:
+                result[field] += values[field]
+        return result
@@ -0,0 +1,367 @@
+"""GSTR-1 builder - one set-based aggregation shared by the GSTR-1 report and JSON export.
+
+Outward supplies of a month are classified per invoice with a SQL CASE:
+
+- exp:  export / SEZ invoices
+- b2b:  B2B invoices or customers with a GSTIN (Customer.tax_number)
+- b2cl: unregistered, inter-state and above B2CL_LIMIT
+- b2cs: everything else
+
+Section totals and the document summary come from one grouped query on
+invoices, the B2CS (place of supply x rate) and HSN (HSN x UQC) tables from
+GROUP BYs over invoice items joined to invoices, and the invoice-wise
+sections (B2B, B2CL, exports) from one query with the customer joined plus
+one query for their items. GSTService.generate_gstr1 and
+GSTRJsonService.generate_gstr1_json only format the result.
+
+For very large periods, build(with_invoices=False) skips the invoice-wise
+sections and iter_invoices() streams them instead: one invoice x item
+query read STREAM_BATCH_SIZE rows at a time, yielding one StreamedInvoice
+at a time in portal grouping order. GSTRJsonService.iter_gstr1_json writes
+the portal JSON from it.
+"""
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import and_, case, func, or_, select
+from sqlalchemy.orm import Session, contains_eager
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.database.models import Customer, Invoice, InvoiceItem, InvoiceStatus, InvoiceType
+
+B2CL_LIMIT = Decimal("250000")
+
+# Invoices that are not outward supplies
+EXCLUDED_STATUSES = [InvoiceStatus.DRAFT, InvoiceStatus.CANCELLED, InvoiceStatus.VOID]
+
+SECTIONS = ("b2b", "b2cl", "b2cs", "exp")
+
+# Invoice x item rows fetched per round trip by iter_invoices
+STREAM_BATCH_SIZE = 2000
+
+TWO_PLACES = Decimal("0.01")
+THREE_PLACES = Decimal("0.001")
+
+
+def _dec(value, places: Decimal = TWO_PLACES) -> Decimal:
+    """SQL sums come back as Decimal or float depending on the database."""
+    return Decimal(str(value or 0)).quantize(places)
+
+
+def period_bounds(month: int, year: int):
+    start_date = datetime(year, month, 1)
+    if month == 12:
+        end_date = datetime(year + 1, 1, 1)
+    else:
+        end_date = datetime(year, month + 1, 1)
+    return start_date, end_date
+
+
+def classify_invoice(
+    invoice_type: Optional[InvoiceType],
+    gstin: Optional[str],
+    total_amount,
+    place_of_supply: Optional[str],
+    state_code: Optional[str],
+) -> str:
+    """GSTR-1 section of one invoice; the Python twin of GSTR1Builder._section."""
+    if invoice_type in (InvoiceType.EXPORT, InvoiceType.SEZ):
+        return "exp"
+    if invoice_type == InvoiceType.B2B or gstin:
+        return "b2b"
+    if Decimal(str(total_amount or 0)) > B2CL_LIMIT and (place_of_supply or "") != (state_code or ""):
+        return "b2cl"
+    return "b2cs"
+
+
+@dataclass
+class GSTR1Data:
+    """Aggregated GSTR-1 figures of one return period."""
+    state_code: str
+    # Per section: invoice_count, invoice_value, taxable_value, igst/cgst/sgst/cess_amount
+    sections: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    # All sections together, plus nil_rated_value, from_serial and to_serial
+    totals: Dict[str, Any] = field(default_factory=dict)
+    # Invoice-wise sections: ORM invoices with customer and items populated
+    invoices: Dict[str, List[Invoice]] = field(default_factory=dict)
+    b2cs: List[Dict[str, Any]] = field(default_factory=list)
+    hsn: List[Dict[str, Any]] = field(default_factory=list)
+
+    @staticmethod
+    def gstin_of(invoice: Invoice) -> str:
+        return (invoice.customer.tax_number or "") if invoice.customer else ""
+
+
+@dataclass
+class _StreamedItem:
+    taxable_amount: Decimal
+    gst_rate: Decimal
+    igst_amount: Decimal
+    cgst_amount: Decimal
+    sgst_amount: Decimal
+    cess_amount: Decimal
+
+
+@dataclass
+class StreamedInvoice:
+    """Invoice-wise section invoice from iter_invoices, with its items."""
+    invoice_number: str
+    invoice_date: datetime
+    total_amount: Decimal
+    place_of_supply: Optional[str]
+    is_reverse_charge: bool
+    igst_amount: Decimal
+    gstin: str
+    items: List[Any] = field(default_factory=list)
+
+
+class GSTR1Builder:
+    """Builds GSTR1Data for a company and month."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _section(self, state_code: Optional[str]):
+        """Section CASE; keep in step with classify_invoice."""
+        has_gstin = and_(Customer.tax_number.isnot(None), Customer.tax_number != "")
+        return case(
+            (Invoice.invoice_type.in_([InvoiceType.EXPORT, InvoiceType.SEZ]), "exp"),
+            (or_(Invoice.invoice_type == InvoiceType.B2B, has_gstin), "b2b"),
+            (and_(
+                Invoice.total_amount > B2CL_LIMIT,
+                func.coalesce(Invoice.place_of_supply, "") != (state_code or ""),
+            ), "b2cl"),
+            else_="b2cs",
+        )
+
+    def _period_filters(self, company_id: str, month: int, year: int):
+        start_date, end_date = period_bounds(month, year)
+        return [
+            Invoice.company_id == company_id,
+            Invoice.invoice_date >= start_date,
+            Invoice.invoice_date < end_date,
+            Invoice.status.notin_(EXCLUDED_STATUSES),
+        ]
+
+    def build(
+        self,
+        company_id: str,
+        state_code: Optional[str],
+        month: int,
+        year: int,
+        with_invoices: bool = True,
+    ) -> GSTR1Data:
+        """
+        Aggregate the month's outward supplies in a fixed number of queries.
+        Pass with_invoices=False to leave the invoice-wise sections empty
+        (stream them with iter_invoices).
+        """
+        section = self._section(state_code)
+        filters = self._period_filters(company_id, month, year)
+        data = GSTR1Data(state_code=state_code or "")
+
+        # Section totals, nil-rated value and invoice number range
+        rows = self.db.query(
+            section.label("section"),
+            func.count(Invoice.id),
+            func.sum(Invoice.total_amount),
+            func.sum(Invoice.subtotal),
+            func.sum(Invoice.igst_amount),
+            func.sum(Invoice.cgst_amount),
+            func.sum(Invoice.sgst_amount),
+            func.sum(Invoice.cess_amount),
+            func.sum(case((func.coalesce(Invoice.total_tax, 0) == 0, Invoice.total_amount), else_=0)),
+            func.min(Invoice.invoice_number),
+            func.max(Invoice.invoice_number),
+        ).outerjoin(Customer, Customer.id == Invoice.customer_id).filter(*filters).group_by(section).all()
+
+        keys = ["invoice_count", "invoice_value", "taxable_value",
+                "igst_amount", "cgst_amount", "sgst_amount", "cess_amount"]
+        totals = {key: Decimal("0") for key in keys[1:]}
+        totals.update(invoice_count=0, nil_rated_value=Decimal("0"), from_serial=None, to_serial=None)
+        for name in SECTIONS:
+            data.sections[name] = {key: Decimal("0") for key in keys[1:]}
+            data.sections[name]["invoice_count"] = 0
+        for row in rows:
+            figures = data.sections[row[0]]
+            figures["invoice_count"] = row[1]
+            for key, value in zip(keys[1:], row[2:8]):
+                figures[key] = _dec(value)
+                totals[key] += figures[key]
+            totals["invoice_count"] += row[1]
+            totals["nil_rated_value"] += _dec(row[8])
+            if totals["from_serial"] is None or row[9] < totals["from_serial"]:
+                totals["from_serial"] = row[9]
+            if totals["to_serial"] is None or row[10] > totals["to_serial"]:
+                totals["to_serial"] = row[10]
+        data.totals = totals
+
+        # B2CS: place of supply x rate over items of B2CS invoices
+        pos = func.coalesce(Invoice.place_of_supply, state_code or "")
+        rows = self.db.query(
+            pos.label("pos"),
+            InvoiceItem.gst_rate,
+            func.sum(InvoiceItem.taxable_amount),
+            func.sum(InvoiceItem.igst_amount),
+            func.sum(InvoiceItem.cgst_amount),
+            func.sum(InvoiceItem.sgst_amount),
+            func.sum(InvoiceItem.cess_amount),
+        ).join(Invoice, Invoice.id == InvoiceItem.invoice_id).outerjoin(
+            Customer, Customer.id == Invoice.customer_id
+        ).filter(*filters, section == "b2cs").group_by(pos, InvoiceItem.gst_rate).order_by(
+            pos, InvoiceItem.gst_rate
+        ).all()
+        data.b2cs = [
+            {
+                "place_of_supply": row[0],
+                "gst_rate": _dec(row[1]),
+                "taxable_value": _dec(row[2]),
+                "igst_amount": _dec(row[3]),
+                "cgst_amount": _dec(row[4]),
+                "sgst_amount": _dec(row[5]),
+                "cess_amount": _dec(row[6]),
+            }
+            for row in rows
+        ]
+
+        # HSN: HSN code x unit over items of every invoice
+        rows = self.db.query(
+            InvoiceItem.hsn_code,
+            InvoiceItem.unit,
+            func.max(InvoiceItem.description),
+            func.sum(InvoiceItem.quantity),
+            func.sum(InvoiceItem.total_amount),
+            func.sum(InvoiceItem.taxable_amount),
+            func.sum(InvoiceItem.igst_amount),
+            func.sum(InvoiceItem.cgst_amount),
+            func.sum(InvoiceItem.sgst_amount),
+            func.sum(InvoiceItem.cess_amount),
+        ).join(Invoice, Invoice.id == InvoiceItem.invoice_id).filter(*filters).group_by(
+            InvoiceItem.hsn_code, InvoiceItem.unit
+        ).order_by(InvoiceItem.hsn_code, InvoiceItem.unit).all()
+        data.hsn = [
+            {
+                "hsn_code": row[0],
+                "unit": row[1],
+                "description": (row[2] or "")[:50],
+                "total_quantity": _dec(row[3], THREE_PLACES),
+                "total_value": _dec(row[4]),
+                "taxable_value": _dec(row[5]),
+                "igst_amount": _dec(row[6]),
+                "cgst_amount": _dec(row[7]),
+                "sgst_amount": _dec(row[8]),
+                "cess_amount": _dec(row[9]),
+            }
+            for row in rows
+        ]
+
+        if not with_invoices:
+            data.invoices = {name: [] for name in ("b2b", "b2cl", "exp")}
+            return data
+        
+        # Invoice-wise sections: headers with the customer joined, then all
+        # their items in a single query (selectinload would batch per 500)
+        invoices = defaultdict(list)
+        query = self.db.query(Invoice, section).outerjoin(
+            Customer, Customer.id == Invoice.customer_id
+        ).options(contains_eager(Invoice.customer)).filter(
+            *filters, section != "b2cs"
+        ).order_by(Invoice.invoice_date, Invoice.invoice_number)
+        for invoice, name in query:
+            invoices[name].append(invoice)
+
+        items = defaultdict(list)
+        for item in self.db.query(InvoiceItem).join(
+            Invoice, Invoice.id == InvoiceItem.invoice_id
+        ).outerjoin(Customer, Customer.id == Invoice.customer_id).filter(
+            *filters, section != "b2cs"
+        ).order_by(InvoiceItem.invoice_id, InvoiceItem.created_at, InvoiceItem.id):
+            items[item.invoice_id].append(item)
+        for section_invoices in invoices.values():
+            for invoice in section_invoices:
+                set_committed_value(invoice, "items", items.get(invoice.id, []))
+
+        data.invoices = {name: invoices.get(name, []) for name in ("b2b", "b2cl", "exp")}
+
+        return data
+
+    def iter_invoices(
+        self,
+        company_id: str,
+        state_code: Optional[str],
+        month: int,
+        year: int,
+        section: str,
+    ) -> Iterator[StreamedInvoice]:
+        """
+        Stream the invoices of an invoice-wise section ('b2b', 'b2cl' or
+        'exp') with their items, grouped the way the portal JSON nests them:
+        B2B by customer GSTIN, B2CL by place of supply, exports with IGST
+        paid first; by date and number within a group. Reads one
+        invoice x item query STREAM_BATCH_SIZE rows at a time and holds a
+        single invoice in memory.
+        """
+        gstin = func.coalesce(Customer.tax_number, "")
+        group = {
+            "b2b": gstin,
+            "b2cl": func.coalesce(Invoice.place_of_supply, ""),
+            "exp": case((Invoice.igst_amount > 0, 0), else_=1),
+        }[section]
+        
+        query = select(
+            Invoice.id,
+            Invoice.invoice_number,
+            Invoice.invoice_date,
+            Invoice.total_amount,
+            Invoice.place_of_supply,
+            Invoice.is_reverse_charge,
+            Invoice.igst_amount,
+            gstin.label("gstin"),
+            InvoiceItem.id.label("item_id"),
+            InvoiceItem.taxable_amount,
+            InvoiceItem.gst_rate,
+            InvoiceItem.igst_amount.label("item_igst_amount"),
+            InvoiceItem.cgst_amount,
+            InvoiceItem.sgst_amount,
+            InvoiceItem.cess_amount,
+        ).select_from(Invoice).outerjoin(
+            Customer, Customer.id == Invoice.customer_id
+        ).outerjoin(
+            InvoiceItem, InvoiceItem.invoice_id == Invoice.id
+        ).where(
+            *self._period_filters(company_id, month, year),
+            self._section(state_code) == section,
+        ).order_by(
+            group, Invoice.invoice_date, Invoice.invoice_number, Invoice.id,
+            InvoiceItem.created_at, InvoiceItem.id,
+        ).execution_options(yield_per=STREAM_BATCH_SIZE)
+        
+        current, current_id = None, None
+        for row in self.db.execute(query):
+            if row.id != current_id:
+                if current is not None:
+                    yield current
+                current_id = row.id
+                current = StreamedInvoice(
+                    invoice_number=row.invoice_number,
+                    invoice_date=row.invoice_date,
+                    total_amount=row.total_amount,
+                    place_of_supply=row.place_of_supply,
+                    is_reverse_charge=bool(row.is_reverse_charge),
+                    igst_amount=row.igst_amount,
+                    gstin=row.gstin,
+                )
+            if row.item_id is not None:
+                current.items.append(_StreamedItem(
+                    taxable_amount=row.taxable_amount,
+                    gst_rate=row.gst_rate,
+                    igst_amount=row.item_igst_amount,
+                    cgst_amount=row.cgst_amount,
+                    sgst_amount=row.sgst_amount,
+                    cess_amount=row.cess_amount,
+                ))
+        if current is not None:
+            yield current
@@ -2,17 +2,24 @@
 GSTR JSON Export Service - Generate GSTR-1 and GSTR-3B JSON files.
 
 Features:
-- GSTR-1 JSON generation (B2B, B2C, CDN, exports)
+- GSTR-1 JSON generation (B2B, B2C, CDN, exports), in memory or streamed
 - GSTR-3B JSON generation
 - HSN summary
 """
 from decimal import Decimal, ROUND_HALF_UP
-from typing import List, Dict, Optional
+from typing import Callable, Iterable, Iterator, List, Dict, Optional
 from datetime import datetime
+import json
+import os
+import tempfile
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
-from app.database.models import Invoice, InvoiceItem, PurchaseInvoice, Customer
+from app.database.models import Company, Invoice, PurchaseInvoice
+from app.services.gstr1_builder import GSTR1Builder, GSTR1Data
+
+# Characters of JSON handed to the response (or file) per chunk
+GSTR1_JSON_CHUNK_SIZE = 64 * 1024
 
 
 class GSTRJsonService:
@@ -32,23 +39,13 @@ class GSTRJsonService:
         return_period: str,  # "012024" for January 2024
         gstin: str,
     ) -> Dict:
-        """Generate GSTR-1 JSON file structure."""
+        """Generate GSTR-1 JSON file structure from the shared GSTR-1 aggregation."""
         # Parse period
         month = int(return_period[:2])
         year = int(return_period[2:])
         
-        start_date = datetime(year, month, 1)
-        if month == 12:
-            end_date = datetime(year + 1, 1, 1)
-        else:
-            end_date = datetime(year, month + 1, 1)
-        
-        # Get invoices for the period
-        invoices = self.db.query(Invoice).filter(
-            Invoice.company_id == company_id,
-            Invoice.invoice_date >= start_date,
-            Invoice.invoice_date < end_date,
-        ).all()
+        state_code = self.db.query(Company.state_code).filter(Company.id == company_id).scalar()
+        data = GSTR1Builder(self.db).build(company_id, state_code, month, year)
         
         # Build JSON structure
         gstr1 = {
@@ -56,269 +53,260 @@ class GSTRJsonService:
             "fp": return_period,
             "version": "GST3.0.4",
             "hash": "hash",
-            "b2b": self._build_b2b(invoices),
-            "b2cl": self._build_b2cl(invoices),
-            "b2cs": self._build_b2cs(invoices),
-            "cdnr": self._build_cdnr(invoices),
-            "exp": self._build_exports(invoices),
-            "hsn": self._build_hsn_summary(invoices),
-            "nil": self._build_nil_supplies(invoices),
-            "doc_issue": self._build_doc_issue(invoices),
+            "b2b": self._build_b2b(data),
+            "b2cl": self._build_b2cl(data),
+            "b2cs": self._build_b2cs(data),
+            "cdnr": self._build_cdnr(data),
+            "exp": self._build_exports(data),
+            "hsn": self._build_hsn_summary(data),
+            "nil": self._build_nil_supplies(data),
+            "doc_issue": self._build_doc_issue(data),
         }
         
         return gstr1
     
-    def _build_b2b(self, invoices: List[Invoice]) -> List[Dict]:
-        """Build B2B (Business to Business) section."""
-        b2b_invoices = [inv for inv in invoices if inv.customer and inv.customer.gstin]
+    # ============== Streaming GSTR-1 ==============
+    
+    def iter_gstr1_json(
+        self,
+        company_id: str,
+        return_period: str,
+        gstin: str,
+    ) -> Iterator[str]:
+        """
+        Stream the same GSTR-1 JSON as generate_gstr1_json in chunks of about
+        GSTR1_JSON_CHUNK_SIZE characters. Summary sections come from the
+        aggregation; B2B, B2CL and export invoices are streamed from
+        GSTR1Builder.iter_invoices one invoice at a time, so memory stays
+        flat however many invoices the period has. B2B and B2CL groups come
+        out ordered by GSTIN / place of supply.
+        """
+        month = int(return_period[:2])
+        year = int(return_period[2:])
         
+        state_code = self.db.query(Company.state_code).filter(Company.id == company_id).scalar()
+        builder = GSTR1Builder(self.db)
+        data = builder.build(company_id, state_code, month, year, with_invoices=False)
+        
+        def invoices(section: str):
+            return builder.iter_invoices(company_id, state_code, month, year, section)
+        
+        def pieces():
+            header = {"gstin": gstin, "fp": return_period, "version": "GST3.0.4", "hash": "hash"}
+            yield json.dumps(header)[:-1]
+            yield ', "b2b": '
+            yield from self._stream_groups(
+                invoices("b2b"), "ctin", lambda inv: inv.gstin,
+                lambda inv: self._b2b_invoice(inv, data.state_code),
+            )
+            yield ', "b2cl": '
+            yield from self._stream_groups(
+                invoices("b2cl"), "pos", lambda inv: inv.place_of_supply or "", self._b2cl_invoice,
+            )
+            yield ', "b2cs": ' + json.dumps(self._build_b2cs(data))
+            yield ', "cdnr": ' + json.dumps(self._build_cdnr(data))
+            yield ', "exp": '
+            yield from self._stream_groups(
+                invoices("exp"), "exp_typ", self._export_type, self._export_invoice,
+            )
+            yield ', "hsn": ' + json.dumps(self._build_hsn_summary(data))
+            yield ', "nil": ' + json.dumps(self._build_nil_supplies(data))
+            yield ', "doc_issue": ' + json.dumps(self._build_doc_issue(data))
+            yield '}'
+        
+        buffer, size = [], 0
+        for piece in pieces():
+            buffer.append(piece)
+            size += len(piece)
+            if size >= GSTR1_JSON_CHUNK_SIZE:
+                yield ''.join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield ''.join(buffer)
+    
+    def _stream_groups(
+        self,
+        invoices: Iterable,
+        key_name: str,
+        key_of: Callable,
+        entry_of: Callable,
+    ) -> Iterator[str]:
+        """JSON array of {key_name: key, "inv": [...]} groups from invoices sorted by key."""
+        yield '['
+        current = None
+        for inv in invoices:
+            key = key_of(inv)
+            if current is None or key != current[0]:
+                if current is not None:
+                    yield ']}, '
+                yield '{' + json.dumps(key_name) + ': ' + json.dumps(key) + ', "inv": ['
+                current = (key,)
+            else:
+                yield ', '
+            yield json.dumps(entry_of(inv))
+        if current is not None:
+            yield ']}'
+        yield ']'
+    
+    def write_gstr1_json(
+        self,
+        company_id: str,
+        return_period: str,
+        gstin: str,
+        path: Optional[str] = None,
+    ) -> str:
+        """
+        Write the streamed GSTR-1 JSON to path (a new temporary file when
+        omitted) and return the path. The caller removes temporary files.
+        """
+        if path is None:
+            handle, path = tempfile.mkstemp(prefix=f"GSTR1_{gstin}_{return_period}_", suffix=".json")
+            os.close(handle)
+        with open(path, "w", encoding="utf-8") as f:
+            for chunk in self.iter_gstr1_json(company_id, return_period, gstin):
+                f.write(chunk)
+        return path
+    
+    def _build_b2b(self, data: GSTR1Data) -> List[Dict]:
+        """Build B2B (Business to Business) section."""
         # Group by customer GSTIN
         by_gstin = {}
-        for inv in b2b_invoices:
-            gstin = inv.customer.gstin
-            if gstin not in by_gstin:
-                by_gstin[gstin] = []
-            by_gstin[gstin].append(inv)
+        for inv in data.invoices["b2b"]:
+            by_gstin.setdefault(data.gstin_of(inv), []).append(inv)
         
-        result = []
-        for gstin, inv_list in by_gstin.items():
-            customer_invoices = []
-            for inv in inv_list:
-                customer_invoices.append({
-                    "inum": inv.invoice_number,
-                    "idt": inv.invoice_date.strftime("%d-%m-%Y"),
-                    "val": self._round(inv.total_amount),
-                    "pos": inv.place_of_supply or "27",
-                    "rchrg": "Y" if inv.is_reverse_charge else "N",
-                    "inv_typ": "R",
-                    "itms": self._build_invoice_items(inv),
-                })
-            
-            result.append({
+        return [
+            {
                 "ctin": gstin,
-                "inv": customer_invoices,
-            })
-        
-        return result
-    
-    def _build_b2cl(self, invoices: List[Invoice]) -> List[Dict]:
-        """Build B2C Large (>2.5L) section."""
-        b2cl_invoices = [
-            inv for inv in invoices 
-            if not (inv.customer and inv.customer.gstin)
-            and inv.total_amount >= 250000
-            and inv.place_of_supply
+                "inv": [self._b2b_invoice(inv, data.state_code) for inv in inv_list],
+            }
+            for gstin, inv_list in by_gstin.items()
         ]
-        
+    
+    def _b2b_invoice(self, inv, state_code: str) -> Dict:
+        return {
+            "inum": inv.invoice_number,
+            "idt": inv.invoice_date.strftime("%d-%m-%Y"),
+            "val": self._round(inv.total_amount),
+            "pos": inv.place_of_supply or state_code,
+            "rchrg": "Y" if inv.is_reverse_charge else "N",
+            "inv_typ": "R",
+            "itms": self._build_invoice_items(inv),
+        }
+    
+    def _build_b2cl(self, data: GSTR1Data) -> List[Dict]:
+        """Build B2C Large (>2.5L inter-state) section."""
         by_pos = {}
-        for inv in b2cl_invoices:
-            pos = inv.place_of_supply
-            if pos not in by_pos:
-                by_pos[pos] = []
-            by_pos[pos].append(inv)
+        for inv in data.invoices["b2cl"]:
+            by_pos.setdefault(inv.place_of_supply or "", []).append(inv)
         
-        result = []
-        for pos, inv_list in by_pos.items():
-            inv_details = []
-            for inv in inv_list:
-                inv_details.append({
-                    "inum": inv.invoice_number,
-                    "idt": inv.invoice_date.strftime("%d-%m-%Y"),
-                    "val": self._round(inv.total_amount),
-                    "itms": self._build_invoice_items(inv),
-                })
-            
-            result.append({
-                "pos": pos,
-                "inv": inv_details,
-            })
-        
-        return result
+        return [
+            {"pos": pos, "inv": [self._b2cl_invoice(inv) for inv in inv_list]}
+            for pos, inv_list in by_pos.items()
+        ]
+    
+    def _b2cl_invoice(self, inv) -> Dict:
+        return {
+            "inum": inv.invoice_number,
+            "idt": inv.invoice_date.strftime("%d-%m-%Y"),
+            "val": self._round(inv.total_amount),
+            "itms": self._build_invoice_items(inv),
+        }
     
-    def _build_b2cs(self, invoices: List[Invoice]) -> List[Dict]:
-        """Build B2C Small (<2.5L) section - summary by rate."""
-        b2cs_invoices = [
-            inv for inv in invoices 
-            if not (inv.customer and inv.customer.gstin)
-            and inv.total_amount < 250000
+    def _build_b2cs(self, data: GSTR1Data) -> List[Dict]:
+        """Build B2C Small section - summary by place of supply and rate."""
+        return [
+            {
+                "pos": row["place_of_supply"],
+                "rt": float(row["gst_rate"]),
+                "sply_ty": "INTRA" if row["place_of_supply"] == data.state_code else "INTER",
+                "txval": self._round(row["taxable_value"]),
+                "camt": self._round(row["cgst_amount"]),
+                "samt": self._round(row["sgst_amount"]),
+                "iamt": self._round(row["igst_amount"]),
+                "csamt": self._round(row["cess_amount"]),
+            }
+            for row in data.b2cs
         ]
-        
-        # Group by GST rate and place of supply
-        summary = {}
-        for inv in b2cs_invoices:
-            for item in inv.items:
-                key = (inv.place_of_supply or "27", float(item.gst_rate))
-                if key not in summary:
-                    summary[key] = {
-                        "pos": key[0],
-                        "rt": key[1],
-                        "sply_ty": "INTRA" if inv.place_of_supply == "27" else "INTER",
-                        "txval": Decimal('0'),
-                        "camt": Decimal('0'),
-                        "samt": Decimal('0'),
-                        "iamt": Decimal('0'),
-                        "csamt": Decimal('0'),
-                    }
-                
-                summary[key]["txval"] += item.taxable_amount or Decimal('0')
-                summary[key]["camt"] += item.cgst_amount or Decimal('0')
-                summary[key]["samt"] += item.sgst_amount or Decimal('0')
-                summary[key]["iamt"] += item.igst_amount or Decimal('0')
-                summary[key]["csamt"] += item.cess_amount or Decimal('0')
-        
-        result = []
-        for data in summary.values():
-            result.append({
-                "pos": data["pos"],
-                "rt": data["rt"],
-                "sply_ty": data["sply_ty"],
-                "txval": self._round(data["txval"]),
-                "camt": self._round(data["camt"]),
-                "samt": self._round(data["samt"]),
-                "iamt": self._round(data["iamt"]),
-                "csamt": self._round(data["csamt"]),
-            })
-        
-        return result
     
-    def _build_cdnr(self, invoices: List[Invoice]) -> List[Dict]:
-        """Build Credit/Debit Notes section."""
-        # Filter for credit/debit notes
-        cdn_invoices = [inv for inv in invoices if inv.invoice_type and 'note' in str(inv.invoice_type).lower()]
-        
-        # Group by customer GSTIN
-        by_gstin = {}
-        for inv in cdn_invoices:
-            if inv.customer and inv.customer.gstin:
-                gstin = inv.customer.gstin
-                if gstin not in by_gstin:
-                    by_gstin[gstin] = []
-                by_gstin[gstin].append(inv)
-        
-        result = []
-        for gstin, inv_list in by_gstin.items():
-            notes = []
-            for inv in inv_list:
-                notes.append({
-                    "ntty": "C",  # Credit note
-                    "nt_num": inv.invoice_number,
-                    "nt_dt": inv.invoice_date.strftime("%d-%m-%Y"),
-                    "val": self._round(inv.total_amount),
-                    "pos": inv.place_of_supply or "27",
-                    "rchrg": "N",
-                    "itms": self._build_invoice_items(inv),
-                })
-            
-            result.append({
-                "ctin": gstin,
-                "nt": notes,
-            })
-        
-        return result
+    def _build_cdnr(self, data: GSTR1Data) -> List[Dict]:
+        """
+        Build Credit/Debit Notes section. Notes are recorded as credit/debit
+        note vouchers, not invoices, so there is nothing to report here yet.
+        """
+        return []
     
-    def _build_exports(self, invoices: List[Invoice]) -> List[Dict]:
+    def _build_exports(self, data: GSTR1Data) -> List[Dict]:
         """Build Exports section."""
-        export_invoices = [
-            inv for inv in invoices 
-            if inv.invoice_type and inv.invoice_type.value in ['export', 'sez']
-        ]
-        
-        if not export_invoices:
-            return []
-        
         exp_with_pay = []
         exp_without_pay = []
         
-        for inv in export_invoices:
-            entry = {
-                "inum": inv.invoice_number,
-                "idt": inv.invoice_date.strftime("%d-%m-%Y"),
-                "val": self._round(inv.total_amount),
-                "sbnum": "",
-                "sbdt": inv.invoice_date.strftime("%d-%m-%Y"),
-                "itms": self._build_invoice_items(inv),
-            }
-            
-            if inv.igst_amount and inv.igst_amount > 0:
-                exp_with_pay.append(entry)
+        for inv in data.invoices["exp"]:
+            if self._export_type(inv) == "WPAY":
+                exp_with_pay.append(self._export_invoice(inv))
             else:
-                exp_without_pay.append(entry)
+                exp_without_pay.append(self._export_invoice(inv))
         
-        return [
-            {"exp_typ": "WPAY", "inv": exp_with_pay} if exp_with_pay else None,
-            {"exp_typ": "WOPAY", "inv": exp_without_pay} if exp_without_pay else None,
-        ]
+        result = []
+        if exp_with_pay:
+            result.append({"exp_typ": "WPAY", "inv": exp_with_pay})
+        if exp_without_pay:
+            result.append({"exp_typ": "WOPAY", "inv": exp_without_pay})
+        return result
     
-    def _build_hsn_summary(self, invoices: List[Invoice]) -> Dict:
-        """Build HSN Summary section."""
-        hsn_data = {}
-        
-        for inv in invoices:
-            for item in inv.items:
-                hsn = item.hsn_code or "0"
-                if hsn not in hsn_data:
-                    hsn_data[hsn] = {
-                        "hsn_sc": hsn,
-                        "desc": "",
-                        "uqc": item.unit or "NOS",
-                        "qty": Decimal('0'),
-                        "val": Decimal('0'),
-                        "txval": Decimal('0'),
-                        "iamt": Decimal('0'),
-                        "camt": Decimal('0'),
-                        "samt": Decimal('0'),
-                        "csamt": Decimal('0'),
-                    }
-                
-                hsn_data[hsn]["qty"] += item.quantity or Decimal('0')
-                hsn_data[hsn]["val"] += item.total_amount or Decimal('0')
-                hsn_data[hsn]["txval"] += item.taxable_amount or Decimal('0')
-                hsn_data[hsn]["iamt"] += item.igst_amount or Decimal('0')
-                hsn_data[hsn]["camt"] += item.cgst_amount or Decimal('0')
-                hsn_data[hsn]["samt"] += item.sgst_amount or Decimal('0')
-                hsn_data[hsn]["csamt"] += item.cess_amount or Decimal('0')
-        
-        data = []
-        for entry in hsn_data.values():
-            data.append({
-                "hsn_sc": entry["hsn_sc"],
-                "desc": entry["desc"],
-                "uqc": entry["uqc"],
-                "qty": self._round(entry["qty"]),
-                "val": self._round(entry["val"]),
-                "txval": self._round(entry["txval"]),
-                "iamt": self._round(entry["iamt"]),
-                "camt": self._round(entry["camt"]),
-                "samt": self._round(entry["samt"]),
-                "csamt": self._round(entry["csamt"]),
-            })
-        
-        return {"data": data}
+    @staticmethod
+    def _export_type(inv) -> str:
+        return "WPAY" if inv.igst_amount and inv.igst_amount > 0 else "WOPAY"
     
-    def _build_nil_supplies(self, invoices: List[Invoice]) -> Dict:
+    def _export_invoice(self, inv) -> Dict:
+        return {
+            "inum": inv.invoice_number,
+            "idt": inv.invoice_date.strftime("%d-%m-%Y"),
+            "val": self._round(inv.total_amount),
+            "sbnum": "",
+            "sbdt": inv.invoice_date.strftime("%d-%m-%Y"),
+            "itms": self._build_invoice_items(inv),
+        }
+    
+    def _build_hsn_summary(self, data: GSTR1Data) -> Dict:
+        """Build HSN Summary section (HSN x UQC)."""
+        return {
+            "data": [
+                {
+                    "num": i,
+                    "hsn_sc": row["hsn_code"] or "0",
+                    "desc": row["description"],
+                    "uqc": (row["unit"] or "NOS").upper(),
+                    "qty": self._round(row["total_quantity"]),
+                    "val": self._round(row["total_value"]),
+                    "txval": self._round(row["taxable_value"]),
+                    "iamt": self._round(row["igst_amount"]),
+                    "camt": self._round(row["cgst_amount"]),
+                    "samt": self._round(row["sgst_amount"]),
+                    "csamt": self._round(row["cess_amount"]),
+                }
+                for i, row in enumerate(data.hsn, start=1)
+            ]
+        }
+    
+    def _build_nil_supplies(self, data: GSTR1Data) -> Dict:
         """Build Nil/Exempt supplies section."""
-        nil_invoices = [inv for inv in invoices if inv.total_tax == 0]
-        
-        total = sum(inv.total_amount or Decimal('0') for inv in nil_invoices)
-        
         return {
             "inv": [
                 {
                     "sply_ty": "INTRB2B",
                     "expt_amt": 0,
-                    "nil_amt": self._round(total),
+                    "nil_amt": self._round(data.totals["nil_rated_value"]),
                     "ngsup_amt": 0,
                 }
             ]
         }
     
-    def _build_doc_issue(self, invoices: List[Invoice]) -> Dict:
+    def _build_doc_issue(self, data: GSTR1Data) -> Dict:
         """Build Document Issue Summary."""
-        if not invoices:
+        count = data.totals["invoice_count"]
+        if not count:
             return {"doc_det": []}
         
-        invoice_numbers = [inv.invoice_number for inv in invoices]
-        
         return {
             "doc_det": [
                 {
@@ -327,19 +315,19 @@ class GSTRJsonService:
                     "docs": [
                         {
                             "num": 1,
-                            "from": min(invoice_numbers) if invoice_numbers else "",
-                            "to": max(invoice_numbers) if invoice_numbers else "",
-                            "totnum": len(invoices),
+                            "from": data.totals["from_serial"],
+                            "to": data.totals["to_serial"],
+                            "totnum": count,
                             "cancel": 0,
-                            "net_issue": len(invoices),
+                            "net_issue": count,
                         }
                     ]
                 }
             ]
         }
     
-    def _build_invoice_items(self, invoice: Invoice) -> List[Dict]:
-        """Build items array for an invoice."""
+    def _build_invoice_items(self, invoice) -> List[Dict]:
+        """Build items array for an invoice (items are populated by the builder)."""
         items = []
         for item in invoice.items:
             items.append({
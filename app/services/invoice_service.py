@@ -1,6 +1,6 @@
 """Invoice service for business logic with GST calculations."""
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, case
 from typing import List, Optional, Tuple
 from datetime import datetime, date
 from decimal import Decimal, ROUND_HALF_UP
@@ -10,6 +10,8 @@ from app.database.models import (
 )
 from app.schemas.invoice import InvoiceCreate, InvoiceUpdate, InvoiceItemCreate
 from app.services.company_service import CompanyService
+from app.services.gst_return_ledger import GSTReturnLedgerService
+from app.services.dashboard_cache import dashboard_cache
 import qrcode
 import base64
 from io import BytesIO
@@ -367,6 +369,7 @@ class InvoiceService:
             stock_service = StockAllocationService(self.db)
             stock_service.restore_stock(invoice, reason=reason or status.value)
         
+        GSTReturnLedgerService(self.db).record_invoice_status(invoice, old_status)
         self.db.commit()
         self.db.refresh(invoice)
         return invoice
@@ -377,6 +380,7 @@ class InvoiceService:
             raise ValueError("Only draft invoices can be finalized")
         
         invoice.status = InvoiceStatus.PENDING
+        GSTReturnLedgerService(self.db).record_invoice_status(invoice, InvoiceStatus.DRAFT)
         self.db.commit()
         self.db.refresh(invoice)
         
@@ -403,9 +407,11 @@ class InvoiceService:
         stock_service = StockAllocationService(self.db)
         stock_service.restore_stock(invoice, reason=reason or "Cancelled")
         
+        old_status = invoice.status
         invoice.status = InvoiceStatus.CANCELLED
         if reason:
             invoice.notes = f"{invoice.notes or ''}\n\n[CANCELLED] {reason}".strip()
+        GSTReturnLedgerService(self.db).record_invoice_status(invoice, old_status)
         self.db.commit()
         self.db.refresh(invoice)
         return invoice
@@ -452,10 +458,12 @@ class InvoiceService:
         if invoice.status == InvoiceStatus.PAID and invoice.amount_paid > 0:
             raise ValueError("Cannot void a paid invoice. Use refund first, then void.")
         
+        old_status = invoice.status
         invoice.status = InvoiceStatus.VOID
         if reason:
             invoice.notes = f"{invoice.notes or ''}\n\n[VOIDED] {reason}".strip()
         
+        GSTReturnLedgerService(self.db).record_invoice_status(invoice, old_status)
         self.db.commit()
         self.db.refresh(invoice)
         return invoice
@@ -556,73 +564,69 @@ class InvoiceService:
         invoice.balance_due = total_amount - invoice.amount_paid
     
     def get_dashboard_summary(self, company: Company) -> dict:
-        """Get invoice summary for dashboard."""
+        """
+        Get invoice summary for dashboard.
+
+        All tiles come from one conditional aggregate over the company's
+        invoices and are cached for DASHBOARD_CACHE_TTL_SECONDS.
+        """
         from datetime import datetime, timedelta
         
         # Current month
         today = datetime.utcnow()
         first_of_month = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
         
-        # Total counts and amounts
-        total_invoices = self.db.query(Invoice).filter(
-            Invoice.company_id == company.id
-        ).count()
-        
-        # Revenue (paid invoices)
-        total_revenue = self.db.query(func.sum(Invoice.amount_paid)).filter(
-            Invoice.company_id == company.id
-        ).scalar() or Decimal("0")
-        
-        # Pending amount
-        total_pending = self.db.query(func.sum(Invoice.balance_due)).filter(
-            Invoice.company_id == company.id,
-            Invoice.status.in_([InvoiceStatus.PENDING, InvoiceStatus.PARTIALLY_PAID])
-        ).scalar() or Decimal("0")
-        
-        # Overdue
-        overdue_count = self.db.query(Invoice).filter(
-            Invoice.company_id == company.id,
-            Invoice.status == InvoiceStatus.OVERDUE
-        ).count()
-        
-        overdue_amount = self.db.query(func.sum(Invoice.balance_due)).filter(
-            Invoice.company_id == company.id,
-            Invoice.status == InvoiceStatus.OVERDUE
-        ).scalar() or Decimal("0")
-        
-        # Current month
-        current_month_revenue = self.db.query(func.sum(Invoice.total_amount)).filter(
-            Invoice.company_id == company.id,
-            Invoice.invoice_date >= first_of_month,
-            Invoice.status.in_([InvoiceStatus.PAID, InvoiceStatus.PARTIALLY_PAID, InvoiceStatus.PENDING])
-        ).scalar() or Decimal("0")
-        
-        current_month_invoices = self.db.query(Invoice).filter(
-            Invoice.company_id == company.id,
-            Invoice.invoice_date >= first_of_month
-        ).count()
-        
-        # GST totals
-        gst_totals = self.db.query(
-            func.sum(Invoice.cgst_amount).label('cgst'),
-            func.sum(Invoice.sgst_amount).label('sgst'),
-            func.sum(Invoice.igst_amount).label('igst')
+        key = dashboard_cache.key(company.id, "invoice_summary", first_of_month.date())
+        summary = dashboard_cache.get(key)
+        if summary is None:
+            summary = self._dashboard_totals(company, first_of_month)
+            dashboard_cache.set(key, summary)
+        return summary
+    
+    def _dashboard_totals(self, company: Company, first_of_month: datetime) -> dict:
+        def total(column, *conditions):
+            return func.sum(case((and_(*conditions), column), else_=0)) if conditions else func.sum(column)
+        
+        def count(*conditions):
+            return func.sum(case((and_(*conditions), 1), else_=0))
+        
+        pending = Invoice.status.in_([InvoiceStatus.PENDING, InvoiceStatus.PARTIALLY_PAID])
+        overdue = Invoice.status == InvoiceStatus.OVERDUE
+        this_month = Invoice.invoice_date >= first_of_month
+        not_cancelled = Invoice.status != InvoiceStatus.CANCELLED
+        
+        row = self.db.query(
+            func.count(Invoice.id).label("total_invoices"),
+            # Revenue (paid invoices)
+            total(Invoice.amount_paid).label("total_revenue"),
+            total(Invoice.balance_due, pending).label("total_pending"),
+            count(overdue).label("overdue_count"),
+            total(Invoice.balance_due, overdue).label("overdue_amount"),
+            total(
+                Invoice.total_amount, this_month,
+                Invoice.status.in_([InvoiceStatus.PAID, InvoiceStatus.PARTIALLY_PAID, InvoiceStatus.PENDING])
+            ).label("current_month_revenue"),
+            count(this_month).label("current_month_invoices"),
+            # GST totals
+            total(Invoice.cgst_amount, not_cancelled).label("cgst"),
+            total(Invoice.sgst_amount, not_cancelled).label("sgst"),
+            total(Invoice.igst_amount, not_cancelled).label("igst"),
         ).filter(
-            Invoice.company_id == company.id,
-            Invoice.status != InvoiceStatus.CANCELLED
-        ).first()
+            Invoice.company_id == company.id
+        ).one()
         
+        total_revenue = Decimal(row.total_revenue or 0)
         return {
-            "total_invoices": total_invoices,
+            "total_invoices": row.total_invoices,
             "total_revenue": total_revenue,
-            "total_pending": total_pending,
+            "total_pending": Decimal(row.total_pending or 0),
             "total_paid": total_revenue,
-            "overdue_count": overdue_count,
-            "overdue_amount": overdue_amount,
-            "current_month_revenue": current_month_revenue,
-            "current_month_invoices": current_month_invoices,
-            "total_cgst": gst_totals.cgst or Decimal("0"),
-            "total_sgst": gst_totals.sgst or Decimal("0"),
-            "total_igst": gst_totals.igst or Decimal("0"),
+            "overdue_count": row.overdue_count or 0,
+            "overdue_amount": Decimal(row.overdue_amount or 0),
+            "current_month_revenue": Decimal(row.current_month_revenue or 0),
+            "current_month_invoices": row.current_month_invoices or 0,
+            "total_cgst": Decimal(row.cgst or 0),
+            "total_sgst": Decimal(row.sgst or 0),
+            "total_igst": Decimal(row.igst or 0),
         }
 
@@ -405,6 +405,54 @@ class LeaveService:
             Attendance.leave_application_id == application.id
         ).delete()
     
+    def get_approved_leave_days(
+        self,
+        company_id: str,
+        month: int,
+        year: int,
+        employee_ids: Optional[List[str]] = None,
+    ) -> Dict[str, Dict[str, Decimal]]:
+        """
+        Approved leave days falling in a month, split into paid and unpaid.
+        
+        Returns {employee_id: {'paid': days, 'unpaid': days}} from one query
+        over the applications overlapping the month.
+        """
+        start_date = date(year, month, 1)
+        if month == 12:
+            end_date = date(year + 1, 1, 1) - timedelta(days=1)
+        else:
+            end_date = date(year, month + 1, 1) - timedelta(days=1)
+        
+        query = self.db.query(
+            LeaveApplication.employee_id,
+            LeaveApplication.from_date,
+            LeaveApplication.to_date,
+            LeaveApplication.is_half_day,
+            LeaveType.paid_leave,
+        ).join(
+            LeaveType, LeaveType.id == LeaveApplication.leave_type_id
+        ).filter(
+            LeaveApplication.company_id == company_id,
+            LeaveApplication.status == LeaveApplicationStatus.APPROVED,
+            LeaveApplication.from_date <= end_date,
+            LeaveApplication.to_date >= start_date,
+        )
+        if employee_ids is not None:
+            query = query.filter(LeaveApplication.employee_id.in_(employee_ids))
+        
+        result = {}
+        for employee_id, from_date, to_date, is_half_day, paid_leave in query:
+            if is_half_day:
+                days = Decimal('0.5')
+            else:
+                days = Decimal((min(to_date, end_date) - max(from_date, start_date)).days + 1)
+            
+            days_by_kind = result.setdefault(employee_id, {'paid': Decimal('0'), 'unpaid': Decimal('0')})
+            days_by_kind['paid' if paid_leave else 'unpaid'] += days
+        
+        return result
+    
     def get_application(self, application_id: str) -> Optional[LeaveApplication]:
         return self.db.query(LeaveApplication).filter(
             LeaveApplication.id == application_id
@@ -6,15 +6,37 @@ Features:
 - Period filtering
 - Drill-down to vouchers
 """
+import base64
+import json
 from decimal import Decimal, ROUND_HALF_UP
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterator, Tuple
 from datetime import datetime
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select, and_, or_
 
 from app.database.models import (
     Account, Transaction, TransactionEntry, TransactionStatus
 )
+from app.services.voucher_book import VoucherBook
+
+# Rows buffered per fetch when streaming a ledger
+LEDGER_BATCH_SIZE = 2000
+
+
+def encode_ledger_cursor(transaction_date: datetime, entry_id: str, balance: Decimal) -> str:
+    """Opaque resume token: the last (date, entry id) sent and the balance after it."""
+    payload = json.dumps([transaction_date.isoformat(), entry_id, str(balance)])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_ledger_cursor(cursor: str) -> Tuple[datetime, str, Decimal]:
+    """Inverse of encode_ledger_cursor. Raises ValueError for a malformed token."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        transaction_date, entry_id, balance = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(transaction_date), str(entry_id), Decimal(balance)
+    except Exception:
+        raise ValueError("Invalid ledger cursor")
 
 
 class LedgerReportService:
@@ -43,65 +65,164 @@ class LedgerReportService:
         if not account:
             return {'error': 'Account not found'}
         
-        # Calculate opening balance from transaction entries
-        # (opening balances are now stored as transactions, so they're included in the query)
+        # Opening balance (opening balances are stored as transactions, so they're included)
         opening_balance = Decimal('0')
         if include_opening and from_date:
-            # Balance before from_date (includes opening balance transactions)
-            opening_result = self.db.query(
-                func.coalesce(func.sum(TransactionEntry.debit_amount), 0) - 
-                func.coalesce(func.sum(TransactionEntry.credit_amount), 0)
-            ).join(Transaction).filter(
-                TransactionEntry.account_id == account_id,
-                Transaction.transaction_date < from_date,
-                Transaction.status == TransactionStatus.POSTED,
-            ).scalar()
-            
-            opening_balance = Decimal(str(opening_result)) if opening_result else Decimal('0')
+            opening_balance = self.get_opening_balance(account_id, from_date)
         # else: opening_balance stays 0 (showing all transactions from beginning)
         
-        # Get entries
-        query = self.db.query(TransactionEntry).join(Transaction).filter(
+        # Build ledger with running balance
+        closing_balance = opening_balance
+        ledger_entries = []
+        
+        for entry in self.iter_ledger_entries(account_id, opening_balance, from_date, to_date):
+            closing_balance = entry.pop('running_balance')
+            entry.pop('cursor')
+            ledger_entries.append(entry)
+        
+        # Calculate totals
+        total_debit = sum(e['debit'] for e in ledger_entries)
+        total_credit = sum(e['credit'] for e in ledger_entries)
+        
+        return {
+            'account': {
+                'id': account.id,
+                'code': account.code,
+                'name': account.name,
+                'type': account.account_type.value,
+            },
+            'period': {
+                'from': from_date.strftime('%Y-%m-%d') if from_date else None,
+                'to': to_date.strftime('%Y-%m-%d') if to_date else None,
+            },
+            'opening_balance': float(self._round(opening_balance)),
+            'closing_balance': float(self._round(closing_balance)),
+            'total_debit': total_debit,
+            'total_credit': total_credit,
+            'entries': ledger_entries,
+            'entry_count': len(ledger_entries),
+        }
+    
+    def get_opening_balance(self, account_id: str, from_date: datetime) -> Decimal:
+        """Debit minus credit of all posted entries before from_date, in one aggregate."""
+        opening_result = self.db.query(
+            func.coalesce(func.sum(TransactionEntry.debit_amount), 0) - 
+            func.coalesce(func.sum(TransactionEntry.credit_amount), 0)
+        ).join(Transaction).filter(
             TransactionEntry.account_id == account_id,
+            Transaction.transaction_date < from_date,
             Transaction.status == TransactionStatus.POSTED,
+        ).scalar()
+        
+        return Decimal(str(opening_result)) if opening_result else Decimal('0')
+    
+    def iter_ledger_entries(
+        self,
+        account_id: str,
+        opening_balance: Decimal,
+        from_date: datetime = None,
+        to_date: datetime = None,
+        after: Optional[Tuple[datetime, str]] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Dict]:
+        """
+        Ledger rows in (transaction_date, entry id) order with a running balance.
+        
+        Reads column-only joined rows in one query, fetched LEDGER_BATCH_SIZE
+        at a time (a server-side cursor where the driver supports it), so
+        memory stays flat however long the ledger is. after resumes behind
+        a (date, entry id) key, with opening_balance being the balance at
+        that point. Each row carries 'running_balance' (Decimal) and
+        'cursor', the token to resume after it.
+        """
+        columns = (
+            TransactionEntry.id,
+            Transaction.transaction_date,
+            Transaction.transaction_number,
+            Transaction.voucher_type,
+            TransactionEntry.description,
+            Transaction.description,
+            TransactionEntry.debit_amount,
+            TransactionEntry.credit_amount,
+            TransactionEntry.transaction_id,
         )
+        base = select(*columns).join(
+            Transaction, Transaction.id == TransactionEntry.transaction_id
+        ).where(
+            TransactionEntry.account_id == account_id,
+            Transaction.status == TransactionStatus.POSTED,
+        ).order_by(Transaction.transaction_date.asc(), TransactionEntry.id.asc())
         
         if from_date:
-            query = query.filter(Transaction.transaction_date >= from_date)
-        
+            base = base.where(Transaction.transaction_date >= from_date)
         if to_date:
-            query = query.filter(Transaction.transaction_date <= to_date)
+            base = base.where(Transaction.transaction_date <= to_date)
         
-        entries = query.order_by(Transaction.transaction_date.asc()).all()
+        if after:
+            base = base.where(or_(
+                Transaction.transaction_date > after[0],
+                and_(Transaction.transaction_date == after[0], TransactionEntry.id > after[1]),
+            ))
+        if limit:
+            base = base.limit(limit)
         
-        # Build ledger with running balance
         running_balance = opening_balance
-        ledger_entries = []
-        
-        for entry in entries:
-            debit = entry.debit_amount or Decimal('0')
-            credit = entry.credit_amount or Decimal('0')
+        rows = self.db.execute(base.execution_options(yield_per=LEDGER_BATCH_SIZE))
+        for (entry_id, transaction_date, voucher_number, voucher_type, entry_description,
+             transaction_description, debit, credit, transaction_id) in rows:
+            debit = debit or Decimal('0')
+            credit = credit or Decimal('0')
             running_balance += debit - credit
             
-            ledger_entries.append({
-                'id': entry.id,
-                'date': entry.transaction.transaction_date.strftime('%Y-%m-%d'),
-                'voucher_number': entry.transaction.transaction_number,
-                'voucher_type': entry.transaction.voucher_type.value if entry.transaction.voucher_type else None,
-                'description': entry.description or entry.transaction.description,
+            yield {
+                'id': entry_id,
+                'date': transaction_date.strftime('%Y-%m-%d'),
+                'voucher_number': voucher_number,
+                'voucher_type': voucher_type.value if voucher_type else None,
+                'description': entry_description or transaction_description,
                 'debit': float(debit),
                 'credit': float(credit),
                 'balance': float(self._round(running_balance)),
-                'transaction_id': entry.transaction_id,
-            })
+                'transaction_id': transaction_id,
+                'running_balance': running_balance,
+                'cursor': encode_ledger_cursor(transaction_date, entry_id, running_balance),
+            }
+    
+    def stream_account_ledger(
+        self,
+        company_id: str,
+        account_id: str,
+        from_date: datetime = None,
+        to_date: datetime = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Tuple[Dict, Iterator[Dict]]:
+        """
+        Ledger header and a lazy iterator of its rows, for streaming responses.
         
-        closing_balance = running_balance
+        Without a cursor the opening balance before from_date is computed
+        with one aggregate; with one (the 'cursor' of the last row received)
+        the rows continue after it and the running balance carries on from
+        the balance it embeds. limit caps the rows of this page.
+        Raises ValueError for an unknown account or a malformed cursor.
+        """
+        account = self.db.query(Account).filter(
+            Account.id == account_id,
+            Account.company_id == company_id,
+        ).first()
+        if not account:
+            raise ValueError("Account not found")
         
-        # Calculate totals
-        total_debit = sum(e['debit'] for e in ledger_entries)
-        total_credit = sum(e['credit'] for e in ledger_entries)
+        after = None
+        if cursor:
+            after_date, after_id, opening_balance = decode_ledger_cursor(cursor)
+            after = (after_date, after_id)
+        elif from_date:
+            opening_balance = self.get_opening_balance(account_id, from_date)
+        else:
+            opening_balance = Decimal('0')
         
-        return {
+        header = {
             'account': {
                 'id': account.id,
                 'code': account.code,
@@ -113,43 +234,49 @@ class LedgerReportService:
                 'to': to_date.strftime('%Y-%m-%d') if to_date else None,
             },
             'opening_balance': float(self._round(opening_balance)),
-            'closing_balance': float(self._round(closing_balance)),
-            'total_debit': total_debit,
-            'total_credit': total_credit,
-            'entries': ledger_entries,
-            'entry_count': len(ledger_entries),
         }
+        rows = self.iter_ledger_entries(account_id, opening_balance, from_date, to_date, after, limit)
+        return header, rows
     
     def get_day_book(
         self,
         company_id: str,
         date: datetime,
         voucher_type: str = None,
+        to_date: datetime = None,
+        page: int = 1,
+        page_size: Optional[int] = None,
     ) -> Dict:
-        """Get day book - all vouchers for a specific date."""
-        query = self.db.query(Transaction).filter(
-            Transaction.company_id == company_id,
-            func.date(Transaction.transaction_date) == date.date(),
-            Transaction.status == TransactionStatus.POSTED,
-        )
+        """
+        Get day book - all vouchers for a date, or for date..to_date.
         
-        if voucher_type:
-            query = query.filter(Transaction.voucher_type == voucher_type)
+        Vouchers, entries and account names come from one joined query;
+        with page_size only that page of vouchers is returned while the
+        count and totals still cover the whole range.
+        """
+        start_of_day = date.replace(hour=0, minute=0, second=0, microsecond=0)
+        end_of_day = (to_date or date).replace(hour=23, minute=59, second=59, microsecond=999999)
         
-        transactions = query.order_by(Transaction.transaction_number.asc()).all()
+        book = VoucherBook(self.db)
+        transactions = book.get_vouchers(
+            company_id, start_of_day, end_of_day, voucher_type,
+            order_by=[func.date(Transaction.transaction_date), Transaction.transaction_number],
+            page=page, page_size=page_size,
+        )
         
         vouchers = []
         total_debit = Decimal('0')
         total_credit = Decimal('0')
         
         for txn in transactions:
-            voucher_debit = sum((e.debit_amount or Decimal('0')) for e in txn.entries)
-            voucher_credit = sum((e.credit_amount or Decimal('0')) for e in txn.entries)
+            voucher_debit = txn.total_debit
+            voucher_credit = txn.total_credit
             total_debit += voucher_debit
             total_credit += voucher_credit
             
             vouchers.append({
                 'id': txn.id,
+                'date': txn.transaction_date.strftime('%Y-%m-%d'),
                 'voucher_number': txn.transaction_number,
                 'voucher_type': txn.voucher_type.value if txn.voucher_type else None,
                 'description': txn.description,
@@ -158,20 +285,30 @@ class LedgerReportService:
                 'entries': [
                     {
                         'account_id': e.account_id,
-                        'account_name': e.account.name if e.account else None,
+                        'account_name': e.account_name,
                         'description': e.description,
-                        'debit': float(e.debit_amount or 0),
-                        'credit': float(e.credit_amount or 0),
+                        'debit': float(e.debit),
+                        'credit': float(e.credit),
                     }
                     for e in txn.entries
                 ],
             })
         
+        total_count = len(vouchers)
+        if page_size:
+            total_count, total_debit, total_credit = book.get_totals(
+                company_id, start_of_day, end_of_day, voucher_type
+            )
+        
         return {
             'date': date.strftime('%Y-%m-%d'),
+            'to_date': end_of_day.strftime('%Y-%m-%d'),
             'voucher_type_filter': voucher_type,
             'vouchers': vouchers,
             'voucher_count': len(vouchers),
+            'total_count': total_count,
+            'page': page if page_size else 1,
+            'page_size': page_size,
             'total_debit': float(total_debit),
             'total_credit': float(total_credit),
         }
@@ -182,38 +319,34 @@ class LedgerReportService:
         from_date: datetime,
         to_date: datetime,
         voucher_type: str = None,
+        page: int = 1,
+        page_size: Optional[int] = None,
     ) -> Dict:
-        """Get voucher register for a period."""
-        query = self.db.query(Transaction).filter(
-            Transaction.company_id == company_id,
-            Transaction.transaction_date >= from_date,
-            Transaction.transaction_date <= to_date,
-            Transaction.status == TransactionStatus.POSTED,
+        """Get voucher register for a period (optionally one page of it)."""
+        book = VoucherBook(self.db)
+        transactions = book.get_vouchers(
+            company_id, from_date, to_date, voucher_type,
+            order_by=[Transaction.transaction_date, Transaction.transaction_number],
+            page=page, page_size=page_size,
         )
         
-        if voucher_type:
-            query = query.filter(Transaction.voucher_type == voucher_type)
-        
-        transactions = query.order_by(
-            Transaction.transaction_date.asc(),
-            Transaction.transaction_number.asc()
-        ).all()
-        
         vouchers = []
         
         for txn in transactions:
-            voucher_amount = sum((e.debit_amount or Decimal('0')) for e in txn.entries)
-            
             vouchers.append({
                 'id': txn.id,
                 'date': txn.transaction_date.strftime('%Y-%m-%d'),
                 'voucher_number': txn.transaction_number,
                 'voucher_type': txn.voucher_type.value if txn.voucher_type else None,
                 'description': txn.description,
-                'amount': float(voucher_amount),
-                'party': txn.party_type + ': ' + txn.party_id if txn.party_id else None,
+                'amount': float(txn.total_debit),
+                'party': f"{txn.party_type}: {txn.party_id}" if txn.party_id else None,
             })
         
+        total_count = len(vouchers)
+        if page_size:
+            total_count = book.get_totals(company_id, from_date, to_date, voucher_type)[0]
+        
         return {
             'period': {
                 'from': from_date.strftime('%Y-%m-%d'),
@@ -222,6 +355,9 @@ class LedgerReportService:
             'voucher_type_filter': voucher_type,
             'vouchers': vouchers,
             'voucher_count': len(vouchers),
+            'total_count': total_count,
+            'page': page if page_size else 1,
+            'page_size': page_size,
         }
     
     def get_cash_bank_book(
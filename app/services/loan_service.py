@@ -547,31 +547,45 @@ class LoanService:
         
         Returns list of dictionaries with employee_id, loan_id, emi_amount
         """
-        # Get all active loans
-        active_loans = self.db.query(EmployeeLoan).filter(
+        payroll_date = date(payroll_year, payroll_month, 1)
+        
+        # Active loans with an EMI due by the payroll month
+        due_loans = self.db.query(EmployeeLoan).filter(
             EmployeeLoan.company_id == company_id,
             EmployeeLoan.status == LoanStatus.ACTIVE,
             EmployeeLoan.outstanding_balance > 0,
+            EmployeeLoan.next_emi_date.isnot(None),
+            EmployeeLoan.next_emi_date <= payroll_date + relativedelta(months=1),
         ).all()
         
-        payroll_date = date(payroll_year, payroll_month, 1)
         pending_emis = []
-        
-        for loan in active_loans:
-            # Check if EMI is due
-            if loan.next_emi_date and loan.next_emi_date <= payroll_date + relativedelta(months=1):
-                pending_emis.append({
-                    "employee_id": loan.employee_id,
-                    "loan_id": loan.id,
-                    "loan_number": loan.loan_number,
-                    "loan_type": loan.loan_type.value,
-                    "emi_amount": float(loan.emi_amount),
-                    "outstanding_balance": float(loan.outstanding_balance),
-                    "emis_remaining": loan.emis_pending,
-                })
+        for loan in due_loans:
+            pending_emis.append({
+                "employee_id": loan.employee_id,
+                "loan_id": loan.id,
+                "loan_number": loan.loan_number,
+                "loan_type": loan.loan_type.value,
+                "emi_amount": float(loan.emi_amount),
+                "outstanding_balance": float(loan.outstanding_balance),
+                "emis_remaining": loan.emis_pending,
+            })
         
         return pending_emis
     
+    def get_pending_emis_by_employee(
+        self,
+        company_id: str,
+        payroll_month: int,
+        payroll_year: int,
+    ) -> Dict[str, Decimal]:
+        """Total EMI due per employee for a payroll run (one query for the whole company)."""
+        emis_by_employee: Dict[str, Decimal] = {}
+        for emi in self.get_pending_emis_for_payroll(company_id, payroll_month, payroll_year):
+            emis_by_employee[emi["employee_id"]] = (
+                emis_by_employee.get(emi["employee_id"], Decimal("0")) + Decimal(str(emi["emi_amount"]))
+            )
+        return emis_by_employee
+    
     def get_loan_statement(self, loan_id: str) -> Dict:
         """Generate loan statement with all details and repayment history."""
         loan = self.db.query(EmployeeLoan).filter(EmployeeLoan.id == loan_id).first()
@@ -0,0 +1,392 @@
+"""Party statements for customers and vendors.
+
+A statement line comes from one of four sources: invoices (sales or
+purchase), payments recorded against them, debit/credit note vouchers and
+bill allocations of receipt/payment vouchers. Each source is one
+set-based query ordered by (party, date), streamed with yield_per and
+merged with heapq.merge, so a statement for one party or for every party
+of the company costs the same handful of queries. Opening balances (the
+party master's opening balance plus everything dated before the period)
+come from one grouped UNION ALL aggregate.
+
+Balances are amounts outstanding: what the customer owes us, or what we
+owe the vendor. Customer invoices are debits and vendor bills are
+credits; payments, notes and allocations reduce the balance.
+"""
+import heapq
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from itertools import groupby
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import case, func, select, union_all
+from sqlalchemy.orm import Session
+
+from app.database.models import (
+    BillAllocation, BillAllocationType, Customer, Invoice, InvoiceStatus, Payment,
+    PurchaseInvoice, PurchaseInvoiceStatus, PurchasePayment, ReferenceType,
+    Transaction, TransactionStatus, VoucherType,
+)
+
+STATEMENT_BATCH_SIZE = 2000
+
+# Invoices that never reach the party's account
+EXCLUDED_INVOICE_STATUSES = [InvoiceStatus.DRAFT, InvoiceStatus.CANCELLED, InvoiceStatus.VOID]
+EXCLUDED_PURCHASE_STATUSES = [PurchaseInvoiceStatus.DRAFT, PurchaseInvoiceStatus.CANCELLED]
+
+# Lines on the same day: invoices first, then notes, payments, allocations
+LINE_ORDER = {"invoice": 0, "debit_note": 1, "credit_note": 1, "payment": 2, "allocation": 3}
+
+
+@dataclass
+class StatementLine:
+    """One document on a party statement, before running balances."""
+    party_id: str
+    date: datetime
+    type: str
+    reference: Optional[str]
+    description: str
+    amount: Decimal  # Positive increases the outstanding balance
+
+    @property
+    def sort_key(self):
+        return self.party_id, self.date, LINE_ORDER[self.type]
+
+
+class PartyStatementEngine:
+    """Opening balances and statement lines for one, several or all parties."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ==================== SOURCES ====================
+
+    def _sources(self, company_id: str, party_type: str) -> Dict[str, Any]:
+        """
+        Per source: a select of (party_id, date, reference, detail, amount, id)
+        without date filters, and the sign of its amount.
+        """
+        if party_type == "vendor":
+            invoices = select(
+                PurchaseInvoice.vendor_id.label("party_id"),
+                PurchaseInvoice.invoice_date.label("date"),
+                func.coalesce(PurchaseInvoice.vendor_invoice_number, PurchaseInvoice.invoice_number).label("reference"),
+                PurchaseInvoice.invoice_number.label("detail"),
+                PurchaseInvoice.total_amount.label("amount"),
+                PurchaseInvoice.id.label("id"),
+            ).where(
+                PurchaseInvoice.company_id == company_id,
+                PurchaseInvoice.vendor_id.isnot(None),
+                PurchaseInvoice.status.notin_(EXCLUDED_PURCHASE_STATUSES),
+            )
+            payments = select(
+                PurchaseInvoice.vendor_id.label("party_id"),
+                PurchasePayment.payment_date.label("date"),
+                PurchasePayment.reference_number.label("reference"),
+                PurchasePayment.payment_mode.label("detail"),
+                PurchasePayment.amount.label("amount"),
+                PurchasePayment.id.label("id"),
+            ).join(PurchaseInvoice, PurchaseInvoice.id == PurchasePayment.purchase_invoice_id).where(
+                PurchaseInvoice.company_id == company_id,
+                PurchaseInvoice.vendor_id.isnot(None),
+            )
+            # Allocations of vouchers already shown as purchase payments
+            already_shown = BillAllocation.payment_transaction_id.in_(
+                select(PurchasePayment.transaction_id).where(PurchasePayment.transaction_id.isnot(None))
+            )
+            invoice_type = "purchase"
+        else:
+            invoices = select(
+                Invoice.customer_id.label("party_id"),
+                Invoice.invoice_date.label("date"),
+                Invoice.invoice_number.label("reference"),
+                Invoice.invoice_number.label("detail"),
+                Invoice.total_amount.label("amount"),
+                Invoice.id.label("id"),
+            ).where(
+                Invoice.company_id == company_id,
+                Invoice.customer_id.isnot(None),
+                Invoice.status.notin_(EXCLUDED_INVOICE_STATUSES),
+            )
+            payments = select(
+                Invoice.customer_id.label("party_id"),
+                Payment.payment_date.label("date"),
+                Payment.reference_number.label("reference"),
+                Payment.payment_mode.label("detail"),
+                Payment.amount.label("amount"),
+                Payment.id.label("id"),
+            ).join(Invoice, Invoice.id == Payment.invoice_id).where(
+                Invoice.company_id == company_id,
+                Invoice.customer_id.isnot(None),
+            )
+            # Allocations of the journal entries created for invoice payments
+            already_shown = BillAllocation.payment_transaction_id.in_(
+                select(Transaction.id).where(
+                    Transaction.company_id == company_id,
+                    Transaction.reference_type == ReferenceType.PAYMENT,
+                )
+            )
+            invoice_type = "sales"
+
+        notes = select(
+            Transaction.party_id.label("party_id"),
+            Transaction.transaction_date.label("date"),
+            Transaction.transaction_number.label("reference"),
+            Transaction.voucher_type.label("detail"),
+            Transaction.total_debit.label("amount"),
+            Transaction.id.label("id"),
+        ).where(
+            Transaction.company_id == company_id,
+            Transaction.party_type == party_type,
+            Transaction.party_id.isnot(None),
+            Transaction.status == TransactionStatus.POSTED,
+            Transaction.voucher_type.in_([VoucherType.DEBIT_NOTE, VoucherType.CREDIT_NOTE]),
+        )
+        allocations = select(
+            BillAllocation.party_id.label("party_id"),
+            BillAllocation.allocation_date.label("date"),
+            BillAllocation.invoice_number.label("reference"),
+            BillAllocation.allocation_type.label("detail"),
+            BillAllocation.allocated_amount.label("amount"),
+            BillAllocation.id.label("id"),
+        ).where(
+            BillAllocation.company_id == company_id,
+            BillAllocation.invoice_type == invoice_type,
+            BillAllocation.party_id.isnot(None),
+            ~already_shown,
+        )
+
+        return {
+            "invoice": (invoices, 1),
+            "payment": (payments, -1),
+            "note": (notes, -1),
+            "allocation": (allocations, -1),
+        }
+
+    # ==================== OPENING BALANCES ====================
+
+    @staticmethod
+    def _party_filter(party_type: str):
+        """Party masters of the requested side (vendors share the customers table)."""
+        if party_type == "vendor":
+            return Customer.customer_type == "vendor"
+        return func.coalesce(Customer.customer_type, "") != "vendor"
+
+    def get_opening_balances(
+        self,
+        company_id: str,
+        party_type: str,
+        before: datetime,
+        party_ids: Optional[List[str]] = None,
+    ) -> Dict[str, Decimal]:
+        """
+        Outstanding balance per party just before `before`: the party
+        master's opening balance (advances negative) plus every document
+        dated earlier, in one grouped aggregate.
+        """
+        master = select(
+            Customer.id.label("party_id"),
+            case(
+                (Customer.opening_balance_type == "advance", -Customer.opening_balance),
+                else_=Customer.opening_balance,
+            ).label("amount"),
+        ).where(
+            Customer.company_id == company_id,
+            Customer.opening_balance != 0,
+            self._party_filter(party_type),
+        )
+        if party_ids is not None:
+            master = master.where(Customer.id.in_(party_ids))
+
+        parts = [master]
+        for query, sign in self._sources(company_id, party_type).values():
+            sub = query.subquery()
+            part = select(sub.c.party_id, (sub.c.amount * sign).label("amount")).where(sub.c.date < before)
+            if party_ids is not None:
+                part = part.where(sub.c.party_id.in_(party_ids))
+            parts.append(part)
+
+        movements = union_all(*parts).subquery()
+        rows = self.db.execute(
+            select(movements.c.party_id, func.sum(movements.c.amount)).group_by(movements.c.party_id)
+        )
+        return {party_id: Decimal(str(total or 0)) for party_id, total in rows}
+
+    # ==================== LINES ====================
+
+    def _describe(self, kind: str, party_type: str, row) -> StatementLine:
+        if kind == "invoice":
+            line_type = "invoice"
+            description = f"Bill {row.detail}" if party_type == "vendor" else f"Invoice {row.reference}"
+        elif kind == "payment":
+            line_type = "payment"
+            mode = row.detail.value if row.detail is not None else "N/A"
+            verb = "made" if party_type == "vendor" else "received"
+            description = f"Payment {verb} - {mode}"
+        elif kind == "note":
+            line_type = row.detail.value
+            description = "Debit Note" if row.detail == VoucherType.DEBIT_NOTE else "Credit Note"
+        else:
+            line_type = "allocation"
+            if row.detail in (BillAllocationType.ADVANCE, BillAllocationType.ON_ACCOUNT):
+                description = "Advance" if row.detail == BillAllocationType.ADVANCE else "On account"
+            else:
+                description = f"Adjusted against {row.reference}" if row.reference else "Adjusted"
+
+        amount = Decimal(str(row.amount or 0))
+        return StatementLine(
+            party_id=row.party_id,
+            date=row.date,
+            type=line_type,
+            reference=row.reference or ("Payment" if kind == "payment" else None),
+            description=description,
+            amount=amount if kind == "invoice" else -amount,
+        )
+
+    def _stream(self, kind: str, party_type: str, query) -> Iterator[StatementLine]:
+        result = self.db.execute(query.execution_options(yield_per=STATEMENT_BATCH_SIZE))
+        for row in result:
+            yield self._describe(kind, party_type, row)
+
+    def iter_lines(
+        self,
+        company_id: str,
+        party_type: str,
+        from_date: datetime,
+        to_date: datetime,
+        party_ids: Optional[List[str]] = None,
+    ) -> Iterator[StatementLine]:
+        """Lines dated within the period, sorted by (party, date), streamed."""
+        streams = []
+        for kind, (query, _) in self._sources(company_id, party_type).items():
+            sub = query.subquery()
+            query = select(sub).where(sub.c.date >= from_date, sub.c.date <= to_date)
+            if party_ids is not None:
+                query = query.where(sub.c.party_id.in_(party_ids))
+            query = query.order_by(sub.c.party_id, sub.c.date, sub.c.id)
+            streams.append(self._stream(kind, party_type, query))
+        return heapq.merge(*streams, key=lambda line: line.sort_key)
+
+    # ==================== STATEMENTS ====================
+
+    def _party_info(self, party: Customer, party_type: str) -> Dict[str, Any]:
+        return {
+            "id": party.id,
+            "name": party.name,
+            "type": party_type,
+            "gstin": party.tax_number,
+        }
+
+    def _build(
+        self,
+        party: Dict[str, Any],
+        party_type: str,
+        opening_balance: Decimal,
+        lines: List[StatementLine],
+        from_date: datetime,
+        to_date: datetime,
+    ) -> Dict[str, Any]:
+        """Statement dict with running balances and totals."""
+        entries = []
+        balance = opening_balance
+        total_invoiced = total_paid = total_adjusted = Decimal("0")
+        for line in lines:
+            balance += line.amount
+            if line.type == "invoice":
+                total_invoiced += line.amount
+            elif line.type in ("payment", "allocation"):
+                total_paid -= line.amount
+            else:
+                total_adjusted -= line.amount
+
+            increase = line.amount if line.amount > 0 else Decimal("0")
+            decrease = -line.amount if line.amount < 0 else Decimal("0")
+            # Customer invoices are debits; vendor bills are credits
+            debit, credit = (decrease, increase) if party_type == "vendor" else (increase, decrease)
+            entries.append({
+                "date": line.date,
+                "type": line.type,
+                "reference": line.reference,
+                "description": line.description,
+                "debit": debit,
+                "credit": credit,
+                "balance": balance,
+            })
+
+        return {
+            "party": party,
+            "from_date": from_date,
+            "to_date": to_date,
+            "entries": entries,
+            "summary": {
+                "opening_balance": opening_balance,
+                "total_invoiced": total_invoiced,
+                "total_paid": total_paid,
+                "total_adjusted": total_adjusted,
+                "closing_balance": balance,
+            },
+        }
+
+    def get_statement(
+        self,
+        company_id: str,
+        party: Customer,
+        party_type: str,
+        from_date: datetime,
+        to_date: datetime,
+    ) -> Dict[str, Any]:
+        """Statement of one party."""
+        opening = self.get_opening_balances(company_id, party_type, from_date, [party.id])
+        lines = list(self.iter_lines(company_id, party_type, from_date, to_date, [party.id]))
+        return self._build(
+            self._party_info(party, party_type), party_type,
+            opening.get(party.id, Decimal("0")), lines, from_date, to_date,
+        )
+
+    def iter_statements(
+        self,
+        company_id: str,
+        party_type: str,
+        from_date: datetime,
+        to_date: datetime,
+        party_ids: Optional[List[str]] = None,
+        include_inactive: bool = False,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Statements of every party (or party_ids) for month-end runs: parties
+        with documents in the period first (in party id order), then parties
+        that only carry an opening balance. Parties with neither are skipped
+        unless include_inactive, which adds the remaining masters of the
+        requested side. Runs a fixed number of queries however many
+        parties and documents there are; only one party's lines are held in
+        memory at a time.
+        """
+        parties_query = self.db.query(Customer).filter(Customer.company_id == company_id)
+        if party_ids is not None:
+            parties_query = parties_query.filter(Customer.id.in_(party_ids))
+        parties = {p.id: p for p in parties_query}
+
+        openings = self.get_opening_balances(company_id, party_type, from_date, party_ids)
+        lines = self.iter_lines(company_id, party_type, from_date, to_date, party_ids)
+
+        done = set()
+        for party_id, party_lines in groupby(lines, key=lambda line: line.party_id):
+            party = parties.get(party_id)
+            if party is None:
+                continue
+            done.add(party_id)
+            yield self._build(
+                self._party_info(party, party_type), party_type,
+                openings.get(party_id, Decimal("0")), list(party_lines), from_date, to_date,
+            )
+
+        for party_id in sorted(set(parties) - done):
+            opening = openings.get(party_id, Decimal("0"))
+            is_vendor = parties[party_id].customer_type == "vendor"
+            if opening == 0 and not (include_inactive and is_vendor == (party_type == "vendor")):
+                continue
+            yield self._build(
+                self._party_info(parties[party_id], party_type), party_type,
+                opening, [], from_date, to_date,
+            )
@@ -9,25 +9,29 @@ This service brings together:
 - Loan deductions
 - Salary structure processing
 """
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from decimal import Decimal, ROUND_HALF_UP
-from dataclasses import dataclass
-from typing import Optional, List, Dict, Any
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import date, datetime
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, insert, select, inspect
 
 from app.database.models import Company
 from app.database.payroll_models import (
     Employee, Department, Designation, SalaryComponent,
     EmployeeSalaryStructure, PayrollRun, PayrollEntry,
     PayrollSettings, PayrollRunStatus, SalaryComponentType,
-    ComponentCalculationType, EmployeeStatus
+    ComponentCalculationType, EmployeeStatus, EmployeeTaxDeclaration
 )
 from app.services.pf_service import PFService
 from app.services.esi_service import ESIService
 from app.services.pt_service import PTService
 from app.services.salary_tds_service import SalaryTDSService
 from app.services.loan_service import LoanService
+from app.services.attendance_service import AttendanceService
 
 
 @dataclass
@@ -42,6 +46,75 @@ class SalaryBreakdown:
     total_deductions: Decimal
     net_pay: Decimal
     ctc_monthly: Decimal
+    lop_days: Decimal = Decimal("0")
+
+
+# Employees per task when a run is spread over worker processes
+PARALLEL_CHUNK_SIZE = 250
+
+
+@dataclass
+class PayrollRunContext:
+    """
+    Everything a payroll run reads besides the employee rows, loaded once.
+    
+    structures maps employee_id to (component code, component type, amount)
+    for the active salary structure; declarations maps employee_id to the
+    tax declaration for financial_year (None when there is none); loan_emis
+    maps employee_id to the total EMI due this month and lop_days to the
+    loss-of-pay days from attendance and unpaid leave.
+    """
+    company_id: str
+    month: int
+    year: int
+    financial_year: str = ""
+    settings: Optional[Any] = None
+    pt_slabs: Dict[str, List[Tuple[Decimal, Decimal, Optional[Decimal]]]] = field(default_factory=dict)
+    structures: Dict[str, List[Tuple[str, SalaryComponentType, Decimal]]] = field(default_factory=dict)
+    declarations: Dict[str, Optional[Any]] = field(default_factory=dict)
+    loan_emis: Dict[str, Decimal] = field(default_factory=dict)
+    lop_days: Dict[str, Decimal] = field(default_factory=dict)
+    
+    def for_employees(self, employee_ids: List[str]) -> "PayrollRunContext":
+        """Picklable copy limited to some employees, with ORM rows as plain snapshots."""
+        return PayrollRunContext(
+            company_id=self.company_id,
+            month=self.month,
+            year=self.year,
+            financial_year=self.financial_year,
+            settings=snapshot(self.settings),
+            pt_slabs=self.pt_slabs,
+            structures={i: self.structures[i] for i in employee_ids if i in self.structures},
+            declarations={i: snapshot(self.declarations.get(i)) for i in employee_ids},
+            loan_emis={i: self.loan_emis[i] for i in employee_ids if i in self.loan_emis},
+            lop_days={i: self.lop_days[i] for i in employee_ids if i in self.lop_days},
+        )
+
+
+def snapshot(instance: Any) -> Optional[SimpleNamespace]:
+    """Column values of an ORM instance as a plain, picklable object."""
+    if instance is None:
+        return None
+    return SimpleNamespace(**{
+        attr.key: getattr(instance, attr.key)
+        for attr in inspect(instance).mapper.column_attrs
+    })
+
+
+def calculate_salary_chunk(
+    employees: List[SimpleNamespace],
+    context: PayrollRunContext,
+    working_days: int,
+) -> List[Tuple[str, Optional[SalaryBreakdown], Optional[str]]]:
+    """
+    Calculate salaries for a chunk of employee snapshots in a worker process.
+    
+    Returns (employee_id, breakdown, error) in input order; the calculation
+    runs without a database session, entirely on the context.
+    """
+    service = PayrollService(None)
+    service._use_context(context)
+    return service._calculate_chunk(employees, context, working_days)
 
 
 class PayrollService:
@@ -402,6 +475,102 @@ class PayrollService:
         
         return payroll_run
     
+    def load_payroll_context(
+        self,
+        company_id: str,
+        month: int,
+        year: int,
+        employee_ids: Optional[List[str]] = None,
+        use_attendance: bool = True,
+    ) -> PayrollRunContext:
+        """
+        Load salary structures, statutory settings, PT slabs, tax declarations,
+        due loan EMIs and attendance LOP for a payroll run in a handful of
+        queries.
+        
+        The statutory services are primed with what was loaded, so the
+        per-employee calculation no longer queries the database. Pass
+        employee_ids to load for specific employees only; by default the
+        whole company is loaded. Employees without attendance or leave in
+        the month have no LOP.
+        """
+        if employee_ids is None:
+            employee_ids = [
+                row.id for row in self.db.query(Employee.id).filter(
+                    Employee.company_id == company_id,
+                    Employee.status == EmployeeStatus.ACTIVE,
+                )
+            ]
+            company_employees = select(Employee.id).where(Employee.company_id == company_id)
+        else:
+            company_employees = employee_ids
+        
+        context = PayrollRunContext(
+            company_id=company_id,
+            month=month,
+            year=year,
+            # Annual TDS is projected for the current financial year
+            financial_year=self.tds_service.get_current_financial_year(),
+        )
+        
+        # Active salary structures with their components
+        rows = self.db.query(
+            EmployeeSalaryStructure.employee_id,
+            SalaryComponent.code,
+            SalaryComponent.component_type,
+            EmployeeSalaryStructure.amount,
+        ).join(
+            SalaryComponent, SalaryComponent.id == EmployeeSalaryStructure.component_id
+        ).filter(
+            EmployeeSalaryStructure.employee_id.in_(company_employees),
+            EmployeeSalaryStructure.is_active == True,
+        ).all()
+        for employee_id, code, component_type, amount in rows:
+            context.structures.setdefault(employee_id, []).append((code, component_type, amount))
+        
+        # PF/ESI settings and PT slabs
+        context.settings = self.db.query(PayrollSettings).filter(
+            PayrollSettings.company_id == company_id
+        ).first()
+        context.pt_slabs = self.pt_service.get_custom_slabs(company_id)
+        
+        # Tax declarations
+        context.declarations = {employee_id: None for employee_id in employee_ids}
+        for declaration in self.db.query(EmployeeTaxDeclaration).filter(
+            EmployeeTaxDeclaration.employee_id.in_(company_employees),
+            EmployeeTaxDeclaration.financial_year == context.financial_year,
+        ):
+            if context.declarations.get(declaration.employee_id) is None:
+                context.declarations[declaration.employee_id] = declaration
+        
+        # Loan EMIs due this month
+        context.loan_emis = self.loan_service.get_pending_emis_by_employee(
+            company_id=company_id,
+            payroll_month=month,
+            payroll_year=year,
+        )
+        
+        # Loss of pay from attendance and approved unpaid leave
+        if use_attendance:
+            summaries = AttendanceService(self.db).get_monthly_summaries(
+                company_id, month, year, employee_ids if len(employee_ids) == 1 else None,
+            )
+            context.lop_days = {
+                employee_id: Decimal(str(summary["lop_days"]))
+                for employee_id, summary in summaries.items()
+                if summary["lop_days"]
+            }
+        
+        self._use_context(context)
+        return context
+    
+    def _use_context(self, context: PayrollRunContext) -> None:
+        """Point the statutory services at the preloaded data of a run."""
+        self.pf_service.use_settings(context.company_id, context.settings)
+        self.esi_service.use_settings(context.company_id, context.settings)
+        self.pt_service.use_custom_slabs(context.company_id, context.pt_slabs)
+        self.tds_service.use_declarations(context.financial_year, context.declarations)
+    
     def calculate_employee_salary(
         self,
         employee: Employee,
@@ -410,15 +579,19 @@ class PayrollService:
         working_days: int = 30,
         days_worked: int = 30,
         lop_days: int = 0,
+        context: Optional[PayrollRunContext] = None,
     ) -> SalaryBreakdown:
         """
         Calculate complete salary for an employee for a month.
+        
+        Payroll runs pass a context from load_payroll_context; without one,
+        the employee's data is loaded first. Unless lop_days is given, the
+        LOP days of the context are applied.
         """
-        # Get salary structure
-        structure = self.db.query(EmployeeSalaryStructure).filter(
-            EmployeeSalaryStructure.employee_id == employee.id,
-            EmployeeSalaryStructure.is_active == True,
-        ).all()
+        if context is None:
+            context = self.load_payroll_context(employee.company_id, month, year, [employee.id])
+        if not lop_days:
+            lop_days = min(context.lop_days.get(employee.id, 0), working_days)
         
         earnings = {}
         basic_amount = Decimal("0")
@@ -426,24 +599,23 @@ class PayrollService:
         gross_salary = Decimal("0")
         
         # Calculate earnings
-        for s in structure:
-            component = s.component
-            if component.component_type != SalaryComponentType.EARNING:
+        for code, component_type, structure_amount in context.structures.get(employee.id, []):
+            if component_type != SalaryComponentType.EARNING:
                 continue
             
-            amount = s.amount or Decimal("0")
+            amount = structure_amount or Decimal("0")
             
             # Apply LOP
             if lop_days > 0 and working_days > 0:
                 per_day = amount / working_days
                 amount = self._round_amount(amount - (per_day * lop_days))
             
-            earnings[component.code] = amount
+            earnings[code] = amount
             gross_salary += amount
             
-            if component.code == "BASIC":
+            if code == "BASIC":
                 basic_amount = amount
-            elif component.code == "HRA":
+            elif code == "HRA":
                 hra_amount = amount
         
         deductions = {}
@@ -496,18 +668,8 @@ class PayrollService:
         )
         deductions["TDS"] = tds_result.monthly_tds
         
-        # Get loan EMIs
-        pending_loans = self.loan_service.get_pending_emis_for_payroll(
-            company_id=employee.company_id,
-            payroll_month=month,
-            payroll_year=year,
-        )
-        
-        loan_deductions = Decimal("0")
-        for loan in pending_loans:
-            if loan["employee_id"] == employee.id:
-                loan_deductions += Decimal(str(loan["emi_amount"]))
-        
+        # Loan EMIs
+        loan_deductions = context.loan_emis.get(employee.id, Decimal("0"))
         if loan_deductions > 0:
             deductions["LOAN"] = loan_deductions
         
@@ -527,14 +689,26 @@ class PayrollService:
             total_deductions=total_deductions,
             net_pay=net_pay,
             ctc_monthly=ctc_monthly,
+            lop_days=Decimal(str(lop_days)),
         )
     
     def process_payroll(
         self,
         payroll_run_id: str,
         working_days: int = 30,
+        workers: Optional[int] = None,
+        use_attendance: bool = True,
     ) -> PayrollRun:
-        """Process payroll for all employees."""
+        """
+        Process payroll for all employees.
+        
+        With more than one worker (PayrollSettings.payroll_workers unless
+        given), salaries are calculated in a process pool; entries and totals
+        are identical to an in-process run. Employees that fail are skipped
+        and listed in payroll_run.processing_errors. With use_attendance,
+        loss-of-pay days from the month's attendance and unpaid leave reduce
+        earnings pro rata.
+        """
         payroll_run = self.db.query(PayrollRun).filter(
             PayrollRun.id == payroll_run_id
         ).first()
@@ -573,63 +747,52 @@ class PayrollService:
         }
         
         processed = 0
+        errors = []
+        entry_rows = []
+        context = self.load_payroll_context(
+            payroll_run.company_id,
+            payroll_run.pay_period_month,
+            payroll_run.pay_period_year,
+            use_attendance=use_attendance,
+        )
+        if workers is None:
+            workers = (context.settings.payroll_workers if context.settings else None) or 1
+        
+        # Calculate salaries, in employee order
+        results = self._calculate_salaries(employees, context, working_days, workers)
+        
+        for employee, (_, breakdown, error) in zip(employees, results):
+            if error is not None:
+                errors.append({
+                    "employee_id": employee.id,
+                    "employee_code": employee.employee_code,
+                    "error": error,
+                })
+                continue
+            
+            entry_rows.append(self._payroll_entry_values(payroll_run_id, breakdown, working_days))
+            
+            # Update totals
+            totals["gross"] += breakdown.gross_salary
+            totals["deductions"] += breakdown.total_deductions
+            totals["net_pay"] += breakdown.net_pay
+            totals["employer_contributions"] += sum(breakdown.employer_contributions.values())
+            totals["pf_employee"] += breakdown.deductions.get("PF_EMP", Decimal("0"))
+            totals["pf_employer"] += breakdown.employer_contributions.get("PF_ER", Decimal("0"))
+            totals["esi_employee"] += breakdown.deductions.get("ESI_EMP", Decimal("0"))
+            totals["esi_employer"] += breakdown.employer_contributions.get("ESI_ER", Decimal("0"))
+            totals["pt"] += breakdown.deductions.get("PT", Decimal("0"))
+            totals["tds"] += breakdown.deductions.get("TDS", Decimal("0"))
+            
+            processed += 1
         
-        for employee in employees:
-            try:
-                # Calculate salary
-                breakdown = self.calculate_employee_salary(
-                    employee=employee,
-                    month=payroll_run.pay_period_month,
-                    year=payroll_run.pay_period_year,
-                    working_days=working_days,
-                )
-                
-                # Create payroll entry
-                entry = PayrollEntry(
-                    payroll_run_id=payroll_run_id,
-                    employee_id=employee.id,
-                    total_working_days=working_days,
-                    days_worked=working_days,
-                    earnings=dict(breakdown.earnings),
-                    total_earnings=breakdown.gross_salary,
-                    deductions=dict(breakdown.deductions),
-                    total_deductions=breakdown.total_deductions,
-                    employer_contributions=dict(breakdown.employer_contributions),
-                    total_employer_contributions=sum(breakdown.employer_contributions.values()),
-                    basic_for_pf=breakdown.earnings.get("BASIC", Decimal("0")),
-                    gross_for_esi=breakdown.gross_salary,
-                    pf_employee=breakdown.deductions.get("PF_EMP", Decimal("0")),
-                    pf_employer=breakdown.employer_contributions.get("PF_ER", Decimal("0")),
-                    esi_employee=breakdown.deductions.get("ESI_EMP", Decimal("0")),
-                    esi_employer=breakdown.employer_contributions.get("ESI_ER", Decimal("0")),
-                    professional_tax=breakdown.deductions.get("PT", Decimal("0")),
-                    tds=breakdown.deductions.get("TDS", Decimal("0")),
-                    total_loan_deductions=breakdown.deductions.get("LOAN", Decimal("0")),
-                    gross_salary=breakdown.gross_salary,
-                    net_pay=breakdown.net_pay,
-                )
-                
-                self.db.add(entry)
-                
-                # Update totals
-                totals["gross"] += breakdown.gross_salary
-                totals["deductions"] += breakdown.total_deductions
-                totals["net_pay"] += breakdown.net_pay
-                totals["employer_contributions"] += sum(breakdown.employer_contributions.values())
-                totals["pf_employee"] += breakdown.deductions.get("PF_EMP", Decimal("0"))
-                totals["pf_employer"] += breakdown.employer_contributions.get("PF_ER", Decimal("0"))
-                totals["esi_employee"] += breakdown.deductions.get("ESI_EMP", Decimal("0"))
-                totals["esi_employer"] += breakdown.employer_contributions.get("ESI_ER", Decimal("0"))
-                totals["pt"] += breakdown.deductions.get("PT", Decimal("0"))
-                totals["tds"] += breakdown.deductions.get("TDS", Decimal("0"))
-                
-                processed += 1
-                
-            except Exception as e:
-                print(f"Error processing employee {employee.id}: {e}")
+        # Create payroll entries in one statement
+        if entry_rows:
+            self.db.execute(insert(PayrollEntry), entry_rows)
         
         # Update payroll run totals
         payroll_run.processed_employees = processed
+        payroll_run.processing_errors = errors or None
         payroll_run.total_gross = totals["gross"]
         payroll_run.total_deductions = totals["deductions"]
         payroll_run.total_net_pay = totals["net_pay"]
@@ -648,6 +811,100 @@ class PayrollService:
         
         return payroll_run
     
+    def _calculate_salaries(
+        self,
+        employees: List[Employee],
+        context: PayrollRunContext,
+        working_days: int,
+        workers: int,
+    ) -> List[Tuple[str, Optional[SalaryBreakdown], Optional[str]]]:
+        """
+        (employee_id, breakdown, error) for each employee, in the given order.
+        
+        Runs too small for more than one chunk are calculated in-process.
+        """
+        if workers <= 1 or len(employees) <= PARALLEL_CHUNK_SIZE:
+            return self._calculate_chunk(employees, context, working_days)
+        
+        chunks = [
+            employees[i:i + PARALLEL_CHUNK_SIZE]
+            for i in range(0, len(employees), PARALLEL_CHUNK_SIZE)
+        ]
+        # spawn: forking a threaded server process is not safe
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(chunks)),
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            futures = [
+                executor.submit(
+                    calculate_salary_chunk,
+                    [snapshot(employee) for employee in chunk],
+                    context.for_employees([employee.id for employee in chunk]),
+                    working_days,
+                )
+                for chunk in chunks
+            ]
+            results = []
+            for future in futures:
+                results.extend(future.result())
+        return results
+    
+    def _calculate_chunk(
+        self,
+        employees: List[Any],
+        context: PayrollRunContext,
+        working_days: int,
+    ) -> List[Tuple[str, Optional[SalaryBreakdown], Optional[str]]]:
+        """Calculate salaries one by one, capturing each employee's error."""
+        results = []
+        for employee in employees:
+            try:
+                breakdown = self.calculate_employee_salary(
+                    employee=employee,
+                    month=context.month,
+                    year=context.year,
+                    working_days=working_days,
+                    context=context,
+                )
+                results.append((employee.id, breakdown, None))
+            except Exception as e:
+                results.append((employee.id, None, str(e)))
+        return results
+    
+    def _payroll_entry_values(
+        self,
+        payroll_run_id: str,
+        breakdown: SalaryBreakdown,
+        working_days: int,
+    ) -> Dict[str, Any]:
+        """Column values of a PayrollEntry for a salary breakdown (for bulk insert)."""
+        return {
+            "payroll_run_id": payroll_run_id,
+            "employee_id": breakdown.employee_id,
+            "total_working_days": working_days,
+            # Day columns are whole days
+            "days_worked": int((working_days - breakdown.lop_days).quantize(Decimal("1"), rounding=ROUND_HALF_UP)),
+            "lop_days": int(breakdown.lop_days.quantize(Decimal("1"), rounding=ROUND_HALF_UP)),
+            # JSON columns can't hold Decimal
+            "earnings": {k: float(v) for k, v in breakdown.earnings.items()},
+            "total_earnings": breakdown.gross_salary,
+            "deductions": {k: float(v) for k, v in breakdown.deductions.items()},
+            "total_deductions": breakdown.total_deductions,
+            "employer_contributions": {k: float(v) for k, v in breakdown.employer_contributions.items()},
+            "total_employer_contributions": sum(breakdown.employer_contributions.values()),
+            "basic_for_pf": breakdown.earnings.get("BASIC", Decimal("0")),
+            "gross_for_esi": breakdown.gross_salary,
+            "pf_employee": breakdown.deductions.get("PF_EMP", Decimal("0")),
+            "pf_employer": breakdown.employer_contributions.get("PF_ER", Decimal("0")),
+            "esi_employee": breakdown.deductions.get("ESI_EMP", Decimal("0")),
+            "esi_employer": breakdown.employer_contributions.get("ESI_ER", Decimal("0")),
+            "professional_tax": breakdown.deductions.get("PT", Decimal("0")),
+            "tds": breakdown.deductions.get("TDS", Decimal("0")),
+            "total_loan_deductions": breakdown.deductions.get("LOAN", Decimal("0")),
+            "gross_salary": breakdown.gross_salary,
+            "net_pay": breakdown.net_pay,
+        }
+    
     def finalize_payroll(
         self,
         payroll_run_id: str,
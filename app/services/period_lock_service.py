@@ -11,6 +11,7 @@ from datetime import datetime, date
 from sqlalchemy.orm import Session
 
 from app.database.models import PeriodLock, VoucherType, generate_uuid
+from app.services.period_totals_cache import PeriodTotalsCache
 
 
 class PeriodLockService:
@@ -42,6 +43,9 @@ class PeriodLockService:
         )
         
         self.db.add(lock)
+        if voucher_types is None:
+            # Cached report periods inside a full lock are frozen
+            PeriodTotalsCache(self.db).freeze(company_id, locked_from, locked_to)
         self.db.commit()
         self.db.refresh(lock)
         
@@ -69,6 +73,8 @@ class PeriodLockService:
         lock = self.get_lock(lock_id)
         if lock:
             lock.is_active = False
+            if lock.voucher_types is None:
+                PeriodTotalsCache(self.db).release(lock.company_id, lock.locked_from, lock.locked_to)
             self.db.commit()
             self.db.refresh(lock)
         return lock
@@ -218,7 +224,13 @@ class PeriodLockService:
         """Extend an existing lock to a new end date."""
         lock = self.get_lock(lock_id)
         if lock:
+            old_to_date = lock.locked_to
             lock.locked_to = new_to_date
+            if lock.voucher_types is None and lock.is_active:
+                cache = PeriodTotalsCache(self.db)
+                if new_to_date < old_to_date:
+                    cache.release(lock.company_id, lock.locked_from, old_to_date)
+                cache.freeze(lock.company_id, lock.locked_from, new_to_date)
             self.db.commit()
             self.db.refresh(lock)
         return lock
@@ -0,0 +1,280 @@
+"""Period totals cache - per (company, account, period) debit/credit totals.
+
+Comparative reports (this year vs last year, month-by-month P&L) ask for
+the same closed periods over and over. The first request computes every
+missing period from one StatementBuilder matrix and stores the totals of
+all accounts; later requests read them back in one query.
+
+Posting code calls invalidate() next to BalanceSnapshotService.record_transaction
+so any post or reversal drops the cached periods containing the
+transaction date and bumps the company's AccountPeriodTotalVersion.
+Computed totals are only stored if the version is unchanged since before
+they were read, so a posting that commits while a report is computing
+cannot leave stale totals behind. Periods inside an active lock covering all voucher
+types (PeriodLockService) are frozen: they are never invalidated or
+recomputed while the lock is active.
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_, delete, update, insert
+from sqlalchemy.exc import IntegrityError
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+from decimal import Decimal
+from app.database.models import AccountPeriodTotal, AccountPeriodTotalVersion, PeriodLock, Transaction
+from app.services.statement_builder import StatementBuilder, JUST_BEFORE
+
+# (period_start or None for "from the start of the books", period_end)
+Period = Tuple[Optional[datetime], datetime]
+Totals = Dict[str, Tuple[Decimal, Decimal]]
+
+
+def lock_end(locked_to: datetime) -> datetime:
+    """
+    Locks are usually set to end at 23:59:59 while report periods end at
+    23:59:59.999999; treat a whole-second lock end as covering that second.
+    """
+    if locked_to.microsecond == 0:
+        return locked_to.replace(microsecond=999999)
+    return locked_to
+
+
+class PeriodTotalsCache:
+    """Service for reading and maintaining cached period totals."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ============== Lookup ==============
+
+    def get_totals(self, company_id: str, periods: List[Period]) -> Dict[Period, Totals]:
+        """
+        Debit/credit totals per account for each period.
+
+        Cached periods are read in one query; all missing periods are
+        computed together from a single grouped query and stored.
+        """
+        periods = list(dict.fromkeys(periods))
+        result = self._load(company_id, periods)
+
+        missing = [p for p in periods if p not in result]
+        if missing:
+            version = self._version(company_id)
+            computed = self._compute(company_id, missing)
+            self._store(company_id, version, computed)
+            result.update(computed)
+
+        return result
+
+    def _period_filter(self, periods: List[Period]):
+        return or_(*[
+            and_(
+                AccountPeriodTotal.period_start.is_(None) if start is None
+                else AccountPeriodTotal.period_start == start,
+                AccountPeriodTotal.period_end == end,
+            )
+            for start, end in periods
+        ])
+
+    def _load(self, company_id: str, periods: List[Period]) -> Dict[Period, Totals]:
+        rows = self.db.query(
+            AccountPeriodTotal.account_id,
+            AccountPeriodTotal.period_start,
+            AccountPeriodTotal.period_end,
+            AccountPeriodTotal.debit_total,
+            AccountPeriodTotal.credit_total,
+        ).filter(
+            AccountPeriodTotal.company_id == company_id,
+            self._period_filter(periods),
+        ).all()
+
+        result: Dict[Period, Totals] = {}
+        for row in rows:
+            result.setdefault((row.period_start, row.period_end), {})[row.account_id] = (
+                Decimal(str(row.debit_total or 0)), Decimal(str(row.credit_total or 0))
+            )
+        return result
+
+    def _compute(self, company_id: str, periods: List[Period]) -> Dict[Period, Totals]:
+        """Totals for every account and period from one StatementBuilder matrix."""
+        edges = [end for _, end in periods]
+        edges += [start - JUST_BEFORE for start, _ in periods if start is not None]
+        matrix = StatementBuilder(self.db).load(company_id, edges)
+
+        result: Dict[Period, Totals] = {}
+        for start, end in periods:
+            totals = {}
+            for account in matrix.accounts:
+                debit, credit = matrix.totals_at(account.id, end)
+                if start is not None:
+                    start_debit, start_credit = matrix.totals_at(account.id, start - JUST_BEFORE)
+                    debit, credit = debit - start_debit, credit - start_credit
+                totals[account.id] = (debit, credit)
+            result[(start, end)] = totals
+        return result
+
+    def _store(self, company_id: str, version: int, computed: Dict[Period, Totals]) -> None:
+        """
+        Write computed periods in a separate session, leaving the caller's
+        transaction alone. Nothing is stored if a posting bumped the version
+        since it was read; a concurrent writer storing the same period wins.
+        """
+        locks = self._full_locks(company_id)
+        now = datetime.utcnow()
+        with Session(bind=self.db.get_bind()) as db:
+            if not self._claim(db, company_id, version):
+                return
+            for (start, end), totals in computed.items():
+                if not totals:
+                    continue
+                locked = self._is_locked(locks, start, end)
+                try:
+                    with db.begin_nested():
+                        db.execute(insert(AccountPeriodTotal), [
+                            {
+                                "company_id": company_id,
+                                "account_id": account_id,
+                                "period_start": start,
+                                "period_end": end,
+                                "debit_total": debit,
+                                "credit_total": credit,
+                                "is_locked": locked,
+                                "computed_at": now,
+                            }
+                            for account_id, (debit, credit) in totals.items()
+                        ])
+                except IntegrityError:
+                    pass
+            db.commit()
+
+    # ============== Versioning ==============
+
+    def _version(self, company_id: str) -> int:
+        version = self.db.query(AccountPeriodTotalVersion.version).filter(
+            AccountPeriodTotalVersion.company_id == company_id
+        ).scalar()
+        return version or 0
+
+    @staticmethod
+    def _claim(db: Session, company_id: str, version: int) -> bool:
+        """
+        Lock the company's version row if it still holds `version`. The
+        UPDATE waits for an uncommitted posting that already bumped it and
+        then sees the new value; a posting that bumps it later waits for
+        this session to commit, then deletes what it stored.
+        """
+        claimed = db.execute(
+            update(AccountPeriodTotalVersion)
+            .where(
+                AccountPeriodTotalVersion.company_id == company_id,
+                AccountPeriodTotalVersion.version == version,
+            )
+            .values(version=AccountPeriodTotalVersion.version)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if claimed or version:
+            return bool(claimed)
+        try:
+            with db.begin_nested():
+                db.execute(insert(AccountPeriodTotalVersion).values(company_id=company_id, version=0))
+        except IntegrityError:
+            return False
+        return True
+
+    def _bump(self, company_id: str) -> None:
+        bump = (
+            update(AccountPeriodTotalVersion)
+            .where(AccountPeriodTotalVersion.company_id == company_id)
+            .values(version=AccountPeriodTotalVersion.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if self.db.execute(bump).rowcount:
+            return
+        try:
+            with self.db.begin_nested():
+                self.db.execute(insert(AccountPeriodTotalVersion).values(company_id=company_id, version=1))
+        except IntegrityError:
+            self.db.execute(bump)
+
+    # ============== Period Locks ==============
+
+    def _full_locks(self, company_id: str) -> List[Tuple[datetime, datetime]]:
+        """Active locks that cover every voucher type."""
+        return [
+            (lock.locked_from, lock.locked_to)
+            for lock in self.db.query(PeriodLock).filter(
+                PeriodLock.company_id == company_id,
+                PeriodLock.is_active == True,
+            )
+            if lock.voucher_types is None
+        ]
+
+    @staticmethod
+    def _is_locked(locks: List[Tuple[datetime, datetime]], start: Optional[datetime], end: datetime) -> bool:
+        if start is None:
+            return False
+        return any(locked_from <= start and end <= lock_end(locked_to) for locked_from, locked_to in locks)
+
+    def freeze(self, company_id: str, locked_from: datetime, locked_to: datetime) -> None:
+        """Mark cached periods inside a newly created or extended lock as frozen. Does not commit."""
+        self.db.execute(
+            update(AccountPeriodTotal)
+            .where(
+                AccountPeriodTotal.company_id == company_id,
+                AccountPeriodTotal.period_start >= locked_from,
+                AccountPeriodTotal.period_end <= lock_end(locked_to),
+            )
+            .values(is_locked=True)
+            .execution_options(synchronize_session=False)
+        )
+
+    def release(self, company_id: str, locked_from: datetime, locked_to: datetime) -> None:
+        """
+        Drop frozen periods inside a deactivated lock; they are recomputed on
+        the next request. Does not commit.
+        """
+        self.db.execute(
+            delete(AccountPeriodTotal)
+            .where(
+                AccountPeriodTotal.company_id == company_id,
+                AccountPeriodTotal.period_start >= locked_from,
+                AccountPeriodTotal.period_end <= lock_end(locked_to),
+                AccountPeriodTotal.is_locked == True,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    # ============== Invalidation ==============
+
+    def invalidate(self, transaction: Transaction) -> None:
+        """
+        Drop cached periods containing the transaction date, except frozen
+        ones. Call whenever a transaction is posted or reversed; does not
+        commit, so it shares the caller's database transaction. The version
+        is bumped before deleting so a concurrent _store either sees the bump
+        or commits first and has its rows deleted here.
+        """
+        day = transaction.transaction_date
+        self._bump(transaction.company_id)
+        self.db.execute(
+            delete(AccountPeriodTotal)
+            .where(
+                AccountPeriodTotal.company_id == transaction.company_id,
+                AccountPeriodTotal.is_locked == False,
+                AccountPeriodTotal.period_end >= day,
+                or_(AccountPeriodTotal.period_start.is_(None), AccountPeriodTotal.period_start <= day),
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    def clear(self, company_id: str) -> int:
+        """Drop every unfrozen cached period of a company."""
+        result = self.db.execute(
+            delete(AccountPeriodTotal)
+            .where(
+                AccountPeriodTotal.company_id == company_id,
+                AccountPeriodTotal.is_locked == False,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+        return result.rowcount
@@ -19,7 +19,7 @@ For international workers (IW):
 """
 from decimal import Decimal, ROUND_HALF_UP
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Dict
 from sqlalchemy.orm import Session
 
 from app.database.payroll_models import Employee, PayrollSettings
@@ -71,6 +71,11 @@ class PFService:
     
     def __init__(self, db: Session):
         self.db = db
+        self._settings: Dict[str, Optional[PayrollSettings]] = {}
+    
+    def use_settings(self, company_id: str, settings: Optional[PayrollSettings]) -> None:
+        """Use preloaded settings for a company instead of querying (payroll runs)."""
+        self._settings[company_id] = settings
     
     def _round_amount(self, amount: Decimal) -> Decimal:
         """Round to nearest rupee (no paise in PF)."""
@@ -82,6 +87,8 @@ class PFService:
     
     def get_pf_settings(self, company_id: str) -> Optional[PayrollSettings]:
         """Get company-specific PF settings."""
+        if company_id in self._settings:
+            return self._settings[company_id]
         return self.db.query(PayrollSettings).filter(
             PayrollSettings.company_id == company_id
         ).first()
@@ -230,6 +230,15 @@ class PTService:
     
     def __init__(self, db: Session):
         self.db = db
+        self._custom_slabs: Dict[str, Dict[str, List[Tuple[Decimal, Decimal, Optional[Decimal]]]]] = {}
+    
+    def use_custom_slabs(
+        self,
+        company_id: str,
+        slabs_by_state: Dict[str, List[Tuple[Decimal, Decimal, Optional[Decimal]]]],
+    ) -> None:
+        """Use preloaded custom slabs (from get_custom_slabs) instead of querying (payroll runs)."""
+        self._custom_slabs[company_id] = slabs_by_state
     
     def _round_amount(self, amount: Decimal) -> Decimal:
         """Round to nearest rupee."""
@@ -249,6 +258,9 @@ class PTService:
         
         Returns list of (max_salary, pt_amount, february_amount) tuples.
         """
+        if company_id in self._custom_slabs:
+            return self._custom_slabs[company_id].get(state_code) or DEFAULT_PT_SLABS.get(state_code, [])
+        
         # Check for custom slabs in database
         custom_slabs = self.db.query(ProfessionalTaxSlab).filter(
             ProfessionalTaxSlab.company_id == company_id,
@@ -269,6 +281,25 @@ class PTService:
         # Return default slabs
         return DEFAULT_PT_SLABS.get(state_code, [])
     
+    def get_custom_slabs(
+        self,
+        company_id: str,
+    ) -> Dict[str, List[Tuple[Decimal, Decimal, Optional[Decimal]]]]:
+        """All active custom slabs of a company in one query, by state code."""
+        slabs_by_state: Dict[str, List[Tuple[Decimal, Decimal, Optional[Decimal]]]] = {}
+        custom_slabs = self.db.query(ProfessionalTaxSlab).filter(
+            ProfessionalTaxSlab.company_id == company_id,
+            ProfessionalTaxSlab.is_active == True,
+        ).order_by(ProfessionalTaxSlab.state_code, ProfessionalTaxSlab.from_amount).all()
+        
+        for slab in custom_slabs:
+            slabs_by_state.setdefault(slab.state_code, []).append((
+                slab.to_amount or Decimal("inf"),
+                slab.tax_amount,
+                slab.february_tax_amount if slab.is_february_special else None
+            ))
+        return slabs_by_state
+    
     def calculate_pt(
         self,
         gross_salary: Decimal,
@@ -12,6 +12,10 @@ from app.database.models import (
     AccountType, TransactionStatus, ReferenceType, StockEntry, StockMovementType,
     INDIAN_STATE_CODES
 )
+from app.services.balance_snapshot_service import BalanceSnapshotService
+from app.services.gst_return_ledger import EXCLUDED_PURCHASE_STATUSES, GSTReturnLedgerService
+from app.services.period_totals_cache import PeriodTotalsCache
+from app.services.sequence_service import SequenceService, SYSTEM_SERIES
 
 
 class PurchaseService:
@@ -59,11 +63,17 @@ class PurchaseService:
     
     def _get_next_invoice_number(self, company: Company) -> str:
         """Generate next purchase invoice number."""
-        count = self.db.query(PurchaseInvoice).filter(
-            PurchaseInvoice.company_id == company.id
-        ).count()
+        def seed() -> int:
+            # First use of the counter continues after existing purchase invoices
+            return self.db.query(PurchaseInvoice).filter(
+                PurchaseInvoice.company_id == company.id
+            ).count() + 1
+        
+        number = SequenceService(self.db).allocate(
+            company.id, "purchase_invoice", series_name=SYSTEM_SERIES, seed=seed
+        )
         prefix = company.invoice_prefix or "PUR"
-        return f"{prefix}-{count + 1:05d}"
+        return f"{prefix}-{number:05d}"
     
     def _get_financial_year_quarter(self, date_obj: datetime) -> Tuple[str, str]:
         """Get financial year and quarter for a date (Indian FY: April to March)."""
@@ -272,6 +282,7 @@ class PurchaseService:
         # Create accounting entries
         self._create_purchase_accounting_entries(invoice)
         
+        GSTReturnLedgerService(self.db).record_purchase(invoice)
         self.db.commit()
         self.db.refresh(invoice)
         return invoice
@@ -403,7 +414,9 @@ class PurchaseService:
             )
             self.db.add(entry)
         
-        # Balances are calculated from transaction entries, not stored
+        # Balances are calculated from transaction entries; snapshots only cache them
+        BalanceSnapshotService(self.db).record_transaction(transaction)
+        PeriodTotalsCache(self.db).invalidate(transaction)
         return transaction
     
     def _get_account_by_code(self, code: str, company: Company) -> Optional[Account]:
@@ -573,7 +586,9 @@ class PurchaseService:
         )
         self.db.add(entry2)
         
-        # Balances are calculated from transaction entries, not stored
+        # Balances are calculated from transaction entries; snapshots only cache them
+        BalanceSnapshotService(self.db).record_transaction(transaction)
+        PeriodTotalsCache(self.db).invalidate(transaction)
         payment.transaction_id = transaction.id
         
         return transaction
@@ -670,10 +685,13 @@ class PurchaseService:
                     product.current_stock = (product.current_stock or Decimal("0")) - item.quantity
                 item.stock_received = False
         
+        old_status = invoice.status
         invoice.status = PurchaseInvoiceStatus.CANCELLED
         if reason:
             invoice.notes = f"{invoice.notes or ''}\n\n[CANCELLED] {reason}".strip()
         
+        if old_status not in EXCLUDED_PURCHASE_STATUSES:
+            GSTReturnLedgerService(self.db).record_purchase(invoice, sign=-1)
         self.db.commit()
         self.db.refresh(invoice)
         return invoice
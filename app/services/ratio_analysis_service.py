@@ -6,17 +6,78 @@ Features:
 - Profitability ratios
 - Solvency ratios
 - Activity ratios
+- Monthly trend of ratios on a trailing twelve month basis
+
+All figures come from one StatementBuilder matrix: balances are classified
+into sub-groups (cash, receivables, inventory, fixed assets, current
+liabilities, cost of goods sold, ...) by the code ranges of the default
+chart of accounts, so ratios use exact figures instead of fixed
+proportions of total assets.
 """
 from decimal import Decimal, ROUND_HALF_UP
-from typing import Dict, Optional
+from typing import Dict, List
 from datetime import datetime
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 
-from app.database.models import (
-    Account, AccountType, Transaction, TransactionEntry, TransactionStatus,
-    Invoice, PurchaseInvoice
-)
+from app.database.models import Account, AccountType
+from app.services.statement_builder import StatementBuilder, StatementMatrix, JUST_BEFORE, PAYABLES_CODE
+
+
+# Sub-groups by code range, following DEFAULT_CHART_OF_ACCOUNTS
+# (1010-xxxx bank ledgers fall under 1010)
+ACCOUNT_GROUPS = {
+    AccountType.ASSET: [
+        (1000, 1099, "cash"),
+        (1120, 1129, "cash"),  # Cheques in hand
+        (1100, 1199, "receivables"),
+        (1200, 1299, "inventory"),
+        (1300, 1499, "other_current_assets"),
+        (1500, 1999, "fixed_assets"),
+    ],
+    AccountType.LIABILITY: [
+        (2000, 2299, "current_liabilities"),
+        (2300, 2999, "long_term_liabilities"),
+    ],
+    AccountType.EXPENSE: [
+        (5000, 5999, "cost_of_goods_sold"),
+        (6000, 9999, "operating_expenses"),
+    ],
+}
+
+# Group for accounts outside the ranges above
+DEFAULT_GROUPS = {
+    AccountType.ASSET: "other_current_assets",
+    AccountType.LIABILITY: "current_liabilities",
+    AccountType.EQUITY: "equity",
+    AccountType.REVENUE: "revenue",
+    AccountType.EXPENSE: "operating_expenses",
+}
+
+CURRENT_ASSET_GROUPS = ("cash", "receivables", "inventory", "other_current_assets")
+
+
+def classify_account(account: Account) -> str:
+    """Ratio sub-group of an account from its type and code."""
+    prefix = (account.code or "")[:4]
+    if prefix.isdigit():
+        number = int(prefix)
+        for low, high, group in ACCOUNT_GROUPS.get(account.account_type, []):
+            if low <= number <= high:
+                return group
+    return DEFAULT_GROUPS[account.account_type]
+
+
+def financial_year_start(as_of: datetime) -> datetime:
+    """1 April of the financial year containing as_of."""
+    year = as_of.year if as_of.month >= 4 else as_of.year - 1
+    return datetime(year, 4, 1)
+
+
+def month_end(year: int, month: int) -> datetime:
+    """Last moment of a calendar month."""
+    if month == 12:
+        return datetime(year + 1, 1, 1) - JUST_BEFORE
+    return datetime(year, month + 1, 1) - JUST_BEFORE
 
 
 class RatioAnalysisService:
@@ -30,96 +91,76 @@ class RatioAnalysisService:
             return 0.0
         return float(Decimal(str(value)).quantize(Decimal(f'0.{"0" * decimals}'), rounding=ROUND_HALF_UP))
     
-    def _get_balance_by_type(
+    def _get_figures(
         self,
-        company_id: str,
-        account_type: AccountType,
-        as_of_date: datetime = None,
-    ) -> Decimal:
-        """Get total balance for an account type from transaction entries."""
-        # Get all account IDs of this type
-        accounts = self.db.query(Account.id).filter(
-            Account.company_id == company_id,
-            Account.account_type == account_type,
-            Account.is_active == True,
-        ).all()
-        
-        if not accounts:
-            return Decimal('0')
-        
-        account_ids = [a.id for a in accounts]
-        
-        # Calculate balance from transaction entries
-        query = self.db.query(
-            func.coalesce(func.sum(TransactionEntry.debit_amount), 0).label('total_debit'),
-            func.coalesce(func.sum(TransactionEntry.credit_amount), 0).label('total_credit')
-        ).join(Transaction).filter(
-            TransactionEntry.account_id.in_(account_ids),
-            Transaction.status == TransactionStatus.POSTED,
-        )
+        matrix: StatementMatrix,
+        opening: datetime,
+        closing: datetime,
+    ) -> Dict[str, Decimal]:
+        """
+        Group totals from the matrix: balance sheet groups as of closing,
+        revenue and expense groups for the activity in (opening, closing],
+        plus opening receivables/payables for the averages.
+        """
+        figures = {group: Decimal('0') for group in (
+            *CURRENT_ASSET_GROUPS, 'fixed_assets', 'current_liabilities', 'long_term_liabilities',
+            'equity', 'revenue', 'cost_of_goods_sold', 'operating_expenses',
+            'retained_earnings', 'payables', 'opening_receivables', 'opening_payables',
+        )}
         
-        if as_of_date:
-            query = query.filter(Transaction.transaction_date <= as_of_date)
+        for account in matrix.accounts:
+            account_type = account.account_type
+            if account_type in (AccountType.REVENUE, AccountType.EXPENSE):
+                # Earnings to date belong to equity, active or not
+                balance = matrix.balance_at(account.id, closing)
+                figures['retained_earnings'] += balance if account_type == AccountType.REVENUE else -balance
+            if not account.is_active:
+                continue
+            
+            group = classify_account(account)
+            if account_type in (AccountType.REVENUE, AccountType.EXPENSE):
+                figures[group] += matrix.activity(account.id, opening, closing)
+            else:
+                figures[group] += matrix.balance_at(account.id, closing)
+                if group == 'receivables':
+                    figures['opening_receivables'] += matrix.balance_at(account.id, opening)
+                elif account_type == AccountType.LIABILITY and (account.code or '').startswith(PAYABLES_CODE):
+                    figures['payables'] += matrix.balance_at(account.id, closing)
+                    figures['opening_payables'] += matrix.balance_at(account.id, opening)
         
-        result = query.first()
-        total_debit = Decimal(str(result.total_debit or 0))
-        total_credit = Decimal(str(result.total_credit or 0))
-        
-        # Assets and Expenses have debit-normal balances
-        # Liabilities, Equity, Revenue have credit-normal balances
-        if account_type in [AccountType.ASSET, AccountType.EXPENSE]:
-            return total_debit - total_credit
-        else:
-            return total_credit - total_debit
+        figures['current_assets'] = sum((figures[g] for g in CURRENT_ASSET_GROUPS), Decimal('0'))
+        figures['total_assets'] = figures['current_assets'] + figures['fixed_assets']
+        figures['total_liabilities'] = figures['current_liabilities'] + figures['long_term_liabilities']
+        figures['total_equity'] = figures['equity'] + figures['retained_earnings']
+        figures['total_expenses'] = figures['cost_of_goods_sold'] + figures['operating_expenses']
+        figures['net_income'] = figures['revenue'] - figures['total_expenses']
+        figures['days'] = Decimal(max((closing - opening).days, 1))
+        return figures
     
-    def get_all_ratios(
-        self,
-        company_id: str,
-        from_date: datetime = None,
-        to_date: datetime = None,
-    ) -> Dict:
-        """Calculate all financial ratios."""
-        # Get account balances by type
-        assets = self._get_balance_by_type(company_id, AccountType.ASSET)
-        liabilities = self._get_balance_by_type(company_id, AccountType.LIABILITY)
-        equity = self._get_balance_by_type(company_id, AccountType.EQUITY)
-        revenue = self._get_balance_by_type(company_id, AccountType.REVENUE)
-        expenses = self._get_balance_by_type(company_id, AccountType.EXPENSE)
-        
-        # Calculate derived values
-        current_assets = assets * Decimal('0.6')  # Approximate
-        current_liabilities = liabilities * Decimal('0.4')  # Approximate
-        inventory = assets * Decimal('0.2')  # Approximate
-        net_income = revenue - expenses
+    def _build_ratios(self, f: Dict[str, Decimal]) -> Dict:
+        """Ratio definitions with rounded values from group figures."""
+        avg_receivables = (f['opening_receivables'] + f['receivables']) / 2
+        avg_payables = (f['opening_payables'] + f['payables']) / 2
+        receivables_turnover = self._safe_divide(f['revenue'], avg_receivables)
+        payables_turnover = self._safe_divide(f['cost_of_goods_sold'], avg_payables)
+        equity = f['total_equity']
         
-        # Get receivables and payables
-        receivables = self.db.query(func.sum(Invoice.outstanding_amount)).filter(
-            Invoice.company_id == company_id,
-            Invoice.outstanding_amount > 0,
-        ).scalar() or Decimal('0')
-        
-        payables = self.db.query(func.sum(PurchaseInvoice.outstanding_amount)).filter(
-            PurchaseInvoice.company_id == company_id,
-            PurchaseInvoice.outstanding_amount > 0,
-        ).scalar() or Decimal('0')
-        
-        # Calculate ratios
         ratios = {
             'liquidity': {
                 'current_ratio': {
-                    'value': self._safe_divide(current_assets, current_liabilities),
+                    'value': self._safe_divide(f['current_assets'], f['current_liabilities']),
                     'formula': 'Current Assets / Current Liabilities',
                     'benchmark': '2.0',
                     'interpretation': 'Measures ability to pay short-term obligations',
                 },
                 'quick_ratio': {
-                    'value': self._safe_divide(current_assets - inventory, current_liabilities),
+                    'value': self._safe_divide(f['current_assets'] - f['inventory'], f['current_liabilities']),
                     'formula': '(Current Assets - Inventory) / Current Liabilities',
                     'benchmark': '1.0',
                     'interpretation': 'Acid test - measures immediate liquidity',
                 },
                 'cash_ratio': {
-                    'value': self._safe_divide(current_assets * Decimal('0.3'), current_liabilities),
+                    'value': self._safe_divide(f['cash'], f['current_liabilities']),
                     'formula': 'Cash / Current Liabilities',
                     'benchmark': '0.5',
                     'interpretation': 'Most conservative liquidity measure',
@@ -127,25 +168,25 @@ class RatioAnalysisService:
             },
             'profitability': {
                 'gross_profit_margin': {
-                    'value': self._safe_divide(revenue - expenses * Decimal('0.6'), revenue) * 100,
+                    'value': self._safe_divide(f['revenue'] - f['cost_of_goods_sold'], f['revenue']) * 100,
                     'formula': '(Revenue - COGS) / Revenue × 100',
                     'benchmark': '30%',
                     'interpretation': 'Profit after direct costs',
                 },
                 'net_profit_margin': {
-                    'value': self._safe_divide(net_income, revenue) * 100,
+                    'value': self._safe_divide(f['net_income'], f['revenue']) * 100,
                     'formula': 'Net Income / Revenue × 100',
                     'benchmark': '10%',
                     'interpretation': 'Overall profitability',
                 },
                 'return_on_assets': {
-                    'value': self._safe_divide(net_income, assets) * 100,
+                    'value': self._safe_divide(f['net_income'], f['total_assets']) * 100,
                     'formula': 'Net Income / Total Assets × 100',
                     'benchmark': '5%',
                     'interpretation': 'Efficiency in using assets',
                 },
                 'return_on_equity': {
-                    'value': self._safe_divide(net_income, abs(equity) if equity else Decimal('1')) * 100,
+                    'value': self._safe_divide(f['net_income'], abs(equity)) * 100,
                     'formula': 'Net Income / Shareholder Equity × 100',
                     'benchmark': '15%',
                     'interpretation': 'Return to shareholders',
@@ -153,19 +194,19 @@ class RatioAnalysisService:
             },
             'solvency': {
                 'debt_to_equity': {
-                    'value': self._safe_divide(liabilities, abs(equity) if equity else Decimal('1')),
+                    'value': self._safe_divide(f['total_liabilities'], abs(equity)),
                     'formula': 'Total Debt / Equity',
                     'benchmark': '1.5',
                     'interpretation': 'Financial leverage',
                 },
                 'debt_ratio': {
-                    'value': self._safe_divide(liabilities, assets) * 100,
+                    'value': self._safe_divide(f['total_liabilities'], f['total_assets']) * 100,
                     'formula': 'Total Debt / Total Assets × 100',
                     'benchmark': '40%',
                     'interpretation': 'Portion of assets financed by debt',
                 },
                 'equity_ratio': {
-                    'value': self._safe_divide(abs(equity) if equity else Decimal('0'), assets) * 100,
+                    'value': self._safe_divide(abs(equity), f['total_assets']) * 100,
                     'formula': 'Equity / Total Assets × 100',
                     'benchmark': '50%',
                     'interpretation': 'Portion of assets financed by owners',
@@ -173,26 +214,26 @@ class RatioAnalysisService:
             },
             'activity': {
                 'receivables_turnover': {
-                    'value': self._safe_divide(revenue, receivables),
+                    'value': receivables_turnover,
                     'formula': 'Revenue / Avg Receivables',
                     'benchmark': '8x',
                     'interpretation': 'How quickly receivables are collected',
                 },
                 'payables_turnover': {
-                    'value': self._safe_divide(expenses * Decimal('0.6'), payables),
+                    'value': payables_turnover,
                     'formula': 'Purchases / Avg Payables',
                     'benchmark': '6x',
                     'interpretation': 'How quickly payables are paid',
                 },
                 'receivables_days': {
-                    'value': self._safe_divide(Decimal('365'), self._safe_divide(revenue, receivables) or Decimal('1')),
-                    'formula': '365 / Receivables Turnover',
+                    'value': self._safe_divide(f['days'], Decimal(str(receivables_turnover))),
+                    'formula': 'Days in Period / Receivables Turnover',
                     'benchmark': '45 days',
                     'interpretation': 'Average collection period',
                 },
                 'payables_days': {
-                    'value': self._safe_divide(Decimal('365'), self._safe_divide(expenses * Decimal('0.6'), payables) or Decimal('1')),
-                    'formula': '365 / Payables Turnover',
+                    'value': self._safe_divide(f['days'], Decimal(str(payables_turnover))),
+                    'formula': 'Days in Period / Payables Turnover',
                     'benchmark': '60 days',
                     'interpretation': 'Average payment period',
                 },
@@ -204,21 +245,83 @@ class RatioAnalysisService:
             for ratio in category.values():
                 ratio['value'] = self._round(ratio['value'])
         
+        return ratios
+    
+    def get_all_ratios(
+        self,
+        company_id: str,
+        from_date: datetime = None,
+        to_date: datetime = None,
+    ) -> Dict:
+        """
+        Calculate all financial ratios as of to_date (default now), with
+        income figures for from_date - to_date (default: financial year to date).
+        """
+        to_date = to_date or datetime.utcnow()
+        from_date = from_date or financial_year_start(to_date)
+        opening = from_date - JUST_BEFORE
+        
+        matrix = StatementBuilder(self.db).load(company_id, [opening, to_date])
+        figures = self._get_figures(matrix, opening, to_date)
+        
         return {
-            'as_of_date': datetime.utcnow().strftime('%Y-%m-%d'),
+            'as_of_date': to_date.strftime('%Y-%m-%d'),
+            'from_date': from_date.strftime('%Y-%m-%d'),
             'balances': {
-                'total_assets': self._round(assets),
-                'total_liabilities': self._round(liabilities),
-                'total_equity': self._round(equity),
-                'total_revenue': self._round(revenue),
-                'total_expenses': self._round(expenses),
-                'net_income': self._round(net_income),
-                'receivables': self._round(receivables),
-                'payables': self._round(payables),
+                'total_assets': self._round(figures['total_assets']),
+                'current_assets': self._round(figures['current_assets']),
+                'cash': self._round(figures['cash']),
+                'inventory': self._round(figures['inventory']),
+                'fixed_assets': self._round(figures['fixed_assets']),
+                'total_liabilities': self._round(figures['total_liabilities']),
+                'current_liabilities': self._round(figures['current_liabilities']),
+                'total_equity': self._round(figures['total_equity']),
+                'total_revenue': self._round(figures['revenue']),
+                'cost_of_goods_sold': self._round(figures['cost_of_goods_sold']),
+                'total_expenses': self._round(figures['total_expenses']),
+                'net_income': self._round(figures['net_income']),
+                'receivables': self._round(figures['receivables']),
+                'payables': self._round(figures['payables']),
             },
-            'ratios': ratios,
+            'ratios': self._build_ratios(figures),
         }
     
+    def get_ratio_trend(
+        self,
+        company_id: str,
+        months: int = 12,
+        as_of_date: datetime = None,
+    ) -> List[Dict]:
+        """
+        Ratios at each of the last `months` month ends, with income figures
+        for the trailing twelve months, from a single grouped query.
+        """
+        as_of_date = as_of_date or datetime.utcnow()
+        # Month ends from twelve months before the first point to the last
+        ends = []
+        year, month = as_of_date.year, as_of_date.month
+        for _ in range(months + 12):
+            ends.append(month_end(year, month))
+            year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+        ends.reverse()
+        
+        matrix = StatementBuilder(self.db).load(company_id, ends)
+        
+        trend = []
+        for i in range(12, len(ends)):
+            figures = self._get_figures(matrix, ends[i - 12], ends[i])
+            ratios = self._build_ratios(figures)
+            trend.append({
+                'month': ends[i].strftime('%Y-%m'),
+                'as_of_date': ends[i].strftime('%Y-%m-%d'),
+                'net_income': self._round(figures['net_income']),
+                'ratios': {
+                    name: ratio['value']
+                    for category in ratios.values() for name, ratio in category.items()
+                },
+            })
+        return trend
+    
     def _safe_divide(self, numerator: Decimal, denominator: Decimal) -> float:
         """Safely divide two numbers."""
         if denominator == 0 or denominator is None:
@@ -0,0 +1,257 @@
+"""
+Reconciliation Matcher - Indexed matching of book entries against bank entries.
+
+Bank entries are bucketed by exact amount in cents. Each bucket is kept
+sorted by (date, position), so a book entry only looks at bank entries of
+the right amount inside its date window instead of scanning the whole
+statement. Matching is greedy in book order and one-to-one.
+
+Passes:
+1. Amount + date within tolerance_days, closest date wins (the original
+   auto_match rule).
+2. Optional: amount + shared reference (UTR, cheque number) within
+   reference_window_days.
+3. Optional: amount + narration token similarity >= narration_threshold
+   within narration_window_days, most similar wins.
+
+Ties are broken by smallest date difference, then by the bank entry's
+position in the input list, so results are deterministic for a given input
+order. Date-pass results record how many other bank entries were equally
+close (MatchResult.ties), so callers can report ambiguous matches.
+"""
+import re
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal, ROUND_FLOOR
+from typing import Dict, List, Optional, Set, Tuple
+
+
+TOKEN_PATTERN = re.compile(r"[A-Za-z0-9]+")
+
+# Words that carry no matching signal in bank narrations
+STOP_WORDS = {
+    "the", "and", "for", "from", "payment", "paid", "received", "transfer",
+    "neft", "rtgs", "imps", "upi", "ach", "txn", "ref", "chq", "cheque", "bank",
+}
+
+
+def to_cents(amount) -> int:
+    """Convert an amount to integer cents (amounts are stored with 2 decimals)."""
+    return int((Decimal(str(amount or 0)) * 100).to_integral_value())
+
+
+def to_day(value) -> Optional[int]:
+    """Convert a date/datetime to a day ordinal."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        value = value.date()
+    return value.toordinal()
+
+
+def reference_tokens(*texts: Optional[str]) -> Set[str]:
+    """Tokens that look like references: 5+ characters with at least one digit."""
+    tokens = set()
+    for text in texts:
+        for token in TOKEN_PATTERN.findall(text or ""):
+            if len(token) >= 5 and any(ch.isdigit() for ch in token):
+                tokens.add(token.upper())
+    return tokens
+
+
+def narration_tokens(*texts: Optional[str]) -> Set[str]:
+    """Lower-cased words of 3+ characters, without common banking noise words."""
+    tokens = set()
+    for text in texts:
+        for token in TOKEN_PATTERN.findall(text or ""):
+            token = token.lower()
+            if len(token) >= 3 and token not in STOP_WORDS:
+                tokens.add(token)
+    return tokens
+
+
+def similarity(a: Set[str], b: Set[str]) -> float:
+    """Jaccard similarity of two token sets."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+@dataclass
+class MatchCandidate:
+    """A book or bank entry reduced to what the matcher needs."""
+    id: str
+    amount_cents: int
+    day: Optional[int]
+    references: Set[str] = field(default_factory=set)
+    words: Set[str] = field(default_factory=set)
+
+
+@dataclass
+class MatchResult:
+    """One matched pair."""
+    book_id: str
+    bank_id: str
+    date_diff_days: int
+    rule: str  # "amount_date", "reference" or "narration"
+    score: float = 1.0
+    ties: int = 0  # Other unmatched bank entries with the same date difference
+
+
+class ReconciliationMatcher:
+    """Matches book candidates to bank candidates using amount buckets."""
+
+    def __init__(
+        self,
+        bank_entries: List[MatchCandidate],
+        tolerance_days: int = 3,
+        tolerance_amount: Decimal = Decimal("0.01"),
+    ):
+        self.bank_entries = bank_entries
+        self.tolerance_days = tolerance_days
+        self.tolerance_cents = int((Decimal(str(tolerance_amount)) * 100).to_integral_value(ROUND_FLOOR))
+
+        # amount in cents -> sorted [(day, position)]
+        self._buckets: Dict[int, List[Tuple[int, int]]] = {}
+        # reference token -> [position]
+        self._references: Dict[str, List[int]] = {}
+        self._matched: Set[int] = set()
+
+        for position, bank in enumerate(bank_entries):
+            if bank.day is None:
+                continue
+            self._buckets.setdefault(bank.amount_cents, []).append((bank.day, position))
+            for token in bank.references:
+                self._references.setdefault(token, []).append(position)
+
+        for bucket in self._buckets.values():
+            bucket.sort()
+        self._amounts = sorted(self._buckets)
+
+    def _amount_keys(self, amount_cents: int) -> List[int]:
+        """Bucket keys within the amount tolerance."""
+        lo = bisect_left(self._amounts, amount_cents - self.tolerance_cents)
+        hi = bisect_right(self._amounts, amount_cents + self.tolerance_cents)
+        return self._amounts[lo:hi]
+
+    def _window(self, amount_cents: int, day: int, days: int):
+        """Yield (day, position) of unmatched bank entries of this amount within ±days."""
+        for key in self._amount_keys(amount_cents):
+            bucket = self._buckets[key]
+            lo = bisect_left(bucket, (day - days, -1))
+            hi = bisect_right(bucket, (day + days, len(self.bank_entries)))
+            for item in bucket[lo:hi]:
+                yield item
+
+    def _take(self, position: int) -> MatchCandidate:
+        """Mark a bank entry as matched and drop it from its bucket."""
+        bank = self.bank_entries[position]
+        bucket = self._buckets[bank.amount_cents]
+        del bucket[bisect_left(bucket, (bank.day, position))]
+        self._matched.add(position)
+        return bank
+
+    def match(
+        self,
+        book_entries: List[MatchCandidate],
+        match_references: bool = False,
+        reference_window_days: int = 30,
+        match_narration: bool = False,
+        narration_threshold: float = 0.5,
+        narration_window_days: int = 15,
+    ) -> List[MatchResult]:
+        """Run the enabled passes over book_entries (in the given order)."""
+        results: List[MatchResult] = []
+        remaining = [book for book in book_entries if book.day is not None]
+
+        remaining = self._match_by_date(remaining, results)
+        if match_references:
+            remaining = self._match_by_reference(remaining, results, reference_window_days)
+        if match_narration:
+            remaining = self._match_by_narration(
+                remaining, results, narration_threshold, narration_window_days
+            )
+        return results
+
+    def _match_by_date(self, books: List[MatchCandidate], results: List[MatchResult]) -> List[MatchCandidate]:
+        unmatched = []
+        for book in books:
+            best = None
+            ties = 0
+            for bank_day, position in self._window(book.amount_cents, book.day, self.tolerance_days):
+                key = (abs(bank_day - book.day), position)
+                if best is None or key[0] < best[0]:
+                    best, ties = key, 0
+                elif key[0] == best[0]:
+                    ties += 1
+                    best = min(best, key)
+
+            if best is None:
+                unmatched.append(book)
+                continue
+
+            bank = self._take(best[1])
+            results.append(MatchResult(book.id, bank.id, best[0], "amount_date", ties=ties))
+        return unmatched
+
+    def _match_by_reference(
+        self,
+        books: List[MatchCandidate],
+        results: List[MatchResult],
+        window_days: int,
+    ) -> List[MatchCandidate]:
+        unmatched = []
+        for book in books:
+            best = None
+            for token in book.references:
+                for position in self._references.get(token, ()):
+                    if position in self._matched:
+                        continue
+                    bank = self.bank_entries[position]
+                    if abs(bank.amount_cents - book.amount_cents) > self.tolerance_cents:
+                        continue
+                    date_diff = abs(bank.day - book.day)
+                    if date_diff > window_days:
+                        continue
+                    key = (date_diff, position)
+                    if best is None or key < best:
+                        best = key
+
+            if best is None:
+                unmatched.append(book)
+                continue
+
+            bank = self._take(best[1])
+            results.append(MatchResult(book.id, bank.id, best[0], "reference"))
+        return unmatched
+
+    def _match_by_narration(
+        self,
+        books: List[MatchCandidate],
+        results: List[MatchResult],
+        threshold: float,
+        window_days: int,
+    ) -> List[MatchCandidate]:
+        unmatched = []
+        for book in books:
+            if not book.words:
+                unmatched.append(book)
+                continue
+
+            best = None
+            for bank_day, position in self._window(book.amount_cents, book.day, window_days):
+                score = similarity(book.words, self.bank_entries[position].words)
+                if score < threshold:
+                    continue
+                key = (-score, abs(bank_day - book.day), position)
+                if best is None or key < best:
+                    best = key
+
+            if best is None:
+                unmatched.append(book)
+                continue
+
+            bank = self._take(best[2])
+            results.append(MatchResult(book.id, bank.id, best[1], "narration", round(-best[0], 4)))
+        return unmatched
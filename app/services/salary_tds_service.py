@@ -109,6 +109,21 @@ class SalaryTDSService:
     
     def __init__(self, db: Session):
         self.db = db
+        self._declarations: Dict[Tuple[str, str], Optional[EmployeeTaxDeclaration]] = {}
+    
+    def use_declarations(
+        self,
+        financial_year: str,
+        declarations: Dict[str, Optional[EmployeeTaxDeclaration]],
+    ) -> None:
+        """
+        Use preloaded declarations instead of querying (payroll runs).
+        
+        Every employee of the run should be a key; None means the employee
+        has no declaration for the year.
+        """
+        for employee_id, declaration in declarations.items():
+            self._declarations[(employee_id, financial_year)] = declaration
     
     def _round_amount(self, amount: Decimal) -> Decimal:
         """Round to nearest rupee."""
@@ -118,12 +133,21 @@ class SalaryTDSService:
         """Round tax to nearest 10 rupees (for TDS purposes)."""
         return (amount / 10).quantize(Decimal('1'), rounding=ROUND_HALF_UP) * 10
     
+    def get_current_financial_year(self) -> str:
+        """Financial year string for today's date (e.g., "2024-2025")."""
+        today = date.today()
+        if today.month >= 4:
+            return f"{today.year}-{today.year + 1}"
+        return f"{today.year - 1}-{today.year}"
+    
     def get_tax_declaration(
         self,
         employee_id: str,
         financial_year: str,
     ) -> Optional[EmployeeTaxDeclaration]:
         """Get employee's tax declaration for a financial year."""
+        if (employee_id, financial_year) in self._declarations:
+            return self._declarations[(employee_id, financial_year)]
         return self.db.query(EmployeeTaxDeclaration).filter(
             EmployeeTaxDeclaration.employee_id == employee_id,
             EmployeeTaxDeclaration.financial_year == financial_year,
@@ -347,11 +371,7 @@ class SalaryTDSService:
         """
         # Determine financial year
         if not financial_year:
-            today = date.today()
-            if today.month >= 4:
-                financial_year = f"{today.year}-{today.year + 1}"
-            else:
-                financial_year = f"{today.year - 1}-{today.year}"
+            financial_year = self.get_current_financial_year()
         
         # Get tax declaration
         declaration = self.get_tax_declaration(employee.id, financial_year)
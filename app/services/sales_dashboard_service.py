@@ -3,7 +3,7 @@ from datetime import datetime, date, timedelta
 from decimal import Decimal
 from typing import List, Optional, Dict, Any
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func, extract
+from sqlalchemy import and_, or_, func, extract, case
 
 from app.database.models import (
     SalesTicket, SalesTicketStatus, SalesTicketStage,
@@ -15,6 +15,19 @@ from app.database.models import (
     Customer
 )
 from app.database.payroll_models import Employee
+from app.services.dashboard_cache import dashboard_cache
+
+CLOSED_ENQUIRY_STATUSES = [EnquiryStatus.CONVERTED_TO_QUOT, EnquiryStatus.IGNORED, EnquiryStatus.COMPLETED]
+
+
+def _count_where(*conditions):
+    """COUNT of the rows matching all conditions, as a SUM(CASE ...) column."""
+    return func.sum(case((and_(*conditions), 1), else_=0))
+
+
+def _sum_where(column, *conditions):
+    """SUM of a column over the rows matching all conditions."""
+    return func.sum(case((and_(*conditions), column), else_=0))
 
 
 class SalesDashboardService:
@@ -25,24 +38,24 @@ class SalesDashboardService:
     
     def get_pipeline_funnel(self, company_id: str) -> Dict[str, Any]:
         """Get pipeline funnel data showing progression through stages."""
-        funnel = []
-        
-        for stage in SalesTicketStage:
-            count = self.db.query(func.count(SalesTicket.id)).filter(
+        totals = {
+            stage: (count, value)
+            for stage, count, value in self.db.query(
+                SalesTicket.current_stage,
+                func.count(SalesTicket.id),
+                func.sum(SalesTicket.expected_value),
+            ).filter(
                 and_(
                     SalesTicket.company_id == company_id,
-                    SalesTicket.status == SalesTicketStatus.OPEN,
-                    SalesTicket.current_stage == stage
+                    SalesTicket.status == SalesTicketStatus.OPEN
                 )
-            ).scalar() or 0
-            
-            value = self.db.query(func.sum(SalesTicket.expected_value)).filter(
-                and_(
-                    SalesTicket.company_id == company_id,
-                    SalesTicket.status == SalesTicketStatus.OPEN,
-                    SalesTicket.current_stage == stage
-                )
-            ).scalar() or Decimal("0")
+            ).group_by(SalesTicket.current_stage)
+        }
+        
+        funnel = []
+        for stage in SalesTicketStage:
+            count, value = totals.get(stage, (0, None))
+            value = value or Decimal("0")
             
             funnel.append({
                 "stage": stage.value,
@@ -76,52 +89,38 @@ class SalesDashboardService:
             SalesTicket.created_date <= to_date
         )
         
-        total_tickets = self.db.query(func.count(SalesTicket.id)).filter(base_filter).scalar() or 0
-        
-        # Count by final status
-        won = self.db.query(func.count(SalesTicket.id)).filter(
-            and_(base_filter, SalesTicket.status == SalesTicketStatus.WON)
-        ).scalar() or 0
-        
-        lost = self.db.query(func.count(SalesTicket.id)).filter(
-            and_(base_filter, SalesTicket.status == SalesTicketStatus.LOST)
-        ).scalar() or 0
+        total_tickets, won, lost = self.db.query(
+            func.count(SalesTicket.id),
+            _count_where(SalesTicket.status == SalesTicketStatus.WON),
+            _count_where(SalesTicket.status == SalesTicketStatus.LOST),
+        ).filter(base_filter).one()
+        won, lost = won or 0, lost or 0
         
         # Count enquiries that converted to quotations
-        enquiries_total = self.db.query(func.count(Enquiry.id)).filter(
+        enquiries_total, enquiries_converted = self.db.query(
+            func.count(Enquiry.id),
+            _count_where(Enquiry.converted_quotation_id.isnot(None)),
+        ).filter(
             and_(
                 Enquiry.company_id == company_id,
                 Enquiry.enquiry_date >= from_date,
                 Enquiry.enquiry_date <= to_date
             )
-        ).scalar() or 0
-        
-        enquiries_converted = self.db.query(func.count(Enquiry.id)).filter(
-            and_(
-                Enquiry.company_id == company_id,
-                Enquiry.enquiry_date >= from_date,
-                Enquiry.enquiry_date <= to_date,
-                Enquiry.converted_quotation_id.isnot(None)
-            )
-        ).scalar() or 0
+        ).one()
+        enquiries_converted = enquiries_converted or 0
         
         # Count quotations that converted to invoices
-        quotations_total = self.db.query(func.count(Quotation.id)).filter(
+        quotations_total, quotations_converted = self.db.query(
+            func.count(Quotation.id),
+            _count_where(Quotation.status == QuotationStatus.CONVERTED),
+        ).filter(
             and_(
                 Quotation.company_id == company_id,
                 Quotation.quotation_date >= from_date,
                 Quotation.quotation_date <= to_date
             )
-        ).scalar() or 0
-        
-        quotations_converted = self.db.query(func.count(Quotation.id)).filter(
-            and_(
-                Quotation.company_id == company_id,
-                Quotation.quotation_date >= from_date,
-                Quotation.quotation_date <= to_date,
-                Quotation.status == QuotationStatus.CONVERTED
-            )
-        ).scalar() or 0
+        ).one()
+        quotations_converted = quotations_converted or 0
         
         return {
             "period": {
@@ -425,70 +424,55 @@ class SalesDashboardService:
         ]
     
     def get_dashboard_summary(self, company_id: str) -> Dict[str, Any]:
-        """Get complete dashboard summary."""
+        """
+        Get complete dashboard summary.
+
+        Month, pipeline and follow-up figures come from one conditional
+        aggregate per table; the whole summary is cached for
+        DASHBOARD_CACHE_TTL_SECONDS.
+        """
         today = datetime.utcnow().date()
+        key = dashboard_cache.key(company_id, "sales_summary", today)
+        summary = dashboard_cache.get(key)
+        if summary is None:
+            summary = self._dashboard_summary(company_id, today)
+            dashboard_cache.set(key, summary)
+        return summary
+    
+    def _dashboard_summary(self, company_id: str, today: date) -> Dict[str, Any]:
         this_month_start = date(today.year, today.month, 1)
         last_month_start = (this_month_start - timedelta(days=1)).replace(day=1)
         last_month_end = this_month_start - timedelta(days=1)
         
-        # Current month stats
-        this_month_enquiries = self.db.query(func.count(Enquiry.id)).filter(
-            and_(
-                Enquiry.company_id == company_id,
-                func.date(Enquiry.enquiry_date) >= this_month_start
-            )
-        ).scalar() or 0
-        
-        this_month_won = self.db.query(func.sum(SalesTicket.actual_value)).filter(
-            and_(
-                SalesTicket.company_id == company_id,
-                SalesTicket.status == SalesTicketStatus.WON,
-                func.date(SalesTicket.actual_close_date) >= this_month_start
-            )
-        ).scalar() or Decimal("0")
-        
-        # Last month for comparison
-        last_month_enquiries = self.db.query(func.count(Enquiry.id)).filter(
-            and_(
-                Enquiry.company_id == company_id,
-                func.date(Enquiry.enquiry_date) >= last_month_start,
-                func.date(Enquiry.enquiry_date) <= last_month_end
-            )
-        ).scalar() or 0
-        
-        last_month_won = self.db.query(func.sum(SalesTicket.actual_value)).filter(
-            and_(
-                SalesTicket.company_id == company_id,
-                SalesTicket.status == SalesTicketStatus.WON,
-                func.date(SalesTicket.actual_close_date) >= last_month_start,
-                func.date(SalesTicket.actual_close_date) <= last_month_end
-            )
-        ).scalar() or Decimal("0")
-        
-        # Total pipeline
-        pipeline_value = self.db.query(func.sum(SalesTicket.expected_value)).filter(
-            and_(
-                SalesTicket.company_id == company_id,
-                SalesTicket.status == SalesTicketStatus.OPEN
-            )
-        ).scalar() or Decimal("0")
-        
-        pipeline_count = self.db.query(func.count(SalesTicket.id)).filter(
-            and_(
-                SalesTicket.company_id == company_id,
-                SalesTicket.status == SalesTicketStatus.OPEN
-            )
-        ).scalar() or 0
-        
-        # Pending follow-ups
-        pending_followups = self.db.query(func.count(Enquiry.id)).filter(
-            and_(
-                Enquiry.company_id == company_id,
+        enquiry_day = func.date(Enquiry.enquiry_date)
+        this_month_enquiries, last_month_enquiries, pending_followups = self.db.query(
+            _count_where(enquiry_day >= this_month_start),
+            _count_where(enquiry_day >= last_month_start, enquiry_day <= last_month_end),
+            # Pending follow-ups (enquiries not yet converted, ignored or completed)
+            _count_where(
                 Enquiry.follow_up_date <= today + timedelta(days=7),
                 Enquiry.follow_up_date >= today,
-                Enquiry.status.not_in([EnquiryStatus.WON, EnquiryStatus.LOST])
-            )
-        ).scalar() or 0
+                Enquiry.status.not_in(CLOSED_ENQUIRY_STATUSES)
+            ),
+        ).filter(Enquiry.company_id == company_id).one()
+        this_month_enquiries = this_month_enquiries or 0
+        last_month_enquiries = last_month_enquiries or 0
+        pending_followups = pending_followups or 0
+        
+        won = SalesTicket.status == SalesTicketStatus.WON
+        open_ = SalesTicket.status == SalesTicketStatus.OPEN
+        close_day = func.date(SalesTicket.actual_close_date)
+        this_month_won, last_month_won, pipeline_value, pipeline_count = self.db.query(
+            _sum_where(SalesTicket.actual_value, won, close_day >= this_month_start),
+            _sum_where(SalesTicket.actual_value, won, close_day >= last_month_start, close_day <= last_month_end),
+            # Total pipeline
+            _sum_where(SalesTicket.expected_value, open_),
+            _count_where(open_),
+        ).filter(SalesTicket.company_id == company_id).one()
+        this_month_won = this_month_won or Decimal("0")
+        last_month_won = last_month_won or Decimal("0")
+        pipeline_value = pipeline_value or Decimal("0")
+        pipeline_count = pipeline_count or 0
         
         return {
             "this_month": {
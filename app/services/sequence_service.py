@@ -0,0 +1,201 @@
+"""
+Sequence Service - Concurrency-safe voucher number allocation.
+
+Every numbered document series has one VoucherSequence counter row per
+(company, voucher type, series, financial year). Numbers are taken with an
+atomic UPDATE ... RETURNING where the database supports it, and with a
+SELECT ... FOR UPDATE row lock otherwise.
+
+Allocation never commits. The counter row stays locked until the caller's
+transaction ends, and a rollback hands the numbers back, so a series stays
+gap-free as long as documents are committed together with their number.
+The cost is the same for every allocation, however large the tables grow.
+"""
+from typing import Callable, Dict, Any, Iterator, Optional
+from datetime import date
+from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.database.models import VoucherSequence
+
+
+# Series name used by the built-in numbering of invoices and vouchers, kept
+# apart from user-configured VoucherNumberingService series
+SYSTEM_SERIES = "System"
+
+
+def get_financial_year(as_of: Optional[date] = None) -> str:
+    """Get the Indian financial year (April-March) for a date, e.g. '2024-2025'."""
+    if as_of is None:
+        as_of = date.today()
+
+    if as_of.month >= 4:
+        return f"{as_of.year}-{as_of.year + 1}"
+    return f"{as_of.year - 1}-{as_of.year}"
+
+
+class SequenceBlock:
+    """A pre-allocated run of consecutive numbers for bulk imports.
+
+    Numbers that are never handed out are lost, so only reserve what the
+    import is going to use.
+    """
+
+    def __init__(self, start: int, size: int):
+        self.start = start
+        self.size = size
+        self._used = 0
+
+    @property
+    def end(self) -> int:
+        """Last number in the block."""
+        return self.start + self.size - 1
+
+    @property
+    def remaining(self) -> int:
+        return self.size - self._used
+
+    def next(self) -> int:
+        """Hand out the next number from the block."""
+        if self._used >= self.size:
+            raise ValueError("Sequence block exhausted")
+        number = self.start + self._used
+        self._used += 1
+        return number
+
+    def __iter__(self) -> Iterator[int]:
+        while self.remaining:
+            yield self.next()
+
+
+class SequenceService:
+    """Allocates numbers from VoucherSequence counter rows."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _key(self, company_id: str, voucher_type: str, series_name: str, financial_year: str):
+        return (
+            VoucherSequence.company_id == company_id,
+            VoucherSequence.voucher_type == voucher_type,
+            VoucherSequence.series_name == series_name,
+            VoucherSequence.financial_year == financial_year,
+        )
+
+    def allocate(
+        self,
+        company_id: str,
+        voucher_type: str,
+        financial_year: str = "",
+        series_name: str = "Default",
+        count: int = 1,
+        seed: Optional[Callable[[], int]] = None,
+        defaults: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        """
+        Allocate `count` consecutive numbers and return the first one.
+
+        If the counter row does not exist yet it is created. Its first number
+        comes from `seed()` (used to continue numbering from existing
+        documents) or 1. Any `defaults` are stored on the new row.
+        """
+        if count < 1:
+            raise ValueError("count must be at least 1")
+
+        key = self._key(company_id, voucher_type, series_name, financial_year)
+
+        first = self._increment(key, count)
+        if first is None:
+            self._create(company_id, voucher_type, series_name, financial_year, seed, defaults)
+            first = self._increment(key, count)
+
+        return first
+
+    def allocate_block(
+        self,
+        company_id: str,
+        voucher_type: str,
+        size: int,
+        financial_year: str = "",
+        series_name: str = "Default",
+        seed: Optional[Callable[[], int]] = None,
+    ) -> SequenceBlock:
+        """Reserve a block of numbers in one round trip (for bulk imports)."""
+        start = self.allocate(
+            company_id, voucher_type,
+            financial_year=financial_year,
+            series_name=series_name,
+            count=size,
+            seed=seed,
+        )
+        return SequenceBlock(start, size)
+
+    def peek(
+        self,
+        company_id: str,
+        voucher_type: str,
+        financial_year: str = "",
+        series_name: str = "Default",
+    ) -> Optional[int]:
+        """Get the next number without consuming it (None if no counter yet)."""
+        return self.db.execute(
+            select(VoucherSequence.next_number).where(
+                *self._key(company_id, voucher_type, series_name, financial_year)
+            )
+        ).scalar()
+
+    def _increment(self, key, count: int) -> Optional[int]:
+        """Atomically bump the counter. Returns the first allocated number."""
+        dialect = self.db.get_bind().dialect
+
+        if dialect.update_returning:
+            new_next = self.db.execute(
+                update(VoucherSequence)
+                .where(*key)
+                .values(next_number=VoucherSequence.next_number + count)
+                .returning(VoucherSequence.next_number)
+                .execution_options(synchronize_session=False)
+            ).scalar()
+            return None if new_next is None else new_next - count
+
+        # No RETURNING support: lock the row, then update it
+        current = self.db.execute(
+            select(VoucherSequence.next_number).where(*key).with_for_update()
+        ).scalar()
+        if current is None:
+            return None
+
+        self.db.execute(
+            update(VoucherSequence)
+            .where(*key)
+            .values(next_number=current + count)
+            .execution_options(synchronize_session=False)
+        )
+        return current
+
+    def _create(
+        self,
+        company_id: str,
+        voucher_type: str,
+        series_name: str,
+        financial_year: str,
+        seed: Optional[Callable[[], int]],
+        defaults: Optional[Dict[str, Any]],
+    ) -> None:
+        """Create a counter row, tolerating a concurrent creator."""
+        start = seed() if seed else 1
+
+        try:
+            with self.db.begin_nested():
+                self.db.add(VoucherSequence(
+                    company_id=company_id,
+                    voucher_type=voucher_type,
+                    series_name=series_name,
+                    financial_year=financial_year,
+                    next_number=start,
+                    **(defaults or {}),
+                ))
+        except IntegrityError:
+            # Another transaction created the row first; use theirs
+            pass
@@ -0,0 +1,344 @@
+"""Financial statement builder.
+
+Loads one (account, period bucket) matrix of debit/credit totals for a
+company in a single grouped query and derives the profit & loss
+statement, balance sheet and cash flow statement from it in memory.
+Multi-period views (monthly columns for a year, comparative balance
+sheets) add buckets to the same query instead of queries per account and
+period.
+
+Amounts stay Decimal. Each account's buckets are held as parallel arrays
+of running totals, so a balance at any bucket edge and the activity
+between two edges are constant-time lookups.
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import func, case
+from typing import Dict, List, Optional, Iterable, Any
+from datetime import datetime, timedelta
+from decimal import Decimal
+from app.database.models import (
+    Account, Transaction, TransactionEntry, AccountType, TransactionStatus
+)
+from app.services.balance_engine import AccountBalanceEngine
+from app.services.balance_snapshot_service import BalanceSnapshotService
+
+
+# Moments are compared at microsecond precision: "before from_date" is
+# everything dated on or before from_date - 1 microsecond
+JUST_BEFORE = timedelta(microseconds=1)
+
+# Well-known chart of accounts codes used by the cash flow statement
+CASH_CODE = "1000"
+BANK_CODE_PREFIX = "1010"
+RECEIVABLES_CODE = "1100"
+FIXED_ASSETS_CODE = "1500"
+PAYABLES_CODE = "2000"
+LOANS_CODE = "2300"
+CAPITAL_CODE = "3000"
+
+
+class StatementMatrix:
+    """
+    Cumulative debit/credit totals per account at a set of moments (edges).
+
+    Bucket 0 holds everything dated on or before edges[0]; bucket k holds
+    (edges[k-1], edges[k]]. cumulative_debit[account_id][k] is the total
+    up to and including edges[k].
+    """
+
+    def __init__(self, accounts: List[Account], edges: List[datetime]):
+        self.accounts = accounts
+        self.account_types = {account.id: account.account_type for account in accounts}
+        self.edges = edges
+        self.index = {edge: i for i, edge in enumerate(edges)}
+        self.cumulative_debit: Dict[str, List[Decimal]] = {}
+        self.cumulative_credit: Dict[str, List[Decimal]] = {}
+
+    @classmethod
+    def from_totals(
+        cls,
+        accounts: List[Account],
+        moments: List[datetime],
+        totals: List[Dict[str, tuple]],
+    ) -> "StatementMatrix":
+        """Matrix from known cumulative (debit, credit) totals at each moment."""
+        matrix = cls(accounts, moments)
+        zeros = [Decimal("0")] * len(moments)
+        for i, column in enumerate(totals):
+            for account_id, (debit, credit) in column.items():
+                matrix.cumulative_debit.setdefault(account_id, list(zeros))[i] = debit
+                matrix.cumulative_credit.setdefault(account_id, list(zeros))[i] = credit
+        return matrix
+
+    def _fill(self, bucket_totals: Dict[str, List[List[Decimal]]]) -> None:
+        """Turn per-bucket [debit, credit] totals into running totals."""
+        for account_id, buckets in bucket_totals.items():
+            debit = credit = Decimal("0")
+            debits, credits = [], []
+            for bucket_debit, bucket_credit in buckets:
+                debit += bucket_debit
+                credit += bucket_credit
+                debits.append(debit)
+                credits.append(credit)
+            self.cumulative_debit[account_id] = debits
+            self.cumulative_credit[account_id] = credits
+
+    def totals_at(self, account_id: str, moment: datetime):
+        """(debit, credit) totals of an account up to and including an edge."""
+        i = self.index[moment]
+        debits = self.cumulative_debit.get(account_id)
+        if debits is None:
+            return Decimal("0"), Decimal("0")
+        return debits[i], self.cumulative_credit[account_id][i]
+
+    def balance_at(self, account_id: str, moment: datetime) -> Decimal:
+        """Signed balance as of an edge (debit-normal for assets and expenses)."""
+        return AccountBalanceEngine.signed_balance(
+            self.account_types[account_id], *self.totals_at(account_id, moment)
+        )
+
+    def activity(self, account_id: str, after: datetime, until: datetime) -> Decimal:
+        """Signed movement in (after, until], both edges."""
+        start_debit, start_credit = self.totals_at(account_id, after)
+        end_debit, end_credit = self.totals_at(account_id, until)
+        return AccountBalanceEngine.signed_balance(
+            self.account_types[account_id], end_debit - start_debit, end_credit - start_credit
+        )
+
+    def first_with_code(self, code: str) -> Optional[Account]:
+        return next((a for a in self.accounts if a.code == code), None)
+
+
+class StatementBuilder:
+    """Builds financial statements from a StatementMatrix."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_accounts(self, company_id: str) -> List[Account]:
+        """All accounts of the company (active or not), in statement order."""
+        return self.db.query(Account).filter(
+            Account.company_id == company_id
+        ).order_by(Account.code, Account.id).all()
+
+    def load(self, company_id: str, moments: Iterable[datetime]) -> StatementMatrix:
+        """
+        Load the matrix for the given moments: one query for the accounts and
+        one grouped (account_id, bucket) query for the totals. With balance
+        snapshots enabled, bucket 0 comes from the snapshots and only later
+        entries are scanned.
+        """
+        edges = sorted(set(moments))
+        matrix = StatementMatrix(self.get_accounts(company_id), edges)
+
+        bucket_totals: Dict[str, List[List[Decimal]]] = {}
+
+        def buckets_of(account_id: str) -> List[List[Decimal]]:
+            if account_id not in bucket_totals:
+                bucket_totals[account_id] = [[Decimal("0"), Decimal("0")] for _ in edges]
+            return bucket_totals[account_id]
+
+        bucket = case(
+            *[(Transaction.transaction_date <= edge, i) for i, edge in enumerate(edges)]
+        )
+        query = self.db.query(
+            TransactionEntry.account_id,
+            bucket.label('bucket'),
+            func.coalesce(func.sum(TransactionEntry.debit_amount), 0).label('total_debit'),
+            func.coalesce(func.sum(TransactionEntry.credit_amount), 0).label('total_credit'),
+        ).join(Transaction).filter(
+            Transaction.company_id == company_id,
+            Transaction.status == TransactionStatus.POSTED,
+            Transaction.transaction_date <= edges[-1],
+        )
+
+        if BalanceSnapshotService.is_enabled():
+            opening = BalanceSnapshotService(self.db).get_company_totals(company_id, edges[0])
+            for account_id, (debit, credit) in opening.items():
+                buckets_of(account_id)[0] = [debit, credit]
+            query = query.filter(Transaction.transaction_date > edges[0])
+
+        for row in query.group_by(TransactionEntry.account_id, bucket).all():
+            totals = buckets_of(row.account_id)[int(row.bucket)]
+            totals[0] += Decimal(str(row.total_debit or 0))
+            totals[1] += Decimal(str(row.total_credit or 0))
+
+        matrix._fill(bucket_totals)
+        return matrix
+
+    # ==================== STATEMENTS ====================
+
+    def _section(self, name: str, accounts: List[Account], amount_of) -> Dict[str, Any]:
+        """Accounts with a non-zero amount and their total."""
+        entries = []
+        total = Decimal("0")
+        for account in accounts:
+            amount = amount_of(account.id)
+            if amount != 0:
+                entries.append({
+                    "account_id": account.id,
+                    "account_name": account.name,
+                    "amount": amount,
+                })
+                total += amount
+        return {"name": name, "accounts": entries, "total": total}
+
+    def _active(self, matrix: StatementMatrix, account_type: AccountType) -> List[Account]:
+        return [a for a in matrix.accounts if a.account_type == account_type and a.is_active]
+
+    def profit_loss(self, matrix: StatementMatrix, from_date: datetime, to_date: datetime) -> Dict[str, Any]:
+        """P&L for [from_date, to_date]; needs edges from_date - JUST_BEFORE and to_date."""
+        after = from_date - JUST_BEFORE
+
+        def amount_of(account_id):
+            return matrix.activity(account_id, after, to_date)
+
+        revenue = self._section("Revenue", self._active(matrix, AccountType.REVENUE), amount_of)
+        expenses = self._section("Expenses", self._active(matrix, AccountType.EXPENSE), amount_of)
+
+        return {
+            "from_date": from_date,
+            "to_date": to_date,
+            "revenue": revenue,
+            "expenses": expenses,
+            "gross_profit": revenue["total"],
+            "net_profit": revenue["total"] - expenses["total"],
+        }
+
+    def balance_sheet(self, matrix: StatementMatrix, as_of_date: datetime) -> Dict[str, Any]:
+        """Balance sheet as of an edge; retained earnings cover all revenue/expense accounts."""
+        def amount_of(account_id):
+            return matrix.balance_at(account_id, as_of_date)
+
+        retained_earnings = Decimal("0")
+        for account in matrix.accounts:
+            if account.account_type == AccountType.REVENUE:
+                retained_earnings += amount_of(account.id)
+            elif account.account_type == AccountType.EXPENSE:
+                retained_earnings -= amount_of(account.id)
+
+        assets = self._section("Assets", self._active(matrix, AccountType.ASSET), amount_of)
+        liabilities = self._section("Liabilities", self._active(matrix, AccountType.LIABILITY), amount_of)
+        equity = self._section("Equity", self._active(matrix, AccountType.EQUITY), amount_of)
+
+        # Add retained earnings to equity
+        if retained_earnings != 0:
+            equity["accounts"].append({
+                "account_id": None,
+                "account_name": "Retained Earnings (Current Period)",
+                "amount": retained_earnings,
+            })
+            equity["total"] += retained_earnings
+
+        total_liabilities_equity = liabilities["total"] + equity["total"]
+
+        return {
+            "as_of_date": as_of_date,
+            "assets": assets,
+            "liabilities": liabilities,
+            "equity": equity,
+            "total_assets": assets["total"],
+            "total_liabilities_equity": total_liabilities_equity,
+            "is_balanced": assets["total"] == total_liabilities_equity,
+        }
+
+    def cash_flow(self, matrix: StatementMatrix, from_date: datetime, to_date: datetime) -> Dict[str, Any]:
+        """
+        Indirect cash flow for [from_date, to_date]; needs edges
+        from_date - 1 second (opening positions), from_date - JUST_BEFORE and
+        to_date.
+        """
+        opening = from_date - timedelta(seconds=1)
+
+        def change(account: Optional[Account]) -> Decimal:
+            """Closing minus opening balance."""
+            if not account:
+                return Decimal("0")
+            return matrix.balance_at(account.id, to_date) - matrix.balance_at(account.id, opening)
+
+        cash_accounts = [a for a in matrix.accounts if a.code == CASH_CODE][:1]
+        cash_accounts += [a for a in matrix.accounts if (a.code or "").startswith(BANK_CODE_PREFIX)]
+        opening_cash = sum((matrix.balance_at(a.id, opening) for a in cash_accounts), Decimal("0"))
+        closing_cash = sum((matrix.balance_at(a.id, to_date) for a in cash_accounts), Decimal("0"))
+
+        def activities(name: str, items) -> Dict[str, Any]:
+            entries = [
+                {"description": description, "amount": amount}
+                for description, amount in items if amount != 0
+            ]
+            return {"name": name, "entries": entries, "total": sum((e["amount"] for e in entries), Decimal("0"))}
+
+        net_profit = self.profit_loss(matrix, from_date, to_date)["net_profit"]
+        operating = activities("Operating Activities", [
+            ("Change in Accounts Receivable", -change(matrix.first_with_code(RECEIVABLES_CODE))),
+            ("Change in Accounts Payable", change(matrix.first_with_code(PAYABLES_CODE))),
+        ])
+        # Net income is always listed first, even when zero
+        operating["entries"].insert(0, {"description": "Net Income", "amount": net_profit})
+        operating["total"] += net_profit
+
+        investing = activities("Investing Activities", [
+            ("Purchase/Sale of Fixed Assets", -change(matrix.first_with_code(FIXED_ASSETS_CODE))),
+        ])
+        financing = activities("Financing Activities", [
+            ("Loan Proceeds/Repayments", change(matrix.first_with_code(LOANS_CODE))),
+            ("Capital Contributions/Withdrawals", change(matrix.first_with_code(CAPITAL_CODE))),
+        ])
+
+        return {
+            "from_date": from_date,
+            "to_date": to_date,
+            "operating_activities": operating,
+            "investing_activities": investing,
+            "financing_activities": financing,
+            "net_cash_change": operating["total"] + investing["total"] + financing["total"],
+            "opening_cash": opening_cash,
+            "closing_cash": closing_cash,
+        }
+
+    def periodic_profit_loss(self, matrix: StatementMatrix, periods: List[tuple]) -> Dict[str, Any]:
+        """
+        P&L with one column per (from_date, to_date) period; every period
+        needs its from_date - JUST_BEFORE and to_date edges.
+        """
+        def row_section(name: str, account_type: AccountType) -> Dict[str, Any]:
+            rows = []
+            totals = [Decimal("0")] * len(periods)
+            for account in self._active(matrix, account_type):
+                amounts = [
+                    matrix.activity(account.id, start - JUST_BEFORE, end)
+                    for start, end in periods
+                ]
+                if any(amounts):
+                    rows.append({
+                        "account_id": account.id,
+                        "account_name": account.name,
+                        "amounts": amounts,
+                        "total": sum(amounts, Decimal("0")),
+                    })
+                    totals = [t + a for t, a in zip(totals, amounts)]
+            return {"name": name, "accounts": rows, "totals": totals, "total": sum(totals, Decimal("0"))}
+
+        revenue = row_section("Revenue", AccountType.REVENUE)
+        expenses = row_section("Expenses", AccountType.EXPENSE)
+
+        return {
+            "periods": [{"from_date": start, "to_date": end} for start, end in periods],
+            "revenue": revenue,
+            "expenses": expenses,
+            "net_profit": [r - e for r, e in zip(revenue["totals"], expenses["totals"])],
+            "total_net_profit": revenue["total"] - expenses["total"],
+        }
+
+
+def month_periods(from_date: datetime, to_date: datetime, months: int = 1) -> List[tuple]:
+    """Split [from_date, to_date] into calendar periods of `months` months."""
+    periods = []
+    start = from_date
+    while start <= to_date:
+        month = start.month - 1 + months
+        next_start = datetime(start.year + month // 12, month % 12 + 1, 1)
+        end = min(next_start - JUST_BEFORE, to_date)
+        periods.append((start, end))
+        start = next_start
+    return periods
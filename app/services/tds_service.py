@@ -9,6 +9,8 @@ from app.database.models import (
     TDSSection, TDSEntry, Company, Customer, PurchaseInvoice,
     Account, Transaction, TransactionEntry, AccountType, TransactionStatus, ReferenceType
 )
+from app.services.balance_snapshot_service import BalanceSnapshotService
+from app.services.period_totals_cache import PeriodTotalsCache
 
 
 # Default TDS Sections as per Income Tax Act
@@ -437,7 +439,9 @@ class TDSService:
         )
         self.db.add(entry2)
         
-        # Balances are calculated from transaction entries, not stored
+        # Balances are calculated from transaction entries; snapshots only cache them
+        BalanceSnapshotService(self.db).record_transaction(transaction)
+        PeriodTotalsCache(self.db).invalidate(transaction)
         return transaction
     
     # ==================== REPORTS ====================
@@ -0,0 +1,150 @@
+"""Voucher listing for day books and voucher registers.
+
+Loads a page of posted vouchers together with their entries and the
+account code/name of each entry in a fixed number of queries (a count and
+totals when paginated, then one joined projection), however many vouchers
+the period holds.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.database.models import Account, Transaction, TransactionEntry, TransactionStatus
+
+
+@dataclass
+class VoucherEntryRow:
+    """One entry line of a voucher."""
+    account_id: str
+    account_code: Optional[str]
+    account_name: Optional[str]
+    description: Optional[str]
+    debit: Decimal
+    credit: Decimal
+
+
+@dataclass
+class VoucherRow:
+    """A posted voucher with its entry lines."""
+    id: str
+    transaction_number: str
+    transaction_date: datetime
+    voucher_type: Optional[object]
+    description: Optional[str]
+    party_type: Optional[str]
+    party_id: Optional[str]
+    entries: List[VoucherEntryRow] = field(default_factory=list)
+
+    @property
+    def total_debit(self) -> Decimal:
+        return sum((e.debit for e in self.entries), Decimal("0"))
+
+    @property
+    def total_credit(self) -> Decimal:
+        return sum((e.credit for e in self.entries), Decimal("0"))
+
+
+class VoucherBook:
+    """Pages of posted vouchers for a company and date range."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _conditions(self, company_id: str, from_date: datetime, to_date: datetime, voucher_type=None):
+        conditions = [
+            Transaction.company_id == company_id,
+            Transaction.status == TransactionStatus.POSTED,
+            Transaction.transaction_date >= from_date,
+            Transaction.transaction_date <= to_date,
+        ]
+        if voucher_type:
+            conditions.append(Transaction.voucher_type == voucher_type)
+        return conditions
+
+    def get_totals(
+        self,
+        company_id: str,
+        from_date: datetime,
+        to_date: datetime,
+        voucher_type=None,
+    ) -> Tuple[int, Decimal, Decimal]:
+        """(voucher count, total debit, total credit) for the whole range, in one query."""
+        conditions = self._conditions(company_id, from_date, to_date, voucher_type)
+        row = self.db.execute(
+            select(
+                func.count(func.distinct(Transaction.id)),
+                func.coalesce(func.sum(TransactionEntry.debit_amount), 0),
+                func.coalesce(func.sum(TransactionEntry.credit_amount), 0),
+            ).select_from(Transaction).outerjoin(
+                TransactionEntry, TransactionEntry.transaction_id == Transaction.id
+            ).where(*conditions)
+        ).one()
+        return int(row[0] or 0), Decimal(str(row[1] or 0)), Decimal(str(row[2] or 0))
+
+    def get_vouchers(
+        self,
+        company_id: str,
+        from_date: datetime,
+        to_date: datetime,
+        voucher_type=None,
+        order_by: Optional[list] = None,
+        page: int = 1,
+        page_size: Optional[int] = None,
+    ) -> List[VoucherRow]:
+        """
+        Vouchers in the range with their entries, in one joined query.
+
+        order_by defaults to (transaction_date, transaction_number). With
+        page_size, only that page of vouchers is returned; entries of a
+        voucher are never split across pages.
+        """
+        conditions = self._conditions(company_id, from_date, to_date, voucher_type)
+        order_by = list(order_by or [Transaction.transaction_date, Transaction.transaction_number])
+        order_by.append(Transaction.id)
+
+        query = select(
+            Transaction.id,
+            Transaction.transaction_number,
+            Transaction.transaction_date,
+            Transaction.voucher_type,
+            Transaction.description,
+            Transaction.party_type,
+            Transaction.party_id,
+            TransactionEntry.account_id,
+            Account.code,
+            Account.name,
+            TransactionEntry.description,
+            TransactionEntry.debit_amount,
+            TransactionEntry.credit_amount,
+        ).select_from(Transaction).outerjoin(
+            TransactionEntry, TransactionEntry.transaction_id == Transaction.id
+        ).outerjoin(
+            Account, Account.id == TransactionEntry.account_id
+        )
+
+        if page_size:
+            page_ids = select(Transaction.id).where(*conditions).order_by(*order_by).limit(
+                page_size
+            ).offset((max(page, 1) - 1) * page_size)
+            query = query.where(Transaction.id.in_(page_ids))
+        else:
+            query = query.where(*conditions)
+
+        vouchers: List[VoucherRow] = []
+        for row in self.db.execute(query.order_by(*order_by)):
+            if not vouchers or vouchers[-1].id != row[0]:
+                vouchers.append(VoucherRow(*row[:7]))
+            if row[7] is not None:
+                vouchers[-1].entries.append(VoucherEntryRow(
+                    account_id=row[7],
+                    account_code=row[8],
+                    account_name=row[9],
+                    description=row[10],
+                    debit=row[11] or Decimal("0"),
+                    credit=row[12] or Decimal("0"),
+                ))
+        return vouchers
@@ -26,6 +26,10 @@ from app.database.models import (
     PurchaseOrder, SalesOrder,
     INDIAN_STATE_CODES
 )
+from app.services.balance_snapshot_service import BalanceSnapshotService
+from app.services.gst_return_ledger import GSTReturnLedgerService
+from app.services.period_totals_cache import PeriodTotalsCache
+from app.services.sequence_service import SequenceService, SYSTEM_SERIES
 
 
 @dataclass
@@ -145,11 +149,12 @@ class VoucherEngine:
         for code, name, acc_type in account_definitions:
             self.get_or_create_account(company, code, name, acc_type)
     
-    def _update_account_balances(self, entries: List[VoucherLine]) -> None:
-        """No-op - account balances are calculated from transaction entries, not stored."""
-        # Balances are now calculated dynamically from TransactionEntry records
-        # Use AccountingService.get_account_balance() to get account balance
-        pass
+    def _update_account_balances(self, transaction: Transaction) -> None:
+        """Roll a posted voucher into the daily balance snapshots."""
+        # Balances are calculated dynamically from TransactionEntry records;
+        # snapshots only cache them. Use AccountingService.get_account_balance()
+        BalanceSnapshotService(self.db).record_transaction(transaction)
+        PeriodTotalsCache(self.db).invalidate(transaction)
     
     def _generate_voucher_number(self, company: Company, voucher_type: VoucherType) -> str:
         """Generate sequential voucher number."""
@@ -166,12 +171,17 @@ class VoucherEngine:
         }
         prefix = prefix_map.get(voucher_type, "TXN")
         
-        count = self.db.query(Transaction).filter(
-            Transaction.company_id == company.id,
-            Transaction.voucher_type == voucher_type
-        ).count()
+        def seed() -> int:
+            # First use of the counter continues after existing vouchers
+            return self.db.query(Transaction).filter(
+                Transaction.company_id == company.id,
+                Transaction.voucher_type == voucher_type
+            ).count() + 1
         
-        return f"{prefix}-{count + 1:06d}"
+        number = SequenceService(self.db).allocate(
+            company.id, voucher_type.value, series_name=SYSTEM_SERIES, seed=seed
+        )
+        return f"{prefix}-{number:06d}"
     
     # ==================== CORE VOUCHER CREATION ====================
     
@@ -215,8 +225,8 @@ class VoucherEngine:
             transaction_number=self._generate_voucher_number(company, voucher_type),
             transaction_date=voucher_date or datetime.utcnow(),
             voucher_type=voucher_type,
-            description=description,
-            narration=narration,
+            # Transaction has no narration column; it stands in for a missing description
+            description=description or narration,
             party_id=party_id,
             party_type=party_type,
             reference_type=reference_type,
@@ -240,13 +250,12 @@ class VoucherEngine:
                 debit_amount=entry.debit_amount,
                 credit_amount=entry.credit_amount,
                 description=entry.description,
-                party_id=entry.party_id,
             )
             self.db.add(txn_entry)
             created_entries.append(txn_entry)
         
         # Update account balances
-        self._update_account_balances(entries)
+        self._update_account_balances(transaction)
         
         return VoucherResult(
             success=True,
@@ -954,7 +963,7 @@ class VoucherEngine:
             party_id=original_invoice.customer_id,
         ))
         
-        return self.create_voucher(
+        result = self.create_voucher(
             company=company,
             voucher_type=VoucherType.DEBIT_NOTE,
             entries=entries,
@@ -965,6 +974,9 @@ class VoucherEngine:
             party_id=original_invoice.customer_id,
             party_type="customer",
         )
+        if result.success:
+            self._record_gst_note(result, "sales_return", original_invoice.place_of_supply, entries)
+        return result
     
     # ==================== CREDIT NOTE (PURCHASE RETURN) ====================
     
@@ -1049,7 +1061,7 @@ class VoucherEngine:
                 description=f"Input SGST reversed - {original_invoice.invoice_number}",
             ))
         
-        return self.create_voucher(
+        result = self.create_voucher(
             company=company,
             voucher_type=VoucherType.CREDIT_NOTE,
             entries=entries,
@@ -1060,6 +1072,51 @@ class VoucherEngine:
             party_id=original_invoice.vendor_id,
             party_type="vendor",
         )
+        if result.success:
+            self._record_gst_note(result, "purchase_return", original_invoice.place_of_supply, entries)
+        return result
+
+    def _record_gst_note(
+        self,
+        result: VoucherResult,
+        section: str,
+        place_of_supply: Optional[str],
+        entries: List[VoucherLine],
+    ) -> None:
+        """Add a debit/credit note voucher to the GST return ledger."""
+        ledger = GSTReturnLedgerService(self.db)
+        if not ledger.is_enabled():
+            return
+        codes = dict(
+            self.db.query(Account.id, Account.code).filter(
+                Account.id.in_([entry.account_id for entry in entries])
+            ).all()
+        )
+        if section == "sales_return":
+            party_code, base_code = self.ACCOUNTS["ACCOUNTS_RECEIVABLE"], self.ACCOUNTS["SALES"]
+            tax_codes = ("OUTPUT_IGST", "OUTPUT_CGST", "OUTPUT_SGST")
+        else:
+            party_code, base_code = self.ACCOUNTS["ACCOUNTS_PAYABLE"], self.ACCOUNTS["PURCHASES"]
+            tax_codes = ("INPUT_IGST", "INPUT_CGST", "INPUT_SGST")
+
+        amounts = {}
+        for entry in entries:
+            amount = entry.debit_amount + entry.credit_amount
+            code = codes.get(entry.account_id)
+            amounts[code] = amounts.get(code, Decimal("0")) + amount
+
+        igst, cgst, sgst = (amounts.get(self.ACCOUNTS[name], Decimal("0")) for name in tax_codes)
+        ledger.record_note(
+            company_id=result.transaction.company_id,
+            section=section,
+            note_date=result.transaction.transaction_date,
+            place_of_supply=place_of_supply,
+            total_value=amounts.get(party_code, Decimal("0")),
+            taxable_value=amounts.get(base_code, Decimal("0")),
+            igst_amount=igst,
+            cgst_amount=cgst,
+            sgst_amount=sgst,
+        )
     
     # ==================== TDS PAYMENT ====================
     
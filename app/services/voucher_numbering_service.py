@@ -14,8 +14,10 @@ from datetime import datetime, date
 from enum import Enum
 from sqlalchemy.orm import Session
 from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 
-from app.database.models import generate_uuid
+from app.database.models import VoucherSequence
+from app.services.sequence_service import SequenceService, SYSTEM_SERIES, get_financial_year
 
 
 class ResetFrequency(str, Enum):
@@ -54,29 +56,166 @@ class VoucherNumberSeries:
 
 
 class VoucherNumberingService:
-    """Service for generating and managing voucher numbers."""
+    """Service for generating and managing voucher numbers.
     
-    # In-memory storage for series (would be in DB in production)
-    _series_cache: Dict[str, Dict[str, VoucherNumberSeries]] = {}
+    Series are persisted as VoucherSequence rows (one per financial year for
+    yearly series) and numbers are allocated through SequenceService, so
+    concurrent requests and multiple workers never hand out the same number.
+    """
     
     def __init__(self, db: Session):
         self.db = db
     
     def _get_current_financial_year(self, as_of: Optional[date] = None) -> str:
         """Get current financial year string (e.g., '2024-2025')."""
-        if as_of is None:
-            as_of = date.today()
-        
-        if as_of.month >= 4:  # April onwards
-            return f"{as_of.year}-{as_of.year + 1}"
-        else:
-            return f"{as_of.year - 1}-{as_of.year}"
+        return get_financial_year(as_of)
     
     def _get_short_fy(self, financial_year: str) -> str:
         """Get short financial year (e.g., '24-25')."""
         years = financial_year.split("-")
         return f"{years[0][-2:]}-{years[1][-2:]}"
     
+    def _get_period_key(self, reset_frequency: str, as_of: Optional[date] = None) -> str:
+        """Counter period for a series: the financial year for yearly series."""
+        if reset_frequency == ResetFrequency.YEARLY.value:
+            return self._get_current_financial_year(as_of)
+        # Monthly/quarterly resets are not supported yet; they never reset
+        return ""
+    
+    def _get_series_row(
+        self,
+        company_id: str,
+        voucher_type: str,
+        series_name: str = "Default",
+    ) -> Optional[VoucherSequence]:
+        """Get the current counter row for a series, or its latest one."""
+        # populate_existing: counters are bumped with SQL UPDATEs
+        rows = self.db.query(VoucherSequence).filter(
+            VoucherSequence.company_id == company_id,
+            VoucherSequence.voucher_type == voucher_type,
+            VoucherSequence.series_name == series_name,
+        ).order_by(VoucherSequence.financial_year.desc()).populate_existing().all()
+        
+        if not rows:
+            return None
+        
+        current_key = self._get_period_key(rows[0].reset_frequency)
+        for row in rows:
+            if row.financial_year == current_key:
+                return row
+        return rows[0]
+    
+    def _to_series(self, row: VoucherSequence) -> VoucherNumberSeries:
+        """Convert a counter row to the public series view."""
+        return VoucherNumberSeries(
+            id=row.id,
+            company_id=row.company_id,
+            voucher_type=row.voucher_type,
+            series_name=row.series_name,
+            prefix=row.prefix or "",
+            suffix=row.suffix or "",
+            starting_number=row.starting_number,
+            current_number=row.next_number - 1,
+            number_padding=row.number_padding,
+            reset_frequency=ResetFrequency(row.reset_frequency),
+            financial_year=row.financial_year or self._get_current_financial_year(),
+            is_active=row.is_active,
+            include_fy_in_number=row.include_fy_in_number,
+            separator=row.separator,
+        )
+    
+    def _series_config(self, row: VoucherSequence) -> Dict:
+        """Formatting columns to copy onto a new period's counter row."""
+        return {
+            "prefix": row.prefix,
+            "suffix": row.suffix,
+            "separator": row.separator,
+            "number_padding": row.number_padding,
+            "starting_number": row.starting_number,
+            "reset_frequency": row.reset_frequency,
+            "include_fy_in_number": row.include_fy_in_number,
+            "is_active": row.is_active,
+        }
+    
+    def _format_number(self, config: Dict, number: int, financial_year: str) -> str:
+        """Build the display number from series settings."""
+        parts = []
+        
+        # Prefix
+        if config["prefix"]:
+            parts.append(config["prefix"])
+        
+        # Financial year
+        if config["include_fy_in_number"] and financial_year:
+            parts.append(self._get_short_fy(financial_year))
+        
+        # Number with padding
+        parts.append(str(number).zfill(config["number_padding"]))
+        
+        # Suffix
+        if config["suffix"]:
+            parts.append(config["suffix"])
+        
+        return config["separator"].join(parts)
+    
+    def _ensure_series(
+        self,
+        company_id: str,
+        voucher_type: str,
+        series_name: str = "Default",
+        prefix: str = "",
+        suffix: str = "",
+        starting_number: int = 1,
+        number_padding: int = 4,
+        reset_frequency: ResetFrequency = ResetFrequency.YEARLY,
+        include_fy_in_number: bool = True,
+        separator: str = "/",
+    ) -> VoucherSequence:
+        """Create or update a series' current counter row without committing."""
+        config = {
+            "prefix": prefix,
+            "suffix": suffix,
+            "separator": separator,
+            "number_padding": number_padding,
+            "starting_number": starting_number,
+            "reset_frequency": ResetFrequency(reset_frequency).value,
+            "include_fy_in_number": include_fy_in_number,
+            "is_active": True,
+        }
+        financial_year = self._get_period_key(config["reset_frequency"])
+        
+        def find() -> Optional[VoucherSequence]:
+            return self.db.query(VoucherSequence).filter(
+                VoucherSequence.company_id == company_id,
+                VoucherSequence.voucher_type == voucher_type,
+                VoucherSequence.series_name == series_name,
+                VoucherSequence.financial_year == financial_year,
+            ).first()
+        
+        row = find()
+        if row is None:
+            try:
+                with self.db.begin_nested():
+                    row = VoucherSequence(
+                        company_id=company_id,
+                        voucher_type=voucher_type,
+                        series_name=series_name,
+                        financial_year=financial_year,
+                        next_number=starting_number,
+                        **config,
+                    )
+                    self.db.add(row)
+                return row
+            except IntegrityError:
+                # Another transaction created the row first; use theirs
+                row = find()
+        
+        # Never rewind an existing counter; only formatting changes
+        for key, value in config.items():
+            setattr(row, key, value)
+        self.db.flush()
+        return row
+    
     def create_series(
         self,
         company_id: str,
@@ -90,35 +229,24 @@ class VoucherNumberingService:
         include_fy_in_number: bool = True,
         separator: str = "/",
     ) -> VoucherNumberSeries:
-        """Create a new voucher number series."""
-        series_id = generate_uuid()
-        financial_year = self._get_current_financial_year()
+        """Create a new voucher number series.
         
-        series = VoucherNumberSeries(
-            id=series_id,
-            company_id=company_id,
-            voucher_type=voucher_type,
-            series_name=series_name,
+        Re-creating an existing series updates its formatting but keeps its
+        counter, so numbers already issued are never handed out again.
+        """
+        row = self._ensure_series(
+            company_id, voucher_type, series_name,
             prefix=prefix,
             suffix=suffix,
             starting_number=starting_number,
-            current_number=starting_number - 1,  # Will be incremented on first use
             number_padding=number_padding,
             reset_frequency=reset_frequency,
-            financial_year=financial_year,
-            is_active=True,
             include_fy_in_number=include_fy_in_number,
             separator=separator,
         )
-        
-        # Store in cache (would be DB in production)
-        if company_id not in self._series_cache:
-            self._series_cache[company_id] = {}
-        
-        key = f"{voucher_type}_{series_name}"
-        self._series_cache[company_id][key] = series
-        
-        return series
+        self.db.commit()
+        self.db.refresh(row)
+        return self._to_series(row)
     
     def get_series(
         self,
@@ -127,28 +255,11 @@ class VoucherNumberingService:
         series_name: str = "Default",
     ) -> Optional[VoucherNumberSeries]:
         """Get a voucher number series."""
-        if company_id not in self._series_cache:
+        row = self._get_series_row(company_id, voucher_type, series_name)
+        if not row:
             return None
         
-        key = f"{voucher_type}_{series_name}"
-        return self._series_cache[company_id].get(key)
-    
-    def _check_and_reset_series(self, series: VoucherNumberSeries) -> bool:
-        """Check if series needs to be reset and reset if necessary."""
-        if series.reset_frequency == ResetFrequency.NEVER:
-            return False
-        
-        current_fy = self._get_current_financial_year()
-        
-        if series.reset_frequency == ResetFrequency.YEARLY:
-            if series.financial_year != current_fy:
-                series.financial_year = current_fy
-                series.current_number = series.starting_number - 1
-                return True
-        
-        # Add monthly/quarterly reset logic if needed
-        
-        return False
+        return self._to_series(row)
     
     def generate_number(
         self,
@@ -160,14 +271,17 @@ class VoucherNumberingService:
         """
         Generate next voucher number.
         
+        The number belongs to the caller's database transaction: it is only
+        consumed when the caller commits.
+        
         Examples:
         - INV/24-25/0001
         - PUR/2024-25/00123
         - REC-001
         """
-        series = self.get_series(company_id, voucher_type, series_name)
+        row = self._get_series_row(company_id, voucher_type, series_name)
         
-        if not series:
+        if not row:
             # Create default series if doesn't exist
             prefix_map = {
                 "invoice": "INV",
@@ -182,39 +296,27 @@ class VoucherNumberingService:
                 "credit_note": "CN",
             }
             
-            series = self.create_series(
+            row = self._ensure_series(
                 company_id=company_id,
                 voucher_type=voucher_type,
                 series_name=series_name,
                 prefix=prefix_map.get(voucher_type, voucher_type.upper()[:3]),
             )
         
-        # Check if reset needed
-        self._check_and_reset_series(series)
-        
-        # Increment counter
-        series.current_number += 1
-        
-        # Build the number
-        parts = []
-        
-        # Prefix
-        if series.prefix:
-            parts.append(series.prefix)
+        config = self._series_config(row)
+        financial_year = self._get_current_financial_year(transaction_date)
         
-        # Financial year
-        if series.include_fy_in_number and series.financial_year:
-            parts.append(self._get_short_fy(series.financial_year))
-        
-        # Number with padding
-        number_str = str(series.current_number).zfill(series.number_padding)
-        parts.append(number_str)
-        
-        # Suffix
-        if series.suffix:
-            parts.append(series.suffix)
+        # Yearly series get a fresh counter row per financial year
+        number = SequenceService(self.db).allocate(
+            company_id,
+            voucher_type,
+            financial_year=self._get_period_key(config["reset_frequency"], transaction_date),
+            series_name=series_name,
+            seed=lambda: config["starting_number"],
+            defaults=config,
+        )
         
-        return series.separator.join(parts)
+        return self._format_number(config, number, financial_year)
     
     def preview_next_number(
         self,
@@ -223,27 +325,20 @@ class VoucherNumberingService:
         series_name: str = "Default",
     ) -> str:
         """Preview next number without incrementing."""
-        series = self.get_series(company_id, voucher_type, series_name)
+        row = self._get_series_row(company_id, voucher_type, series_name)
         
-        if not series:
+        if not row:
             return "No series configured"
         
-        # Simulate next number
-        next_num = series.current_number + 1
-        parts = []
-        
-        if series.prefix:
-            parts.append(series.prefix)
-        
-        if series.include_fy_in_number and series.financial_year:
-            parts.append(self._get_short_fy(series.financial_year))
-        
-        parts.append(str(next_num).zfill(series.number_padding))
-        
-        if series.suffix:
-            parts.append(series.suffix)
+        config = self._series_config(row)
+        period_key = self._get_period_key(config["reset_frequency"])
+        next_num = SequenceService(self.db).peek(
+            company_id, voucher_type, financial_year=period_key, series_name=series_name
+        )
+        if next_num is None:
+            next_num = config["starting_number"]
         
-        return series.separator.join(parts)
+        return self._format_number(config, next_num, self._get_current_financial_year())
     
     def update_series_settings(
         self,
@@ -252,24 +347,39 @@ class VoucherNumberingService:
         series_name: str = "Default",
         **kwargs,
     ) -> Optional[VoucherNumberSeries]:
-        """Update series settings."""
-        series = self.get_series(company_id, voucher_type, series_name)
+        """Update series settings (the counter itself cannot be changed)."""
+        row = self._get_series_row(company_id, voucher_type, series_name)
         
-        if not series:
+        if not row:
             return None
         
         for key, value in kwargs.items():
-            if hasattr(series, key):
-                setattr(series, key, value)
-        
-        return series
+            if key == "reset_frequency":
+                value = ResetFrequency(value).value
+            if key in self._series_config(row):
+                setattr(row, key, value)
+        
+        self.db.commit()
+        self.db.refresh(row)
+        return self._to_series(row)
     
     def list_series(self, company_id: str) -> List[VoucherNumberSeries]:
         """List all series for a company."""
-        if company_id not in self._series_cache:
-            return []
-        
-        return list(self._series_cache[company_id].values())
+        rows = self.db.query(VoucherSequence).filter(
+            VoucherSequence.company_id == company_id,
+            VoucherSequence.series_name != SYSTEM_SERIES,
+        ).order_by(
+            VoucherSequence.voucher_type,
+            VoucherSequence.series_name,
+            VoucherSequence.financial_year,
+        ).populate_existing().all()
+        
+        # One entry per series: its latest financial year's counter row
+        latest = {}
+        for row in rows:
+            latest[(row.voucher_type, row.series_name)] = row
+        
+        return [self._to_series(row) for row in latest.values()]
     
     def get_default_series_config(self, voucher_type: str) -> Dict:
         """Get default configuration for a voucher type."""
@@ -10,6 +10,8 @@ from app.database.models import (
     VoucherType, EntryType, ReferenceType, TransactionStatus, PaymentMode
 )
 from app.services.accounting_service import AccountingService
+from app.services.balance_snapshot_service import BalanceSnapshotService
+from app.services.period_totals_cache import PeriodTotalsCache
 
 
 # Category to Account mapping for auto-categorization
@@ -374,6 +376,8 @@ class VoucherService:
             self.db.add(entry)
         
         self.db.flush()
+        BalanceSnapshotService(self.db).record_transaction(transaction)
+        PeriodTotalsCache(self.db).invalidate(transaction)
         return transaction
     
     def _get_or_create_category_account(
@@ -0,0 +1,6 @@
+"""Shared helpers."""
+from app.utils.cache import BoundedCache
+
+__all__ = [
+    "BoundedCache",
+]
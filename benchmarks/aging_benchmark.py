@@ -0,0 +1,137 @@
+"""
+Aging report benchmark.
+
+Seeds open sales and purchase invoices across many parties, then times the
+aging and outstanding reports that share the aging engine. The summary and
+per-party rollup must be one query whatever the number of invoices, and
+bucket totals must match a Python bucketing of the seeded rows.
+
+Usage: python benchmarks/aging_benchmark.py [parties] [invoices]
+"""
+import random
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from common import make_session, seed_company, measure
+
+from sqlalchemy import insert
+from app.database.models import (
+    Customer, Invoice, InvoiceStatus, PurchaseInvoice, PurchaseInvoiceStatus, generate_uuid,
+)
+from app.services.aging_report_service import AgingReportService
+from app.services.bill_allocation_service import BillAllocationService
+from app.services.report_service import ReportService
+
+AS_OF = datetime(2024, 12, 31, 23, 59, 59)
+LIMITS = [30, 60, 90, 180]
+
+
+def bucket_of(days: int) -> int:
+    for i, limit in enumerate(LIMITS):
+        if days <= limit:
+            return i
+    return len(LIMITS)
+
+
+def seed(db, company, parties: int, invoices: int, seed: int = 5):
+    """Seed invoices and return the expected bucket totals per invoice type."""
+    rng = random.Random(seed)
+    expected = {"sales": [Decimal("0")] * 5, "purchase": [Decimal("0")] * 5}
+    by_party = defaultdict(Decimal)
+
+    customers = [generate_uuid() for _ in range(parties)]
+    vendors = [generate_uuid() for _ in range(parties // 4 or 1)]
+    db.execute(insert(Customer), [
+        {"id": pid, "company_id": company.id, "name": f"Party {i}", "contact": "9000000000",
+         "customer_type": "vendor" if pid in vendors else "customer"}
+        for i, pid in enumerate(customers + vendors)
+    ])
+
+    sales, purchases = [], []
+    for i in range(invoices):
+        invoice_date = AS_OF - timedelta(days=rng.randrange(400), hours=rng.randrange(24))
+        due_date = invoice_date + timedelta(days=30) if rng.random() < 0.8 else None
+        total = Decimal(rng.randrange(1000, 500000)) / 100
+        balance = rng.choice([total, total / 2, Decimal("0")]).quantize(Decimal("0.01"))
+        days = (AS_OF - (due_date or invoice_date)).days
+        if rng.random() < 0.7:
+            status = rng.choice([InvoiceStatus.PENDING, InvoiceStatus.PARTIALLY_PAID, InvoiceStatus.DRAFT])
+            party = rng.choice(customers)
+            sales.append({
+                "id": generate_uuid(), "company_id": company.id, "customer_id": party,
+                "invoice_number": f"INV-{i:06d}", "invoice_date": invoice_date, "due_date": due_date,
+                "total_amount": total, "amount_paid": total - balance, "balance_due": balance, "status": status,
+            })
+            if balance > 0 and status != InvoiceStatus.DRAFT:
+                expected["sales"][bucket_of(days)] += balance
+                by_party[party] += balance
+        else:
+            party = rng.choice(vendors)
+            purchases.append({
+                "id": generate_uuid(), "company_id": company.id, "vendor_id": party,
+                "invoice_number": f"PI-{i:06d}", "invoice_date": invoice_date, "due_date": due_date,
+                "total_amount": total, "amount_paid": total - balance, "balance_due": balance,
+                "status": PurchaseInvoiceStatus.APPROVED,
+            })
+            if balance > 0:
+                expected["purchase"][bucket_of(days)] += balance
+                by_party[party] += balance
+
+    db.execute(insert(Invoice), sales)
+    db.execute(insert(PurchaseInvoice), purchases)
+    db.commit()
+    return expected, by_party
+
+
+def main():
+    parties = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    invoices = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    db = make_session()
+    company = seed_company(db, "Aging Bench")
+    expected, by_party = seed(db, company, parties, invoices)
+    company_id = company.id  # reload after the seeding commit, outside the measured blocks
+    aging = AgingReportService(db)
+    reports = ReportService(db)
+
+    print(f"\n{parties} parties, {invoices} invoices (SQLite)")
+    with measure(db, "receivables aging, summary only") as counter:
+        receivables = aging.get_receivables_aging(company_id, AS_OF, include_details=False)
+    assert counter.count == 1, counter.count
+    assert list(receivables["summary"].values()) == [float(v) for v in expected["sales"]]
+    for row in receivables["by_customer"]:
+        assert Decimal(str(row["total"])) == by_party[row["customer_id"]]
+
+    page_size = 100
+    with measure(db, f"receivables aging, one page of {page_size}") as counter:
+        page = aging.get_receivables_aging(company_id, AS_OF, page=2, page_size=page_size)
+    # Second page: whatever is left of the open invoices after the first, up to a full page
+    assert counter.count == 2
+    assert len(page["details"]) == min(page_size, max(receivables["invoice_count"] - page_size, 0))
+
+    with measure(db, "payables aging, full details") as counter:
+        payables = aging.get_payables_aging(company_id, AS_OF)
+    assert counter.count == 2
+    assert list(payables["summary"].values()) == [float(v) for v in expected["purchase"]]
+    assert len(payables["details"]) == payables["invoice_count"]
+
+    with measure(db, "ReportService.get_aging_report") as counter:
+        report = reports.get_aging_report(company, "receivables", AS_OF)
+    assert counter.count == 2
+    assert report["total"] == sum(expected["sales"])
+
+    with measure(db, "ReportService.get_outstanding_payables") as counter:
+        outstanding = reports.get_outstanding_payables(company, AS_OF)
+    assert counter.count == 2
+    assert outstanding["total_outstanding"] == sum(expected["purchase"])
+
+    with measure(db, "BillAllocationService.get_aging_analysis") as counter:
+        analysis = BillAllocationService(db).get_aging_analysis(company_id, "sales", as_of_date=AS_OF)
+    assert counter.count == 2
+    assert list(analysis["summary"].values()) == [float(v) for v in expected["sales"]]
+    print("  bucket totals match the seeded invoices")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Balance snapshot concurrency check.
+
+Runs many threads that each post backdated journal vouchers on a shared set
+of accounts, in random account order and their own session, then checks
+that the incrementally maintained snapshots match a full recompute.
+Reports vouchers/sec.
+
+Usage: python benchmarks/balance_snapshot_stress_benchmark.py [threads] [vouchers_per_thread] [database_url]
+
+Without a database_url a temporary SQLite file is used, where writers are
+serialised anyway. Pass a PostgreSQL URL to exercise the account row locks.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from common import Base, seed_company  # noqa: F401  (sets up sys.path)
+from sequence_stress_benchmark import make_engine, run_threads
+
+from sqlalchemy.orm import sessionmaker
+from app.config import settings
+from app.database.models import Account, AccountType, Company, VoucherType
+from app.services.balance_snapshot_service import BalanceSnapshotService
+from app.services.voucher_engine import VoucherEngine, VoucherLine
+
+
+def main():
+    thread_count = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    per_thread = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    url = sys.argv[3] if len(sys.argv) > 3 else None
+    settings.BALANCE_SNAPSHOTS_ENABLED = True
+
+    tmpdir = None
+    if url is None:
+        tmpdir = tempfile.mkdtemp()
+        url = f"sqlite:///{os.path.join(tmpdir, 'balance_snapshot_stress.db')}"
+
+    engine = make_engine(url)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    setup = Session()
+    company = seed_company(setup, name=f"Snapshot Stress {time.time_ns()}")
+    company_id = company.id
+    accounts = [
+        Account(company_id=company_id, code=f"9{i:03d}", name=f"Stress {i}", account_type=AccountType.EXPENSE)
+        for i in range(6)
+    ]
+    setup.add_all(accounts)
+    setup.commit()
+    account_ids = [account.id for account in accounts]
+    VoucherEngine(setup)._ensure_system_accounts(company)
+    setup.commit()
+    setup.close()
+
+    print(f"\n{thread_count} threads x {per_thread} backdated vouchers on {engine.dialect.name}")
+    today = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+
+    def worker(db):
+        rng = random.Random()
+        engine = VoucherEngine(db)
+        company = db.get(Company, company_id)
+        posted = []
+        for _ in range(per_thread):
+            debit, credit = rng.sample(account_ids, 2)
+            amount = Decimal(rng.randrange(100, 100000)) / 100
+            result = engine.create_voucher(
+                company=company,
+                voucher_type=VoucherType.JOURNAL,
+                entries=[
+                    VoucherLine(account_id=debit, debit_amount=amount),
+                    VoucherLine(account_id=credit, credit_amount=amount),
+                ],
+                voucher_date=today - timedelta(days=rng.randrange(60)),
+                description="Snapshot stress",
+            )
+            assert result.success, result.error
+            db.commit()
+            posted.append(result.transaction.id)
+        return posted
+
+    posted, elapsed = run_threads(Session, worker, thread_count)
+    print(f"  {len(posted)} vouchers {len(posted) / elapsed:>10.0f} vouchers/s")
+
+    check = Session()
+    result = BalanceSnapshotService(check).check_consistency(company_id)
+    check.close()
+    assert result["is_consistent"], result["mismatches"][:3]
+    print(f"  snapshots match full recompute ({result['snapshot_rows']} rows)")
+
+
+if __name__ == "__main__":
+    main()
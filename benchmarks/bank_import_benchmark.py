@@ -0,0 +1,129 @@
+"""
+Bank statement import benchmark.
+
+Generates an HDFC-style CSV and imports it through
+BankImportService.create_import and BankStatementImportService.import_statement
+from a binary file object (as the upload endpoints do), reporting time and
+query count. Each file is imported twice; the second run must skip every
+line as a duplicate. Peak traced memory is measured in a separate run.
+Finally BankImportService.match_transactions runs against one transaction
+per second import row.
+
+Usage: python benchmarks/bank_import_benchmark.py [rows] [chunk_size]
+"""
+import io
+import random
+import sys
+import tracemalloc
+from datetime import date, timedelta
+
+from common import make_session, seed_company, measure
+
+from sqlalchemy import insert
+
+from app.database.models import BankAccount, Transaction, TransactionStatus, generate_uuid
+from app.services.bank_import_service import BankImportService
+from app.services.bank_statement_import_service import BankStatementImportService
+
+
+def new_bank_account(db, company, number: str) -> BankAccount:
+    bank_account = BankAccount(
+        company_id=company.id, bank_name="HDFC", account_name="Current",
+        account_number=number, ifsc_code="HDFC0000001",
+    )
+    db.add(bank_account)
+    db.commit()
+    return bank_account
+
+
+def make_csv(rows: int, seed: int = 11) -> bytes:
+    rng = random.Random(seed)
+    lines = ["Date,Narration,Chq./Ref.No.,Value Dt,Withdrawal Amt.,Deposit Amt.,Closing Balance"]
+    balance = 1_000_000.0
+    start = date(2024, 4, 1)
+    for i in range(rows):
+        day = (start + timedelta(days=i // 50)).strftime("%d/%m/%y")
+        amount = round(rng.uniform(10, 50000), 2)
+        if rng.random() < 0.5:
+            balance -= amount
+            withdrawal, deposit = f"{amount:.2f}", ""
+        else:
+            balance += amount
+            withdrawal, deposit = "", f"{amount:.2f}"
+        lines.append(f"{day},NEFT-{rng.randrange(10**9)}-PARTY {i % 700},REF{i:08d},{day},"
+                     f"{withdrawal},{deposit},{balance:.2f}")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def peak_memory(func) -> float:
+    """Peak traced allocation in MB while func runs (tracing slows it down a lot)."""
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024 / 1024
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    chunk_size = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    data = make_csv(rows)
+    print(f"\nImporting {rows} rows ({len(data) / 1024 / 1024:.1f} MB), chunk size {chunk_size}")
+
+    db = make_session()
+    company = seed_company(db, "Import Bench")
+    bank_account = new_bank_account(db, company, "000222")
+
+    service = BankImportService(db)
+    for attempt in ("first", "repeat"):
+        with measure(db, f"create_import ({attempt})"):
+            bank_import = service.create_import(
+                company, "bench.csv", io.BytesIO(data), bank_account.id, chunk_size=chunk_size,
+            )
+        print(f"  {'':<40} processed {bank_import.processed_rows}, duplicates {bank_import.duplicate_rows}")
+    assert bank_import.processed_rows == 0 and bank_import.duplicate_rows == rows
+
+    statements = BankStatementImportService(db)
+    for attempt in ("first", "repeat"):
+        with measure(db, f"import_statement ({attempt})"):
+            result = statements.import_statement(
+                company.id, bank_account.id, io.BytesIO(data), "bench.csv",
+                auto_match=False, chunk_size=chunk_size,
+            )
+        print(f"  {'':<40} imported {result['imported']}, duplicates {result['duplicates_skipped']}")
+    assert result["imported"] == 0 and result["duplicates_skipped"] == rows
+
+    other_account = new_bank_account(db, company, "000333")
+    peak = peak_memory(lambda: service.create_import(
+        company, "bench.csv", io.BytesIO(data), other_account.id, chunk_size=chunk_size,
+    ))
+    print(f"\n  create_import peak traced memory: {peak:.1f} MB (file held by the caller: "
+          f"{len(data) / 1024 / 1024:.1f} MB)")
+
+    bench_match(db, company, service)
+
+
+def bench_match(db, company, service):
+    """match_transactions on the first import, with a transaction for every second row."""
+    bank_import = service.get_imports(company, page_size=1000)[0][-1]
+    rows = service.get_import_rows(bank_import)
+    db.execute(insert(Transaction), [
+        {
+            "id": generate_uuid(), "company_id": company.id, "transaction_number": f"JE-{i:06d}",
+            "transaction_date": row.transaction_date, "status": TransactionStatus.POSTED,
+            "total_debit": row.credit_amount or row.debit_amount,
+            "total_credit": row.credit_amount or row.debit_amount,
+        }
+        for i, row in enumerate(rows[::2])
+    ])
+    db.commit()
+    db.expire_all()
+
+    print(f"\nmatch_transactions on {len(rows)} rows, {len(rows[::2])} transactions")
+    with measure(db, "BankImportService.match_transactions"):
+        result = service.match_transactions(bank_import)
+    print(f"  matched {result['matched']}, ambiguous {result['ambiguous']}, unmatched {result['unmatched']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Bank reconciliation auto-match benchmark.
+
+1. Matcher scaling: the indexed ReconciliationMatcher against a copy of the
+   previous nested-loop algorithm on synthetic entries. Where both run, the
+   matched pairs must be identical.
+2. End to end: BankReconciliationService.auto_match on an in-memory
+   database, reporting query count and time.
+
+Usage: python benchmarks/bank_reconciliation_benchmark.py [max_entries] [db_entries]
+"""
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from common import make_session, seed_company, measure
+
+from sqlalchemy import insert
+from app.database.models import (
+    Account, AccountType, BankAccount, Transaction, TransactionEntry, TransactionStatus, generate_uuid
+)
+from app.database.bank_statement_models import BankStatementEntry, BankStatementEntryStatus
+from app.services.bank_reconciliation_service import BankReconciliationService
+from app.services.reconciliation_matcher import MatchCandidate, ReconciliationMatcher
+
+START = datetime(2024, 4, 1)
+
+
+def make_entries(count: int, seed: int = 7):
+    """Book and bank candidates where most book entries have a bank twin a few days apart."""
+    rng = random.Random(seed)
+    books, banks = [], []
+    for i in range(count):
+        day = START.toordinal() + rng.randrange(365)
+        cents = rng.choice([rng.randrange(100, 10_000_000), rng.choice([50000, 100000, 250000])])
+        cents = cents if rng.random() < 0.6 else -cents
+        books.append(MatchCandidate(id=f"book-{i}", amount_cents=cents, day=day))
+        if rng.random() < 0.85:
+            banks.append(MatchCandidate(id=f"bank-{i}", amount_cents=cents, day=day + rng.randint(-4, 4)))
+        else:
+            banks.append(MatchCandidate(id=f"bank-{i}", amount_cents=rng.randrange(100, 10_000_000), day=day))
+    banks.sort(key=lambda b: (b.day, b.id))
+    books.sort(key=lambda b: (b.day, b.id))
+    return books, banks
+
+
+def legacy_match(books, banks, tolerance_days=3, tolerance_cents=1):
+    """The previous auto_match loop, on candidates."""
+    matched_bank, results = set(), []
+    for book in books:
+        best, best_diff = None, None
+        for position, bank in enumerate(banks):
+            if position in matched_bank:
+                continue
+            if abs(book.amount_cents - bank.amount_cents) > tolerance_cents:
+                continue
+            diff = abs(book.day - bank.day)
+            if diff > tolerance_days:
+                continue
+            if best is None or diff < best_diff:
+                best, best_diff = position, diff
+        if best is not None:
+            matched_bank.add(best)
+            results.append((book.id, banks[best].id))
+    return results
+
+
+def bench_matcher(max_entries: int):
+    print("\nMatcher scaling (book x bank entries)")
+    print(f"  {'entries':>8} {'legacy ms':>12} {'indexed ms':>12} {'matched':>9}")
+    sizes = sorted({s for s in (1000, 2000, 4000, 8000) if s < max_entries} | {max_entries})
+    for size in sizes:
+        books, banks = make_entries(size)
+
+        start = time.perf_counter()
+        results = ReconciliationMatcher(banks).match(books)
+        indexed_ms = (time.perf_counter() - start) * 1000
+
+        legacy_ms = None
+        if size <= 4000:
+            start = time.perf_counter()
+            expected = legacy_match(books, banks)
+            legacy_ms = (time.perf_counter() - start) * 1000
+            assert [(r.book_id, r.bank_id) for r in results] == expected, "indexed matcher diverged"
+
+        legacy = f"{legacy_ms:>12.1f}" if legacy_ms is not None else f"{'-':>12}"
+        print(f"  {size:>8} {legacy} {indexed_ms:>12.1f} {len(results):>9}")
+
+
+def bench_database(count: int):
+    db = make_session()
+    company = seed_company(db, "Reconciliation Bench")
+    bank_account = BankAccount(
+        company_id=company.id, bank_name="Bench Bank", account_name="Current",
+        account_number="000111", ifsc_code="BENC0000001",
+    )
+    db.add(bank_account)
+    db.flush()
+    ledger = Account(
+        company_id=company.id, code="1201", name="Bench Bank",
+        account_type=AccountType.ASSET, bank_account_id=bank_account.id,
+    )
+    contra = Account(company_id=company.id, code="4000", name="Sales", account_type=AccountType.REVENUE)
+    db.add_all([ledger, contra])
+    db.commit()
+
+    books, banks = make_entries(count)
+    transactions, entries, statement = [], [], []
+    for i, book in enumerate(books):
+        txn_id = generate_uuid()
+        amount = Decimal(abs(book.amount_cents)) / 100
+        transactions.append({
+            "id": txn_id, "company_id": company.id, "transaction_number": f"JE-{i:06d}",
+            "transaction_date": datetime.fromordinal(book.day), "status": TransactionStatus.POSTED,
+            "description": f"Entry {i}",
+        })
+        debit = amount if book.amount_cents > 0 else Decimal("0")
+        credit = amount if book.amount_cents < 0 else Decimal("0")
+        entries.append({"id": generate_uuid(), "transaction_id": txn_id, "account_id": ledger.id,
+                        "debit_amount": debit, "credit_amount": credit, "is_reconciled": False})
+        entries.append({"id": generate_uuid(), "transaction_id": txn_id, "account_id": contra.id,
+                        "debit_amount": credit, "credit_amount": debit, "is_reconciled": False})
+    for bank in banks:
+        statement.append({
+            "id": generate_uuid(), "company_id": company.id, "bank_account_id": bank_account.id,
+            "value_date": datetime.fromordinal(bank.day), "amount": Decimal(bank.amount_cents) / 100,
+            "status": BankStatementEntryStatus.PENDING, "description": "NEFT",
+        })
+    db.execute(insert(Transaction), transactions)
+    db.execute(insert(TransactionEntry), entries)
+    db.execute(insert(BankStatementEntry), statement)
+    db.commit()
+
+    print(f"\nauto_match on {count} book x {count} bank entries (SQLite)")
+    with measure(db, "BankReconciliationService.auto_match"):
+        result = BankReconciliationService(db).auto_match(company.id, bank_account.id)
+    print(f"  matched {result['matched']}, bank unmatched {result['bank_unmatched_count']}, "
+          f"book unmatched {result['book_unmatched_count']}")
+
+
+def main():
+    max_entries = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    db_entries = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    bench_matcher(max_entries)
+    bench_database(db_entries)
+
+
+if __name__ == "__main__":
+    main()
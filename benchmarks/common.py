@@ -0,0 +1,71 @@
+"""Shared helpers for the benchmark scripts.
+
+Benchmarks run against a throwaway in-memory SQLite database so they never
+touch the configured DATABASE_URL.
+"""
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.database  # noqa: F401  (registers all models on Base)
+from app.database.connection import Base
+from app.database.models import User, Company
+
+
+def make_session(url: str = "sqlite://"):
+    """Create a fresh database with all tables and return a session."""
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+
+def seed_company(db, name: str = "Benchmark Co"):
+    """Create a user and company to hang benchmark data off."""
+    user = User(email=f"{name.lower().replace(' ', '.')}@example.com", full_name=name)
+    db.add(user)
+    db.flush()
+    company = Company(user_id=user.id, name=name, state_code="27")
+    db.add(company)
+    db.commit()
+    return company
+
+
+class QueryCounter:
+    """Counts SQL statements executed on an engine while active."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+@contextmanager
+def measure(db, label: str):
+    """Print query count and wall time for the enclosed block."""
+    counter = QueryCounter(db.get_bind())
+    start = time.perf_counter()
+    with counter:
+        yield counter
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"  {label:<40} {counter.count:>7} queries {elapsed:>10.1f} ms")
@@ -0,0 +1,102 @@
+"""
+Comparative report benchmark.
+
+Seeds the financial statements data set, then asks for a month-by-month P&L
+of one year and a year-on-year balance sheet through
+ReportService.get_comparative_report, cold and warm. Every column must equal
+the standalone statement for that period. A journal posted into one month
+must drop only the cached periods containing it, totals computed before a
+concurrent posting must not be stored, and a month inside a full period
+lock must stay frozen.
+
+Usage: python benchmarks/comparative_report_benchmark.py [entries]
+"""
+import sys
+from datetime import datetime
+from decimal import Decimal
+
+from common import make_session, seed_company, measure
+from financial_statements_benchmark import seed
+
+from app.database.models import Account, AccountPeriodTotal, AccountType
+from app.schemas.accounting import TransactionCreate, TransactionEntryCreate
+from app.services.accounting_service import AccountingService
+from app.services.period_lock_service import PeriodLockService
+from app.services.period_totals_cache import PeriodTotalsCache
+from app.services.report_service import ReportService
+from app.services.statement_builder import month_periods
+
+
+def cached_periods(db, company):
+    return {
+        (start, end) for start, end in db.query(
+            AccountPeriodTotal.period_start, AccountPeriodTotal.period_end
+        ).filter(AccountPeriodTotal.company_id == company.id).distinct()
+    }
+
+
+def main():
+    entry_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    db = make_session()
+    company = seed_company(db, "Comparative Bench")
+    seed(db, company, entry_count, 300)
+    service = ReportService(db)
+
+    months = month_periods(datetime(2024, 4, 1), datetime(2025, 3, 31, 23, 59, 59, 999999))
+    years = [(datetime(2023, 4, 1), datetime(2024, 3, 31, 23, 59, 59, 999999)), months[0][:1] + months[-1][1:]]
+    PeriodLockService(db).lock_financial_year(company.id, "2023-2024")
+
+    print(f"\n{entry_count} entries, 12 monthly P&L columns and 2 balance sheet columns (SQLite)")
+    for attempt in ("cold", "warm"):
+        with measure(db, f"monthly P&L ({attempt})") as counter:
+            monthly = service.get_comparative_report(company, months, "profit_loss")
+        with measure(db, f"year-on-year balance sheet ({attempt})"):
+            yearly = service.get_comparative_report(company, years, "balance_sheet")
+    assert counter.count <= 2, counter.count
+
+    for (start, end), column in zip(months, monthly["columns"]):
+        assert column == service.get_profit_loss(company, start, end), start
+    for (_, end), column in zip(years, yearly["columns"]):
+        assert column == service.get_balance_sheet(company, end), end
+
+    # A posting in June only drops June and the balance sheet column after it
+    accounts = {a.code: a for a in db.query(Account).filter(Account.company_id == company.id)}
+    expense = next(a for a in accounts.values() if a.account_type == AccountType.EXPENSE and a.is_active)
+    before = cached_periods(db, company)
+
+    def post(day):
+        AccountingService(db).create_journal_entry(company, TransactionCreate(
+            transaction_date=day,
+            entries=[
+                TransactionEntryCreate(account_id=expense.id, debit_amount=Decimal("1000"), credit_amount=0),
+                TransactionEntryCreate(account_id=accounts["1000"].id, debit_amount=0, credit_amount=Decimal("1000")),
+            ],
+        ), auto_post=True)
+
+    post(datetime(2024, 6, 15, 12))
+    dropped = before - cached_periods(db, company)
+    assert dropped == {months[2], (None, years[1][1])}, dropped
+
+    with measure(db, "monthly P&L after one posting"):
+        monthly = service.get_comparative_report(company, months, "profit_loss")
+    assert monthly["columns"][2] == service.get_profit_loss(company, *months[2])
+
+    # A posting committed while June was being computed keeps the stale totals out
+    cache = PeriodTotalsCache(db)
+    version = cache._version(company.id)
+    stale = cache._compute(company.id, [months[2]])
+    post(datetime(2024, 6, 20, 12))
+    cache._store(company.id, version, stale)
+    assert months[2] not in cached_periods(db, company)
+
+    # The locked year stays frozen
+    frozen = service.get_comparative_report(company, years[:1], "profit_loss")
+    assert years[0] in cached_periods(db, company)
+    post(datetime(2023, 6, 15, 12))
+    assert years[0] in cached_periods(db, company)
+    assert service.get_comparative_report(company, years[:1], "profit_loss") == frozen
+    print("\nOK: columns match standalone statements; invalidation drops only affected periods")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Dashboard metrics benchmark.
+
+Seeds a year of invoices, payments, purchases and sales pipeline records
+for two companies and checks that:
+
+- InvoiceService.get_dashboard_summary matches totals computed in Python
+  from the rows, in one query;
+- the business outstanding tile and SalesDashboardService.get_dashboard_summary
+  stay within a fixed number of queries;
+- repeated reads are served from the dashboard cache without queries;
+- committing a payment drops only the paying company's cached metrics.
+
+Usage: python benchmarks/dashboard_benchmark.py [invoices]
+"""
+import asyncio
+import random
+import sys
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from common import make_session, seed_company, measure
+
+from sqlalchemy import insert
+from app.api.business_dashboard import get_outstanding_summary
+from app.config import settings
+from app.database.models import (
+    Customer, Enquiry, EnquiryStatus, Invoice, InvoiceStatus, Payment, PurchaseInvoice,
+    PurchaseInvoiceStatus, Quotation, QuotationStatus, SalesTicket, SalesTicketStage,
+    SalesTicketStatus, User, generate_uuid,
+)
+from app.services.invoice_service import InvoiceService
+from app.services.sales_dashboard_service import SalesDashboardService
+
+STATUSES = [InvoiceStatus.DRAFT, InvoiceStatus.PENDING, InvoiceStatus.PARTIALLY_PAID, InvoiceStatus.PAID,
+            InvoiceStatus.OVERDUE, InvoiceStatus.CANCELLED]
+
+
+def seed(db, company, invoices: int, seed: int = 25):
+    """Bulk-insert a year of activity; return the invoice rows."""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    customer = generate_uuid()
+    db.execute(insert(Customer), [{"id": customer, "company_id": company.id, "name": "Customer", "contact": "9"}])
+
+    rows = []
+    for i in range(invoices):
+        total = Decimal(rng.randrange(10000, 1000000)) / 100
+        half_tax = (total * Decimal("0.09")).quantize(Decimal("0.01"))
+        status = rng.choice(STATUSES)
+        paid = {InvoiceStatus.PAID: total, InvoiceStatus.PARTIALLY_PAID: (total / 2).quantize(Decimal("0.01"))}
+        amount_paid = paid.get(status, Decimal("0"))
+        rows.append({
+            "id": generate_uuid(), "company_id": company.id, "customer_id": customer,
+            "invoice_number": f"{company.name[:3]}-{i:06d}",
+            "invoice_date": now - timedelta(minutes=rng.randrange(365 * 24 * 60)),
+            "due_date": now + timedelta(days=rng.randrange(-60, 30)),
+            "status": status, "total_amount": total, "amount_paid": amount_paid,
+            "balance_due": total - amount_paid, "cgst_amount": half_tax, "sgst_amount": half_tax,
+            "igst_amount": 0, "total_tax": 2 * half_tax,
+        })
+    db.execute(insert(Invoice), rows)
+    db.execute(insert(PurchaseInvoice), [
+        {"id": generate_uuid(), "company_id": company.id, "vendor_id": customer,
+         "invoice_number": f"P-{i:06d}", "invoice_date": now - timedelta(days=rng.randrange(365)),
+         "due_date": now + timedelta(days=rng.randrange(-60, 30)),
+         "status": rng.choice(list(PurchaseInvoiceStatus)),
+         "total_amount": Decimal(rng.randrange(1000, 100000)) / 100,
+         "balance_due": Decimal(rng.randrange(0, 1000)) / 100}
+        for i in range(invoices // 3)
+    ])
+    db.execute(insert(SalesTicket), [
+        {"id": generate_uuid(), "company_id": company.id, "ticket_number": f"TKT-{company.id[:8]}-{i}",
+         "status": rng.choice(list(SalesTicketStatus)), "current_stage": rng.choice(list(SalesTicketStage)),
+         "expected_value": Decimal(rng.randrange(1000, 100000)), "actual_value": Decimal(rng.randrange(1000, 100000)),
+         "created_date": now - timedelta(days=rng.randrange(200)),
+         "actual_close_date": now - timedelta(days=rng.randrange(60))}
+        for i in range(invoices // 5)
+    ])
+    db.execute(insert(Enquiry), [
+        {"id": generate_uuid(), "company_id": company.id, "enquiry_number": f"ENQ-{i}", "subject": "Enquiry",
+         "enquiry_date": now - timedelta(days=rng.randrange(90)), "status": rng.choice(list(EnquiryStatus)),
+         "follow_up_date": now + timedelta(days=rng.randrange(-5, 15))}
+        for i in range(invoices // 5)
+    ])
+    db.execute(insert(Quotation), [
+        {"id": generate_uuid(), "company_id": company.id, "quotation_number": f"QT-{i}",
+         "quotation_date": now - timedelta(days=rng.randrange(120)), "status": rng.choice(list(QuotationStatus))}
+        for i in range(invoices // 10)
+    ])
+    db.commit()
+    return rows
+
+
+def expected_summary(rows):
+    """The invoice dashboard computed row by row."""
+    first_of_month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    this_month = [r for r in rows if r["invoice_date"] >= first_of_month]
+    live = [r for r in rows if r["status"] != InvoiceStatus.CANCELLED]
+    overdue = [r for r in rows if r["status"] == InvoiceStatus.OVERDUE]
+    revenue = sum(r["amount_paid"] for r in rows)
+    return {
+        "total_invoices": len(rows),
+        "total_revenue": revenue,
+        "total_pending": sum(r["balance_due"] for r in rows
+                             if r["status"] in (InvoiceStatus.PENDING, InvoiceStatus.PARTIALLY_PAID)),
+        "total_paid": revenue,
+        "overdue_count": len(overdue),
+        "overdue_amount": sum(r["balance_due"] for r in overdue),
+        "current_month_revenue": sum(r["total_amount"] for r in this_month if r["status"] in (
+            InvoiceStatus.PAID, InvoiceStatus.PARTIALLY_PAID, InvoiceStatus.PENDING)),
+        "current_month_invoices": len(this_month),
+        "total_cgst": sum(r["cgst_amount"] for r in live),
+        "total_sgst": sum(r["sgst_amount"] for r in live),
+        "total_igst": sum(Decimal(r["igst_amount"]) for r in live),
+    }
+
+
+def main():
+    invoices = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    settings.DASHBOARD_CACHE_TTL_SECONDS = 60
+    db = make_session()
+    company = seed_company(db, "Dashboard Bench")
+    other = seed_company(db, "Other Bench")
+    rows = seed(db, company, invoices)
+    seed(db, other, invoices // 10, seed=26)
+    company_id, other_id = company.id, other.id
+    user = db.get(User, company.user_id)
+    other_user = db.get(User, other.user_id)
+
+    invoice_service = InvoiceService(db)
+    sales_service = SalesDashboardService(db)
+
+    def outstanding(cid, owner):
+        return asyncio.run(get_outstanding_summary(cid, current_user=owner, db=db))
+
+    print(f"\n{invoices} invoices (SQLite)")
+    with measure(db, "invoice dashboard (cold)") as counter:
+        summary = invoice_service.get_dashboard_summary(company)
+    assert counter.count == 1, counter.count
+    assert summary == expected_summary(rows), (summary, expected_summary(rows))
+    with measure(db, "business outstanding (cold)") as counter:
+        outstanding(company_id, user)
+    # company lookup plus one aggregate per table
+    assert counter.count <= 3, counter.count
+    with measure(db, "sales dashboard (cold)") as counter:
+        sales = sales_service.get_dashboard_summary(company_id)
+    # enquiries, tickets, funnel, three conversion counts, deal cycle
+    assert counter.count <= 7, counter.count
+    funnel_count = db.query(SalesTicket).filter(
+        SalesTicket.company_id == company_id, SalesTicket.status == SalesTicketStatus.OPEN
+    ).count()
+    assert sales["pipeline"]["count"] == sales["funnel"]["total_count"] == funnel_count
+    invoice_service.get_dashboard_summary(other)
+    outstanding(other_id, other_user)
+
+    with measure(db, "invoice + sales dashboards (cached)") as counter:
+        assert invoice_service.get_dashboard_summary(company) == summary
+        assert sales_service.get_dashboard_summary(company_id) == sales
+    assert counter.count == 0, counter.count
+    with measure(db, "business outstanding (cached)") as counter:
+        before = outstanding(company_id, user)
+    assert counter.count == 1, counter.count  # company lookup only
+
+    # A committed payment drops the paying company's entries only
+    invoice = db.query(Invoice).filter(
+        Invoice.company_id == company_id, Invoice.status == InvoiceStatus.PENDING
+    ).first()
+    db.add(Payment(invoice_id=invoice.id, amount=invoice.balance_due, payment_date=datetime.utcnow()))
+    invoice.amount_paid, invoice.balance_due = invoice.total_amount, Decimal("0")
+    invoice.status = InvoiceStatus.PAID
+    db.commit()
+    db.refresh(company)
+    with measure(db, "invoice dashboard after payment") as counter:
+        after = invoice_service.get_dashboard_summary(company)
+    assert counter.count == 1, counter.count
+    assert after["total_revenue"] == summary["total_revenue"] + invoice.total_amount
+    assert outstanding(company_id, user)["receivables"]["count"] == before["receivables"]["count"] - 1
+    db.refresh(other)
+    with measure(db, "other company (still cached)") as counter:
+        invoice_service.get_dashboard_summary(other)
+    assert counter.count == 0, counter.count
+    print("  cached reads issue no queries; a payment refreshes only its company")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Day book and voucher register benchmark.
+
+Seeds busy days of three-line vouchers and runs ReportService.get_day_book,
+LedgerReportService.get_day_book and LedgerReportService.get_voucher_register
+at growing volumes, whole and paginated. The number of queries must not
+depend on the number of vouchers; the script fails if it does.
+
+Usage: python benchmarks/day_book_benchmark.py [vouchers ...]
+"""
+import random
+import sys
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from common import make_session, seed_company, measure, QueryCounter
+
+from sqlalchemy import insert
+
+from app.database.models import (
+    Account, AccountType, Transaction, TransactionEntry, TransactionStatus, generate_uuid,
+)
+from app.services.ledger_report_service import LedgerReportService
+from app.services.report_service import ReportService
+
+DAY = datetime(2024, 7, 15)
+
+
+def seed(db, company, count: int, seed: int = 17):
+    rng = random.Random(seed)
+    accounts = [
+        Account(company_id=company.id, code=f"{1000 + i}", name=f"Ledger {i}",
+                account_type=rng.choice(list(AccountType)))
+        for i in range(50)
+    ]
+    db.add_all(accounts)
+    db.commit()
+
+    transactions, entries = [], []
+    for i in range(count):
+        txn_id = generate_uuid()
+        amount = Decimal(rng.randrange(100, 1_000_000)) / 100
+        tax = (amount * Decimal("0.18")).quantize(Decimal("0.01"))
+        transactions.append({
+            "id": txn_id, "company_id": company.id, "transaction_number": f"JV-{i:06d}",
+            "transaction_date": DAY + timedelta(days=i % 3, seconds=rng.randrange(86400)),
+            "status": TransactionStatus.POSTED, "description": f"Voucher {i}",
+        })
+        debit, credit, tax_account = rng.sample(accounts, 3)
+        entries += [
+            {"id": generate_uuid(), "transaction_id": txn_id, "account_id": debit.id,
+             "debit_amount": amount + tax, "credit_amount": Decimal("0")},
+            {"id": generate_uuid(), "transaction_id": txn_id, "account_id": credit.id,
+             "debit_amount": Decimal("0"), "credit_amount": amount},
+            {"id": generate_uuid(), "transaction_id": txn_id, "account_id": tax_account.id,
+             "debit_amount": Decimal("0"), "credit_amount": tax},
+        ]
+    db.execute(insert(Transaction), transactions)
+    db.execute(insert(TransactionEntry), entries)
+    db.commit()
+
+
+def reports(db, company):
+    """(label, callable) for every report under test."""
+    to_date = DAY + timedelta(days=2)
+    ledger = LedgerReportService(db)
+    return [
+        ("ReportService.get_day_book", lambda: ReportService(db).get_day_book(company, DAY)),
+        ("ReportService day book (range, page)",
+         lambda: ReportService(db).get_day_book(company, DAY, to_date, page=2, page_size=100)),
+        ("LedgerReportService.get_day_book", lambda: ledger.get_day_book(company.id, DAY)),
+        ("LedgerReportService day book (range, page)",
+         lambda: ledger.get_day_book(company.id, DAY, None, to_date, page=2, page_size=100)),
+        ("LedgerReportService.get_voucher_register",
+         lambda: ledger.get_voucher_register(company.id, DAY, to_date.replace(hour=23))),
+    ]
+
+
+def main():
+    volumes = [int(v) for v in sys.argv[1:]] or [300, 3000, 9000]
+    query_counts = {}
+    for count in volumes:
+        db = make_session()
+        company = seed_company(db, "Day Book Bench")
+        seed(db, company, count)
+        print(f"\n{count} vouchers over 3 days (SQLite)")
+        for label, run in reports(db, company):
+            db.expire_all()
+            with measure(db, label):
+                result = run()
+            with QueryCounter(db.get_bind()) as counter:
+                run()
+            query_counts.setdefault(label, set()).add(counter.count)
+
+        book = ReportService(db).get_day_book(company, DAY, DAY + timedelta(days=2), page_size=50)
+        assert book["totals"]["debit"] == book["totals"]["credit"]
+        assert book["transaction_count"] == count
+
+    for label, counts in query_counts.items():
+        assert len(counts) == 1, f"{label}: query count depends on volume {sorted(counts)}"
+    print("\nQuery counts are independent of voucher volume")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Bulk e-invoice benchmark.
+
+Seeds a month of B2B and walk-in B2C invoices and runs an EInvoiceJob
+against the local NIC simulator with per-request latency and random
+retryable failures. Checks that:
+
+- only eligible invoices (B2B / registered customers) are submitted;
+- database queries per chunk stay fixed (no per-invoice lazy loads);
+- a run whose IRP rejects some invoices outright leaves them listed as
+  failures, and resuming the job issues their IRNs without resubmitting
+  the rest;
+- the rate limit caps request starts per second;
+- database work runs off the event loop, so it keeps serving other tasks
+  while a chunk is loaded and written back;
+- only one of two resume requests claims a job.
+
+Usage: python benchmarks/einvoice_batch_benchmark.py [invoices] [latency_ms]
+"""
+import asyncio
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from common import make_session, seed_company, measure
+
+from sqlalchemy import func, insert
+from app.database.models import (
+    Customer, EInvoiceJobStatus, Invoice, InvoiceItem, InvoiceStatus, InvoiceType, generate_uuid,
+)
+from app.services.einvoice_batch import (
+    EINVOICE_BATCH_SIZE, EInvoiceBatchService, EInvoiceTransportError, SimulatedNICTransport,
+)
+
+MONTH_START, MONTH_END = datetime(2024, 3, 1), datetime(2024, 4, 1)
+
+
+class RejectingTransport(SimulatedNICTransport):
+    """Simulator whose IRP rejects a fixed set of documents until told otherwise."""
+
+    def __init__(self, rejected, **kwargs):
+        super().__init__(**kwargs)
+        self.rejected = set(rejected)
+        self.submitted = 0
+
+    async def generate_irn(self, payload):
+        self.submitted += 1
+        if payload["DocDtls"]["No"] in self.rejected:
+            raise EInvoiceTransportError("2150: Duplicate IRN", retryable=False)
+        return await super().generate_irn(payload)
+
+
+def seed(db, company, invoices: int, seed: int = 24):
+    """Seed the month; return the number of e-invoice eligible invoices."""
+    rng = random.Random(seed)
+    registered = [generate_uuid() for _ in range(40)]
+    walk_in = generate_uuid()
+    db.execute(insert(Customer), [
+        {"id": pid, "company_id": company.id, "name": f"Customer {i}", "contact": "9000000000",
+         "tax_number": f"29AAAAA{i:04d}A1Z5" if pid in registered else None,
+         "billing_address_line1": "1 Market Road", "billing_city": "Bengaluru",
+         "billing_zip": "560001", "billing_state_code": "29"}
+        for i, pid in enumerate(registered + [walk_in])
+    ])
+
+    headers, lines, eligible = [], [], 0
+    for i in range(invoices):
+        invoice_id = generate_uuid()
+        b2b = rng.random() < 0.6
+        status = InvoiceStatus.DRAFT if rng.random() < 0.03 else InvoiceStatus.PENDING
+        eligible += b2b and status != InvoiceStatus.DRAFT
+        subtotal = Decimal("0")
+        for n in range(3):
+            taxable = Decimal(rng.randrange(1000, 500000)) / 100
+            gst = (taxable * Decimal("0.18")).quantize(Decimal("0.01"))
+            lines.append({
+                "id": generate_uuid(), "invoice_id": invoice_id, "description": f"Line {n}",
+                "hsn_code": "8517", "quantity": Decimal("1"), "unit": "nos", "unit_price": taxable,
+                "gst_rate": Decimal("18"), "taxable_amount": taxable, "total_amount": taxable + gst,
+                "igst_amount": gst, "cgst_amount": 0, "sgst_amount": 0, "cess_amount": 0,
+            })
+            subtotal += taxable
+        tax = (subtotal * Decimal("0.18")).quantize(Decimal("0.01"))
+        headers.append({
+            "id": invoice_id, "company_id": company.id,
+            "customer_id": rng.choice(registered) if b2b else walk_in,
+            "invoice_number": f"INV-{i:06d}",
+            "invoice_date": MONTH_START + timedelta(minutes=rng.randrange(30 * 24 * 60)),
+            "invoice_type": InvoiceType.B2B if b2b else InvoiceType.B2C,
+            "place_of_supply": "29", "status": status,
+            "subtotal": subtotal, "igst_amount": tax, "total_tax": tax, "total_amount": subtotal + tax,
+        })
+    db.execute(insert(Invoice), headers)
+    db.execute(insert(InvoiceItem), lines)
+    db.commit()
+    return eligible
+
+
+async def run_with_ticker(service, job, **kwargs):
+    """Run a job while a ticker measures the longest event loop stall."""
+    longest = 0.0
+
+    async def tick():
+        nonlocal longest
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(0.005)
+            longest = max(longest, loop.time() - start - 0.005)
+
+    ticker = asyncio.create_task(tick())
+    try:
+        await service.run_job(job, **kwargs)
+    finally:
+        ticker.cancel()
+    return longest
+
+
+def with_irn(db, company_id):
+    return db.query(func.count(Invoice.id)).filter(
+        Invoice.company_id == company_id, Invoice.irn.isnot(None)
+    ).scalar()
+
+
+def main():
+    invoices = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    latency = (int(sys.argv[2]) if len(sys.argv) > 2 else 20) / 1000
+    db = make_session()
+    company = seed_company(db, "EInvoice Bench")
+    company.gstin = "27AAACB1234C1Z5"
+    company.address_line1, company.city, company.pincode = "2 Mill Lane", "Pune", "411001"
+    db.commit()
+    eligible = seed(db, company, invoices)
+    company_id = company.id
+
+    print(f"\n{invoices} invoices, {eligible} eligible, {latency * 1000:.0f} ms per IRP call (SQLite)")
+
+    # Flaky portal: 5% retryable failures, 32 requests in flight, no rate limit
+    transport = SimulatedNICTransport(latency=latency, failure_rate=0.05, seed=1)
+    service = EInvoiceBatchService(db, transport)
+    job = service.create_job(company, MONTH_START, MONTH_END)
+    assert job.total_invoices == eligible, (job.total_invoices, eligible)
+    chunks = -(-eligible // EINVOICE_BATCH_SIZE)
+    start = time.perf_counter()
+    with measure(db, "run_job (concurrency 32)") as counter:
+        stall = asyncio.run(run_with_ticker(service, job, concurrency=32, rate_per_second=0, max_retries=5))
+    elapsed = time.perf_counter() - start
+    assert job.status == EInvoiceJobStatus.COMPLETED, job.error_message
+    assert job.succeeded_invoices == eligible and not job.failures, service.job_summary(job)
+    assert with_irn(db, company_id) == eligible
+    assert counter.count <= 10 + 8 * chunks, counter.count
+    print(f"  {job.attempts} submissions incl. retries; sequential would take "
+          f"~{eligible * latency:.1f} s, took {elapsed:.1f} s")
+    print(f"  longest event loop stall {stall * 1000:.0f} ms")
+
+    # Two resume requests: the first claims the job, the second is refused
+    assert service.claim_job(job) and not service.claim_job(job)
+    assert service.claim_job(job, force=True)
+
+    # Resume: first run rejects some documents, the second one issues them
+    db.query(Invoice).filter(Invoice.company_id == company_id).update(
+        {"irn": None, "ack_number": None, "ack_date": None, "signed_qr": None}
+    )
+    db.commit()
+    numbers = [n for (n,) in db.query(Invoice.invoice_number).filter(
+        Invoice.company_id == company_id, Invoice.invoice_type == InvoiceType.B2B,
+        Invoice.status != InvoiceStatus.DRAFT,
+    ).order_by(Invoice.invoice_number).limit(25)]
+    transport = RejectingTransport(numbers)
+    service = EInvoiceBatchService(db, transport)
+    job = service.create_job(company, MONTH_START, MONTH_END)
+    with measure(db, "run_job (25 rejected)"):
+        asyncio.run(service.run_job(job, concurrency=32, rate_per_second=0))
+    assert job.failed_invoices == 25 and job.succeeded_invoices == eligible - 25
+    assert {f["invoice_number"] for f in job.failures} == set(numbers)
+
+    transport.rejected.clear()
+    transport.submitted = 0
+    with measure(db, "resume"):
+        asyncio.run(service.run_job(job, concurrency=32, rate_per_second=0))
+    assert transport.submitted == 25, transport.submitted
+    assert job.succeeded_invoices == eligible and job.failed_invoices == 0 and job.runs == 2
+    assert with_irn(db, company_id) == eligible
+    print("  rejected invoices reported, then issued on resume without resubmitting the rest")
+
+    # Rate limit: re-issue the eligible invoices among the first 400 at 400/s
+    db.query(Invoice).filter(Invoice.company_id == company_id).update({"irn": None})
+    db.query(Invoice).filter(
+        Invoice.company_id == company_id,
+        Invoice.invoice_number.notin_(numbers[:1] + [f"INV-{i:06d}" for i in range(400)]),
+    ).update({"irn": "x"}, synchronize_session=False)
+    db.commit()
+    service = EInvoiceBatchService(db, SimulatedNICTransport())
+    job = service.create_job(company, MONTH_START, MONTH_END)
+    start = time.perf_counter()
+    asyncio.run(service.run_job(job, concurrency=64, rate_per_second=400))
+    elapsed = time.perf_counter() - start
+    assert elapsed >= (job.total_invoices - 1) / 400, elapsed
+    print(f"  {job.total_invoices} requests at 400/s took {elapsed:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
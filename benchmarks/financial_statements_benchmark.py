@@ -0,0 +1,166 @@
+"""
+Financial statements benchmark.
+
+Seeds a chart of accounts with the standard cash, bank, receivable, payable,
+fixed asset, loan and capital ledgers plus a few hundred revenue and expense
+ledgers, and two years of balanced journals. Times the P&L, balance sheet,
+cash flow, a 12-column monthly P&L and a 3-date comparative balance sheet.
+P&L and balance sheet figures are checked against per-account SUM loops, as
+they used to be computed, and the monthly columns must add up to the
+annual P&L.
+
+Usage: python benchmarks/financial_statements_benchmark.py [entries] [ledgers]
+"""
+import random
+import sys
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from common import make_session, seed_company, measure
+
+from sqlalchemy import func, insert
+from app.database.models import (
+    Account, Transaction, TransactionEntry, AccountType, TransactionStatus,
+    generate_uuid,
+)
+from app.services.report_service import ReportService
+
+START = datetime(2023, 4, 1)
+STANDARD = [
+    ("1000", "Cash", AccountType.ASSET), ("1010-01", "Bank 1", AccountType.ASSET),
+    ("1010-02", "Bank 2", AccountType.ASSET), ("1100", "Accounts Receivable", AccountType.ASSET),
+    ("1500", "Fixed Assets", AccountType.ASSET), ("2000", "Accounts Payable", AccountType.LIABILITY),
+    ("2300", "Loans", AccountType.LIABILITY), ("3000", "Capital", AccountType.EQUITY),
+]
+
+
+def seed(db, company, entry_count: int, ledger_count: int, seed: int = 8):
+    rng = random.Random(seed)
+    accounts = [
+        {"id": generate_uuid(), "company_id": company.id, "code": code, "name": name,
+         "account_type": account_type, "is_active": True}
+        for code, name, account_type in STANDARD
+    ]
+    for i in range(ledger_count):
+        account_type = AccountType.REVENUE if i % 3 == 0 else AccountType.EXPENSE
+        accounts.append({
+            "id": generate_uuid(), "company_id": company.id, "code": f"{4000 + i}",
+            "name": f"Ledger {i}", "account_type": account_type, "is_active": i % 50 != 49,
+        })
+    db.execute(insert(Account), accounts)
+
+    transactions, entries = [], []
+    minutes = 2 * 365 * 24 * 60
+    for n in range(entry_count // 2):
+        txn_id = generate_uuid()
+        amount = Decimal(rng.randint(100, 1000000)) / 100
+        transactions.append({
+            "id": txn_id, "company_id": company.id, "transaction_number": f"JV-{n:07d}",
+            "transaction_date": START + timedelta(minutes=rng.randrange(minutes)),
+            "status": TransactionStatus.POSTED if rng.random() < 0.97 else TransactionStatus.DRAFT,
+            "total_debit": amount, "total_credit": amount,
+        })
+        debit, credit = rng.sample(accounts, 2)
+        entries.append({"id": generate_uuid(), "transaction_id": txn_id,
+                        "account_id": debit["id"], "debit_amount": amount, "credit_amount": 0})
+        entries.append({"id": generate_uuid(), "transaction_id": txn_id,
+                        "account_id": credit["id"], "debit_amount": 0, "credit_amount": amount})
+
+    db.execute(insert(Transaction), transactions)
+    db.execute(insert(TransactionEntry), entries)
+    db.commit()
+
+
+def legacy_period_amounts(db, company, from_date, to_date):
+    """Per-account activity SUM loop over active revenue and expense ledgers."""
+    amounts = {}
+    for account in db.query(Account).filter(
+        Account.company_id == company.id, Account.is_active == True,
+        Account.account_type.in_([AccountType.REVENUE, AccountType.EXPENSE]),
+    ):
+        debit, credit = db.query(
+            func.coalesce(func.sum(TransactionEntry.debit_amount), 0),
+            func.coalesce(func.sum(TransactionEntry.credit_amount), 0),
+        ).join(Transaction).filter(
+            TransactionEntry.account_id == account.id,
+            Transaction.status == TransactionStatus.POSTED,
+            Transaction.transaction_date >= from_date,
+            Transaction.transaction_date <= to_date,
+        ).one()
+        debit, credit = Decimal(str(debit)), Decimal(str(credit))
+        amounts[account.id] = credit - debit if account.account_type == AccountType.REVENUE else debit - credit
+    return amounts
+
+
+def legacy_balances(service, company, as_of_date):
+    """Per-account balance loop, with retained earnings from every revenue and expense ledger."""
+    balances, retained_earnings = {}, Decimal("0")
+    for account in service.db.query(Account).filter(Account.company_id == company.id):
+        balance = service._get_account_balance_at_date(account, as_of_date)
+        if account.account_type == AccountType.REVENUE:
+            retained_earnings += balance
+        elif account.account_type == AccountType.EXPENSE:
+            retained_earnings -= balance
+        elif account.is_active:
+            balances[account.id] = balance
+    balances[None] = retained_earnings
+    return balances
+
+
+def amounts_of(*sections):
+    return {e["account_id"]: e["amount"] for s in sections for e in s["accounts"]}
+
+
+def main():
+    entry_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    ledger_count = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    db = make_session()
+    company = seed_company(db, "Statements Bench")
+    seed(db, company, entry_count, ledger_count)
+    service = ReportService(db)
+    year_start, year_end = datetime(2024, 4, 1), datetime(2025, 3, 31, 23, 59, 59, 999999)
+
+    print(f"\n{ledger_count + len(STANDARD)} ledgers / {entry_count} entries (SQLite)")
+    with measure(db, "per-account P&L loop"):
+        legacy_pl = legacy_period_amounts(db, company, year_start, year_end)
+    with measure(db, "get_profit_loss") as counter:
+        pl = service.get_profit_loss(company, year_start, year_end)
+    assert counter.count == 2, counter.count
+    assert amounts_of(pl["revenue"], pl["expenses"]) == {k: v for k, v in legacy_pl.items() if v != 0}
+
+    with measure(db, "per-account balance sheet loop"):
+        legacy_bs = legacy_balances(service, company, year_end)
+    with measure(db, "get_balance_sheet") as counter:
+        bs = service.get_balance_sheet(company, year_end)
+    assert counter.count == 2, counter.count
+    assert amounts_of(bs["assets"], bs["liabilities"], bs["equity"]) == {
+        k: v for k, v in legacy_bs.items() if v != 0
+    }
+    assert bs["is_balanced"]
+
+    with measure(db, "get_cash_flow") as counter:
+        cash_flow = service.get_cash_flow(company, year_start, year_end)
+    assert counter.count == 2, counter.count
+    assert cash_flow["operating_activities"]["entries"][0]["amount"] == pl["net_profit"]
+
+    with measure(db, "get_periodic_profit_loss (12 months)") as counter:
+        monthly = service.get_periodic_profit_loss(company, year_start, year_end)
+    assert counter.count == 2, counter.count
+    assert len(monthly["periods"]) == 12
+    assert monthly["total_net_profit"] == pl["net_profit"]
+    assert {r["account_id"]: r["total"] for r in monthly["revenue"]["accounts"] if r["total"]} == \
+        {e["account_id"]: e["amount"] for e in pl["revenue"]["accounts"]}
+
+    dates = [datetime(2024, 3, 31, 23, 59, 59), datetime(2024, 9, 30, 23, 59, 59), year_end]
+    with measure(db, "get_comparative_balance_sheet (3)") as counter:
+        comparative = service.get_comparative_balance_sheet(company, dates)
+    assert counter.count == 2, counter.count
+    assert comparative[-1] == bs
+
+    print(f"  net profit {pl['net_profit']}, total assets {bs['total_assets']}, "
+          f"net cash change {cash_flow['net_cash_change']}")
+    print("\nOK: statements match the per-account loops with a fixed query count")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+GST return ledger benchmark.
+
+Pushes a sample of sales and purchase invoices through the real services
+(finalise, cancel, void, approve, cancel) plus debit/credit notes posted
+through VoucherEngine, and checks that the incrementally maintained
+ledger matches a full recompute. Then bulk-loads a busy quarter, rebuilds the ledger and times the GST
+summary and GSTR-3B read from the ledger against the recompute path.
+
+Usage: python benchmarks/gst_return_ledger_benchmark.py [invoices] [items_per_invoice]
+"""
+import random
+import sys
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from common import make_session, seed_company, measure
+
+from sqlalchemy import insert
+from app.config import settings
+from app.database.models import (
+    Customer, Invoice, InvoiceItem, InvoiceStatus, InvoiceType, PurchaseInvoice,
+    PurchaseInvoiceItem, PurchaseInvoiceStatus, generate_uuid,
+)
+from app.services.gst_return_ledger import GSTReturnLedgerService
+from app.services.gst_service import GSTService
+from app.services.invoice_service import InvoiceService
+from app.services.purchase_service import PurchaseService
+from app.services.voucher_engine import VoucherEngine
+
+YEAR = 2024
+RATES = [Decimal("5"), Decimal("12"), Decimal("18"), Decimal("28")]
+HSN_CODES = ["0401", "1905", "3004", "6109", "8517", "9403"]
+CENT = Decimal("0.01")
+
+
+def document(rng, company_id, parent_key, parent_id, number, month, per_invoice):
+    """One invoice (sales or purchase) header plus its item rows."""
+    pos = rng.choice(["27", "27", "27", "29", "07"])
+    inter = pos != "27"
+    items, subtotal, tax = [], Decimal("0"), Decimal("0")
+    igst = cgst = sgst = Decimal("0")
+    for _ in range(per_invoice):
+        rate, code = rng.choice(RATES), rng.choice(HSN_CODES)
+        taxable = (Decimal(rng.randrange(1000, 100000)) / 100).quantize(CENT)
+        gst = (taxable * rate / 100).quantize(CENT)
+        half = (gst / 2).quantize(CENT)
+        items.append({
+            "id": generate_uuid(), parent_key: parent_id, "description": f"Item {code}",
+            "hsn_code": code, "quantity": Decimal("2"), "unit": "nos", "unit_price": taxable / 2,
+            "gst_rate": rate, "taxable_amount": taxable, "total_amount": taxable + gst,
+            "igst_amount": gst if inter else 0, "cgst_amount": 0 if inter else half,
+            "sgst_amount": 0 if inter else gst - half, "cess_amount": 0,
+        })
+        subtotal, tax = subtotal + taxable, tax + gst
+        if inter:
+            igst += gst
+        else:
+            cgst, sgst = cgst + half, sgst + gst - half
+    header = {
+        "id": parent_id, "company_id": company_id, "invoice_number": number,
+        "invoice_date": datetime(YEAR, month, 1) + timedelta(minutes=rng.randrange(28 * 24 * 60)),
+        "place_of_supply": pos, "subtotal": subtotal, "total_tax": tax, "total_amount": subtotal + tax,
+        "igst_amount": igst, "cgst_amount": cgst, "sgst_amount": sgst, "cess_amount": 0,
+        "balance_due": subtotal + tax,
+    }
+    return header, items
+
+
+def seed(db, company, invoices: int, per_invoice: int, draft: bool, seed: int = 22):
+    """Bulk-insert sales and purchase invoices over a quarter; return their ids."""
+    rng = random.Random(seed)
+    registered = [generate_uuid() for _ in range(20)]
+    walk_in = generate_uuid()
+    db.execute(insert(Customer), [
+        {"id": pid, "company_id": company.id, "name": f"Party {i}", "contact": "9000000000",
+         "tax_number": f"27AAAAA{i:04d}A1Z5" if pid in registered else None}
+        for i, pid in enumerate(registered + [walk_in])
+    ])
+
+    sales, sales_items, purchases, purchase_items = [], [], [], []
+    tag = "D" if draft else "B"
+    for i in range(invoices):
+        month = rng.choice([1, 2, 3])
+        customer = rng.choice(registered) if rng.random() < 0.1 else walk_in
+        header, items = document(rng, company.id, "invoice_id", generate_uuid(), f"INV-{tag}{i:06d}",
+                                 month, per_invoice)
+        header.update(
+            customer_id=customer,
+            invoice_type=InvoiceType.B2B if customer != walk_in else InvoiceType.B2C,
+            status=InvoiceStatus.DRAFT if draft else rng.choice([InvoiceStatus.PAID, InvoiceStatus.PENDING]),
+            is_reverse_charge=rng.random() < 0.02,
+        )
+        sales.append(header)
+        sales_items.extend(items)
+
+        if i % 3 == 0:
+            header, items = document(rng, company.id, "purchase_invoice_id", generate_uuid(),
+                                     f"PUR-{tag}{i:06d}", month, per_invoice)
+            for item in items:
+                item["itc_eligible"] = rng.random() > 0.05
+            header.update(
+                vendor_id=rng.choice(registered),
+                status=PurchaseInvoiceStatus.DRAFT if draft else PurchaseInvoiceStatus.APPROVED,
+                itc_eligible=rng.random() > 0.05,
+            )
+            purchases.append(header)
+            purchase_items.extend(items)
+
+    db.execute(insert(Invoice), sales)
+    db.execute(insert(InvoiceItem), sales_items)
+    db.execute(insert(PurchaseInvoice), purchases)
+    db.execute(insert(PurchaseInvoiceItem), purchase_items)
+    db.commit()
+    return [row["id"] for row in sales], [row["id"] for row in purchases]
+
+
+def run_hooks(db, company, sales_ids, purchase_ids):
+    """Drive the sample through the services that maintain the ledger."""
+    rng = random.Random(7)
+    invoices = InvoiceService(db)
+    purchases = PurchaseService(db)
+    vouchers = VoucherEngine(db)
+
+    for invoice_id in sales_ids:
+        invoices.finalize_invoice(db.get(Invoice, invoice_id))
+    for invoice_id in rng.sample(sales_ids, len(sales_ids) // 10):
+        invoice = db.get(Invoice, invoice_id)
+        if rng.random() < 0.5:
+            invoices.cancel_invoice(invoice, "benchmark")
+        else:
+            invoices.void_invoice(invoice, "benchmark")
+    for invoice_id in purchase_ids:
+        purchases.approve_purchase_invoice(db.get(PurchaseInvoice, invoice_id))
+    for invoice_id in rng.sample(purchase_ids, len(purchase_ids) // 10):
+        purchases.cancel_purchase_invoice(db.get(PurchaseInvoice, invoice_id), "benchmark")
+
+    for invoice_id in rng.sample(sales_ids, len(sales_ids) // 20):
+        post_note(vouchers, company, db.get(Invoice, invoice_id), "sales_return")
+    for invoice_id in rng.sample(purchase_ids, len(purchase_ids) // 20):
+        post_note(vouchers, company, db.get(PurchaseInvoice, invoice_id), "purchase_return")
+    db.commit()
+
+
+def post_note(vouchers, company, invoice, section):
+    """Post a one-item debit/credit note through VoucherEngine."""
+    item = invoice.items[0]
+    gst = (item.igst_amount or 0) + (item.cgst_amount or 0) + (item.sgst_amount or 0)
+    create = vouchers.create_debit_note if section == "sales_return" else vouchers.create_credit_note
+    result = create(
+        company, invoice, [{"taxable_amount": item.taxable_amount, "gst_amount": gst}],
+        voucher_date=invoice.invoice_date + timedelta(days=3), reason="benchmark",
+    )
+    assert result.success, result.error
+
+
+def main():
+    invoices = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    per_invoice = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    settings.GST_RETURN_LEDGER_ENABLED = True
+
+    db = make_session()
+    company = seed_company(db, "GST Ledger Bench")
+    company_id = company.id
+    ledger = GSTReturnLedgerService(db)
+
+    sample = max(invoices // 100, 50)
+    print(f"\nIncremental maintenance: {sample} invoices through the services (SQLite)")
+    sales_ids, purchase_ids = seed(db, company, sample, per_invoice, draft=True)
+    with measure(db, "finalise/cancel/void/approve/notes"):
+        run_hooks(db, company, sales_ids, purchase_ids)
+    result = ledger.check_consistency(company_id)
+    assert result["is_consistent"], result["mismatches"][:3]
+    print(f"  ledger matches full recompute ({result['ledger_rows']} rows)")
+
+    print(f"\n{invoices} invoices x {per_invoice} items over a quarter (SQLite)")
+    seed(db, company, invoices, per_invoice, draft=False, seed=23)
+    with measure(db, "GSTReturnLedgerService.rebuild"):
+        rows = ledger.rebuild(company_id)
+    print(f"  {rows} ledger rows")
+
+    service = GSTService(db)
+    db.expire_all()
+    company = db.get(type(company), company_id)
+    with measure(db, "get_gst_summary (ledger)") as counter:
+        summary = service.get_gst_summary(company, 2, YEAR)
+    assert counter.count <= 1, counter.count
+    with measure(db, "generate_gstr3b (ledger)") as counter:
+        gstr3b = service.generate_gstr3b(company, 2, YEAR)
+    assert counter.count <= 1, counter.count
+
+    settings.GST_RETURN_LEDGER_ENABLED = False
+    with measure(db, "get_gst_summary (recompute)"):
+        recomputed = service.get_gst_summary(company, 2, YEAR)
+    with measure(db, "generate_gstr3b (recompute)"):
+        gstr3b_recomputed = service.generate_gstr3b(company, 2, YEAR)
+    settings.GST_RETURN_LEDGER_ENABLED = True
+
+    assert summary == recomputed
+    assert gstr3b == gstr3b_recomputed
+    with measure(db, "check_consistency"):
+        assert ledger.check_consistency(company_id)["is_consistent"]
+    print(f"  {summary.total_invoices} invoices in February, tax {summary.total_tax}, "
+          f"net ITC {gstr3b.total_itc_available}, payable {gstr3b.tax_payable}; paths agree")
+
+
+if __name__ == "__main__":
+    main()
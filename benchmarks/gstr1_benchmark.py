@@ -0,0 +1,123 @@
+"""
+GSTR-1 benchmark.
+
+Seeds a retail month of invoices, mostly B2C with a few B2B, B2C large and
+export invoices, then times GSTService.generate_gstr1 and
+GSTRJsonService.generate_gstr1_json. Both must run a fixed number of
+queries, and the B2CS and HSN tables must match a per-item Python
+accumulation over the seeded rows.
+
+Usage: python benchmarks/gstr1_benchmark.py [invoices] [items_per_invoice]
+"""
+import random
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from common import make_session, seed_company, measure
+
+from sqlalchemy import insert
+from app.database.models import (
+    Customer, Invoice, InvoiceItem, InvoiceStatus, InvoiceType, generate_uuid,
+)
+from app.services.gst_service import GSTService
+from app.services.gstr_json_service import GSTRJsonService
+
+MONTH, YEAR = 3, 2024
+RATES = [Decimal("5"), Decimal("12"), Decimal("18"), Decimal("28")]
+HSN_CODES = ["0401", "1905", "3004", "6109", "8517", "9403"]
+
+
+def seed(db, company, invoices: int, per_invoice: int, seed: int = 6):
+    """Seed the month and return the expected B2CS and HSN taxable values."""
+    rng = random.Random(seed)
+    registered = [generate_uuid() for _ in range(50)]
+    walk_in = generate_uuid()
+    db.execute(insert(Customer), [
+        {"id": pid, "company_id": company.id, "name": f"Customer {i}", "contact": "9000000000",
+         "tax_number": f"27AAAAA{i:04d}A1Z5" if pid in registered else None}
+        for i, pid in enumerate(registered + [walk_in])
+    ])
+
+    b2cs = defaultdict(Decimal)
+    hsn = defaultdict(Decimal)
+    headers, lines = [], []
+    start = datetime(YEAR, MONTH, 1)
+    for i in range(invoices):
+        invoice_id = generate_uuid()
+        kind = rng.random()
+        customer = rng.choice(registered) if kind < 0.05 else walk_in
+        invoice_type = InvoiceType.EXPORT if 0.05 <= kind < 0.06 else InvoiceType.B2C
+        large = 0.06 <= kind < 0.07
+        pos = rng.choice(["27", "27", "27", "29", "07"])
+        status = InvoiceStatus.CANCELLED if rng.random() < 0.02 else InvoiceStatus.PAID
+
+        items, subtotal, tax = [], Decimal("0"), Decimal("0")
+        for _ in range(per_invoice):
+            rate, code = rng.choice(RATES), rng.choice(HSN_CODES)
+            taxable = Decimal(rng.randrange(10000000 if large else 1000, 20000000 if large else 100000)) / 100
+            gst = (taxable * rate / 100).quantize(Decimal("0.01"))
+            half = (gst / 2).quantize(Decimal("0.01"))
+            inter = pos != "27"
+            items.append({
+                "id": generate_uuid(), "invoice_id": invoice_id, "description": f"Item {code}",
+                "hsn_code": code, "quantity": Decimal("1"), "unit": "nos", "unit_price": taxable,
+                "gst_rate": rate, "taxable_amount": taxable, "total_amount": taxable + gst,
+                "igst_amount": gst if inter else 0, "cgst_amount": 0 if inter else half,
+                "sgst_amount": 0 if inter else half, "cess_amount": 0,
+            })
+            subtotal, tax = subtotal + taxable, tax + gst
+        total = subtotal + tax
+        headers.append({
+            "id": invoice_id, "company_id": company.id, "customer_id": customer,
+            "invoice_number": f"INV-{i:06d}", "invoice_date": start + timedelta(minutes=rng.randrange(30 * 24 * 60)),
+            "invoice_type": invoice_type, "place_of_supply": pos, "status": status,
+            "subtotal": subtotal, "total_tax": tax, "total_amount": total,
+            "igst_amount": tax if pos != "27" else 0, "cgst_amount": 0, "sgst_amount": 0, "cess_amount": 0,
+        })
+        lines.extend(items)
+        if status == InvoiceStatus.CANCELLED:
+            continue
+        for item in items:
+            hsn[item["hsn_code"]] += item["taxable_amount"]
+        is_b2cl = total > 250000 and pos != "27"
+        if customer == walk_in and invoice_type == InvoiceType.B2C and not is_b2cl:
+            for item in items:
+                b2cs[(pos, item["gst_rate"])] += item["taxable_amount"]
+
+    db.execute(insert(Invoice), headers)
+    db.execute(insert(InvoiceItem), lines)
+    db.commit()
+    return b2cs, hsn
+
+
+def main():
+    invoices = int(sys.argv[1]) if len(sys.argv) > 1 else 60000
+    per_invoice = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    db = make_session()
+    company = seed_company(db, "GSTR1 Bench")
+    company.gstin = "27AAACB1234C1Z5"
+    db.commit()
+    b2cs, hsn = seed(db, company, invoices, per_invoice)
+    company_id, gstin = company.id, company.gstin
+
+    print(f"\n{invoices} invoices x {per_invoice} items (SQLite)")
+    with measure(db, "GSTService.generate_gstr1") as counter:
+        report = GSTService(db).generate_gstr1(company, MONTH, YEAR)
+    assert counter.count <= 5, counter.count
+    assert {(row.place_of_supply, row.gst_rate): row.taxable_value for row in report.b2cs_summary} == dict(b2cs)
+    assert {row.hsn_code: row.taxable_value for row in report.hsn_summary} == dict(hsn)
+
+    db.expire_all()
+    with measure(db, "GSTRJsonService.generate_gstr1_json") as counter:
+        portal = GSTRJsonService(db).generate_gstr1_json(company_id, f"{MONTH:02d}{YEAR}", gstin)
+    assert counter.count <= 6, counter.count
+    assert sum(len(group["inv"]) for group in portal["b2b"]) == len(report.b2b_invoices)
+    assert len(portal["b2cs"]) == len(report.b2cs_summary)
+    print(f"  {len(report.b2b_invoices)} B2B, {len(report.b2cl_invoices)} B2CL, "
+          f"{len(report.b2cs_summary)} B2CS rows, {len(report.hsn_summary)} HSN rows; tables match")
+
+
+if __name__ == "__main__":
+    main()
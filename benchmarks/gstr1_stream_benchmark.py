@@ -0,0 +1,86 @@
+"""
+Streaming GSTR-1 JSON benchmark.
+
+Seeds a retail month (see gstr1_benchmark.py) and compares
+GSTRJsonService.generate_gstr1_json, which builds the whole document in
+memory, with iter_gstr1_json, which streams it. Both must produce the same
+JSON (up to the order of B2B/B2CL groups); the streamed run's peak Python
+memory must stay bounded as the invoice count grows.
+
+Usage: python benchmarks/gstr1_stream_benchmark.py [invoices] [items_per_invoice]
+"""
+import json
+import os
+import sys
+import tracemalloc
+
+from common import make_session, seed_company, measure
+from gstr1_benchmark import MONTH, YEAR, seed
+
+from app.services.gstr_json_service import GSTRJsonService
+
+
+def normalized(portal):
+    """Portal JSON with B2B and B2CL groups in a fixed order."""
+    portal = dict(portal)
+    portal["b2b"] = sorted(portal["b2b"], key=lambda group: group["ctin"])
+    portal["b2cl"] = sorted(portal["b2cl"], key=lambda group: group["pos"])
+    return portal
+
+
+def peak_mb(fn):
+    tracemalloc.start()
+    try:
+        result = fn()
+        return result, tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    invoices = int(sys.argv[1]) if len(sys.argv) > 1 else 60000
+    per_invoice = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    db = make_session()
+    company = seed_company(db, "GSTR1 Stream Bench")
+    company.gstin = "27AAACB1234C1Z5"
+    db.commit()
+    seed(db, company, invoices, per_invoice)
+    company_id, gstin = company.id, company.gstin
+    period = f"{MONTH:02d}{YEAR}"
+    service = GSTRJsonService(db)
+
+    print(f"\n{invoices} invoices x {per_invoice} items (SQLite)")
+    with measure(db, "generate_gstr1_json + json.dumps"):
+        (portal, text), in_memory = peak_mb(
+            lambda: (lambda p: (p, json.dumps(p)))(service.generate_gstr1_json(company_id, period, gstin))
+        )
+    db.expire_all()
+
+    def consume():
+        size, chunks = 0, 0
+        for chunk in service.iter_gstr1_json(company_id, period, gstin):
+            size, chunks = size + len(chunk), chunks + 1
+        return size, chunks
+
+    with measure(db, "iter_gstr1_json") as counter:
+        (size, chunks), streamed = peak_mb(consume)
+    # state code, three aggregates and one streamed query per invoice-wise section
+    assert counter.count <= 7, counter.count
+    print(f"  {size / 1024 / 1024:.1f} MB of JSON in {chunks} chunks; "
+          f"peak {in_memory:.1f} MB in memory vs {streamed:.1f} MB streamed")
+    assert streamed < in_memory
+
+    db.expire_all()
+    with measure(db, "write_gstr1_json (temp file)"):
+        path = service.write_gstr1_json(company_id, period, gstin)
+    try:
+        with open(path, encoding="utf-8") as f:
+            written = json.load(f)
+    finally:
+        os.remove(path)
+    assert normalized(written) == normalized(portal)
+    print("  streamed JSON matches the in-memory document")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+GSTR-2B reconciliation benchmark.
+
+Seeds a month of purchase invoices from a few hundred GSTIN-registered
+vendors, builds a GSTR-2B with exact matches, reformatted invoice numbers,
+amount differences, missing invoices and extra records, and times
+GSTReconciliationService.reconcile_period.
+
+Usage: python benchmarks/gstr2b_reconciliation_benchmark.py [invoices]
+"""
+import random
+import sys
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from common import make_session, seed_company, measure
+
+from sqlalchemy import insert
+
+from app.database.models import Customer, PurchaseInvoice, PurchaseInvoiceStatus, generate_uuid
+from app.services.gst_reconciliation_service import GSTReconciliationService, GSTR2Record
+
+START = datetime(2024, 4, 1)
+
+
+def seed(db, company, count: int, seed: int = 5):
+    rng = random.Random(seed)
+    vendors = []
+    for i in range(300):
+        vendors.append({
+            "id": generate_uuid(), "company_id": company.id, "name": f"Vendor {i}",
+            "tax_number": f"27AAAC{i:04d}A1Z5", "customer_type": "vendor", "contact": "9000000000",
+        })
+    db.execute(insert(Customer), vendors)
+
+    invoices, records = [], []
+    for i in range(count):
+        vendor = rng.choice(vendors)
+        day = START + timedelta(days=rng.randrange(30))
+        taxable = Decimal(rng.randrange(1000, 500000)) / 100
+        tax = (taxable * Decimal("0.18")).quantize(Decimal("0.01"))
+        total = taxable + tax
+        number = f"INV/{i:05d}"
+        invoices.append({
+            "id": generate_uuid(), "company_id": company.id, "vendor_id": vendor["id"],
+            "invoice_number": f"PI-{i:06d}", "vendor_invoice_number": number,
+            "invoice_date": day, "vendor_invoice_date": day, "subtotal": taxable,
+            "igst_amount": tax, "total_tax": tax, "total_amount": total,
+            "status": PurchaseInvoiceStatus.APPROVED,
+        })
+
+        roll = rng.random()
+        if roll < 0.05:
+            continue  # Supplier didn't file: NOT_IN_GSTR
+        if roll < 0.15:
+            number = number.replace("/", "-").lower()  # Reformatted number
+        value = total + (Decimal("50") if roll > 0.97 else Decimal("0"))
+        records.append(GSTR2Record(
+            supplier_gstin=vendor["tax_number"], supplier_name=vendor["name"],
+            invoice_number=number, invoice_date=day.date(), invoice_value=value,
+            taxable_value=taxable, cgst=Decimal("0"), sgst=Decimal("0"), igst=tax,
+            cess=Decimal("0"), place_of_supply="27",
+        ))
+
+    for i in range(count // 50):
+        vendor = rng.choice(vendors)
+        records.append(GSTR2Record(
+            supplier_gstin=vendor["tax_number"], supplier_name=vendor["name"],
+            invoice_number=f"MISSING-{i}", invoice_date=(START + timedelta(days=3)).date(),
+            invoice_value=Decimal("999.99"), taxable_value=Decimal("847.45"), cgst=Decimal("0"),
+            sgst=Decimal("0"), igst=Decimal("152.54"), cess=Decimal("0"), place_of_supply="27",
+        ))
+
+    db.execute(insert(PurchaseInvoice), invoices)
+    db.commit()
+    return records
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
+    db = make_session()
+    company = seed_company(db, "GSTR2B Bench")
+    records = seed(db, company, count)
+
+    print(f"\nreconcile_period: {len(records)} GSTR-2B records, {count} purchase invoices (SQLite)")
+    with measure(db, "GSTReconciliationService.reconcile_period"):
+        result = GSTReconciliationService(db).reconcile_period(company.id, records, "042024")
+    for key, value in result["summary"].items():
+        print(f"  {key:<20} {value:>7}")
+    assert len(result["not_in_gstr"]) == result["summary"]["not_in_gstr"]
+
+
+if __name__ == "__main__":
+    main()
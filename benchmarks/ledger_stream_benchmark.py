@@ -0,0 +1,120 @@
+"""
+Account ledger streaming benchmark.
+
+Seeds one heavily used account, then compares AccountingService and
+LedgerReportService.get_account_ledger with the streamed ledger
+(LedgerReportService.stream_account_ledger). The streamed ledger is also
+read page by page through cursors; the balances must match the
+unpaginated ledger row for row. Peak traced memory is measured in
+separate runs.
+
+Usage: python benchmarks/ledger_stream_benchmark.py [entries] [page_size]
+"""
+import random
+import sys
+import tracemalloc
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from common import make_session, seed_company, measure
+
+from sqlalchemy import insert
+
+from app.database.models import (
+    Account, AccountType, Transaction, TransactionEntry, TransactionStatus, generate_uuid,
+)
+from app.services.accounting_service import AccountingService
+from app.services.ledger_report_service import LedgerReportService
+
+START = datetime(2023, 4, 1)
+
+
+def seed(db, company, count: int, seed: int = 13):
+    rng = random.Random(seed)
+    bank = Account(company_id=company.id, code="1201", name="Bank", account_type=AccountType.ASSET)
+    sales = Account(company_id=company.id, code="4000", name="Sales", account_type=AccountType.REVENUE)
+    db.add_all([bank, sales])
+    db.commit()
+
+    transactions, entries = [], []
+    for i in range(count):
+        txn_id = generate_uuid()
+        amount = Decimal(rng.randrange(100, 10_000_000)) / 100
+        debit = amount if rng.random() < 0.55 else Decimal("0")
+        credit = amount - debit
+        transactions.append({
+            "id": txn_id, "company_id": company.id, "transaction_number": f"JV-{i:07d}",
+            "transaction_date": START + timedelta(days=rng.randrange(730)),
+            "status": TransactionStatus.POSTED, "description": f"Entry {i}",
+        })
+        entries.append({"id": generate_uuid(), "transaction_id": txn_id, "account_id": bank.id,
+                        "debit_amount": debit, "credit_amount": credit})
+        entries.append({"id": generate_uuid(), "transaction_id": txn_id, "account_id": sales.id,
+                        "debit_amount": credit, "credit_amount": debit})
+    db.execute(insert(Transaction), transactions)
+    db.execute(insert(TransactionEntry), entries)
+    db.commit()
+    return bank
+
+
+def read_pages(service, company, account, from_date, page_size):
+    """All rows of the streamed ledger, fetched page by page through cursors."""
+    rows, cursor, pages = [], None, 0
+    while True:
+        _, page = service.stream_account_ledger(company.id, account.id, from_date, None, cursor, page_size)
+        page = list(page)
+        pages += 1
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows, pages
+        cursor = page[-1]["cursor"]
+
+
+def peak_memory(func) -> float:
+    """Peak traced allocation in MB while func runs."""
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024 / 1024
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    db = make_session()
+    company = seed_company(db, "Ledger Bench")
+    bank = seed(db, company, count)
+    from_date = START + timedelta(days=180)
+    service = LedgerReportService(db)
+
+    print(f"\nLedger of {count} entries, from {from_date:%Y-%m-%d} (SQLite)")
+    with measure(db, "AccountingService.get_account_ledger"):
+        AccountingService(db).get_account_ledger(bank, from_date.date())
+    db.expire_all()
+    with measure(db, "LedgerReportService.get_account_ledger"):
+        full = service.get_account_ledger(company.id, bank.id, from_date)
+    with measure(db, "stream_account_ledger (one stream)"):
+        header, rows = service.stream_account_ledger(company.id, bank.id, from_date)
+        streamed = sum(1 for _ in rows)
+    with measure(db, f"stream_account_ledger (pages of {page_size})"):
+        paged, pages = read_pages(service, company, bank, from_date, page_size)
+
+    assert streamed == len(paged) == full["entry_count"]
+    assert header["opening_balance"] == full["opening_balance"]
+    assert [r["balance"] for r in paged] == [e["balance"] for e in full["entries"]]
+    print(f"  {streamed} rows, {pages} pages, balances identical; closing {full['closing_balance']}")
+
+    def stream_all():
+        _, rows = service.stream_account_ledger(company.id, bank.id, from_date)
+        for _ in rows:
+            pass
+
+    db.expire_all()
+    print(f"\n  peak traced memory: get_account_ledger "
+          f"{peak_memory(lambda: service.get_account_ledger(company.id, bank.id, from_date)):.1f} MB, "
+          f"streamed {peak_memory(stream_all):.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
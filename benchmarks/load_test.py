@@ -0,0 +1,105 @@
+"""
+HTTP load test for the hot read endpoints.
+
+Runs N concurrent clients against a running server and reports throughput
+and latency per endpoint. Use it to compare the async endpoints (invoice
+list/detail, dashboards, ledger) with endpoints that still run synchronous
+queries on the event loop, or to compare two builds of the server.
+
+Usage:
+    uvicorn main:app --port 6768 &
+    python benchmarks/load_test.py --company <company_id> [--clients 50] [--requests 20]
+        [--base-url http://127.0.0.1:6768/api] [--token mock-access-token]
+        [--invoice <invoice_id>] [--account <account_id>] [--path <extra path> ...]
+
+Paths are relative to /companies/<company_id>/.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+import httpx
+
+
+DEFAULT_PATHS = [
+    "invoices",
+    "dashboard/summary",
+    "dashboard/recent-invoices",
+    "dashboard/outstanding-invoices",
+    "business/summary",
+    # Still synchronous, for comparison
+    "business/gst-summary",
+]
+
+
+async def run_path(client: httpx.AsyncClient, url: str, clients: int, requests_per_client: int) -> dict:
+    """Hit one URL from `clients` concurrent clients and collect latencies."""
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for _ in range(requests_per_client):
+            start = time.perf_counter()
+            try:
+                response = await client.get(url)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "max": latencies[-1] * 1000,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test for read endpoints")
+    parser.add_argument("--base-url", default="http://127.0.0.1:6768/api")
+    parser.add_argument("--token", default="mock-access-token")
+    parser.add_argument("--company", required=True)
+    parser.add_argument("--invoice", help="Invoice ID for the detail endpoint")
+    parser.add_argument("--account", help="Account ID for the ledger endpoint")
+    parser.add_argument("--path", action="append", default=[], help="Extra path to test")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=20, help="Requests per client per path")
+    args = parser.parse_args()
+
+    paths = list(DEFAULT_PATHS)
+    if args.invoice:
+        paths.insert(1, f"invoices/{args.invoice}")
+    if args.account:
+        paths.append(f"accounts/{args.account}/ledger")
+    paths.extend(args.path)
+
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    headers = {"Authorization": f"Bearer {args.token}"}
+
+    print(f"\n{args.clients} clients x {args.requests} requests per endpoint against {args.base_url}\n")
+    print(f"  {'endpoint':<40} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'errors':>7}")
+
+    async with httpx.AsyncClient(headers=headers, limits=limits, timeout=60.0) as client:
+        for path in paths:
+            url = f"{args.base_url}/companies/{args.company}/{path}"
+            # Warm up connections and caches
+            await client.get(url)
+            result = await run_path(client, url, args.clients, args.requests)
+            print(f"  {path:<40} {result['rps']:>8.0f} {result['p50']:>8.1f} "
+                  f"{result['p95']:>8.1f} {result['max']:>8.1f} {result['errors']:>7}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,142 @@
+"""
+Party statement benchmark.
+
+Seeds customers with opening balances, invoices, payments against them,
+debit/credit note vouchers and receipt vouchers allocated bill-wise, then
+times ReportService.get_party_statement for one customer and the bulk
+iter_party_statements run for every customer. Both must use a fixed number
+of queries, bulk statements must equal the single-party ones, and every
+closing balance must equal a brute-force sum over the seeded documents.
+
+Usage: python benchmarks/party_statement_benchmark.py [customers] [invoices_per_customer]
+"""
+import random
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from common import make_session, seed_company, measure
+
+from sqlalchemy import insert
+from app.database.models import (
+    BillAllocation, BillAllocationType, Customer, Invoice, InvoiceStatus, Payment, PaymentMode,
+    Transaction, TransactionStatus, VoucherType, generate_uuid,
+)
+from app.services.report_service import ReportService
+
+START = datetime(2024, 1, 1)
+FROM_DATE, TO_DATE = datetime(2024, 7, 1), datetime(2024, 9, 30, 23, 59, 59)
+
+
+CENT = Decimal("0.01")
+
+
+def seed(db, company, customers: int, per_customer: int, seed: int = 4):
+    """Seed documents and return the expected closing balance per customer at TO_DATE."""
+    rng = random.Random(seed)
+    expected = defaultdict(Decimal)
+    parties, invoices, payments, transactions, allocations = [], [], [], [], []
+
+    def day():
+        return START + timedelta(minutes=rng.randrange(365 * 24 * 60))
+
+    for c in range(customers):
+        party_id = generate_uuid()
+        opening = Decimal(rng.randrange(0, 50000))
+        advance = rng.random() < 0.2
+        parties.append({
+            "id": party_id, "company_id": company.id, "name": f"Customer {c}", "contact": "9000000000",
+            "opening_balance": opening, "opening_balance_type": "advance" if advance else "outstanding",
+        })
+        expected[party_id] += -opening if advance else opening
+
+        for i in range(per_customer):
+            invoice_id, when = generate_uuid(), day()
+            total = Decimal(rng.randrange(1000, 200000)) / 100
+            status = rng.choice([InvoiceStatus.PENDING, InvoiceStatus.PAID, InvoiceStatus.DRAFT])
+            invoices.append({
+                "id": invoice_id, "company_id": company.id, "customer_id": party_id,
+                "invoice_number": f"INV-{c}-{i}", "invoice_date": when, "total_amount": total,
+                "status": status,
+            })
+            counted = status != InvoiceStatus.DRAFT and when <= TO_DATE
+            expected[party_id] += total if counted else 0
+
+            if rng.random() < 0.5:
+                paid_on = when + timedelta(days=rng.randrange(30))
+                payments.append({
+                    "id": generate_uuid(), "invoice_id": invoice_id, "amount": (total / 2).quantize(CENT),
+                    "payment_date": paid_on, "payment_mode": PaymentMode.UPI,
+                })
+                expected[party_id] -= (total / 2).quantize(CENT) if paid_on <= TO_DATE else 0
+            if rng.random() < 0.2:
+                receipt_id, received_on = generate_uuid(), when + timedelta(days=rng.randrange(60))
+                amount = (total / 4).quantize(CENT)
+                transactions.append({
+                    "id": receipt_id, "company_id": company.id, "transaction_number": f"RCT-{c}-{i}",
+                    "transaction_date": received_on, "voucher_type": VoucherType.RECEIPT,
+                    "status": TransactionStatus.POSTED, "total_debit": amount, "total_credit": amount,
+                    "party_id": party_id, "party_type": "customer",
+                })
+                allocations.append({
+                    "id": generate_uuid(), "company_id": company.id, "payment_transaction_id": receipt_id,
+                    "invoice_id": invoice_id, "invoice_type": "sales", "invoice_number": f"INV-{c}-{i}",
+                    "allocation_type": BillAllocationType.AGAINST_REFERENCE, "allocated_amount": amount,
+                    "allocation_date": received_on, "party_id": party_id, "party_type": "customer",
+                })
+                expected[party_id] -= amount if received_on <= TO_DATE else 0
+            if rng.random() < 0.05:
+                note_on, amount = when + timedelta(days=3), (total / 10).quantize(CENT)
+                transactions.append({
+                    "id": generate_uuid(), "company_id": company.id, "transaction_number": f"DN-{c}-{i}",
+                    "transaction_date": note_on, "voucher_type": VoucherType.DEBIT_NOTE,
+                    "status": TransactionStatus.POSTED, "total_debit": amount, "total_credit": amount,
+                    "party_id": party_id, "party_type": "customer",
+                })
+                expected[party_id] -= amount if note_on <= TO_DATE else 0
+
+    db.execute(insert(Customer), parties)
+    db.execute(insert(Invoice), invoices)
+    db.execute(insert(Payment), payments)
+    db.execute(insert(Transaction), transactions)
+    db.execute(insert(BillAllocation), allocations)
+    db.commit()
+    return expected
+
+
+def main():
+    customers = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    per_customer = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+    db = make_session()
+    company = seed_company(db, "Statement Bench")
+    expected = seed(db, company, customers, per_customer)
+    service = ReportService(db)
+    party_id = next(iter(expected))
+
+    print(f"\n{customers} customers x {per_customer} invoices (SQLite)")
+    with measure(db, "get_party_statement (one customer)") as counter:
+        single = service.get_party_statement(company, party_id, "customer", FROM_DATE, TO_DATE)
+    assert counter.count <= 7, counter.count
+    assert single["summary"]["closing_balance"] == expected[party_id]
+
+    with measure(db, "iter_party_statements (all customers)") as counter:
+        statements = list(service.iter_party_statements(company, "customer", FROM_DATE, TO_DATE))
+    assert counter.count <= 7, counter.count
+
+    by_party = {s["party"]["id"]: s for s in statements}
+    assert by_party[party_id] == single
+    for pid, balance in expected.items():
+        closing = by_party[pid]["summary"]["closing_balance"] if pid in by_party else Decimal("0")
+        assert closing == balance, (pid, closing, balance)
+    lines = sum(len(s["entries"]) for s in statements)
+    print(f"  {len(statements)} statements, {lines} lines; closing balances match the documents")
+
+    following = service.get_party_statement(
+        company, party_id, "customer", TO_DATE + timedelta(seconds=1), datetime(2024, 12, 31, 23, 59, 59)
+    )
+    assert following["summary"]["opening_balance"] == single["summary"]["closing_balance"]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Payroll run benchmark.
+
+Seeds employees with salary structures, statutory settings, custom PT slabs,
+tax declarations, loans, a month of attendance and some approved unpaid
+leave, then runs PayrollService.process_payroll. With
+--compare, each employee is also calculated one by one with
+calculate_employee_salary without a preloaded context, and every breakdown
+must equal the batch result. With --workers N, the run is repeated on a
+process pool of N workers and every entry and total must match.
+
+Usage: python benchmarks/payroll_benchmark.py [employees] [--compare] [--workers N]
+"""
+import random
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from common import make_session, seed_company, measure
+
+from sqlalchemy import insert
+
+from app.database.models import generate_uuid
+from app.database.payroll_models import (
+    Attendance, AttendanceStatus, Employee, EmployeeLoan, LeaveApplication, LeaveApplicationStatus, LeaveType, EmployeeSalaryStructure, EmployeeStatus, EmployeeTaxDeclaration,
+    LoanStatus, PayrollEntry, PayrollRunStatus, PayrollSettings, ProfessionalTaxSlab, TaxRegime,
+)
+from app.services.payroll_service import PayrollService
+from app.services.salary_tds_service import SalaryTDSService
+
+MONTH, YEAR = 6, 2024
+STATES = ["MH", "KA", "TN", "DL", "WB"]
+
+
+def seed(db, company, count: int, seed: int = 3):
+    rng = random.Random(seed)
+    service = PayrollService(db)
+    components = {c.code: c for c in service.create_default_salary_components(company.id)}
+    db.add(PayrollSettings(company_id=company.id))
+    db.add_all([
+        ProfessionalTaxSlab(company_id=company.id, state_code="KA", from_amount=Decimal("0"),
+                            to_amount=Decimal("24999"), tax_amount=Decimal("0")),
+        ProfessionalTaxSlab(company_id=company.id, state_code="KA", from_amount=Decimal("25000"),
+                            to_amount=None, tax_amount=Decimal("200")),
+    ])
+
+    unpaid = LeaveType(company_id=company.id, name="Leave Without Pay", code="LWP",
+                       days_per_year=Decimal("30"), paid_leave=False)
+    db.add(unpaid)
+    db.flush()
+
+    employees, structures, declarations, loans = [], [], [], []
+    attendance, leaves = [], []
+    financial_year = SalaryTDSService(db).get_current_financial_year()
+    for i in range(count):
+        employee_id = generate_uuid()
+        employees.append({
+            "id": employee_id, "company_id": company.id, "employee_code": f"EMP{i:05d}",
+            "first_name": f"Emp{i}", "last_name": "Bench", "full_name": f"Emp{i} Bench",
+            "date_of_joining": date(2020, 1, 1), "status": EmployeeStatus.ACTIVE,
+            "pf_applicable": rng.random() < 0.9, "esi_applicable": rng.random() < 0.5,
+            "pt_applicable": True, "work_state": rng.choice(STATES),
+            "tax_regime": rng.choice([TaxRegime.NEW, TaxRegime.OLD]),
+        })
+        basic = Decimal(rng.randrange(8000, 120000))
+        for code, amount in (("BASIC", basic), ("HRA", (basic * Decimal("0.4")).quantize(Decimal("1"))),
+                             ("SPECIAL", Decimal(rng.randrange(0, 40000)))):
+            structures.append({
+                "id": generate_uuid(), "employee_id": employee_id, "component_id": components[code].id,
+                "amount": amount, "effective_from": date(2024, 1, 1), "is_active": True,
+            })
+        if rng.random() < 0.3:
+            declarations.append({
+                "id": generate_uuid(), "employee_id": employee_id, "financial_year": financial_year,
+                "tax_regime": TaxRegime.OLD,
+            })
+        if rng.random() < 0.1:
+            emi = Decimal(rng.randrange(1000, 10000))
+            loans.append({
+                "id": generate_uuid(), "company_id": company.id, "employee_id": employee_id,
+                "loan_number": f"LN{i:05d}", "principal_amount": emi * 12, "tenure_months": 12,
+                "emi_amount": emi, "outstanding_balance": emi * 6, "emis_pending": 6,
+                "next_emi_date": date(YEAR, MONTH, 5), "status": LoanStatus.ACTIVE,
+            })
+
+        for day in range(1, 31):
+            roll = rng.random()
+            status = (AttendanceStatus.ABSENT if roll < 0.02 else AttendanceStatus.HALF_DAY if roll < 0.04
+                      else AttendanceStatus.WEEK_OFF if day % 7 == 0 else AttendanceStatus.PRESENT)
+            attendance.append({
+                "id": generate_uuid(), "company_id": company.id, "employee_id": employee_id,
+                "attendance_date": date(YEAR, MONTH, day), "status": status,
+                "working_hours": Decimal("8"), "overtime_hours": Decimal(rng.choice([0, 0, 0, 1, 2])),
+            })
+        if rng.random() < 0.05:
+            start = date(YEAR, MONTH, 1) + timedelta(days=rng.randrange(25))
+            leaves.append({
+                "id": generate_uuid(), "company_id": company.id, "employee_id": employee_id,
+                "leave_type_id": unpaid.id, "from_date": start, "to_date": start + timedelta(days=2),
+                "total_days": Decimal("3"), "reason": "Personal", "status": LeaveApplicationStatus.APPROVED,
+            })
+
+    db.execute(insert(Employee), employees)
+    db.execute(insert(EmployeeSalaryStructure), structures)
+    if declarations:
+        db.execute(insert(EmployeeTaxDeclaration), declarations)
+    if loans:
+        db.execute(insert(EmployeeLoan), loans)
+    db.execute(insert(Attendance), attendance)
+    if leaves:
+        db.execute(insert(LeaveApplication), leaves)
+    db.commit()
+
+
+def compare(db, company, payroll_run):
+    """Recalculate every employee on its own and compare with the stored entries."""
+    service = PayrollService(db)
+    employees = db.query(Employee).filter(
+        Employee.company_id == company.id, Employee.status == EmployeeStatus.ACTIVE,
+    ).all()
+    entries = {e.employee_id: e for e in db.query(PayrollEntry).filter(
+        PayrollEntry.payroll_run_id == payroll_run.id)}
+
+    start = time.perf_counter()
+    with measure(db, "calculate_employee_salary x N"):
+        for employee in employees:
+            breakdown = service.calculate_employee_salary(employee, MONTH, YEAR)
+            entry = entries[employee.id]
+            assert entry.gross_salary == breakdown.gross_salary, employee.id
+            assert entry.net_pay == breakdown.net_pay, employee.id
+            assert entry.total_deductions == breakdown.total_deductions, employee.id
+            assert entry.tds == breakdown.deductions.get("TDS", 0), employee.id
+            assert entry.total_loan_deductions == breakdown.deductions.get("LOAN", 0), employee.id
+    print(f"  per-employee path: {time.perf_counter() - start:.2f} s, all {len(employees)} breakdowns identical")
+
+
+ENTRY_FIELDS = ("employee_id", "earnings", "deductions", "employer_contributions", "gross_salary",
+                "total_deductions", "net_pay", "pf_employee", "esi_employee", "professional_tax", "tds")
+RUN_FIELDS = ("processed_employees", "total_gross", "total_deductions", "total_net_pay",
+              "total_pf_employee", "total_esi_employer", "total_pt", "total_tds")
+
+
+def run_entries(db, payroll_run):
+    entries = db.query(PayrollEntry).filter(PayrollEntry.payroll_run_id == payroll_run.id).all()
+    return sorted(tuple(getattr(e, f) for f in ENTRY_FIELDS) for e in entries)
+
+
+def compare_workers(db, company, payroll_run, workers: int):
+    """Process the run again on a process pool and compare entries and totals."""
+    service = PayrollService(db)
+    serial_totals = tuple(getattr(payroll_run, f) for f in RUN_FIELDS)
+    serial_entries = run_entries(db, payroll_run)
+    payroll_run.status = PayrollRunStatus.DRAFT
+    db.commit()
+
+    with measure(db, f"process_payroll (workers={workers})"):
+        payroll_run = service.process_payroll(payroll_run.id, workers=workers)
+    assert tuple(getattr(payroll_run, f) for f in RUN_FIELDS) == serial_totals
+    assert run_entries(db, payroll_run) == serial_entries
+    print(f"  entries and totals identical, errors: {len(payroll_run.processing_errors or [])}")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 5000
+    db = make_session()
+    company = seed_company(db, "Payroll Bench")
+    seed(db, company, count)
+
+    service = PayrollService(db)
+    payroll_run = service.create_payroll_run(company.id, MONTH, YEAR)
+    print(f"\nprocess_payroll for {count} employees (SQLite)")
+    with measure(db, "PayrollService.process_payroll"):
+        payroll_run = service.process_payroll(payroll_run.id)
+    print(f"  processed {payroll_run.processed_employees}, gross {payroll_run.total_gross}, "
+          f"net {payroll_run.total_net_pay}")
+
+    if "--workers" in sys.argv:
+        compare_workers(db, company, payroll_run, int(sys.argv[sys.argv.index("--workers") + 1]))
+
+    if "--compare" in sys.argv:
+        compare(db, company, payroll_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Ratio analysis benchmark.
+
+Seeds the default chart of accounts with two years of balanced journals
+between its ledgers, then times RatioAnalysisService.get_all_ratios and a
+24-month get_ratio_trend. Group figures must agree with the balance sheet
+and P&L, and each trend point must equal get_all_ratios for its trailing
+twelve months; both run in a fixed number of queries.
+
+Usage: python benchmarks/ratio_analysis_benchmark.py [entries]
+"""
+import random
+import sys
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from common import make_session, seed_company, measure
+
+from sqlalchemy import insert
+from app.database.models import Transaction, TransactionEntry, TransactionStatus, generate_uuid
+from app.services.accounting_service import AccountingService
+from app.services.ratio_analysis_service import RatioAnalysisService, JUST_BEFORE
+from app.services.report_service import ReportService
+
+START = datetime(2023, 1, 1)
+
+
+def seed(db, company, entry_count: int, seed: int = 21):
+    rng = random.Random(seed)
+    accounts = AccountingService(db).initialize_chart_of_accounts(company)
+    transactions, entries = [], []
+    minutes = 2 * 365 * 24 * 60
+    for n in range(entry_count // 2):
+        txn_id = generate_uuid()
+        amount = Decimal(rng.randint(100, 1000000)) / 100
+        transactions.append({
+            "id": txn_id, "company_id": company.id, "transaction_number": f"JV-{n:07d}",
+            "transaction_date": START + timedelta(minutes=rng.randrange(minutes)),
+            "status": TransactionStatus.POSTED, "total_debit": amount, "total_credit": amount,
+        })
+        debit, credit = rng.sample(accounts, 2)
+        entries.append({"id": generate_uuid(), "transaction_id": txn_id,
+                        "account_id": debit.id, "debit_amount": amount, "credit_amount": 0})
+        entries.append({"id": generate_uuid(), "transaction_id": txn_id,
+                        "account_id": credit.id, "debit_amount": 0, "credit_amount": amount})
+    db.execute(insert(Transaction), transactions)
+    db.execute(insert(TransactionEntry), entries)
+    db.commit()
+
+
+def main():
+    entry_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    db = make_session()
+    company = seed_company(db, "Ratio Bench")
+    seed(db, company, entry_count)
+    service = RatioAnalysisService(db)
+    reports = ReportService(db)
+    company_id = company.id
+    as_of = datetime(2024, 12, 31, 23, 59, 59, 999999)
+    from_date = datetime(2024, 4, 1)
+
+    print(f"\nDefault chart / {entry_count} entries (SQLite)")
+    with measure(db, "get_all_ratios") as counter:
+        result = service.get_all_ratios(company_id, from_date, as_of)
+    assert counter.count == 2, counter.count
+
+    balance_sheet = reports.get_balance_sheet(company, as_of)
+    pl = reports.get_profit_loss(company, from_date, as_of)
+    balances = result["balances"]
+    assert balances["total_assets"] == float(balance_sheet["total_assets"])
+    assert round(balances["total_liabilities"] + balances["total_equity"], 2) == \
+        float(balance_sheet["total_liabilities_equity"])
+    assert balances["net_income"] == float(pl["net_profit"])
+
+    with measure(db, "get_ratio_trend (24 months)") as counter:
+        trend = service.get_ratio_trend(company_id, 24, as_of)
+    assert counter.count == 2, counter.count
+    assert len(trend) == 24 and trend[-1]["month"] == "2024-12"
+
+    year_ago = datetime(2023, 12, 31, 23, 59, 59, 999999)
+    trailing = service.get_all_ratios(company_id, year_ago + JUST_BEFORE, as_of)
+    assert trend[-1]["net_income"] == trailing["balances"]["net_income"]
+    assert trend[-1]["ratios"] == {
+        name: ratio["value"] for category in trailing["ratios"].values() for name, ratio in category.items()
+    }
+
+    for category, ratios in result["ratios"].items():
+        print(f"  {category:<14} " + ", ".join(f"{k} {v['value']}" for k, v in ratios.items()))
+    print("\nOK: ratios agree with the statements in a fixed number of queries")
+
+
+if __name__ == "__main__":
+    main()
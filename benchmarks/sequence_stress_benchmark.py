@@ -0,0 +1,146 @@
+"""
+Voucher number allocator stress test.
+
+Runs many threads that each take numbers from the same series in their own
+session and commit, then checks that no number was handed out twice and
+that the committed numbers form a gap-free run. Reports allocations/sec.
+
+Usage: python benchmarks/sequence_stress_benchmark.py [threads] [allocations_per_thread] [database_url]
+
+Without a database_url a temporary SQLite file is used. Pass a PostgreSQL
+URL to exercise real row locking.
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from common import Base, seed_company  # noqa: F401  (sets up sys.path)
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.database.models import Company
+from app.services.company_service import CompanyService
+from app.services.sequence_service import SequenceService
+
+
+def make_engine(url: str):
+    """Create an engine; SQLite gets immediate write transactions to avoid lock upgrades."""
+    if not url.startswith("sqlite"):
+        return create_engine(url, pool_size=32, max_overflow=32)
+
+    engine = create_engine(url, connect_args={"check_same_thread": False, "timeout": 60})
+
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_begin(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin_immediate(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return engine
+
+
+def run_threads(Session, worker, thread_count: int):
+    """Run worker(session, results) in thread_count threads, return results and elapsed seconds."""
+    results, errors = [], []
+    lock = threading.Lock()
+
+    def target():
+        db = Session()
+        try:
+            local = worker(db)
+            with lock:
+                results.extend(local)
+        except Exception as exc:  # surface failures after join
+            errors.append(exc)
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=target) for _ in range(thread_count)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    if errors:
+        raise errors[0]
+    return results, elapsed
+
+
+def check(label: str, numbers, elapsed: float):
+    """Assert no duplicates and no gaps, then print throughput."""
+    assert len(numbers) == len(set(numbers)), f"{label}: duplicate numbers allocated"
+    assert sorted(numbers) == list(range(1, len(numbers) + 1)), f"{label}: gaps in sequence"
+    print(f"  {label:<32} {len(numbers):>7} numbers {len(numbers) / elapsed:>10.0f} alloc/s")
+
+
+def main():
+    thread_count = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    per_thread = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    url = sys.argv[3] if len(sys.argv) > 3 else None
+
+    tmpdir = None
+    if url is None:
+        tmpdir = tempfile.mkdtemp()
+        url = f"sqlite:///{os.path.join(tmpdir, 'sequence_stress.db')}"
+
+    engine = make_engine(url)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    setup = Session()
+    company_id = seed_company(setup, name=f"Sequence Stress {time.time_ns()}").id
+    setup.close()
+
+    print(f"\n{thread_count} threads x {per_thread} allocations on {engine.dialect.name}")
+
+    def invoice_worker(db):
+        company = db.get(Company, company_id)
+        numbers = []
+        for _ in range(per_thread):
+            invoice_number = CompanyService(db).get_next_invoice_number(company)
+            db.commit()
+            numbers.append(int(invoice_number.rsplit("-", 1)[1]))
+        return numbers
+
+    numbers, elapsed = run_threads(Session, invoice_worker, thread_count)
+    check("invoice numbers", numbers, elapsed)
+
+    def rollback_worker(db):
+        # Every other allocation is rolled back; committed numbers must stay gap-free
+        numbers = []
+        for i in range(per_thread):
+            number = SequenceService(db).allocate(company_id, "stress_rollback")
+            if i % 2:
+                db.rollback()
+            else:
+                db.commit()
+                numbers.append(number)
+        return numbers
+
+    numbers, elapsed = run_threads(Session, rollback_worker, thread_count)
+    check("with rollbacks", numbers, elapsed)
+
+    block_size = 50
+
+    def block_worker(db):
+        numbers = []
+        for _ in range(max(1, per_thread // block_size)):
+            block = SequenceService(db).allocate_block(company_id, "stress_block", block_size)
+            db.commit()
+            numbers.extend(block)
+        return numbers
+
+    numbers, elapsed = run_threads(Session, block_worker, thread_count)
+    check(f"blocks of {block_size}", numbers, elapsed)
+
+    print("\nOK: no duplicates, no gaps")
+
+
+if __name__ == "__main__":
+    main()
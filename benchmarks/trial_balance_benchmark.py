@@ -0,0 +1,108 @@
+"""
+Trial balance benchmark.
+
+Seeds 100k transaction entries spread across a growing number of ledgers and
+compares the per-account SUM loop with the grouped balance engine. The
+grouped engine must return identical balances with a constant query count.
+
+Usage: python benchmarks/trial_balance_benchmark.py [entries]
+"""
+import random
+import sys
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from common import make_session, seed_company, measure
+
+from sqlalchemy import insert
+from app.database.models import (
+    Account, Transaction, TransactionEntry, AccountType, TransactionStatus,
+    generate_uuid,
+)
+from app.services.report_service import ReportService
+
+
+def seed_ledgers(db, company, ledger_count: int, entry_count: int):
+    """Seed accounts and balanced two-line journals totalling entry_count rows."""
+    types = list(AccountType)
+    accounts = [
+        {
+            "id": generate_uuid(),
+            "company_id": company.id,
+            "code": f"{10000 + i}",
+            "name": f"Ledger {i}",
+            "account_type": types[i % len(types)],
+            "is_active": True,
+        }
+        for i in range(ledger_count)
+    ]
+    db.execute(insert(Account), accounts)
+
+    rng = random.Random(42)
+    start = datetime(2020, 4, 1)
+    transactions, entries = [], []
+    for n in range(entry_count // 2):
+        txn_id = generate_uuid()
+        amount = Decimal(rng.randint(100, 1000000)) / 100
+        transactions.append({
+            "id": txn_id,
+            "company_id": company.id,
+            "transaction_number": f"JV-{n:07d}",
+            "transaction_date": start + timedelta(minutes=n),
+            "status": TransactionStatus.POSTED,
+            "total_debit": amount,
+            "total_credit": amount,
+        })
+        debit, credit = rng.sample(accounts, 2)
+        entries.append({"id": generate_uuid(), "transaction_id": txn_id,
+                        "account_id": debit["id"], "debit_amount": amount, "credit_amount": 0})
+        entries.append({"id": generate_uuid(), "transaction_id": txn_id,
+                        "account_id": credit["id"], "debit_amount": 0, "credit_amount": amount})
+
+    db.execute(insert(Transaction), transactions)
+    db.execute(insert(TransactionEntry), entries)
+    db.commit()
+
+
+def legacy_trial_balance(service: ReportService, company, as_of_date):
+    """Per-account SUM loop, as the trial balance used to be computed."""
+    accounts = service.db.query(Account).filter(
+        Account.company_id == company.id,
+        Account.is_active == True
+    ).order_by(Account.code).all()
+    return {
+        account.id: service._get_account_balance_at_date(account, as_of_date)
+        for account in accounts
+    }
+
+
+def main():
+    entry_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    for ledger_count in (100, 500, 1500):
+        db = make_session()
+        company = seed_company(db)
+        seed_ledgers(db, company, ledger_count, entry_count)
+        service = ReportService(db)
+        as_of = datetime.utcnow()
+
+        print(f"\n{ledger_count} ledgers / {entry_count} entries")
+        with measure(db, "per-account loop"):
+            legacy = legacy_trial_balance(service, company, as_of)
+        with measure(db, "grouped engine") as counter:
+            report = service.get_trial_balance(company, as_of)
+
+        grouped = {e["account_id"]: e["debit_balance"] - e["credit_balance"] for e in report["entries"]}
+        for account_id, balance in legacy.items():
+            account_type = db.get(Account, account_id).account_type
+            expected = balance if account_type in (AccountType.ASSET, AccountType.EXPENSE) else -balance
+            assert grouped.get(account_id, Decimal("0")) == expected, account_id
+        assert counter.count <= 2, counter.count
+        assert report["is_balanced"]
+        db.close()
+
+    print("\nOK: balances match and query count is constant")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,14 @@
 """GST Invoice Pro - Main FastAPI Application."""
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
+import hmac
 import os
 
 from app.config import settings
 from app.database.connection import init_db
+from app.database.metrics import db_metrics
 from app.api import (
     auth_router,
     companies_router,
@@ -81,6 +84,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.DB_METRICS_ENABLED:
+    @app.middleware("http")
+    async def db_metrics_middleware(request: Request, call_next):
+        """Count queries per request for /metrics and, if enabled, the X-DB-* response headers.
+        
+        Headers are sent before the body, so for streamed responses they only
+        cover the queries run before streaming started. The per-route totals
+        are folded in once the body has been sent and include everything.
+        """
+        stats = db_metrics.start_request()
+        response = await call_next(request)
+        
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        if settings.DB_METRICS_HEADERS:
+            response.headers["X-DB-Queries"] = str(stats.queries)
+            response.headers["X-DB-Query-Time-Ms"] = f"{stats.query_time * 1000:.1f}"
+        
+        body = response.body_iterator
+        
+        async def body_then_finish():
+            try:
+                async for chunk in body:
+                    yield chunk
+            finally:
+                db_metrics.finish_request(route, stats)
+        
+        response.body_iterator = body_then_finish()
+        return response
+
 # Create directories
 os.makedirs("static", exist_ok=True)
 os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
@@ -145,6 +177,19 @@ async def health_check():
     }
 
 
+if settings.METRICS_ENDPOINT_ENABLED:
+    @app.get("/metrics")
+    async def metrics(request: Request, format: str = "json"):
+        """Database pool and per-request query metrics (format=json|prometheus)."""
+        if settings.METRICS_TOKEN:
+            supplied = request.headers.get("Authorization", "").removeprefix("Bearer ")
+            if not hmac.compare_digest(supplied, settings.METRICS_TOKEN):
+                raise HTTPException(status_code=401, detail="Invalid metrics token")
+        if format == "prometheus":
+            return PlainTextResponse(db_metrics.prometheus())
+        return db_metrics.snapshot()
+
+
 @app.get("/api")
 async def api_info():
     """API information endpoint."""
@@ -0,0 +1,58 @@
+"""
+Rebuild or verify daily account balance snapshots.
+
+Usage:
+    python rebuild_balance_snapshots.py                  # rebuild all companies
+    python rebuild_balance_snapshots.py --company <id>   # rebuild one company
+    python rebuild_balance_snapshots.py --check          # verify only, no writes
+
+Run a full rebuild before setting BALANCE_SNAPSHOTS_ENABLED=true.
+"""
+import argparse
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy.orm import Session
+from app.database.connection import engine, init_db
+from app.database.models import Company
+from app.services.balance_snapshot_service import BalanceSnapshotService
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild or verify account balance snapshots")
+    parser.add_argument("--company", help="Only process this company ID")
+    parser.add_argument("--check", action="store_true", help="Compare snapshots against a full recompute")
+    args = parser.parse_args()
+
+    # Make sure the snapshot table exists
+    init_db()
+
+    failed = False
+    with Session(engine) as db:
+        query = db.query(Company.id, Company.name)
+        if args.company:
+            query = query.filter(Company.id == args.company)
+
+        service = BalanceSnapshotService(db)
+        for company_id, name in query.all():
+            if args.check:
+                result = service.check_consistency(company_id)
+                if result["is_consistent"]:
+                    print(f"✅ {name}: {result['snapshot_rows']} snapshots consistent")
+                else:
+                    failed = True
+                    print(f"❌ {name}: {len(result['mismatches'])} account(s) drifted")
+                    for m in result["mismatches"]:
+                        print(f"   {m['account_id']} from {m['date']}: "
+                              f"expected Dr {m['expected_debit']} / Cr {m['expected_credit']}, "
+                              f"snapshot Dr {m['snapshot_debit']} / Cr {m['snapshot_credit']}")
+            else:
+                rows = service.rebuild(company_id)
+                print(f"✅ {name}: rebuilt {rows} snapshots")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
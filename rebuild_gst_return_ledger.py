@@ -0,0 +1,59 @@
+"""
+Rebuild or verify the GST return ledger.
+
+Usage:
+    python rebuild_gst_return_ledger.py                  # rebuild all companies
+    python rebuild_gst_return_ledger.py --company <id>   # rebuild one company
+    python rebuild_gst_return_ledger.py --check          # verify only, no writes
+
+Run a full rebuild before setting GST_RETURN_LEDGER_ENABLED=true, and
+--check nightly to catch drift from writes that bypass the services.
+"""
+import argparse
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy.orm import Session
+from app.database.connection import engine, init_db
+from app.database.models import Company
+from app.services.gst_return_ledger import GSTReturnLedgerService
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild or verify the GST return ledger")
+    parser.add_argument("--company", help="Only process this company ID")
+    parser.add_argument("--check", action="store_true", help="Compare the ledger against a full recompute")
+    args = parser.parse_args()
+
+    # Make sure the ledger table exists
+    init_db()
+
+    failed = False
+    with Session(engine) as db:
+        query = db.query(Company.id, Company.name)
+        if args.company:
+            query = query.filter(Company.id == args.company)
+
+        service = GSTReturnLedgerService(db)
+        for company_id, name in query.all():
+            if args.check:
+                result = service.check_consistency(company_id)
+                if result["is_consistent"]:
+                    print(f"✅ {name}: {result['ledger_rows']} ledger rows consistent")
+                else:
+                    failed = True
+                    print(f"❌ {name}: {len(result['mismatches'])} ledger row(s) drifted")
+                    for m in result["mismatches"]:
+                        print(f"   {m['return_period']} {m['line_type']}/{m['section']} "
+                              f"pos={m['place_of_supply']} rate={m['gst_rate']} hsn={m['hsn_code']}: "
+                              f"expected {m['expected']}, ledger {m['stored']}")
+            else:
+                rows = service.rebuild(company_id)
+                print(f"✅ {name}: rebuilt {rows} ledger rows")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()